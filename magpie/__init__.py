@@ -44,6 +44,7 @@ def includeme(config):
     config.include("pyramid_chameleon")
     config.include("pyramid_beaker")
     config.include("pyramid_mako")
+    config.include("magpie.metrics")
     config.include("magpie.api")
     config.include("magpie.db")
     if get_constant("MAGPIE_UI_ENABLED", config):
@@ -2,7 +2,6 @@ import logging
 import time
 from typing import TYPE_CHECKING
 
-import requests
 import six
 from pyramid.authentication import IAuthenticationPolicy
 from pyramid.httpexceptions import HTTPForbidden, HTTPOk
@@ -14,8 +13,11 @@ from magpie.adapter.magpieowssecurity import MagpieOWSSecurity
 from magpie.adapter.magpieservice import MagpieServiceStore
 from magpie.api.exception import raise_http, valid_http
 from magpie.api.schemas import SigninAPI
+from magpie.cache import register_cache_invalidation_listener
 from magpie.db import get_engine, get_session_factory, get_tm_session
-from magpie.security import get_auth_config
+from magpie.http_client import get_http_client
+from magpie.metrics import METRICS, get_metrics_response, register_sql_metrics
+from magpie.security import get_auth_config, register_special_principals
 from magpie.utils import CONTENT_TYPE_JSON, SingletonMeta, get_logger, get_magpie_url, get_settings
 
 # WARNING:
@@ -115,8 +117,8 @@ def verify_user(request):
     :return: appropriate HTTP success or error response with details about the result.
     """
     magpie_url = get_magpie_url(request)
-    resp = requests.post(magpie_url + SigninAPI.path, json=request.json,
-                         headers={"Content-Type": CONTENT_TYPE_JSON, "Accept": CONTENT_TYPE_JSON})
+    resp = get_http_client(request).post(magpie_url + SigninAPI.path, json=request.json,
+                                         headers={"Content-Type": CONTENT_TYPE_JSON, "Accept": CONTENT_TYPE_JSON})
     if resp.status_code != HTTPOk.code:
         content = {"response": resp.json()}
         return raise_http(HTTPForbidden, detail="Failed Magpie login.", content=content, nothrow=True)  # noqa
@@ -172,6 +174,7 @@ class MagpieAdapter(AdapterInterface):
         # type: (AnySettingsContainer) -> Configurator
         settings = get_settings(container)
         set_cache_regions_from_settings(settings)
+        METRICS.configure(settings)
 
         # disable rpcinterface which is conflicting with postgres db
         settings["twitcher.rpcinterface"] = False
@@ -183,8 +186,16 @@ class MagpieAdapter(AdapterInterface):
         # use pyramid_tm to hook the transaction lifecycle to the request
         # make request.db available for use in Pyramid
         config.include("pyramid_tm")
-        session_factory = get_session_factory(get_engine(settings))
+        engine = get_engine(settings)
+        session_factory = get_session_factory(engine)
         config.registry["dbsession_factory"] = session_factory
+        register_cache_invalidation_listener(config, engine)
+        register_sql_metrics(engine)
+        db_session = session_factory()
+        try:
+            register_special_principals(config, db_session)
+        finally:
+            db_session.close()
         config.add_request_method(
             # r.tm is the transaction manager used by pyramid_tm
             lambda r: get_tm_session(session_factory, r.tm),
@@ -200,4 +211,9 @@ class MagpieAdapter(AdapterInterface):
         config.add_route("verify-user", "/verify")
         config.add_view(verify_user, route_name="verify-user")
 
+        # add route to obtain metrics of authorization stages of proxied requests
+        if METRICS.enabled:
+            config.add_route("magpie-metrics", "/metrics")
+            config.add_view(get_metrics_response, route_name="magpie-metrics", request_method="GET")
+
         return config
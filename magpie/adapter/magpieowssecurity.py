@@ -1,5 +1,14 @@
+import base64
+import hashlib
+import json
 import logging
-import requests
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+import six
+from beaker.cache import cache_regions
 from pyramid.authentication import IAuthenticationPolicy
 from pyramid.authorization import IAuthorizationPolicy
 from pyramid.httpexceptions import HTTPForbidden, HTTPNotFound, HTTPOk
@@ -9,8 +18,10 @@ from six.moves.urllib.parse import urlparse
 
 from magpie.api.exception import evaluate_call, verify_param
 from magpie.api.schemas import ProviderSigninAPI
+from magpie.cache import SERVICE_REGISTRY, TOKEN_CACHE_REGION, add_cache_invalidation_handler
 from magpie.constants import get_constant
-from magpie.models import Service
+from magpie.http_client import get_http_client
+from magpie.metrics import measure_stage, record_authz_decision
 from magpie.permissions import Permission
 from magpie.services import service_factory
 from magpie.utils import CONTENT_TYPE_JSON, get_logger, get_magpie_url, get_settings
@@ -23,9 +34,135 @@ from twitcher.owsexceptions import OWSAccessForbidden  # noqa
 from twitcher.owssecurity import OWSSecurityInterface  # noqa
 from twitcher.utils import parse_service_name  # noqa
 
+if TYPE_CHECKING:
+    # pylint: disable=W0611,unused-import
+    from typing import Dict, Optional, Tuple
+
+    from magpie.typedefs import Str
+
 LOGGER = get_logger("TWITCHER")
 
 
+class TokenSessionCache(object):
+    """
+    Thread-safe cache of `Magpie` sessions resolved from ``Authorization`` headers, bounded by least recently used.
+
+    Entries are indexed by hash of the header (never the token itself) and are kept for the ``expire`` delay of the
+    ``token`` cache region (or :attr:`default_expire` if undefined), capped by the expiry of the token when it is a
+    `JWT` and by the expiry of the obtained session cookie. The maximum amount of entries is defined by ``max_size`` of
+    the same region.
+    """
+    default_expire = 300
+    default_max_size = 1000
+
+    def __init__(self, region=TOKEN_CACHE_REGION):
+        # type: (Str) -> None
+        self.region = region
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # type: Dict[Str, Tuple[float, Str, Optional[int]]]
+
+    @property
+    def enabled(self):
+        # type: () -> bool
+        region = cache_regions.get(self.region)
+        return bool(region and region.get("enabled", True))
+
+    @property
+    def expire(self):
+        # type: () -> int
+        """
+        Maximum delay to keep sessions, always applied since opaque tokens and session cookies could have no expiry.
+        """
+        return int(cache_regions.get(self.region, {}).get("expire") or self.default_expire)
+
+    @property
+    def max_size(self):
+        # type: () -> int
+        return int(cache_regions.get(self.region, {}).get("max_size") or self.default_max_size)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(authorization, provider):
+        # type: (Str, Str) -> Str
+        return hashlib.sha256(six.ensure_binary("{}:{}".format(provider, authorization))).hexdigest()
+
+    @staticmethod
+    def get_token_expiry(authorization):
+        # type: (Str) -> Optional[float]
+        """
+        Obtains the expiry time of a bearer token if it is a `JWT` with an ``exp`` claim.
+
+        The signature is not validated since the token is only employed to shorten the duration of cached entries.
+        """
+        token = authorization.split(" ", 1)[-1].strip()
+        parts = token.split(".")
+        if len(parts) != 3:
+            return None
+        try:
+            payload = parts[1] + "=" * (-len(parts[1]) % 4)
+            claims = json.loads(six.ensure_str(base64.urlsafe_b64decode(six.ensure_binary(payload))))
+            return float(claims["exp"])
+        except (ValueError, TypeError, KeyError, AttributeError):
+            return None
+
+    def get(self, key):
+        # type: (Str) -> Optional[Tuple[Str, Optional[int]]]
+        """
+        Obtains the session cookie and user ID cached for the token if not expired.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            expire_at, cookie, user_id = entry
+            if expire_at < time.time():
+                return None
+            self._entries[key] = entry  # move as most recently used
+        return cookie, user_id
+
+    def set(self, key, cookie, user_id=None, expire_at=None):
+        # type: (Str, Str, Optional[int], Optional[float]) -> None
+        """
+        Stores the session cookie and user ID resolved for the token until the earliest applicable expiry.
+        """
+        if not self.enabled:
+            return
+        expiry = time.time() + self.expire
+        if expire_at is not None:
+            expiry = min(expiry, expire_at)
+        max_size = self.max_size
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (expiry, cookie, user_id)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id=None, group_id=None, resource_id=None):
+        # type: (Optional[int], Optional[int], Optional[int]) -> None
+        """
+        Removes sessions of a modified user, or all of them if all caches are cleared.
+        """
+        if user_id is None and group_id is None and resource_id is None:
+            self.clear()
+        elif user_id is not None:
+            with self._lock:
+                for key in [key for key, entry in self._entries.items() if entry[2] == user_id]:
+                    self._entries.pop(key)
+
+    def clear(self):
+        # type: () -> None
+        with self._lock:
+            self._entries.clear()
+
+
+TOKEN_SESSION_CACHE = TokenSessionCache()
+add_cache_invalidation_handler(TOKEN_SESSION_CACHE.invalidate)
+
+
 class MagpieOWSSecurity(OWSSecurityInterface):
 
     def __init__(self, request):
@@ -38,25 +175,29 @@ class MagpieOWSSecurity(OWSSecurityInterface):
     def check_request(self, request):
         if request.path.startswith(self.twitcher_protected_path):
             service_name = parse_service_name(request.path, self.twitcher_protected_path)
-            service = evaluate_call(lambda: Service.by_service_name(service_name, db_session=request.db),
-                                    http_error=HTTPForbidden, msg_on_fail="Service query by name refused by db.")
+            with measure_stage(request, "service_lookup"):
+                service = evaluate_call(lambda: SERVICE_REGISTRY.find(request.db, name=service_name),
+                                        http_error=HTTPForbidden, msg_on_fail="Service query by name refused by db.")
             verify_param(service, not_none=True, http_error=HTTPNotFound, msg_on_fail="Service name not found.")
 
             # return a specific type of service, ex: ServiceWPS with all the acl (loaded according to the service_type)
             service_specific = service_factory(service, request)
             # should contain all the acl, this the only thing important
             # parse request (GET/POST) to get the permission requested for that service
-            permission_requested = service_specific.permission_requested()
+            with measure_stage(request, "request_parsing"):
+                permission_requested = service_specific.permission_requested()
             # convert permission enum to str for comparison
             permission_requested = Permission.get(permission_requested).value if permission_requested else None
 
             if permission_requested:
                 LOGGER.info("'%s' request '%s' permission on '%s'", request.user, permission_requested, request.path)
                 self.update_request_cookies(request)
-                authn_policy = request.registry.queryUtility(IAuthenticationPolicy)
-                authz_policy = request.registry.queryUtility(IAuthorizationPolicy)
-                principals = authn_policy.effective_principals(request)
-                has_permission = authz_policy.permits(service_specific, principals, permission_requested)
+                with measure_stage(request, "authorization"):
+                    authn_policy = request.registry.queryUtility(IAuthenticationPolicy)
+                    authz_policy = request.registry.queryUtility(IAuthorizationPolicy)
+                    principals = authn_policy.effective_principals(request)
+                    has_permission = authz_policy.permits(service_specific, principals, permission_requested)
+                record_authz_decision(service.type, bool(has_permission))
 
                 if LOGGER.isEnabledFor(logging.DEBUG):
                     LOGGER.debug("%s - AUTHN policy configurations:", type(self).__name__)
@@ -66,7 +207,8 @@ class MagpieOWSSecurity(OWSSecurityInterface):
 
                 if has_permission:
                     return  # allowed
-
+            else:
+                record_authz_decision(service.type, False)
             raise OWSAccessForbidden("Not authorized to access this resource. "
                                      "User does not meet required permissions.")
 
@@ -80,11 +222,18 @@ class MagpieOWSSecurity(OWSSecurityInterface):
         token_name = get_constant("MAGPIE_COOKIE_NAME", settings_container=request.registry.settings)
         if "Authorization" in request.headers and token_name not in request.cookies:
             magpie_prov = request.params.get("provider", "WSO2")
+            token_key = TokenSessionCache.make_key(request.headers["Authorization"], magpie_prov)
+            cached_session = TOKEN_SESSION_CACHE.get(token_key)
+            if cached_session:
+                LOGGER.debug("Reusing cached session of user [%s] for token.", cached_session[1])
+                request.cookies.update({token_name: cached_session[0]})
+                return
             magpie_path = ProviderSigninAPI.path.format(provider_name=magpie_prov)
             magpie_auth = "{}{}".format(self.magpie_url, magpie_path)
             headers = dict(request.headers)
             headers.update({"Homepage-Route": "/session", "Accept": CONTENT_TYPE_JSON})
-            session_resp = requests.get(magpie_auth, headers=headers, verify=self.twitcher_ssl_verify)
+            session_resp = get_http_client(self.settings).get(magpie_auth, headers=headers,
+                                                              verify=self.twitcher_ssl_verify)
             if session_resp.status_code != HTTPOk.code:
                 raise OWSAccessForbidden("Not authorized to access this resource. "
                                          "Provider login failed with following reason: [{}]."
@@ -95,7 +244,15 @@ class MagpieOWSSecurity(OWSSecurityInterface):
             magpie_cookies = list(filter(lambda cookie: cookie.name == token_name, request_cookies))
             magpie_domain = urlparse(self.magpie_url).hostname if len(magpie_cookies) > 1 else None
             session_cookies = RequestsCookieJar.get(request_cookies, token_name, domain=magpie_domain)
-            if not session_resp.json().get("authenticated") or not session_cookies:
+            session_json = session_resp.json()
+            if not session_json.get("authenticated") or not session_cookies:
                 raise OWSAccessForbidden("Not authorized to access this resource. "
                                          "Session authentication could not be verified.")
             request.cookies.update({token_name: session_cookies})
+
+            expiry = [TokenSessionCache.get_token_expiry(request.headers["Authorization"])]
+            expiry.extend(cookie.expires for cookie in magpie_cookies
+                          if magpie_domain is None or cookie.domain == magpie_domain)
+            expiry = [expire_at for expire_at in expiry if expire_at is not None]
+            user_id = session_json.get("user", {}).get("user_id")
+            TOKEN_SESSION_CACHE.set(token_key, session_cookies, user_id, expire_at=min(expiry) if expiry else None)
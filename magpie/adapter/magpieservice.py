@@ -3,12 +3,12 @@ Store adapters to read data from magpie.
 """
 from typing import TYPE_CHECKING
 
-import requests
 from pyramid.httpexceptions import HTTPOk
 from pyramid.settings import asbool
 
 from magpie.api.schemas import ServicesAPI
-from magpie.models import Service as MagpieService
+from magpie.cache import SERVICE_REGISTRY
+from magpie.http_client import get_http_client
 from magpie.utils import CONTENT_TYPE_JSON, get_admin_cookies, get_logger, get_magpie_url, get_settings
 
 # WARNING:
@@ -61,8 +61,9 @@ class MagpieServiceStore(ServiceStoreInterface):
         # obtain admin access since 'service_url' is only provided on admin routes
         services = []
         path = "{}{}".format(self.magpie_url, ServicesAPI.path)
-        resp = requests.get(path, cookies=self.magpie_admin_token, headers={"Accept": CONTENT_TYPE_JSON},
-                            verify=self.twitcher_ssl_verify)
+        resp = get_http_client(self.settings).get(path, cookies=self.magpie_admin_token,
+                                                  headers={"Accept": CONTENT_TYPE_JSON},
+                                                  verify=self.twitcher_ssl_verify)
         if resp.status_code != HTTPOk.code:
             raise resp.raise_for_status()
         json_body = resp.json()
@@ -77,13 +78,23 @@ class MagpieServiceStore(ServiceStoreInterface):
         """
         Gets service for given ``name`` from magpie.
         """
+        return self._fetch(name=name)
 
-        session = self.session_factory()
+    def fetch_by_url(self, url, request=None):
+        """
+        Gets service for given ``url`` from magpie.
+        """
+        return self._fetch(url=url)
 
+    def _fetch(self, name=None, url=None):
+        """
+        Gets service by ``name`` or ``url`` from the shared registry, or directly from the database if not enabled.
+        """
+        session = self.session_factory()
         try:
-            service = MagpieService.by_service_name(name, db_session=session)
+            service = SERVICE_REGISTRY.lookup(session, name=name, url=url)
             if service is None:
-                raise ServiceNotFound("Service name not found.")
+                raise ServiceNotFound("Service {} not found.".format("name" if name is not None else "url"))
 
             return Service(url=service.url,
                            name=service.resource_name,
@@ -92,16 +103,6 @@ class MagpieServiceStore(ServiceStoreInterface):
         finally:
             session.close()
 
-    def fetch_by_url(self, url, request=None):
-        """
-        Gets service for given ``url`` from mongodb storage.
-        """
-        services = self.list_services(request=request)
-        for service in services:
-            if service.url == url:
-                return service
-        raise ServiceNotFound
-
     def clear_services(self, request=None):
         """
         Magpie store is read-only, use magpie api to delete services.
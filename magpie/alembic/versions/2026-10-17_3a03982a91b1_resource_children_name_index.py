@@ -0,0 +1,34 @@
+"""
+Index resource children by lower-case name.
+
+Revision ID: 3a03982a91b1
+Revises: 954a9d7fe740
+Create Date: 2026-10-17 09:12:41.527103
+"""
+
+from alembic import op
+from alembic.context import get_context  # noqa: F401
+from sqlalchemy.dialects.postgresql.base import PGDialect
+
+# revision identifiers, used by Alembic.
+revision = "3a03982a91b1"
+down_revision = "954a9d7fe740"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    context = get_context()
+    if isinstance(context.connection.engine.dialect, PGDialect):
+        op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_resources_parent_id_lower_resource_name
+          ON resources
+          USING btree
+          (parent_id, lower(resource_name::text));
+        """)
+
+
+def downgrade():
+    context = get_context()
+    if isinstance(context.connection.engine.dialect, PGDialect):
+        op.execute("DROP INDEX IF EXISTS ix_resources_parent_id_lower_resource_name;")
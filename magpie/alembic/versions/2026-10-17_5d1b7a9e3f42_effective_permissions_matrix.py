@@ -0,0 +1,49 @@
+"""
+Materialized effective permissions matrix of services.
+
+Revision ID: 5d1b7a9e3f42
+Revises: c8e3f4a1b2d7
+Create Date: 2026-10-17 16:21:45.503918
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5d1b7a9e3f42"
+down_revision = "c8e3f4a1b2d7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table("services_permissions_matrix",
+                    sa.Column("service_id", sa.Integer(),
+                              sa.ForeignKey("services.resource_id", onupdate="CASCADE", ondelete="CASCADE"),
+                              primary_key=True, nullable=False),
+                    sa.Column("computed", sa.DateTime(), nullable=False),
+                    sa.Column("entries", sa.Integer(), nullable=False)
+                    )
+    op.create_table("effective_permissions",
+                    sa.Column("service_id", sa.Integer(),
+                              sa.ForeignKey("services.resource_id", onupdate="CASCADE", ondelete="CASCADE"),
+                              nullable=False),
+                    sa.Column("resource_id", sa.Integer(),
+                              sa.ForeignKey("resources.resource_id", onupdate="CASCADE", ondelete="CASCADE"),
+                              primary_key=True, nullable=False),
+                    sa.Column("user_id", sa.Integer(),
+                              sa.ForeignKey("users.id", onupdate="CASCADE", ondelete="CASCADE"),
+                              primary_key=True, nullable=False),
+                    sa.Column("perm_name", sa.Unicode(64), primary_key=True, nullable=False),
+                    sa.Column("access", sa.Unicode(16), nullable=False),
+                    sa.Column("reason", sa.UnicodeText(), nullable=True)
+                    )
+    op.create_index("ix_effective_permissions_service_id", "effective_permissions", ["service_id"])
+    op.create_index("ix_effective_permissions_user_id", "effective_permissions", ["user_id"])
+
+
+def downgrade():
+    op.drop_index("ix_effective_permissions_user_id", table_name="effective_permissions")
+    op.drop_index("ix_effective_permissions_service_id", table_name="effective_permissions")
+    op.drop_table("effective_permissions")
+    op.drop_table("services_permissions_matrix")
@@ -0,0 +1,27 @@
+"""
+Scheduling details of remote resources synchronization.
+
+Revision ID: 7b2e9c4d1f60
+Revises: 5d1b7a9e3f42
+Create Date: 2026-10-17 18:04:12.318542
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "7b2e9c4d1f60"
+down_revision = "5d1b7a9e3f42"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("remote_resources_sync_info", sa.Column("next_sync", sa.DateTime(), nullable=True))
+    op.add_column("remote_resources_sync_info", sa.Column("sync_failures", sa.Integer(),
+                                                          server_default="0", nullable=False))
+
+
+def downgrade():
+    op.drop_column("remote_resources_sync_info", "sync_failures")
+    op.drop_column("remote_resources_sync_info", "next_sync")
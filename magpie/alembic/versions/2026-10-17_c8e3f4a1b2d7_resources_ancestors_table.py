@@ -0,0 +1,50 @@
+"""
+Resources ancestors closure table.
+
+Revision ID: c8e3f4a1b2d7
+Revises: 3a03982a91b1
+Create Date: 2026-10-17 14:03:27.815342
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c8e3f4a1b2d7"
+down_revision = "3a03982a91b1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table("resources_ancestors",
+                    sa.Column("resource_id", sa.Integer(),
+                              sa.ForeignKey("resources.resource_id", onupdate="CASCADE", ondelete="CASCADE"),
+                              primary_key=True, nullable=False),
+                    sa.Column("ancestor_id", sa.Integer(),
+                              sa.ForeignKey("resources.resource_id", onupdate="CASCADE", ondelete="CASCADE"),
+                              primary_key=True, nullable=False),
+                    sa.Column("depth", sa.Integer(), nullable=False)
+                    )
+    op.create_index("ix_resources_ancestors_ancestor_id", "resources_ancestors", ["ancestor_id"])
+
+    # populate references of all existing resources by rewinding the tree from each one up to its root service
+    op.execute("""
+    INSERT INTO resources_ancestors (resource_id, ancestor_id, depth)
+    WITH RECURSIVE ancestors(resource_id, ancestor_id, depth) AS (
+        SELECT resource_id, parent_id, 1
+        FROM resources
+        WHERE parent_id IS NOT NULL
+      UNION ALL
+        SELECT ancestors.resource_id, resources.parent_id, ancestors.depth + 1
+        FROM ancestors
+        JOIN resources ON resources.resource_id = ancestors.ancestor_id
+        WHERE resources.parent_id IS NOT NULL
+    )
+    SELECT resource_id, ancestor_id, depth FROM ancestors;
+    """)
+
+
+def downgrade():
+    op.drop_index("ix_resources_ancestors_ancestor_id", table_name="resources_ancestors")
+    op.drop_table("resources_ancestors")
@@ -1,8 +1,9 @@
 from pyramid.security import NO_PERMISSION_REQUIRED
 
 from magpie.api import schemas as s
-from magpie.api.home.home import get_homepage
+from magpie.api.home.home import get_homepage, get_metrics
 from magpie.constants import get_constant
+from magpie.metrics import METRICS
 from magpie.utils import get_logger
 
 LOGGER = get_logger(__name__)
@@ -15,4 +16,9 @@ def includeme(config):
         LOGGER.info("Adding API homepage...")
         config.add_route(s.HomepageAPI.name, s.HomepageAPI.path)
         config.add_view(get_homepage, route_name=s.HomepageAPI.name, permission=NO_PERMISSION_REQUIRED)
+    if METRICS.enabled:
+        LOGGER.info("Adding API metrics...")
+        config.add_route(**s.service_api_route_info(s.MetricsAPI))
+        config.add_view(get_metrics, route_name=s.MetricsAPI.name, request_method="GET",
+                        permission=NO_PERMISSION_REQUIRED)
     config.scan()
@@ -9,6 +9,7 @@ from magpie import __meta__
 from magpie.api import exception as ax
 from magpie.api import schemas as s
 from magpie.db import get_database_revision
+from magpie.metrics import get_metrics_response
 from magpie.utils import CONTENT_TYPE_JSON, get_logger, get_magpie_url, print_log
 
 LOGGER = get_logger(__name__)
@@ -46,3 +47,11 @@ def get_version(request):
     }
     return ax.valid_http(http_success=HTTPOk, content=version, content_type=CONTENT_TYPE_JSON,
                          detail=s.Version_GET_OkResponseSchema.description)
+
+
+@s.MetricsAPI.get(tags=[s.APITag], api_security=s.SecurityEveryoneAPI, response_schemas=s.Metrics_GET_responses)
+def get_metrics(request):
+    """
+    Metrics of authorization stages and SQL statements of requests in Prometheus text format (only if enabled).
+    """
+    return get_metrics_response(request)
@@ -19,8 +19,13 @@ from magpie.api import exception as ax
 from magpie.api import schemas as s
 from magpie.api.management.group.group_formats import format_group
 from magpie.api.management.resource.resource_formats import format_resource
-from magpie.api.management.resource.resource_utils import check_valid_service_or_resource_permission
+from magpie.api.management.resource.resource_utils import (
+    check_valid_service_or_resource_permission,
+    get_resources_by_ids,
+    get_services_children
+)
 from magpie.api.management.service.service_formats import format_service, format_service_resources
+from magpie.cache import invalidate_permission_cache
 from magpie.permissions import PermissionSet, PermissionType, format_permissions
 from magpie.services import SERVICE_TYPE_DICT
 
@@ -51,21 +56,37 @@ def get_group_resources(group, db_session):
     Get formatted JSON body describing all service resources the ``group`` as permissions on.
     """
     json_response = {}
-    for svc in list(ResourceService.all(models.Service, db_session=db_session)):
-        svc_perms = get_group_service_permissions(group=group, service=svc, db_session=db_session)
+    services = list(ResourceService.all(models.Service, db_session=db_session))
+    # retrieve permissions and children resources of all services at once rather than for each service
+    services_perms = {svc.resource_id: ([], {}) for svc in services}
+    for res_id, res_perms in get_group_resources_permissions_dict(group, db_session).items():
+        resource = res_perms[0].perm_tuple.resource
+        if resource.root_service_id is None:
+            if res_id in services_perms:
+                services_perms[res_id][0].extend(res_perms)
+        elif resource.root_service_id in services_perms:
+            services_perms[resource.root_service_id][1][res_id] = res_perms
+    services_children = get_services_children(services_perms, db_session)
+    for svc in services:
+        if svc.owner_group_id == group.id:
+            svc_perms = [PermissionSet(perm, typ=PermissionType.OWNED)
+                         for perm in SERVICE_TYPE_DICT[svc.type].permissions]
+        else:
+            svc_perms = [PermissionSet(perm.name, perm.access, perm.scope, typ=PermissionType.APPLIED)
+                         for perm in services_perms[svc.resource_id][0]]
         svc_name = str(svc.resource_name)
         svc_type = str(svc.type)
         if svc_type not in json_response:
             json_response[svc_type] = {}
-        res_perm_dict = get_group_service_resources_permissions_dict(group=group, service=svc, db_session=db_session)
         json_response[svc_type][svc_name] = format_service_resources(
             svc,
             db_session=db_session,
             service_perms=svc_perms,
-            resources_perms_dict=res_perm_dict,
+            resources_perms_dict=services_perms[svc.resource_id][1],
             permission_type=PermissionType.APPLIED,
             show_all_children=False,
             show_private_url=False,
+            resources_children=services_children[svc.resource_id],
         )
     return json_response
 
@@ -181,6 +202,7 @@ def create_group_resource_permission_response(group, resource, permission, db_se
     ax.evaluate_call(lambda: db_session.add(new_perm), fallback=lambda: db_session.rollback(),
                      http_error=HTTPForbidden, content=perm_content,
                      msg_on_fail=s.GroupResourcePermissions_POST_ForbiddenAddResponseSchema.description)
+    invalidate_permission_cache(db_session, group_id=group.id, resource_id=resource_id)
     return ax.valid_http(http_success=http_success, content=perm_content, detail=http_detail)
 
 
@@ -266,6 +288,7 @@ def delete_group_resource_permission_response(group, resource, permission, db_se
     ax.evaluate_call(lambda: db_session.delete(del_perm), fallback=lambda: db_session.rollback(),
                      http_error=HTTPForbidden, content=perm_content,
                      msg_on_fail=s.GroupServicePermission_DELETE_ForbiddenResponseSchema.description)
+    invalidate_permission_cache(db_session, group_id=group.id, resource_id=res_id)
     return ax.valid_http(http_success=HTTPOk, detail=s.GroupServicePermission_DELETE_OkResponseSchema.description)
 
 
@@ -275,8 +298,9 @@ def get_group_services(resources_permissions_dict, db_session):
     Nest and regroup the resource permissions under corresponding root service types.
     """
     grp_svc_dict = {}
+    services = get_resources_by_ids(resources_permissions_dict, db_session)
     for res_id, perms in resources_permissions_dict.items():
-        svc = ResourceService.by_resource_id(resource_id=res_id, db_session=db_session)
+        svc = services[res_id]
         svc_type = str(svc.type)
         svc_name = str(svc.resource_name)
         if svc_type not in grp_svc_dict:
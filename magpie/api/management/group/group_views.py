@@ -8,6 +8,7 @@ from magpie.api import requests as ar
 from magpie.api import schemas as s
 from magpie.api.management.group import group_formats as gf
 from magpie.api.management.group import group_utils as gu
+from magpie.cache import invalidate_permission_cache
 from magpie.constants import get_constant
 
 
@@ -87,6 +88,8 @@ def edit_group_view(request):
         group.description = new_description
     if update_disc:
         group.discoverable = new_discoverability
+    if update_name:
+        invalidate_permission_cache(request.db, group_id=group.id)  # name employed in permission reasons
     return ax.valid_http(http_success=HTTPOk, detail=s.Group_PATCH_OkResponseSchema.description)
 
 
@@ -107,6 +110,7 @@ def delete_group_view(request):
     ax.evaluate_call(lambda: request.db.delete(group),
                      fallback=lambda: request.db.rollback(), http_error=HTTPForbidden,
                      msg_on_fail=s.Group_DELETE_ForbiddenResponseSchema.description)
+    invalidate_permission_cache(request.db, group_id=group.id)
     return ax.valid_http(http_success=HTTPOk, detail=s.Group_DELETE_OkResponseSchema.description)
 
 
@@ -19,6 +19,7 @@ from magpie.api import schemas as s
 from magpie.api.management.group import group_formats as gf
 from magpie.api.management.register import register_utils as ru
 from magpie.api.management.user import user_utils as uu
+from magpie.cache import invalidate_permission_cache
 
 if TYPE_CHECKING:
     from pyramid.httpexceptions import HTTPException
@@ -74,6 +75,7 @@ def join_discoverable_group_view(request):
                      fallback=lambda: request.db.rollback(), http_error=HTTPForbidden,
                      msg_on_fail=s.RegisterGroup_POST_ForbiddenResponseSchema.description,
                      content={"user_name": user.user_name, "group_name": group.group_name})
+    invalidate_permission_cache(request.db, user_id=user.id)
     return ax.valid_http(http_success=HTTPCreated, detail=s.RegisterGroup_POST_CreatedResponseSchema.description,
                          content={"user_name": user.user_name, "group_name": group.group_name})
 
@@ -1,3 +1,4 @@
+import json
 from typing import TYPE_CHECKING
 
 from pyramid.httpexceptions import HTTPInternalServerError
@@ -8,17 +9,20 @@ from magpie.permissions import PermissionType, format_permissions
 from magpie.services import SERVICE_TYPE_DICT
 
 if TYPE_CHECKING:
-    from typing import Collection, Optional
+    from typing import Collection, Dict, Iterable, Iterator, List, Optional
 
+    from sqlalchemy.engine.result import RowProxy
     from sqlalchemy.orm.session import Session
 
     from magpie.models import Resource, Service
+    from magpie.permissions import Permission
     from magpie.typedefs import (
         JSON,
         AnyPermissionType,
         ChildrenResourceNodes,
         ResourcePermissionMap,
-        ServiceOrResourceType
+        ServiceOrResourceType,
+        Str
     )
 
 
@@ -97,7 +101,8 @@ def format_resource_tree(children, db_session, resources_perms_dict=None, permis
                 else:
                     service_id = resource.root_service_id
                     if service_id not in __internal_svc_res_perm_dict:
-                        service = ResourceService.by_resource_id(service_id, db_session=db_session)
+                        # reuse the service already loaded in the session when available to avoid another query
+                        service = db_session.query(ResourceService.model).get(service_id)
                 # add to dict only if not already added
                 if service is not None and service_id not in __internal_svc_res_perm_dict:
                     __internal_svc_res_perm_dict[service_id] = {
@@ -113,6 +118,46 @@ def format_resource_tree(children, db_session, resources_perms_dict=None, permis
     return recursive_fmt_res_tree(children)
 
 
+def iter_resource_tree_json(resources, resources_perms_dict=None, permission_type=None, chunk_size=65536):
+    # type: (Iterable[RowProxy], Optional[Dict[Str, List[Permission]]], Optional[PermissionType], int) -> Iterator[Str]
+    """
+    Generates the formatted resource tree as JSON string chunks while iterating over the provided resources.
+
+    The resulting JSON is equivalent to the output of :func:`format_resource_tree`, but resources are expected to be
+    provided depth-first with their ``depth`` relative to the root of the tree, as retrieved with
+    :func:`magpie.api.management.resource.resource_utils.get_resource_children_tree_query`. Each resource is encoded
+    as soon as it is received, such that neither the complete tree of resources nor its JSON representation are held
+    in memory.
+
+    :param resources: resources ordered depth-first with their corresponding ``depth``.
+    :param resources_perms_dict: permissions to set on resources by type name (no permission if not provided).
+    :param permission_type: permission type being rendered.
+    :param chunk_size: approximate size of chunks to generate.
+    :return: JSON string chunks of the formatted resource tree
+    """
+    depth = 0
+    chunk = ["{"]
+    size = 0
+    for resource in resources:
+        # close previous resources down to the level of the parent, and separate siblings
+        separator = "}}" * (depth - resource.depth + 1) + ", " if depth >= resource.depth else ""
+        perms = (resources_perms_dict or {}).get(resource.resource_type, [])
+        res_json = format_resource(resource, perms, permission_type)
+        res_json.pop("children")
+        # same output as 'format_resource_tree', but leave children open to write them as they are received
+        res_key = json.dumps(str(resource.resource_id))
+        res_json = "{}{}: {}, \"children\": {{".format(separator, res_key, json.dumps(res_json)[:-1])
+        chunk.append(res_json)
+        size += len(res_json)
+        depth = resource.depth
+        if size >= chunk_size:
+            yield "".join(chunk)
+            chunk = []
+            size = 0
+    chunk.append("}}" * depth + "}")
+    yield "".join(chunk)
+
+
 def format_resource_with_children(resource, db_session):
     # type: (ServiceOrResourceType, Session) -> JSON
     """
@@ -1,5 +1,7 @@
 from typing import TYPE_CHECKING
 
+import six
+import sqlalchemy as sa
 from pyramid.httpexceptions import (
     HTTPBadRequest,
     HTTPConflict,
@@ -11,6 +13,8 @@ from pyramid.httpexceptions import (
     HTTPUnprocessableEntity
 )
 from pyramid.settings import asbool
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import with_polymorphic
 from ziggurat_foundations.models.services.resource import ResourceService
 
 from magpie import models
@@ -18,13 +22,14 @@ from magpie.api import exception as ax
 from magpie.api import requests as ar
 from magpie.api import schemas as s
 from magpie.api.management.resource.resource_formats import format_resource
+from magpie.cache import invalidate_permission_cache
 from magpie.permissions import Permission
 from magpie.register import sync_services_phoenix
 from magpie.services import SERVICE_TYPE_DICT, service_factory
 
 if TYPE_CHECKING:
     # pylint: disable=W0611,unused-import
-    from typing import List, Optional, Tuple, Type, Union
+    from typing import Dict, Iterable, List, Optional, Tuple, Type, Union
 
     from pyramid.httpexceptions import HTTPException
     from pyramid.request import Request
@@ -32,7 +37,7 @@ if TYPE_CHECKING:
     from ziggurat_foundations.models.services.resource_tree import ResourceTreeService
 
     from magpie.services import ServiceInterface
-    from magpie.typedefs import ChildrenResourceNodes, ServiceOrResourceType, Str
+    from magpie.typedefs import JSON, ChildrenResourceNodes, ResourceTreeNode, ServiceOrResourceType, Str
 
 
 def check_valid_service_or_resource_permission(permission_name, service_or_resource, db_session):
@@ -155,12 +160,11 @@ def get_resource_path(resource_id, db_session):
     Will return the following path: ``/service-1/resource-1/resource-2``.
 
     This is the same representation of the ``resource`` field within startup permissions configuration file.
+
+    All names are retrieved with a single lookup of ancestors (see :class:`magpie.models.ResourceAncestor`).
     """
-    parent_resources = models.RESOURCE_TREE_SERVICE.path_upper(resource_id, db_session=db_session)
-    parent_path = ""
-    for parent_resource in parent_resources:
-        parent_path = "/" + parent_resource.resource_name + parent_path
-    return parent_path
+    parent_resources = models.get_resource_ancestors(resource_id, db_session=db_session)
+    return "".join("/" + parent_resource.resource_name for parent_resource in reversed(parent_resources))
 
 
 def get_service_or_resource_types(service_or_resource):
@@ -197,6 +201,103 @@ def get_resource_children(resource, db_session, tree_service_builder=None):
     return tree_struct_dict["children"]
 
 
+def get_services_children(service_ids, db_session):
+    # type: (Iterable[int], Session) -> Dict[int, ChildrenResourceNodes]
+    """
+    Obtains the children resource node structures of many services at once.
+
+    Equivalent to calling :func:`get_resource_children` for each service, but all children resources are retrieved
+    with a single query using their root service reference instead of one recursive query per service.
+
+    :param service_ids: services for which to build the children resource trees.
+    :param db_session: database connection to retrieve resources
+    :returns: mapping of service ID to {node_id: {node: Resource, children: {node_id: <recursive>}}}
+    """
+    service_ids = list(service_ids)
+    if not service_ids:
+        return {}
+    query = db_session.query(models.Resource).filter(models.Resource.root_service_id.in_(service_ids))
+    resources_by_parent = {}  # type: Dict[int, List[models.Resource]]
+    for resource in query.order_by(models.Resource.ordering, models.Resource.resource_id):
+        resources_by_parent.setdefault(resource.parent_id, []).append(resource)
+
+    def build_children(parent_id):
+        return {res.resource_id: {"node": res, "children": build_children(res.resource_id)}
+                for res in resources_by_parent.get(parent_id, [])}
+
+    return {svc_id: build_children(svc_id) for svc_id in service_ids}
+
+
+def get_resources_by_ids(resource_ids, db_session):
+    # type: (Iterable[int], Session) -> Dict[int, ServiceOrResourceType]
+    """
+    Obtains many resources by ID at once, with service-specific details already loaded for services.
+
+    :returns: mapping of found resources by ID (missing ones are omitted).
+    """
+    resource_ids = list(resource_ids)
+    if not resource_ids:
+        return {}
+    resource_model = with_polymorphic(models.Resource, [models.Service])
+    query = db_session.query(resource_model).filter(resource_model.resource_id.in_(resource_ids))
+    return {resource.resource_id: resource for resource in query}
+
+
+def get_resource_children_tree_query(resource_id, max_depth=None, cursor=None, limit=None):
+    # type: (int, Optional[int], Optional[int], Optional[int]) -> sa.sql.Select
+    """
+    Generates the query of children resources nested under a resource, ordered depth-first.
+
+    Each resource row provides its ``depth`` relative to the parent resource (direct children at depth ``1``), such
+    that the nested tree can be generated progressively while rows are read. Resources directly under the parent are
+    ordered by ID, which keeps pages that resume after a :paramref:`cursor` consistent when other resources are added.
+
+    :param resource_id: parent resource from which to retrieve children resources.
+    :param max_depth: maximum depth of nested children resources to retrieve (unlimited if ``None``).
+    :param cursor: only retrieve children resources placed after this resource ID directly under the parent.
+    :param limit: maximum amount of resources directly under the parent to retrieve with their children resources.
+    """
+    res = models.Resource.__table__
+    columns = [res.c.resource_id, res.c.parent_id, res.c.resource_name, res.c.resource_display_name,
+               res.c.resource_type, res.c.root_service_id]
+    page = sa.select(columns).where(res.c.parent_id == resource_id).order_by(res.c.resource_id)
+    if cursor is not None:
+        page = page.where(res.c.resource_id > cursor)
+    if limit is not None:
+        page = page.limit(limit)
+    page = page.alias("page")
+    tree = sa.select(list(page.c) + [sa.literal(1).label("depth"),
+                                     postgresql.array([page.c.resource_id]).label("path")]).cte("tree", recursive=True)
+    nested = sa.select(columns + [(tree.c.depth + 1).label("depth"),
+                                  tree.c.path.op("||")(res.c.resource_id).label("path")])
+    nested = nested.where(res.c.parent_id == tree.c.resource_id)
+    if max_depth is not None:
+        nested = nested.where(tree.c.depth < max_depth)
+    tree = tree.union_all(nested)
+    return sa.select([tree]).order_by(tree.c.path)
+
+
+def get_resource_children_next_cursor(resource_id, db_session, cursor=None, limit=None):
+    # type: (int, Session, Optional[int], Optional[int]) -> Optional[int]
+    """
+    Obtains the cursor to retrieve the next page of children resources following the one specified by the cursor.
+
+    .. seealso::
+        - :func:`get_resource_children_tree_query`
+
+    :returns: last resource ID directly under the parent within the page if more resources remain, or ``None``.
+    """
+    if limit is None:
+        return None
+    query = db_session.query(models.Resource.resource_id).filter(models.Resource.parent_id == resource_id)
+    if cursor is not None:
+        query = query.filter(models.Resource.resource_id > cursor)
+    page_ids = [res.resource_id for res in query.order_by(models.Resource.resource_id).limit(limit + 1)]
+    if len(page_ids) > limit:
+        return page_ids[limit - 1]
+    return None
+
+
 def get_resource_permissions(resource, db_session):
     # type: (ServiceOrResourceType, Session) -> List[Permission]
     """
@@ -303,6 +404,7 @@ def create_resource(resource_name, resource_display_name, resource_type, parent_
         total_children = models.RESOURCE_TREE_SERVICE.count_children(new_res.parent_id, db_session=db)
         models.RESOURCE_TREE_SERVICE.set_position(resource_id=new_res.resource_id,
                                                   to_position=total_children, db_session=db)
+        models.set_resource_ancestors(new_res.resource_id, new_res.parent_id, db_session=db)
 
     ax.evaluate_call(lambda: add_resource_in_tree(new_resource, db_session),
                      fallback=lambda: db_session.rollback(),
@@ -311,6 +413,147 @@ def create_resource(resource_name, resource_display_name, resource_type, parent_
                          content={"resource": format_resource(new_resource, basic_info=True)})
 
 
+def check_valid_resource_tree(resources, parent_resource, root_service):
+    # type: (JSON, ServiceOrResourceType, models.Service) -> List[ResourceTreeNode]
+    """
+    Validates in memory a nested tree of new resources to be created under the parent resource of the root service.
+
+    The tree must be of the form validated by :func:`magpie.cli.sync_services.is_valid_resource_schema`, where every
+    node also provides its ``resource_type`` and optionally its ``resource_display_name``::
+
+        {
+            "<resource-name>": {
+                "resource_type": "<resource-type>",
+                "children": {<recursive>}
+            }
+        }
+
+    Every resource type must be allowed by the ``resource_types_permissions`` of the root service, and only resource
+    types allowing children can contain other resources. Since nested resources are all new, sibling name conflicts
+    can only occur with existing children of the parent resource, which must be verified separately.
+
+    :returns: flattened nodes in depth-first order, each referencing the index of its own parent node in the list,
+        or ``None`` for resources placed directly under :paramref:`parent_resource`.
+        Error details report the ``resource_path`` of invalid nodes relative to :paramref:`parent_resource`.
+    :raises HTTPUnprocessableEntity: if the tree structure or any of its values is invalid.
+    :raises HTTPForbidden: if any resource type is not allowed at its location in the tree.
+    """
+    svc_res_types = SERVICE_TYPE_DICT[root_service.type].resource_type_names
+    nodes = []  # type: List[ResourceTreeNode]
+
+    def flatten(children, parent_index, parent_type, parent_path):
+        if not isinstance(children, dict):
+            ax.raise_http(http_error=HTTPUnprocessableEntity, content={"resource_path": parent_path},
+                          detail=s.ResourceChildren_POST_UnprocessableEntityResponseSchema.description)
+        if children and not models.RESOURCE_TYPE_DICT[parent_type].child_resource_allowed:
+            ax.raise_http(http_error=HTTPForbidden, content={"resource_path": parent_path},
+                          detail="Child resource not allowed for specified parent resource type '{}'"
+                                 .format(parent_type))
+        for position, (res_name, res_info) in enumerate(children.items(), start=1):
+            res_path = parent_path + "/" + six.text_type(res_name)
+            res_info = res_info if isinstance(res_info, dict) else {}
+            res_type = res_info.get("resource_type")
+            res_display_name = res_info.get("resource_display_name")
+            if (not isinstance(res_name, six.string_types) or not res_name or "children" not in res_info
+                    or not isinstance(res_type, six.string_types)
+                    or not isinstance(res_display_name, (type(None), six.string_types))):
+                ax.raise_http(http_error=HTTPUnprocessableEntity, content={"resource_path": res_path},
+                              detail=s.ResourceChildren_POST_UnprocessableEntityResponseSchema.description)
+            if res_type not in svc_res_types:
+                ax.raise_http(http_error=HTTPForbidden,
+                              content={"resource_path": res_path, "resource_type": res_type},
+                              detail="Invalid 'resource_type' specified for service type '{}'"
+                                     .format(root_service.type))
+            nodes.append({"resource_name": res_name, "resource_display_name": res_display_name or res_name,
+                          "resource_type": res_type, "parent_index": parent_index, "ordering": position})
+            flatten(res_info["children"], len(nodes) - 1, res_type, res_path)
+
+    flatten(resources, None, parent_resource.resource_type_name, "")
+    return nodes
+
+
+def create_resource_tree(resources, parent_id, db_session):
+    # type: (JSON, int, Session) -> HTTPException
+    """
+    Creates a complete tree of new resources nested under the specified parent resource.
+
+    Contrary to :func:`create_resource` that validates and inserts one resource at a time, the whole tree is first
+    validated in memory by :func:`check_valid_resource_tree` with a single verification of conflicting names against
+    existing children of the parent resource. All resources and their references to ancestors are then inserted
+    with set-based operations, using IDs reserved beforehand and ordering positions computed in bulk.
+
+    .. seealso::
+        - :func:`magpie.models.bulk_insert`
+        - :func:`magpie.models.reserve_resource_ids`
+    """
+    ax.verify_param(parent_id, param_name="parent_id", not_none=True, is_type=True, param_compare=int,
+                    http_error=HTTPUnprocessableEntity,
+                    msg_on_fail="Invalid 'parent_id' specified for children resources creation.")
+    ax.verify_param(resources, param_name="resources", is_type=True, param_compare=dict, with_param=False,
+                    http_error=HTTPUnprocessableEntity,
+                    msg_on_fail=s.ResourceChildren_POST_UnprocessableEntityResponseSchema.description)
+    # lock parent to avoid concurrent insertion of children resources with conflicting names or ordering positions
+    parent_resource = ax.evaluate_call(
+        lambda: ResourceService.lock_resource_for_update(resource_id=parent_id, db_session=db_session),
+        fallback=lambda: db_session.rollback(), http_error=HTTPForbidden,
+        msg_on_fail=s.ResourceChildren_POST_ForbiddenResponseSchema.description, content={"parent_id": parent_id}
+    )
+    ax.verify_param(parent_resource, not_none=True, http_error=HTTPNotFound, content={"parent_id": parent_id},
+                    msg_on_fail=s.Resources_POST_NotFoundResponseSchema.description)
+    root_service = get_resource_root_service(parent_resource, db_session=db_session)
+    ax.verify_param(root_service, not_none=True, http_error=HTTPInternalServerError,
+                    msg_on_fail="Failed retrieving 'root_service' from db")
+    nodes = check_valid_resource_tree(resources, parent_resource, root_service)
+
+    existing_children = db_session.query(models.Resource.resource_name).filter(models.Resource.parent_id == parent_id)
+    existing_names = [child.resource_name for child in existing_children]
+    for node in nodes:
+        if node["parent_index"] is None:
+            ax.verify_param(node["resource_name"], param_name="resource_name", not_in=True,
+                            param_compare=existing_names, http_error=HTTPConflict,
+                            msg_on_fail=s.Resources_POST_ConflictResponseSchema.description)
+            node["ordering"] += len(existing_names)
+
+    def add_resource_tree_in_db(db):
+        res_ids = models.reserve_resource_ids(len(nodes), db_session=db)
+        parent_ancestors = [(parent_id, 1)] + [
+            (ancestor.ancestor_id, ancestor.depth + 1)
+            for ancestor in db.query(models.ResourceAncestor).filter(models.ResourceAncestor.resource_id == parent_id)
+        ]
+
+        def res_rows():
+            for res_id, node in zip(res_ids, nodes):
+                res_parent_id = parent_id if node["parent_index"] is None else res_ids[node["parent_index"]]
+                yield (res_id, res_parent_id, node["ordering"], node["resource_name"],
+                       node["resource_display_name"], node["resource_type"], root_service.resource_id)
+
+        def ancestor_rows():
+            for index, (res_id, node) in enumerate(zip(res_ids, nodes)):
+                depth = 0
+                while index is not None:
+                    index = nodes[index]["parent_index"]
+                    depth += 1
+                    if index is not None:
+                        yield res_id, res_ids[index], depth
+                for ancestor_id, ancestor_depth in parent_ancestors:
+                    yield res_id, ancestor_id, depth + ancestor_depth - 1
+
+        models.bulk_insert(models.Resource.__table__,
+                           ["resource_id", "parent_id", "ordering", "resource_name",
+                            "resource_display_name", "resource_type", "root_service_id"],
+                           res_rows(), db_session=db)
+        models.bulk_insert(models.ResourceAncestor.__table__, ["resource_id", "ancestor_id", "depth"],
+                           ancestor_rows(), db_session=db)
+
+    ax.evaluate_call(lambda: add_resource_tree_in_db(db_session),
+                     fallback=lambda: db_session.rollback(), http_error=HTTPForbidden,
+                     msg_on_fail=s.ResourceChildren_POST_ForbiddenResponseSchema.description,
+                     content={"parent_id": parent_id})
+    return ax.valid_http(http_success=HTTPCreated, detail=s.ResourceChildren_POST_CreatedResponseSchema.description,
+                         content={"resource": format_resource(parent_resource, basic_info=True),
+                                  "created_count": len(nodes)})
+
+
 def delete_resource(request):
     resource = ar.get_resource_matchdict_checked(request)
     service_push = asbool(ar.get_multiformat_body(request, "service_push", default=False))
@@ -331,4 +574,5 @@ def delete_resource(request):
     ax.evaluate_call(lambda: remove_service_magpie_and_phoenix(resource, service_push, request.db),
                      fallback=lambda: request.db.rollback(), http_error=HTTPForbidden,
                      msg_on_fail=s.Resource_DELETE_ForbiddenResponseSchema.description, content=res_content)
+    invalidate_permission_cache(request.db, resource_id=resource.resource_id)
     return ax.valid_http(http_success=HTTPOk, detail=s.Resource_DELETE_OkResponseSchema.description)
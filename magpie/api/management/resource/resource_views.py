@@ -22,12 +22,15 @@ def get_resources_view(request):
     List all registered resources.
     """
     res_json = {}
+    services = {svc_type: get_services_by_type(svc_type, db_session=request.db) for svc_type in SERVICE_TYPE_DICT}
+    services_children = ru.get_services_children([svc.resource_id for svc_type in services
+                                                  for svc in services[svc_type]], request.db)
     for svc_type in SERVICE_TYPE_DICT:
-        services = get_services_by_type(svc_type, db_session=request.db)
         res_json[svc_type] = {}
-        for svc in services:
+        for svc in services[svc_type]:
             res_json[svc_type][svc.resource_name] = format_service_resources(
-                svc, request.db, show_all_children=True, show_private_url=False)
+                svc, request.db, show_all_children=True, show_private_url=False,
+                resources_children=services_children[svc.resource_id])
     res_json = {"resources": res_json}
     return ax.valid_http(http_success=HTTPOk, detail=s.Resources_GET_OkResponseSchema.description, content=res_json)
 
@@ -62,6 +65,18 @@ def create_resource_view(request):
     return ru.create_resource(resource_name, resource_display_name, resource_type, parent_id, request.db)
 
 
+@s.ResourceChildrenAPI.post(schema=s.ResourceChildren_POST_RequestSchema, tags=[s.ResourcesTag],
+                            response_schemas=s.ResourceChildren_POST_responses)
+@view_config(route_name=s.ResourceChildrenAPI.name, request_method="POST")
+def create_resource_children_view(request):
+    """
+    Register a tree of new children resources under a resource.
+    """
+    resource = ar.get_resource_matchdict_checked(request)
+    resources = ar.get_value_multiformat_body_checked(request, "resources", check_type=dict)
+    return ru.create_resource_tree(resources, resource.resource_id, request.db)
+
+
 @s.ResourceAPI.delete(schema=s.Resource_DELETE_RequestSchema, tags=[s.ResourcesTag],
                       response_schemas=s.Resources_DELETE_responses)
 @view_config(route_name=s.ResourceAPI.name, request_method="DELETE")
@@ -20,6 +20,7 @@ def includeme(config):
     config.add_route(**s.service_api_route_info(s.ServicesAPI))
     config.add_route(**s.service_api_route_info(s.ServiceAPI))
     config.add_route(**s.service_api_route_info(s.ServicePermissionsAPI))
+    config.add_route(**s.service_api_route_info(s.ServicePermissionsMatrixAPI))
     config.add_route(**s.service_api_route_info(s.ServiceResourcesAPI))
     config.add_route(**s.service_api_route_info(s.ServiceResourceAPI))
     config.scan()
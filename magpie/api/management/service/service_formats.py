@@ -1,24 +1,37 @@
+import csv
+import json
 from typing import TYPE_CHECKING
 
+import six
+import sqlalchemy as sa
 from pyramid.httpexceptions import HTTPInternalServerError
 
+from magpie import models
 from magpie.api.exception import evaluate_call
-from magpie.api.management.resource.resource_formats import format_resource_tree
-from magpie.api.management.resource.resource_utils import crop_tree_with_permission, get_resource_children
+from magpie.api.management.resource.resource_formats import format_resource_tree, iter_resource_tree_json
+from magpie.api.management.resource.resource_utils import (
+    crop_tree_with_permission,
+    get_resource_children,
+    get_resource_children_tree_query
+)
 from magpie.permissions import PermissionType, format_permissions
 from magpie.services import SERVICE_TYPE_DICT
-from magpie.utils import get_twitcher_protected_service_url
+from magpie.utils import CONTENT_TYPE_CSV, CONTENT_TYPE_NDJSON, get_twitcher_protected_service_url
 
 if TYPE_CHECKING:
     # pylint: disable=W0611,unused-import
-    from typing import List, Optional, Type
+    from typing import Iterator, List, Optional, Type
 
     from sqlalchemy.orm.session import Session
 
     from magpie.models import Resource, Service
     from magpie.permissions import PermissionSet
     from magpie.services import ServiceInterface
-    from magpie.typedefs import JSON, ResourcePermissionMap
+    from magpie.typedefs import JSON, ChildrenResourceNodes, ResourcePermissionMap, Str
+
+PERMISSIONS_MATRIX_FORMATS = {"csv": CONTENT_TYPE_CSV, "ndjson": CONTENT_TYPE_NDJSON}
+PERMISSIONS_MATRIX_FIELDS = ["user_id", "user_name", "resource_id", "resource_name", "resource_type",
+                             "permission_name", "access", "reason"]
 
 
 def format_service(service, permissions=None, permission_type=None,
@@ -69,6 +82,7 @@ def format_service_resources(service,                       # type: Service
                              permission_type=None,          # type: Optional[PermissionType]
                              show_all_children=False,       # type: bool
                              show_private_url=True,         # type: bool
+                             resources_children=None,       # type: Optional[ChildrenResourceNodes]
                              ):                             # type: (...) -> JSON
     """
     Formats the service and its children resource tree as a JSON body.
@@ -87,10 +101,13 @@ def format_service_resources(service,                       # type: Service
     :param show_all_children:
         Display all children resources recursively, or only ones specified by ID with :paramref:`resources_perms_dict`.
     :param show_private_url: displays the
+    :param resources_children:
+        Children resource nodes of the service if already retrieved (e.g.: using :func:`get_services_children`).
+        Otherwise, they are obtained from the database.
     :return: JSON body representation of the service resource tree
     """
     def fmt_svc_res(svc, db, svc_perms, res_perms, show_all):
-        tree = get_resource_children(svc, db)
+        tree = get_resource_children(svc, db) if resources_children is None else resources_children
         if not show_all:
             filter_res_ids = list(res_perms) if res_perms else []
             tree, _ = crop_tree_with_permission(tree, filter_res_ids)
@@ -109,6 +126,100 @@ def format_service_resources(service,                       # type: Service
     )
 
 
+def iter_service_resources_json(service,                    # type: Service
+                                db_session,                 # type: Session
+                                max_depth=None,             # type: Optional[int]
+                                cursor=None,                # type: Optional[int]
+                                limit=None,                 # type: Optional[int]
+                                show_private_url=True,      # type: bool
+                                ):                          # type: (...) -> Iterator[Str]
+    """
+    Generates the service and its children resource tree as JSON string chunks while resources are read.
+
+    The result is equivalent to the formatted JSON of :func:`format_service_resources` with :term:`Allowed Permissions`
+    for every resource. Children resources are streamed from a dedicated database connection as they get encoded,
+    which keeps memory usage constant regardless of the size of the tree. Service details are formatted immediately
+    such that the generator can be consumed after the request transaction was completed.
+
+    :param service: service for which to display details with sub-resources
+    :param db_session: database session
+    :param max_depth: maximum depth of nested children resources to display (unlimited if ``None``).
+    :param cursor: display only children resources placed after this resource ID directly under the service.
+    :param limit: maximum amount of resources directly under the service to display with their children resources.
+    :param show_private_url: displays the private URL of the service
+    :return: JSON string chunks of the service resource tree
+    """
+    svc_type = SERVICE_TYPE_DICT[service.type]
+    svc_json = format_service(service, svc_type.permissions, show_private_url=show_private_url)
+    res_perms = {res_type.resource_type_name: res_perms
+                 for res_type, res_perms in svc_type.resource_types_permissions.items()}
+    query = get_resource_children_tree_query(service.resource_id, max_depth=max_depth, cursor=cursor, limit=limit)
+    engine = db_session.get_bind()
+
+    def iter_svc_res():
+        yield json.dumps(svc_json)[:-1] + ", \"resources\": "
+        if max_depth is not None and max_depth < 1:
+            yield "{}}"
+            return
+        with engine.connect() as connection:
+            resources = connection.execution_options(stream_results=True).execute(query)
+            for chunk in iter_resource_tree_json(resources, res_perms):
+                yield chunk
+        yield "}"
+
+    return iter_svc_res()
+
+
+def iter_service_permissions_matrix(service, db_session, content_type=CONTENT_TYPE_CSV, chunk_size=65536):
+    # type: (Service, Session, Str, int) -> Iterator[Str]
+    """
+    Generates the stored effective permissions matrix of the service as text chunks while entries are read.
+
+    Entries are ordered by user and resource, one per line, either as CSV rows (with a header) or as JSON objects
+    (NDJSON) with fields :py:data:`PERMISSIONS_MATRIX_FIELDS`. Similarly to :func:`iter_service_resources_json`,
+    entries are streamed from a dedicated database connection, such that the generator can be consumed after the
+    request transaction was completed.
+
+    :param service: service for which to export the effective permissions matrix.
+    :param db_session: database session
+    :param content_type: one of the :py:data:`PERMISSIONS_MATRIX_FORMATS` content types.
+    :param chunk_size: approximate size of chunks to generate.
+    :return: text chunks of the effective permissions matrix
+    """
+    perms = models.EffectivePermission.__table__
+    users = models.User.__table__
+    resources = models.Resource.__table__
+    query = (
+        sa.select([perms.c.user_id, users.c.user_name, perms.c.resource_id, resources.c.resource_name,
+                   resources.c.resource_type, perms.c.perm_name, perms.c.access, perms.c.reason])
+        .select_from(perms.join(users, users.c.id == perms.c.user_id)
+                     .join(resources, resources.c.resource_id == perms.c.resource_id))
+        .where(perms.c.service_id == service.resource_id)
+        .order_by(perms.c.user_id, perms.c.resource_id, perms.c.perm_name)
+    )
+    engine = db_session.get_bind()
+
+    def iter_matrix():
+        chunk = six.StringIO()
+        writer = csv.writer(chunk, lineterminator="\n")
+        if content_type == CONTENT_TYPE_CSV:
+            writer.writerow(PERMISSIONS_MATRIX_FIELDS)
+        with engine.connect() as connection:
+            entries = connection.execution_options(stream_results=True).execute(query)
+            for entry in entries:
+                if content_type == CONTENT_TYPE_CSV:
+                    writer.writerow(list(entry))
+                else:
+                    chunk.write(json.dumps(dict(zip(PERMISSIONS_MATRIX_FIELDS, entry))) + "\n")
+                if chunk.tell() >= chunk_size:
+                    yield chunk.getvalue()
+                    chunk.seek(0)
+                    chunk.truncate()
+        yield chunk.getvalue()
+
+    return iter_matrix()
+
+
 def format_service_resource_type(resource_class, service_class):
     # type: (Type[Resource], Type[ServiceInterface]) -> JSON
     svc_res_info = {
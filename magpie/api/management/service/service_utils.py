@@ -1,3 +1,4 @@
+import datetime
 from typing import TYPE_CHECKING
 
 import six
@@ -17,8 +18,9 @@ from magpie.api import exception as ax
 from magpie.api import schemas as s
 from magpie.api.management.group.group_utils import create_group_resource_permission_response
 from magpie.api.management.service.service_formats import format_service
+from magpie.cache import invalidate_permission_cache
 from magpie.constants import get_constant
-from magpie.permissions import Permission
+from magpie.permissions import PERMISSION_REASON_DEFAULT, Permission
 from magpie.register import SERVICES_PHOENIX_ALLOWED, sync_services_phoenix
 from magpie.services import SERVICE_TYPE_DICT
 from magpie.utils import get_logger
@@ -28,6 +30,7 @@ if TYPE_CHECKING:
     from typing import Iterable, Optional
 
     from pyramid.httpexceptions import HTTPException
+    from pyramid.request import Request
     from sqlalchemy.orm.session import Session
 
     from magpie.typedefs import JSON, Str
@@ -90,6 +93,7 @@ def create_service(service_name, service_type, service_url, service_push, servic
                                fallback=lambda: db_session.rollback(), http_error=HTTPForbidden,
                                msg_on_fail=s.Services_POST_ForbiddenResponseSchema.description,
                                content=format_service(service, show_private_url=True))
+    invalidate_permission_cache(db_session, resource_id=service.resource_id)  # registry of services
     return ax.valid_http(http_success=HTTPCreated, detail=s.Services_POST_CreatedResponseSchema.description,
                          content={"service": format_service(service, show_private_url=True)})
 
@@ -115,3 +119,42 @@ def add_service_getcapabilities_perms(service, db_session, group_name=None):
                                                            Permission.GET_CAPABILITIES.value, db_session)
         if perm is None:  # not set, create it
             create_group_resource_permission_response(group, service, Permission.GET_CAPABILITIES, db_session)
+
+
+def refresh_service_permissions_matrix(service, request):
+    # type: (models.Service, Request) -> models.ServicePermissionsMatrix
+    """
+    Computes and stores the effective permissions of every user over every resource of the service.
+
+    Previously stored effective permissions of the service are replaced. Permissions denied by default (without any
+    permission applied for the user or its groups) are not stored.
+
+    .. seealso::
+        - :meth:`magpie.services.ServiceInterface.effective_permissions_matrix`
+    """
+    db_session = request.db
+    service_impl = SERVICE_TYPE_DICT[service.type](service, request)
+    matrix_table = models.EffectivePermission.__table__
+    entries = {"count": 0}
+
+    def matrix_rows():
+        for user, resource, perms in service_impl.effective_permissions_matrix():
+            for perm in perms:
+                if perm.reason == PERMISSION_REASON_DEFAULT:
+                    continue
+                entries["count"] += 1
+                yield (service.resource_id, resource.resource_id, user.id,
+                       perm.name.value, perm.access.value, perm.reason)
+
+    db_session.execute(matrix_table.delete().where(matrix_table.c.service_id == service.resource_id))
+    models.bulk_insert(matrix_table, ["service_id", "resource_id", "user_id", "perm_name", "access", "reason"],
+                       matrix_rows(), db_session=db_session)
+    matrix = models.ServicePermissionsMatrix.by_service_id(service.resource_id, db_session)
+    if matrix is None:
+        matrix = models.ServicePermissionsMatrix(service_id=service.resource_id)
+        db_session.add(matrix)
+    matrix.computed = datetime.datetime.utcnow()
+    matrix.entries = entries["count"]
+    db_session.flush()
+    LOGGER.info("Computed %s effective permissions for service [%s].", matrix.entries, service.resource_name)
+    return matrix
@@ -1,13 +1,17 @@
+import itertools
+import json
 from typing import TYPE_CHECKING
 
 from pyramid.httpexceptions import (
     HTTPBadRequest,
     HTTPConflict,
     HTTPForbidden,
+    HTTPInternalServerError,
     HTTPNotFound,
     HTTPOk,
     HTTPUnprocessableEntity
 )
+from pyramid.response import Response
 from pyramid.settings import asbool
 from pyramid.view import view_config
 
@@ -15,9 +19,11 @@ from magpie import models
 from magpie.api import exception as ax
 from magpie.api import requests as ar
 from magpie.api import schemas as s
+from magpie.api.generic import get_request_info, guess_target_format
 from magpie.api.management.resource import resource_utils as ru
 from magpie.api.management.service import service_formats as sf
 from magpie.api.management.service import service_utils as su
+from magpie.cache import invalidate_permission_cache
 from magpie.permissions import Permission, PermissionType, format_permissions
 from magpie.register import SERVICES_PHOENIX_ALLOWED, sync_services_phoenix
 from magpie.services import SERVICE_TYPE_DICT
@@ -26,6 +32,8 @@ from magpie.utils import CONTENT_TYPE_JSON
 if TYPE_CHECKING:
     from typing import List, Union
 
+    from pyramid.request import Request
+
     from magpie.typedefs import JSON
 
 
@@ -164,6 +172,7 @@ def update_service_view(request):
                      fallback=lambda: request.db.rollback(),
                      http_error=HTTPForbidden, msg_on_fail=s.Service_PATCH_ForbiddenResponseSchema.description,
                      content=err_svc_content)
+    invalidate_permission_cache(request.db, resource_id=service.resource_id)  # compiled service router
     return ax.valid_http(http_success=HTTPOk, detail=s.Service_PATCH_OkResponseSchema.description,
                          content={"service": sf.format_service(service, show_private_url=True)})
 
@@ -204,6 +213,7 @@ def unregister_service_view(request):
     ax.evaluate_call(lambda: remove_service_magpie_and_phoenix(service, service_push, request.db),
                      fallback=lambda: request.db.rollback(), http_error=HTTPForbidden,
                      msg_on_fail=s.Service_DELETE_ForbiddenResponseSchema.description, content=svc_content)
+    invalidate_permission_cache(request.db, resource_id=svc_res_id)
     return ax.valid_http(http_success=HTTPOk, detail=s.Service_DELETE_OkResponseSchema.description)
 
 
@@ -222,6 +232,53 @@ def get_service_permissions_view(request):
                          content=format_permissions(svc_perms, PermissionType.ALLOWED))
 
 
+def _refresh_service_permissions_matrix(request, service):
+    # type: (Request, models.Service) -> models.ServicePermissionsMatrix
+    return ax.evaluate_call(lambda: su.refresh_service_permissions_matrix(service, request),
+                            fallback=lambda: request.db.rollback(), http_error=HTTPInternalServerError,
+                            msg_on_fail=s.ServicePermissionsMatrix_POST_InternalServerErrorResponseSchema.description,
+                            content={"service_name": service.resource_name})
+
+
+@s.ServicePermissionsMatrixAPI.get(schema=s.ServicePermissionsMatrix_GET_RequestSchema, tags=[s.ServicesTag],
+                                   response_schemas=s.ServicePermissionsMatrix_GET_responses)
+@view_config(route_name=s.ServicePermissionsMatrixAPI.name, request_method="GET")
+def get_service_permissions_matrix_view(request):
+    """
+    Export the effective permissions of every user over every resource of a service.
+
+    The matrix is computed on first request and then stored, such that following exports only stream stored entries.
+    It must be refreshed to reflect later modifications of users, groups, resources or permissions. The time of the
+    computation is indicated by the ``Last-Modified`` header.
+    """
+    service = ar.get_service_matchdict_checked(request)
+    output_format = ar.get_query_param(request, "format", "csv")
+    ax.verify_param(output_format, is_in=True, param_compare=list(sf.PERMISSIONS_MATRIX_FORMATS), param_name="format",
+                    http_error=HTTPBadRequest, content={"format": output_format},
+                    msg_on_fail=s.ServicePermissionsMatrix_GET_BadRequestResponseSchema.description)
+    matrix = models.ServicePermissionsMatrix.by_service_id(service.resource_id, request.db)
+    if matrix is None:
+        matrix = _refresh_service_permissions_matrix(request, service)
+    content_type = sf.PERMISSIONS_MATRIX_FORMATS[output_format]
+    matrix_chunks = sf.iter_service_permissions_matrix(service, db_session=request.db, content_type=content_type)
+    return Response(app_iter=(chunk.encode("utf-8") for chunk in matrix_chunks),
+                    content_type=content_type, charset="UTF-8", last_modified=matrix.computed)
+
+
+@s.ServicePermissionsMatrixAPI.post(schema=s.ServicePermissionsMatrix_POST_RequestSchema, tags=[s.ServicesTag],
+                                    response_schemas=s.ServicePermissionsMatrix_POST_responses)
+@view_config(route_name=s.ServicePermissionsMatrixAPI.name, request_method="POST")
+def refresh_service_permissions_matrix_view(request):
+    """
+    Compute and store the effective permissions of every user over every resource of a service.
+    """
+    service = ar.get_service_matchdict_checked(request)
+    matrix = _refresh_service_permissions_matrix(request, service)
+    return ax.valid_http(http_success=HTTPOk, detail=s.ServicePermissionsMatrix_POST_OkResponseSchema.description,
+                         content={"service_name": service.resource_name,
+                                  "computed": matrix.computed.isoformat(), "entries": matrix.entries})
+
+
 @s.ServiceResourceAPI.delete(schema=s.ServiceResource_DELETE_RequestSchema, tags=[s.ServicesTag],
                              response_schemas=s.ServiceResource_DELETE_responses)
 @view_config(route_name=s.ServiceResourceAPI.name, request_method="DELETE")
@@ -238,12 +295,43 @@ def delete_service_resource_view(request):
 def get_service_resources_view(request):
     """
     List all resources registered under a service.
+
+    Resources can be limited to a maximum ``depth`` under the service, and paginated over resources directly under
+    the service using ``limit`` and ``cursor`` (``next_cursor`` value of the previous page). Unless another format is
+    requested, the JSON response is streamed while resources are retrieved from the database.
     """
     service = ar.get_service_matchdict_checked(request)
-    svc_res_json = sf.format_service_resources(service, db_session=request.db,
-                                               show_all_children=True, show_private_url=True)
-    return ax.valid_http(http_success=HTTPOk, content={svc_res_json["service_name"]: svc_res_json},
-                         detail=s.ServiceResources_GET_OkResponseSchema.description)
+    params = {}
+    for param in ["depth", "cursor", "limit"]:
+        value = ar.get_query_param(request, param)
+        if value is not None:
+            value = ax.evaluate_call(lambda: int(value), http_error=HTTPBadRequest,
+                                     msg_on_fail=s.ServiceResources_GET_BadRequestResponseSchema.description,
+                                     content={param: value})
+            ax.verify_param(value >= (1 if param == "limit" else 0), is_true=True, param_name=param,
+                            http_error=HTTPBadRequest, content={param: value},
+                            msg_on_fail=s.ServiceResources_GET_BadRequestResponseSchema.description)
+        params[param] = value
+    svc_res_json = sf.iter_service_resources_json(service, db_session=request.db, show_private_url=True,
+                                                  max_depth=params["depth"], cursor=params["cursor"],
+                                                  limit=params["limit"])
+    content = {}
+    if params["limit"] is not None:
+        content["next_cursor"] = ru.get_resource_children_next_cursor(
+            service.resource_id, db_session=request.db, cursor=params["cursor"], limit=params["limit"])
+    detail = s.ServiceResources_GET_OkResponseSchema.description
+    content_type, _ = guess_target_format(request)
+    if content_type != CONTENT_TYPE_JSON:
+        content[service.resource_name] = json.loads("".join(svc_res_json))
+        return ax.valid_http(http_success=HTTPOk, content=content, detail=detail)
+
+    # stream the resources tree within the same JSON body that 'valid_http' would produce with request metadata
+    content.update(get_request_info(request, default_message=detail))
+    content.update({"code": HTTPOk.code, "detail": detail, "type": CONTENT_TYPE_JSON})
+    body_start = "{}, {}: ".format(json.dumps(content)[:-1], json.dumps(service.resource_name))
+    body_chunks = itertools.chain([body_start], svc_res_json, ["}"])
+    return Response(app_iter=(chunk.encode("utf-8") for chunk in body_chunks),
+                    content_type=CONTENT_TYPE_JSON, charset="UTF-8")
 
 
 @s.ServiceResourcesAPI.post(schema=s.ServiceResources_POST_RequestSchema, tags=[s.ServicesTag],
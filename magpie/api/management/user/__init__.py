@@ -24,6 +24,7 @@ def includeme(config):
     config.add_route(**s.service_api_route_info(s.UserResourceTypesAPI, **user_kwargs))
     config.add_route(**s.service_api_route_info(s.UserResourcePermissionsAPI, **user_kwargs))
     config.add_route(**s.service_api_route_info(s.UserResourcePermissionAPI, **user_kwargs))
+    config.add_route(**s.service_api_route_info(s.UserPermissionsCheckAPI, **user_kwargs))
     # Logged User routes
     config.add_route(**s.service_api_route_info(s.LoggedUserAPI, **user_kwargs))
     config.add_route(**s.service_api_route_info(s.LoggedUserGroupsAPI, **user_kwargs))
@@ -36,5 +37,6 @@ def includeme(config):
     config.add_route(**s.service_api_route_info(s.LoggedUserResourceTypesAPI, **user_kwargs))
     config.add_route(**s.service_api_route_info(s.LoggedUserResourcePermissionsAPI, **user_kwargs))
     config.add_route(**s.service_api_route_info(s.LoggedUserResourcePermissionAPI, **user_kwargs))
+    config.add_route(**s.service_api_route_info(s.LoggedUserPermissionsCheckAPI, **user_kwargs))
 
     config.scan()
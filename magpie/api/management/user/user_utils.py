@@ -1,6 +1,7 @@
 from typing import TYPE_CHECKING
 
 import six
+import sqlalchemy as sa
 from pyramid.httpexceptions import (
     HTTPBadRequest,
     HTTPConflict,
@@ -21,13 +22,14 @@ from magpie.api import schemas as s
 from magpie.api.management.resource import resource_utils as ru
 from magpie.api.management.service.service_formats import format_service
 from magpie.api.management.user import user_formats as uf
+from magpie.cache import invalidate_permission_cache
 from magpie.constants import get_constant
-from magpie.permissions import PermissionSet, PermissionType, format_permissions
+from magpie.permissions import Permission, PermissionSet, PermissionType, format_permissions
 from magpie.services import service_factory
 
 if TYPE_CHECKING:
     # pylint: disable=W0611,unused-import
-    from typing import Iterable, List, Optional
+    from typing import Dict, Iterable, List, Optional, Tuple
 
     from pyramid.httpexceptions import HTTPException
     from pyramid.request import Request
@@ -35,9 +37,11 @@ if TYPE_CHECKING:
     from ziggurat_foundations.permissions import PermissionTuple  # noqa
 
     from magpie.typedefs import (
+        JSON,
         ResolvablePermissionType,
         ResourcePermissionMap,
         ServiceOrResourceType,
+        ServiceResourcesPermissions,
         Str,
         UserServicesType
     )
@@ -157,6 +161,7 @@ def create_user_resource_permission_response(user, resource, permission, db_sess
     ax.evaluate_call(lambda: db_session.add(new_perm), fallback=lambda: db_session.rollback(),
                      http_error=HTTPForbidden, content=err_content,
                      msg_on_fail=s.UserResourcePermissions_POST_ForbiddenResponseSchema.description)
+    invalidate_permission_cache(db_session, user_id=user.id, resource_id=res_id)
     return ax.valid_http(http_success=http_success, content=err_content, detail=http_detail)
 
 
@@ -175,6 +180,7 @@ def assign_user_group(user, group, db_session):
                      fallback=lambda: db_session.rollback(), http_error=HTTPForbidden,
                      msg_on_fail=s.UserGroups_POST_RelationshipForbiddenResponseSchema.description,
                      content={"user_name": user.user_name, "group_name": group.group_name})
+    invalidate_permission_cache(db_session, user_id=user.id)
 
 
 def delete_user_group(user, group, db_session):
@@ -197,6 +203,7 @@ def delete_user_group(user, group, db_session):
     ax.evaluate_call(lambda: del_usr_grp(user, group), fallback=lambda: db_session.rollback(),
                      http_error=HTTPNotFound, msg_on_fail=s.UserGroup_DELETE_NotFoundResponseSchema.description,
                      content={"user_name": user.user_name, "group_name": group.group_name})
+    invalidate_permission_cache(db_session, user_id=user.id)
 
 
 def delete_user_resource_permission_response(user, resource, permission, db_session, similar=True):
@@ -228,6 +235,7 @@ def delete_user_resource_permission_response(user, resource, permission, db_sess
     ax.evaluate_call(lambda: db_session.delete(del_perm), fallback=lambda: db_session.rollback(),
                      http_error=HTTPNotFound, content=err_content,
                      msg_on_fail=s.UserResourcePermissionName_DELETE_NotFoundResponseSchema.description)
+    invalidate_permission_cache(db_session, user_id=user.id, resource_id=res_id)
     return ax.valid_http(http_success=HTTPOk, detail=s.UserResourcePermissionName_DELETE_OkResponseSchema.description)
 
 
@@ -304,6 +312,124 @@ def get_user_resource_permissions_response(user, resource, request,
                          detail=s.UserResourcePermissions_GET_OkResponseSchema.description)
 
 
+def check_user_permissions_response(user, resources, permissions, request):
+    # type: (models.User, List[JSON], Optional[List[Str]], Request) -> HTTPException
+    """
+    Resolves the effective permissions of the user over many resources, referenced by ID or by service-relative path.
+
+    Resources are regrouped by root service such that each service implementation resolves all of its resources at
+    once, fetching shared ancestors only once. When a resource path cannot be entirely found, permissions are resolved
+    from its closest existing parent, as for a request to the service. Requested permissions that are not applicable
+    for a resource are resolved as denied.
+
+    .. seealso::
+        - :meth:`magpie.services.ServiceInterface.batch_effective_permissions`
+
+    :returns: valid HTTP response with effective permissions of each resource in the same order as requested.
+    :raises HTTPException: error HTTP response of corresponding situation.
+    """
+    db_session = request.db
+    msg_bad_request = s.UserPermissionsCheck_POST_BadRequestResponseSchema.description
+    ax.verify_param(resources, param_name="resources", is_type=True, param_compare=list,
+                    http_error=HTTPBadRequest, msg_on_fail=msg_bad_request)
+    ax.verify_param(resources, param_name="resources", not_empty=True,
+                    http_error=HTTPBadRequest, msg_on_fail=msg_bad_request)
+    if permissions is not None:
+        ax.verify_param(permissions, param_name="permissions", is_type=True, param_compare=list,
+                        http_error=HTTPBadRequest, msg_on_fail=msg_bad_request)
+        for perm_name in permissions:
+            ax.verify_param(Permission.get(perm_name), param_name="permissions", not_none=True,
+                            param_content={"value": perm_name}, http_error=HTTPBadRequest,
+                            msg_on_fail=msg_bad_request)
+        permissions = [Permission.get(perm_name) for perm_name in permissions]
+
+    resource_ids = set()
+    service_names = set()
+    for index, res_info in enumerate(resources):
+        content = {"index": index, "resource": res_info}
+        ax.verify_param(res_info, param_name="resources", is_type=True, param_compare=dict, content=content,
+                        http_error=HTTPBadRequest, msg_on_fail=msg_bad_request)
+        if "resource_id" in res_info:
+            ax.verify_param(res_info["resource_id"], param_name="resource_id", is_type=True, param_compare=int,
+                            content=content, http_error=HTTPBadRequest, msg_on_fail=msg_bad_request)
+            resource_ids.add(res_info["resource_id"])
+        else:
+            ax.verify_param(res_info.get("service_name"), param_name="service_name", is_type=True,
+                            param_compare=six.string_types, content=content,
+                            http_error=HTTPBadRequest, msg_on_fail=msg_bad_request)
+            ax.verify_param(res_info.get("resource_path", ""), param_name="resource_path", is_type=True,
+                            param_compare=six.string_types, content=content,
+                            http_error=HTTPBadRequest, msg_on_fail=msg_bad_request)
+            service_names.add(res_info["service_name"])
+
+    def get_references():
+        refs = db_session.query(models.Resource).filter(models.Resource.resource_id.in_(list(resource_ids))).all()
+        root_ids = {ref.root_service_id or ref.resource_id for ref in refs}
+        services = db_session.query(models.Service).filter(sa.or_(
+            models.Service.resource_id.in_(list(root_ids)),
+            models.Service.resource_name.in_(list(service_names)),
+        )).all()
+        return {ref.resource_id: ref for ref in refs}, services
+
+    found_resources, found_services = ax.evaluate_call(
+        lambda: get_references(), fallback=lambda: db_session.rollback(), http_error=HTTPForbidden,
+        msg_on_fail=s.UserPermissionsCheck_POST_ForbiddenResponseSchema.description)
+    services_by_id = {svc.resource_id: svc for svc in found_services}
+    services_by_name = {svc.resource_name: svc for svc in found_services}
+    for res_id in sorted(resource_ids):
+        ax.verify_param(found_resources.get(res_id), not_none=True, param_name="resource_id",
+                        param_content={"value": res_id}, http_error=HTTPNotFound,
+                        msg_on_fail=s.UserPermissionsCheck_POST_NotFoundResponseSchema.description)
+    for svc_name in sorted(service_names):
+        ax.verify_param(services_by_name.get(svc_name), not_none=True, param_name="service_name",
+                        param_content={"value": svc_name}, http_error=HTTPNotFound,
+                        msg_on_fail=s.UserPermissionsCheck_POST_NotFoundResponseSchema.description)
+
+    # regroup requested resources by service to resolve them all at once with the corresponding implementation
+    services_items = {}  # type: Dict[int, List[int]]
+    for index, res_info in enumerate(resources):
+        if "resource_id" in res_info:
+            resource = found_resources[res_info["resource_id"]]
+            service = services_by_id[resource.root_service_id or resource.resource_id]
+        else:
+            service = services_by_name[res_info["service_name"]]
+        services_items.setdefault(service.resource_id, []).append(index)
+
+    def check_permissions():
+        results = [None] * len(resources)  # type: List[Optional[JSON]]
+        for svc_id, svc_items in services_items.items():
+            service = services_by_id[svc_id]
+            service_impl = service_factory(service, request)
+            paths = [resources[index].get("resource_path", "") for index in svc_items
+                     if "resource_id" not in resources[index]]
+            found_paths = iter(service_impl.resolve_resource_paths(paths))
+            targets = []  # type: List[Tuple[ServiceOrResourceType, bool]]
+            for index in svc_items:
+                if "resource_id" in resources[index]:
+                    targets.append((found_resources[resources[index]["resource_id"]], True))
+                else:
+                    targets.append(next(found_paths))
+            effective_perms = service_impl.batch_effective_permissions(user, targets, permissions)
+            for index, (resource, found), res_perms in zip(svc_items, targets, effective_perms):
+                result = {
+                    "resource_id": resource.resource_id,
+                    "resource_found": found,
+                    "service_name": service.resource_name,
+                }
+                if "resource_id" not in resources[index]:
+                    result["resource_path"] = resources[index].get("resource_path", "")
+                result.update(format_permissions(res_perms, PermissionType.EFFECTIVE))
+                results[index] = result
+        return results
+
+    results = ax.evaluate_call(
+        lambda: check_permissions(), fallback=lambda: db_session.rollback(), http_error=HTTPInternalServerError,
+        msg_on_fail=s.UserPermissionsCheck_POST_InternalServerErrorResponseSchema.description,
+        content={"user_name": str(user.user_name)})
+    return ax.valid_http(http_success=HTTPOk, content={"results": results},
+                         detail=s.UserPermissionsCheck_POST_OkResponseSchema.description)
+
+
 def get_user_services(user, request, cascade_resources=False, format_as_list=False,
                       inherit_groups_permissions=False, resolve_groups_permissions=False):
     # type: (models.User, Request, bool, bool, bool, bool) -> UserServicesType
@@ -342,9 +468,13 @@ def get_user_services(user, request, cascade_resources=False, format_as_list=Fal
                                                         inherit_groups_permissions=inherit_groups_permissions,
                                                         resolve_groups_permissions=resolve_groups_permissions)
     perm_type = PermissionType.INHERITED if inherit_groups_permissions else PermissionType.DIRECT
+    # retrieve all resources and their root services at once rather than one at a time for each permission
+    resources = ru.get_resources_by_ids(res_perm_dict, db_session)
+    root_services = ru.get_resources_by_ids({res.root_service_id for res in resources.values()
+                                             if res.root_service_id is not None}, db_session)
     services = {}
     for resource_id, perms in res_perm_dict.items():
-        resource = ResourceService.by_resource_id(resource_id=resource_id, db_session=db_session)
+        resource = resources[resource_id]
         is_service = resource.resource_type == models.Service.resource_type_name
 
         if not is_service:
@@ -354,16 +484,16 @@ def get_user_services(user, request, cascade_resources=False, format_as_list=Fal
                 continue
             perms = []
 
-        svc = ru.get_resource_root_service_impl(resource, request)
-        if svc.service_type not in services:
-            services[svc.service_type] = {}
-        svc_name = svc.service.resource_name
-        svc_type = svc.service_type
+        service = resource if is_service else root_services[resource.root_service_id]
+        svc_type = service.type
+        svc_name = service.resource_name
+        if svc_type not in services:
+            services[svc_type] = {}
 
         # if service was not already added, add it (could be directly its permissions, or empty via children resource)
         # otherwise, set explicit immediate permissions on service instead of empty children resource permissions
         if svc_name not in services[svc_type] or is_service:
-            svc_json = format_service(svc.service, perms, perm_type, show_private_url=False)
+            svc_json = format_service(service, perms, perm_type, show_private_url=False)
             services[svc_type][svc_name] = svc_json
 
     if not format_as_list:
@@ -552,6 +682,48 @@ def get_user_service_resources_permissions_dict(user, service, request,
                                                resolve_groups_permissions=resolve_groups_permissions)
 
 
+def get_user_services_resources_permissions(user, services, request,
+                                            inherit_groups_permissions=True, resolve_groups_permissions=False):
+    # type: (models.User, List[models.Service], Request, bool, bool) -> Dict[int, ServiceResourcesPermissions]
+    """
+    Retrieves the permissions of the user on many services and on their children resources at once.
+
+    Results are equivalent to calling :func:`get_user_service_permissions` and
+    :func:`get_user_service_resources_permissions_dict` for each service, but all permissions are retrieved with a
+    single query instead of multiple ones per service.
+
+    :returns: mapping of service IDs to the service permissions and the dictionary of children resource permissions.
+    """
+    res_perm_tuple_list = UserService.resources_with_possible_perms(user, db_session=request.db)
+    if not inherit_groups_permissions and not resolve_groups_permissions:
+        res_perm_tuple_list = filter_user_permission(res_perm_tuple_list, user)
+    res_perm_dict = regroup_permissions_by_resource(res_perm_tuple_list, resolve=False)
+
+    services_perms = {svc.resource_id: ([], {}) for svc in services}
+    for res_id, res_perms in res_perm_dict.items():
+        resource = res_perms[0].perm_tuple.resource
+        if resource.root_service_id is None:
+            if res_id in services_perms:
+                services_perms[res_id][0].extend(res_perms)
+        elif resource.root_service_id in services_perms:
+            if resolve_groups_permissions:
+                res_perms = resolve_user_group_permissions(res_perms)
+            services_perms[resource.root_service_id][1][res_id] = res_perms
+
+    for svc in services:
+        if svc.owner_user_id == user.id:
+            perm_type = PermissionType.OWNED
+            svc_perms = [PermissionSet(perm, typ=perm_type) for perm in service_factory(svc, request).permissions]
+        else:
+            if inherit_groups_permissions or resolve_groups_permissions:
+                perm_type = PermissionType.INHERITED
+            else:
+                perm_type = PermissionType.DIRECT
+            svc_perms = [PermissionSet(perm, typ=perm_type) for perm in services_perms[svc.resource_id][0]]
+        services_perms[svc.resource_id] = (svc_perms, services_perms[svc.resource_id][1])
+    return services_perms
+
+
 def check_user_info(user_name=None, email=None, password=None, group_name=None,  # required unless disabled explicitly
                     check_name=True, check_email=True, check_password=True, check_group=True):
     # type: (Str, Str, Str, Str, bool, bool, bool, bool) -> None
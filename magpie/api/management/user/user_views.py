@@ -12,9 +12,11 @@ from magpie import models
 from magpie.api import exception as ax
 from magpie.api import requests as ar
 from magpie.api import schemas as s
+from magpie.api.management.resource import resource_utils as ru
 from magpie.api.management.service.service_formats import format_service_resources
 from magpie.api.management.user import user_formats as uf
 from magpie.api.management.user import user_utils as uu
+from magpie.cache import invalidate_permission_cache
 from magpie.constants import MAGPIE_CONTEXT_PERMISSION, MAGPIE_LOGGED_PERMISSION, get_constant
 from magpie.permissions import PermissionType, format_permissions
 from magpie.services import SERVICE_TYPE_DICT
@@ -96,6 +98,7 @@ def update_user_view(request):
         ax.verify_param(existing_user, is_none=True, with_param=False, http_error=HTTPConflict,
                         msg_on_fail=s.User_PATCH_ConflictResponseSchema.description)
         user.user_name = new_user_name
+        invalidate_permission_cache(request.db, user_id=user.id)  # name employed in permission reasons
     if update_email:
         uu.check_user_info(email=new_email, check_name=False, check_password=False, check_group=False)
         user.email = new_email
@@ -136,6 +139,7 @@ def delete_user_view(request):
                     http_error=HTTPForbidden, msg_on_fail=s.User_DELETE_ForbiddenResponseSchema.description)
     ax.evaluate_call(lambda: request.db.delete(user), fallback=lambda: request.db.rollback(),
                      http_error=HTTPForbidden, msg_on_fail=s.User_DELETE_ForbiddenResponseSchema.description)
+    invalidate_permission_cache(request.db, user_id=user.id)
     return ax.valid_http(http_success=HTTPOk, detail=s.User_DELETE_OkResponseSchema.description)
 
 
@@ -217,17 +221,17 @@ def get_user_resources_view(request):
     def build_json_user_resource_tree(usr):
         json_res = {}
         perm_type = PermissionType.INHERITED if inherit_groups_perms else PermissionType.DIRECT
-        services = ResourceService.all(models.Service, db_session=db)
+        services = list(ResourceService.all(models.Service, db_session=db))
         # add service-types so they are ordered and listed if no service of that type was defined
         for svc_type in sorted(SERVICE_TYPE_DICT):
             json_res[svc_type] = {}
+        # retrieve permissions and children resources of all services at once rather than for each service
+        services_perms = uu.get_user_services_resources_permissions(
+            user=usr, services=services, request=request,
+            inherit_groups_permissions=inherit_groups_perms, resolve_groups_permissions=resolve_groups_perms)
+        services_children = ru.get_services_children([svc.resource_id for svc in services], db)
         for svc in services:
-            svc_perms = uu.get_user_service_permissions(
-                user=usr, service=svc, request=request,
-                inherit_groups_permissions=inherit_groups_perms, resolve_groups_permissions=resolve_groups_perms)
-            res_perms_dict = uu.get_user_service_resources_permissions_dict(
-                user=usr, service=svc, request=request,
-                inherit_groups_permissions=inherit_groups_perms, resolve_groups_permissions=resolve_groups_perms)
+            svc_perms, res_perms_dict = services_perms[svc.resource_id]
             # always allow admin to view full resource tree, unless explicitly requested to be filtered
             # otherwise (non-admin), only add details if there is at least one resource permission (any level)
             if (is_admin and not filtered_perms) or (svc_perms or res_perms_dict):
@@ -239,6 +243,7 @@ def get_user_resources_view(request):
                     permission_type=perm_type,
                     show_all_children=False,
                     show_private_url=False,
+                    resources_children=services_children[svc.resource_id],
                 )
         return json_res
 
@@ -273,6 +278,23 @@ def get_user_resource_permissions_view(request):
                                                      effective_permissions=effective_perms)
 
 
+@s.UserPermissionsCheckAPI.post(schema=s.UserPermissionsCheck_POST_RequestSchema, tags=[s.UsersTag],
+                                api_security=s.SecurityEveryoneAPI,
+                                response_schemas=s.UserPermissionsCheck_POST_responses)
+@s.LoggedUserPermissionsCheckAPI.post(schema=s.UserPermissionsCheck_POST_RequestSchema, tags=[s.LoggedUserTag],
+                                      api_security=s.SecurityEveryoneAPI,
+                                      response_schemas=s.UserPermissionsCheck_POST_responses)
+@view_config(route_name=s.UserPermissionsCheckAPI.name, request_method="POST", permission=MAGPIE_CONTEXT_PERMISSION)
+def check_user_permissions_view(request):
+    """
+    Resolve the effective permissions a user has on many services or resources at once.
+    """
+    user = ar.get_user_matchdict_checked_or_logged(request)
+    resources = ar.get_multiformat_body(request, "resources")
+    permissions = ar.get_multiformat_body(request, "permissions")
+    return uu.check_user_permissions_response(user, resources, permissions, request)
+
+
 @s.UserResourcePermissionsAPI.post(schema=s.UserResourcePermissions_POST_RequestSchema, tags=[s.UsersTag],
                                    response_schemas=s.UserResourcePermissions_POST_responses)
 @s.LoggedUserResourcePermissionsAPI.post(schema=s.UserResourcePermissions_POST_RequestSchema, tags=[s.LoggedUserTag],
@@ -180,8 +180,7 @@ def get_user(request, user_name_or_token=None):
         curr_user = request.user
         if curr_user:
             return curr_user
-        anonymous_user = get_constant("MAGPIE_ANONYMOUS_USER", settings_container=request)
-        anonymous = ax.evaluate_call(lambda: UserService.by_user_name(anonymous_user, db_session=request.db),
+        anonymous = ax.evaluate_call(lambda: request.identity_context.anonymous_user,
                                      fallback=lambda: request.db.rollback(), http_error=HTTPForbidden,
                                      msg_on_fail=s.User_CheckAnonymous_ForbiddenResponseSchema.description)
         ax.verify_param(anonymous, not_none=True, http_error=HTTPNotFound,
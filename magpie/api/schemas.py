@@ -28,8 +28,10 @@ from magpie.constants import get_constant
 from magpie.permissions import Access, Permission, PermissionType, Scope
 from magpie.security import get_provider_names
 from magpie.utils import (
+    CONTENT_TYPE_CSV,
     CONTENT_TYPE_HTML,
     CONTENT_TYPE_JSON,
+    CONTENT_TYPE_NDJSON,
     KNOWN_CONTENT_TYPES,
     SUPPORTED_ACCEPT_TYPES,
     SUPPORTED_FORMAT_TYPES
@@ -138,6 +140,9 @@ UserServicePermissionsAPI = Service(
 UserServicePermissionAPI = Service(
     path="/users/{user_name}/services/{service_name}/permissions/{permission_name}",
     name="UserServicePermission")
+UserPermissionsCheckAPI = Service(
+    path="/users/{user_name}/permissions/check",
+    name="UserPermissionsCheck")
 LoggedUserAPI = Service(
     path=LoggedUserBase,
     name="LoggedUser")
@@ -171,6 +176,9 @@ LoggedUserServicePermissionsAPI = Service(
 LoggedUserServicePermissionAPI = Service(
     path=LoggedUserBase + "/services/{service_name}/permissions/{permission_name}",
     name="LoggedUserServicePermission")
+LoggedUserPermissionsCheckAPI = Service(
+    path=LoggedUserBase + "/permissions/check",
+    name="LoggedUserPermissionsCheck")
 GroupsAPI = Service(
     path="/groups",
     name="Groups")
@@ -219,6 +227,9 @@ ResourceAPI = Service(
 ResourcePermissionsAPI = Service(
     path="/resources/{resource_id}/permissions",
     name="ResourcePermissions")
+ResourceChildrenAPI = Service(
+    path="/resources/{resource_id}/children",
+    name="ResourceChildren")
 ServicesAPI = Service(
     path="/services",
     name="Services")
@@ -234,6 +245,9 @@ ServiceTypeAPI = Service(
 ServicePermissionsAPI = Service(
     path="/services/{service_name}/permissions",
     name="ServicePermissions")
+ServicePermissionsMatrixAPI = Service(
+    path="/services/{service_name}/permissions/matrix",
+    name="ServicePermissionsMatrix")
 ServiceResourcesAPI = Service(
     path="/services/{service_name}/resources",
     name="ServiceResources")
@@ -264,6 +278,9 @@ SessionAPI = Service(
 VersionAPI = Service(
     path="/version",
     name="Version")
+MetricsAPI = Service(
+    path="/metrics",
+    name="Metrics")
 HomepageAPI = Service(
     path="/",
     name="homepage")
@@ -1114,6 +1131,46 @@ class Resources_POST_ConflictResponseSchema(BaseResponseSchemaAPI):
     body = ErrorResponseBodySchema(code=HTTPConflict.code, description=description)
 
 
+class ResourceChildren_POST_RequestBodySchema(colander.MappingSchema):
+    resources = colander.MappingSchema(
+        unknown="preserve",
+        description="Tree of new children resources to create under the parent resource. Each resource name is "
+                    "a key mapping to its 'resource_type', optional 'resource_display_name' and nested 'children' "
+                    "resources of the same format.",
+        example={"dir": {"resource_type": "directory", "children": {
+            "file.nc": {"resource_type": "file", "children": {}}
+        }}}
+    )
+
+
+class ResourceChildren_POST_RequestSchema(BaseRequestSchemaAPI):
+    path = Resource_RequestPathSchema()
+    body = ResourceChildren_POST_RequestBodySchema()
+
+
+class ResourceChildren_POST_ResponseBodySchema(BaseResponseBodySchema):
+    resource = ResourceBodySchema()
+    created_count = colander.SchemaNode(
+        colander.Integer(),
+        description="Amount of children resources created within the tree under the parent resource."
+    )
+
+
+class ResourceChildren_POST_CreatedResponseSchema(BaseResponseSchemaAPI):
+    description = "Create children resources tree successful."
+    body = ResourceChildren_POST_ResponseBodySchema(code=HTTPCreated.code, description=description)
+
+
+class ResourceChildren_POST_ForbiddenResponseSchema(BaseResponseSchemaAPI):
+    description = "Failed to insert new children resources tree under parent resource."
+    body = ErrorResponseBodySchema(code=HTTPForbidden.code, description=description)
+
+
+class ResourceChildren_POST_UnprocessableEntityResponseSchema(BaseResponseSchemaAPI):
+    description = "Invalid children resources tree structure or values specified for creation."
+    body = ErrorResponseBodySchema(code=HTTPUnprocessableEntity.code, description=description)
+
+
 class ResourcePermissions_GET_RequestSchema(BaseRequestSchemaAPI):
     path = Resource_RequestPathSchema()
 
@@ -1448,6 +1505,58 @@ class ServicePermissions_GET_BadRequestResponseSchema(BaseResponseSchemaAPI):
     body = ServicePermissions_GET_BadRequestResponseBodySchema(code=HTTPBadRequest.code, description=description)
 
 
+class ServicePermissionsMatrix_GET_QuerySchema(QueryRequestSchemaAPI):
+    format = colander.SchemaNode(
+        colander.String(), missing=colander.drop, default="csv", validator=colander.OneOf(["csv", "ndjson"]),
+        description="Format of the exported effective permissions (default: csv). "
+                    "Other formats supported by the API do not apply to this export.")
+
+
+class ServicePermissionsMatrix_GET_RequestSchema(BaseRequestSchemaAPI):
+    path = Service_RequestPathSchema()
+    querystring = ServicePermissionsMatrix_GET_QuerySchema()
+
+
+class ServicePermissionsMatrix_GET_HeaderResponseSchema(colander.MappingSchema):
+    content_type = ContentType(validator=colander.OneOf([CONTENT_TYPE_CSV, CONTENT_TYPE_NDJSON]),
+                               description="MIME content type of the exported effective permissions.")
+
+
+class ServicePermissionsMatrix_GET_OkResponseSchema(colander.MappingSchema):
+    description = "Export service effective permissions matrix successful."
+    header = ServicePermissionsMatrix_GET_HeaderResponseSchema()
+    body = colander.SchemaNode(
+        colander.String(),
+        description="Effective permission of a user over a resource on each line (as CSV row or JSON object) with "
+                    "fields 'user_id', 'user_name', 'resource_id', 'resource_name', 'resource_type', "
+                    "'permission_name', 'access' and 'reason'. Permissions denied by default are omitted.")
+
+
+class ServicePermissionsMatrix_GET_BadRequestResponseSchema(BaseResponseSchemaAPI):
+    description = "Invalid 'format' query parameter value."
+    body = ErrorResponseBodySchema(code=HTTPBadRequest.code, description=description)
+
+
+class ServicePermissionsMatrix_ResponseBodySchema(BaseResponseBodySchema):
+    service_name = colander.SchemaNode(colander.String(), description="Name of the service.")
+    computed = colander.SchemaNode(colander.DateTime(), description="Time when the matrix was computed.")
+    entries = colander.SchemaNode(colander.Integer(), description="Amount of stored effective permissions.")
+
+
+class ServicePermissionsMatrix_POST_RequestSchema(BaseRequestSchemaAPI):
+    path = Service_RequestPathSchema()
+
+
+class ServicePermissionsMatrix_POST_OkResponseSchema(BaseResponseSchemaAPI):
+    description = "Refresh service effective permissions matrix successful."
+    body = ServicePermissionsMatrix_ResponseBodySchema(code=HTTPOk.code, description=description)
+
+
+class ServicePermissionsMatrix_POST_InternalServerErrorResponseSchema(BaseResponseSchemaAPI):
+    description = "Failed to compute service effective permissions matrix."
+    body = InternalServerErrorResponseBodySchema(code=HTTPInternalServerError.code, description=description)
+
+
 # create service's resource use same method as direct resource create
 class ServiceResources_POST_RequestSchema(Resources_POST_RequestSchema):
     path = Service_RequestPathSchema()
@@ -1476,12 +1585,32 @@ ServiceResource_DELETE_ForbiddenResponseSchema = Resource_DELETE_ForbiddenRespon
 ServiceResource_DELETE_OkResponseSchema = Resource_DELETE_OkResponseSchema
 
 
+class ServiceResources_GET_QuerySchema(QueryRequestSchemaAPI):
+    depth = colander.SchemaNode(
+        colander.Integer(), missing=colander.drop, validator=colander.Range(min=0),
+        description="Maximum depth of children resources to return under the service (default: unlimited). "
+                    "Resources directly under the service are at depth 1.")
+    limit = colander.SchemaNode(
+        colander.Integer(), missing=colander.drop, validator=colander.Range(min=1),
+        description="Maximum amount of resources directly under the service to return with their children resources. "
+                    "Response provides the 'next_cursor' value to retrieve the following page when specified.")
+    cursor = colander.SchemaNode(
+        colander.Integer(), missing=colander.drop, validator=colander.Range(min=0),
+        description="Return only resources directly under the service following the specified cursor, as provided "
+                    "by 'next_cursor' from the response of the previous page.")
+
+
 class ServiceResources_GET_RequestSchema(BaseRequestSchemaAPI):
     path = Service_RequestPathSchema()
+    querystring = ServiceResources_GET_QuerySchema()
 
 
 class ServiceResources_GET_ResponseBodySchema(BaseResponseBodySchema):
     service_name = Resource_ServiceWithChildrenResourcesContainerBodySchema(name="{service_name}")
+    next_cursor = colander.SchemaNode(
+        colander.Integer(), missing=colander.drop, default=colander.null,
+        description="Cursor to retrieve the next page of resources, or null if this is the last page. "
+                    "Provided only when 'limit' query parameter is specified.")
 
 
 class ServiceResources_GET_OkResponseSchema(BaseResponseSchemaAPI):
@@ -1489,6 +1618,11 @@ class ServiceResources_GET_OkResponseSchema(BaseResponseSchemaAPI):
     body = ServiceResources_GET_ResponseBodySchema(code=HTTPOk.code, description=description)
 
 
+class ServiceResources_GET_BadRequestResponseSchema(BaseResponseSchemaAPI):
+    description = "Invalid 'depth', 'limit' or 'cursor' query parameter value."
+    body = ErrorResponseBodySchema(code=HTTPBadRequest.code, description=description)
+
+
 class ServiceTypeResources_GET_RequestSchema(BaseRequestSchemaAPI):
     path = ServiceType_RequestPathSchema()
 
@@ -1989,6 +2123,99 @@ class UserResourcePermissions_GET_NotFoundResponseSchema(BaseResponseSchemaAPI):
     body = ErrorResponseBodySchema(code=HTTPNotFound.code, description=description)
 
 
+class UserPermissionsCheck_ResourceSchema(colander.MappingSchema):
+    resource_id = colander.SchemaNode(
+        colander.Integer(),
+        description="Identifier of the service or resource to check. Ignores 'service_name' and 'resource_path'.",
+        missing=colander.drop,
+        example=123,
+    )
+    service_name = colander.SchemaNode(
+        colander.String(),
+        description="Name of the service under which the resource is located when referenced by path.",
+        missing=colander.drop,
+        example="thredds",
+    )
+    resource_path = colander.SchemaNode(
+        colander.String(),
+        description="Path of nested children resource names under the service. The closest existing parent resource "
+                    "is employed to resolve permissions if the complete path cannot be found.",
+        missing=colander.drop,
+        example="/birdhouse/dataset/file.nc",
+    )
+
+
+class UserPermissionsCheck_ResourceListSchema(colander.SequenceSchema):
+    resource = UserPermissionsCheck_ResourceSchema()
+
+
+class UserPermissionsCheck_POST_RequestBodySchema(colander.MappingSchema):
+    resources = UserPermissionsCheck_ResourceListSchema(
+        description="Services or resources for which to resolve the effective permissions of the user."
+    )
+    permissions = PermissionNameListSchema(
+        description="Permission names to resolve for every resource. "
+                    "All permissions applicable for each resource are resolved if omitted.",
+        missing=colander.drop,
+        example=[Permission.READ.value],
+    )
+
+
+class UserPermissionsCheck_POST_RequestSchema(BaseRequestSchemaAPI):
+    path = User_RequestPathSchema()
+    body = UserPermissionsCheck_POST_RequestBodySchema()
+
+
+class UserPermissionsCheck_ResultSchema(UserPermissionsCheck_ResourceSchema):
+    resource_found = colander.SchemaNode(
+        colander.Boolean(),
+        description="Indicates if the referenced resource exists. Otherwise, 'resource_id' is the closest existing "
+                    "parent resource of the requested path from which recursive permissions were resolved.",
+    )
+    permission_names = PermissionNameListSchema(
+        description="List of resource permissions effective for the referenced user.",
+        example=[Permission.READ.value]
+    )
+    permissions = PermissionObjectListSchema(
+        description="List of detailed resource permissions effective for the referenced user."
+    )
+
+
+class UserPermissionsCheck_ResultListSchema(colander.SequenceSchema):
+    result = UserPermissionsCheck_ResultSchema()
+
+
+class UserPermissionsCheck_POST_ResponseBodySchema(BaseResponseBodySchema):
+    results = UserPermissionsCheck_ResultListSchema(
+        description="Effective permissions of the user for each requested resource, in the same order."
+    )
+
+
+class UserPermissionsCheck_POST_OkResponseSchema(BaseResponseSchemaAPI):
+    description = "Check user effective permissions of resources successful."
+    body = UserPermissionsCheck_POST_ResponseBodySchema(code=HTTPOk.code, description=description)
+
+
+class UserPermissionsCheck_POST_BadRequestResponseSchema(BaseResponseSchemaAPI):
+    description = "Invalid resources or permissions specified for effective permissions check."
+    body = ErrorResponseBodySchema(code=HTTPBadRequest.code, description=description)
+
+
+class UserPermissionsCheck_POST_ForbiddenResponseSchema(BaseResponseSchemaAPI):
+    description = "Failed to retrieve resources or services for effective permissions check."
+    body = ErrorResponseBodySchema(code=HTTPForbidden.code, description=description)
+
+
+class UserPermissionsCheck_POST_NotFoundResponseSchema(BaseResponseSchemaAPI):
+    description = "Could not find specified resource or service for effective permissions check."
+    body = ErrorResponseBodySchema(code=HTTPNotFound.code, description=description)
+
+
+class UserPermissionsCheck_POST_InternalServerErrorResponseSchema(BaseResponseSchemaAPI):
+    description = "Failed to resolve user effective permissions of resources."
+    body = InternalServerErrorResponseBodySchema(code=HTTPInternalServerError.code, description=description)
+
+
 class UserResourcePermissions_POST_RequestBodySchema(colander.MappingSchema):
     permission_name = colander.SchemaNode(
         colander.String(),
@@ -2918,6 +3145,12 @@ class Version_GET_OkResponseSchema(BaseResponseSchemaAPI):
     body = Version_GET_ResponseBodySchema(code=HTTPOk.code, description=description)
 
 
+class Metrics_GET_OkResponseSchema(colander.MappingSchema):
+    description = "Get metrics successful."
+    body = colander.SchemaNode(colander.String(), description="Metrics in Prometheus text exposition format.",
+                               example="magpie_acl_cache_requests_total{result=\"hit\"} 42")
+
+
 class Homepage_GET_OkResponseSchema(BaseResponseSchemaAPI):
     description = "Get homepage successful."
     body = BaseResponseBodySchema(code=HTTPOk.code, description=description)
@@ -2966,6 +3199,16 @@ Resources_POST_responses = {
     "422": UnprocessableEntityResponseSchema(),
     "500": InternalServerErrorResponseSchema(),
 }
+ResourceChildren_POST_responses = {
+    "201": ResourceChildren_POST_CreatedResponseSchema(),
+    "401": UnauthorizedResponseSchema(),
+    "403": ResourceChildren_POST_ForbiddenResponseSchema(),
+    "404": Resources_POST_NotFoundResponseSchema(),
+    "406": NotAcceptableResponseSchema(),
+    "409": Resources_POST_ConflictResponseSchema(),
+    "422": ResourceChildren_POST_UnprocessableEntityResponseSchema(),
+    "500": InternalServerErrorResponseSchema(),
+}
 Resources_DELETE_responses = {
     "200": Resource_DELETE_OkResponseSchema(),
     "400": Resource_MatchDictCheck_BadRequestResponseSchema(),  # FIXME: https://github.com/Ouranosinc/Magpie/issues/359
@@ -3052,8 +3295,26 @@ ServicePermissions_GET_responses = {
     "422": UnprocessableEntityResponseSchema(),
     "500": InternalServerErrorResponseSchema(),
 }
+ServicePermissionsMatrix_GET_responses = {
+    "200": ServicePermissionsMatrix_GET_OkResponseSchema(),
+    "400": ServicePermissionsMatrix_GET_BadRequestResponseSchema(),
+    "401": UnauthorizedResponseSchema(),
+    "403": Service_MatchDictCheck_ForbiddenResponseSchema(),  # FIXME: https://github.com/Ouranosinc/Magpie/issues/359
+    "404": Service_MatchDictCheck_NotFoundResponseSchema(),
+    "406": NotAcceptableResponseSchema(),
+    "500": ServicePermissionsMatrix_POST_InternalServerErrorResponseSchema(),
+}
+ServicePermissionsMatrix_POST_responses = {
+    "200": ServicePermissionsMatrix_POST_OkResponseSchema(),
+    "401": UnauthorizedResponseSchema(),
+    "403": Service_MatchDictCheck_ForbiddenResponseSchema(),  # FIXME: https://github.com/Ouranosinc/Magpie/issues/359
+    "404": Service_MatchDictCheck_NotFoundResponseSchema(),
+    "406": NotAcceptableResponseSchema(),
+    "500": ServicePermissionsMatrix_POST_InternalServerErrorResponseSchema(),
+}
 ServiceResources_GET_responses = {
     "200": ServiceResources_GET_OkResponseSchema(),
+    "400": ServiceResources_GET_BadRequestResponseSchema(),
     "401": UnauthorizedResponseSchema(),
     "403": Service_MatchDictCheck_ForbiddenResponseSchema(),  # FIXME: https://github.com/Ouranosinc/Magpie/issues/359
     "404": Service_MatchDictCheck_NotFoundResponseSchema(),
@@ -3192,6 +3453,16 @@ UserResourcePermissions_GET_responses = {
     "422": UnprocessableEntityResponseSchema(),
     "500": InternalServerErrorResponseSchema(),
 }
+UserPermissionsCheck_POST_responses = {
+    "200": UserPermissionsCheck_POST_OkResponseSchema(),
+    "400": UserPermissionsCheck_POST_BadRequestResponseSchema(),
+    "401": UnauthorizedResponseSchema(),
+    "403": UserPermissionsCheck_POST_ForbiddenResponseSchema(),
+    "404": UserPermissionsCheck_POST_NotFoundResponseSchema(),
+    "406": NotAcceptableResponseSchema(),
+    "422": UnprocessableEntityResponseSchema(),
+    "500": UserPermissionsCheck_POST_InternalServerErrorResponseSchema(),
+}
 UserResourcePermissions_POST_responses = {
     "201": UserResourcePermissions_POST_CreatedResponseSchema(),
     # FIXME: https://github.com/Ouranosinc/Magpie/issues/359
@@ -3607,6 +3878,10 @@ Session_GET_responses = {
     "406": NotAcceptableResponseSchema(),
     "500": Session_GET_InternalServerErrorResponseSchema(),
 }
+Metrics_GET_responses = {
+    "200": Metrics_GET_OkResponseSchema(),
+    "406": NotAcceptableResponseSchema(),
+}
 Version_GET_responses = {
     "200": Version_GET_OkResponseSchema(),
     "406": NotAcceptableResponseSchema(),
@@ -12,7 +12,7 @@ from magpie.cli.register_defaults import register_defaults
 from magpie.constants import get_constant
 from magpie.db import get_db_session_from_config_ini, run_database_migration_when_ready, set_sqlalchemy_log_level
 from magpie.register import magpie_register_permissions_from_config, magpie_register_services_from_config
-from magpie.security import get_auth_config
+from magpie.security import get_auth_config, register_special_principals
 from magpie.utils import get_logger, patch_magpie_url, print_log
 
 LOGGER = get_logger(__name__)
@@ -83,6 +83,9 @@ def main(global_config=None, **settings):  # noqa: F811
     config = get_auth_config(settings)
     set_cache_regions_from_settings(settings)
 
+    print_log("Resolve special users and groups...", LOGGER)
+    register_special_principals(config, db_session)
+
     # don't use scan otherwise modules like 'magpie.adapter' are
     # automatically found and cause import errors on missing packages
     print_log("Including Magpie modules...", LOGGER)
@@ -0,0 +1,783 @@
+"""
+Process-wide caching of resolved permissions with change-driven invalidation.
+
+Resolved :term:`Effective Permissions` are stored per ``(user, resource, permission, allow_match)`` combination along
+with the user's groups and the resource hierarchy that were employed to resolve them. Any modification applied on one
+of those elements (see :func:`invalidate_permission_cache`) evicts only the impacted entries, which allows to keep
+results cached for much longer durations than with time-based expiration alone.
+
+The cache is configured by the ``permission`` region of the `Beaker` cache settings. For example::
+
+    cache.regions = acl, permission
+    cache.permission.enabled = true
+    cache.permission.expire = 3600
+
+When multiple workers or instances share the same `PostgreSQL` database, each invalidation is also emitted with
+``NOTIFY`` on channel :data:`CACHE_INVALIDATION_CHANNEL` within the transaction that applies the modification. Every
+process with enabled caches runs a :class:`CacheInvalidationListener` that evicts the corresponding entries from its
+local caches once the modification is committed.
+
+Registered services are similarly indexed in memory by :data:`SERVICE_REGISTRY` when the ``service`` region is enabled,
+such that proxied requests of the ``MagpieAdapter`` can resolve their service without querying the database.
+Resources accessible to unauthenticated requests are indexed by :data:`PUBLIC_ACCESS_INDEX` when the ``public`` region
+is enabled, such that their effective permissions are resolved without any query.
+"""
+import json
+import os
+import select
+import socket
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+import sqlalchemy as sa
+from beaker.cache import cache_regions
+from pyramid.events import NewRequest
+from six.moves.urllib.parse import urlparse, urlunparse
+from sqlalchemy.orm.session import Session as SessionType
+
+from magpie.permissions import PermissionSet
+from magpie.utils import get_logger
+
+if TYPE_CHECKING:
+    # pylint: disable=W0611,unused-import
+    from typing import Any, Callable, Collection, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+    from pyramid.config import Configurator
+    from sqlalchemy.engine import Engine
+    from sqlalchemy.orm.session import Session
+    from ziggurat_foundations.permissions import PermissionTuple
+
+    from magpie.models import Service, User
+    from magpie.permissions import Permission
+    from magpie.typedefs import ServiceOrResourceType, Str
+
+    PermissionCacheKey = Tuple[int, int, Permission, bool]
+    # expiry, resolved permission, IDs of groups and resource hierarchy employed to resolve it
+    PermissionCacheEntry = Tuple[Optional[float], PermissionSet, Tuple[int, ...], Tuple[int, ...]]
+    # version, applied permissions per resource, ancestors with applied permissions per resource, resolved permissions
+    PublicAccessSnapshot = Tuple[
+        int,
+        Dict[int, Tuple[ServiceOrResourceType, List[PermissionTuple]]],
+        Dict[int, Tuple[int, ...]],
+        Dict[Tuple[int, FrozenSet[Permission], bool], List[PermissionSet]],
+    ]
+    CacheInvalidationHandler = Callable[[Optional[int], Optional[int], Optional[int]], None]
+
+LOGGER = get_logger(__name__)
+
+PERMISSION_CACHE_REGION = "permission"
+SERVICE_CACHE_REGION = "service"
+TOKEN_CACHE_REGION = "token"
+PUBLIC_CACHE_REGION = "public"
+CACHE_INVALIDATION_CHANNEL = "magpie_cache_invalidation"
+CACHE_INVALIDATION_HANDLERS = []  # type: List[CacheInvalidationHandler]
+
+
+class PermissionCache(object):
+    """
+    Thread-safe storage of resolved permissions indexed by the elements that were employed to resolve them.
+
+    The maximum amount of entries is defined by ``max_size`` of the cache region, beyond which the least recently used
+    ones are removed.
+    """
+    default_max_size = 100000
+
+    def __init__(self, region=PERMISSION_CACHE_REGION):
+        # type: (Str) -> None
+        self.region = region
+        self._lock = threading.RLock()
+        self._version = 0
+        self._entries = OrderedDict()  # type: Dict[PermissionCacheKey, PermissionCacheEntry]
+        self._by_user = {}      # type: Dict[int, Set[PermissionCacheKey]]
+        self._by_group = {}     # type: Dict[int, Set[PermissionCacheKey]]
+        self._by_resource = {}  # type: Dict[int, Set[PermissionCacheKey]]
+
+    @property
+    def enabled(self):
+        # type: () -> bool
+        region = cache_regions.get(self.region)
+        return bool(region and region.get("enabled", True))
+
+    @property
+    def expire(self):
+        # type: () -> Optional[int]
+        return cache_regions.get(self.region, {}).get("expire") or None
+
+    @property
+    def max_size(self):
+        # type: () -> int
+        return int(cache_regions.get(self.region, {}).get("max_size") or self.default_max_size)
+
+    @property
+    def version(self):
+        # type: () -> int
+        """
+        Counter incremented on each invalidation.
+
+        Must be obtained *before* resolving permissions to be cached such that :meth:`set` can detect that a concurrent
+        invalidation occurred during resolution, in which case resolved permissions could be outdated.
+        """
+        return self._version
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, user_id, resource_id, permissions, allow_match):
+        # type: (int, int, Collection[Permission], bool) -> Optional[List[PermissionSet]]
+        """
+        Obtains cached resolved permissions only if *all* requested ones are available and not expired.
+        """
+        if not self.enabled:
+            return None
+        now = time.time()
+        found = []
+        with self._lock:
+            for perm in set(permissions):
+                key = (user_id, resource_id, perm, allow_match)
+                entry = self._entries.get(key)
+                if entry is None:
+                    return None
+                expire_at, perm_set, _, _ = entry
+                if expire_at is not None and expire_at < now:
+                    self._remove(key)
+                    return None
+                self._entries[key] = self._entries.pop(key)  # move as most recently used
+                found.append(perm_set)
+        # copy to avoid modifications of returned items to alter cached ones
+        return [PermissionSet(p.name, p.access, p.scope, p.type, p.reason) for p in found]
+
+    def set(self,
+            user_id,        # type: int
+            group_ids,      # type: Iterable[int]
+            resource_id,    # type: int
+            hierarchy_ids,  # type: Iterable[int]
+            permissions,    # type: Iterable[PermissionSet]
+            allow_match,    # type: bool
+            version,        # type: int
+            ):              # type: (...) -> None
+        """
+        Stores resolved permissions of a resource with references to elements that were employed to resolve them.
+
+        Nothing is stored if an invalidation occurred since :paramref:`version` was obtained.
+        """
+        if not self.enabled:
+            return
+        expire = self.expire
+        expire_at = time.time() + expire if expire else None
+        group_ids = tuple(group_ids)
+        hierarchy_ids = tuple(hierarchy_ids)
+        max_size = self.max_size
+        with self._lock:
+            if version != self._version:
+                return
+            for perm in permissions:
+                key = (user_id, resource_id, perm.name, allow_match)
+                perm_copy = PermissionSet(perm.name, perm.access, perm.scope, perm.type, perm.reason)
+                self._remove(key)
+                self._entries[key] = (expire_at, perm_copy, group_ids, hierarchy_ids)
+                self._by_user.setdefault(user_id, set()).add(key)
+                for grp_id in group_ids:
+                    self._by_group.setdefault(grp_id, set()).add(key)
+                for res_id in hierarchy_ids:
+                    self._by_resource.setdefault(res_id, set()).add(key)
+            while len(self._entries) > max_size:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, user_id=None, group_id=None, resource_id=None):
+        # type: (Optional[int], Optional[int], Optional[int]) -> None
+        """
+        Removes cached permissions that were resolved using the specified elements.
+
+        When combined, only entries referencing *all* specified elements are removed (e.g.: permissions of a user
+        under a given resource). When none are specified, the whole cache is cleared.
+        """
+        with self._lock:
+            self._version += 1
+            indexes = [(index, key) for index, key in [(self._by_user, user_id),
+                                                       (self._by_group, group_id),
+                                                       (self._by_resource, resource_id)] if key is not None]
+            if not indexes:
+                self._clear()
+                return
+            keys = None
+            for index, key in indexes:
+                found = index.get(key, set())
+                keys = set(found) if keys is None else keys & found
+            for key in keys:
+                self._remove(key)
+
+    def clear(self):
+        # type: () -> None
+        with self._lock:
+            self._version += 1
+            self._clear()
+
+    def _remove(self, key):
+        # type: (PermissionCacheKey) -> None
+        """
+        Removes the entry and its references from all indexes. Must be called while holding the lock.
+        """
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        _, _, group_ids, hierarchy_ids = entry
+        references = [(self._by_user, key[0])]
+        references.extend((self._by_group, grp_id) for grp_id in group_ids)
+        references.extend((self._by_resource, res_id) for res_id in hierarchy_ids)
+        for index, ref_id in references:
+            keys = index.get(ref_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    index.pop(ref_id)
+
+    def _clear(self):
+        self._entries.clear()
+        self._by_user.clear()
+        self._by_group.clear()
+        self._by_resource.clear()
+
+
+PERMISSION_CACHE = PermissionCache()
+
+
+class ServiceRegistry(object):
+    """
+    Thread-safe in-memory index of all registered services by name and by normalized URL.
+
+    Services are loaded at once from the database with a dedicated session and kept detached from it, such that they
+    can be looked up by every request without any query. The registry is reloaded entirely on next lookup whenever any
+    cache invalidation referencing a resource is received (services are created, updated or deleted), or when the
+    ``expire`` delay of its cache region is reached. When the region is disabled, lookups query the database directly.
+    """
+
+    def __init__(self, region=SERVICE_CACHE_REGION):
+        # type: (Str) -> None
+        self.region = region
+        self._lock = threading.RLock()
+        self._expire_at = None  # type: Optional[float]
+        # indexes by name and by URL replaced together such that lookups without lock always obtain consistent ones
+        self._indexes = None    # type: Optional[Tuple[Dict[Str, Service], Dict[Str, Service]]]
+
+    @property
+    def enabled(self):
+        # type: () -> bool
+        region = cache_regions.get(self.region)
+        return bool(region and region.get("enabled", True))
+
+    @property
+    def expire(self):
+        # type: () -> Optional[int]
+        return cache_regions.get(self.region, {}).get("expire") or None
+
+    @staticmethod
+    def normalize_url(url):
+        # type: (Str) -> Str
+        """
+        Normalizes the service URL for lookup regardless of letter case of its scheme and host, or trailing slashes.
+        """
+        parts = urlparse(url)
+        return urlunparse((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"),
+                           parts.params, parts.query, parts.fragment))
+
+    def _load(self, db_session):
+        # type: (Session) -> Tuple[Dict[Str, Service], Dict[Str, Service]]
+        from magpie import models  # pylint: disable=C0415  # avoid circular import
+
+        with self._lock:
+            if self._indexes is not None and (self._expire_at is None or self._expire_at >= time.time()):
+                return self._indexes
+            expire = self.expire
+            registry_session = SessionType(bind=db_session.get_bind())
+            try:
+                services = registry_session.query(models.Service).all()
+            finally:
+                registry_session.close()  # detach loaded services
+            self._indexes = (
+                {svc.resource_name: svc for svc in services},
+                {self.normalize_url(svc.url): svc for svc in services},
+            )
+            self._expire_at = time.time() + expire if expire else None
+            LOGGER.debug("Loaded %s services in registry.", len(services))
+            return self._indexes
+
+    def lookup(self, db_session, name=None, url=None):
+        # type: (Session, Optional[Str], Optional[Str]) -> Optional[Service]
+        """
+        Obtains the service matching either the name or the URL.
+
+        When the registry is enabled, the returned service is shared and detached from any session. It must therefore
+        be employed only to read its details (see :meth:`find` otherwise). When disabled, the service is obtained
+        from the database using the provided session.
+        """
+        if not self.enabled:
+            from magpie import models  # pylint: disable=C0415  # avoid circular import
+
+            if name is not None:
+                return models.Service.by_service_name(name, db_session=db_session)
+            url = self.normalize_url(url)
+            for svc in db_session.query(models.Service):
+                if self.normalize_url(svc.url) == url:
+                    return svc
+            return None
+        indexes, expire_at = self._indexes, self._expire_at
+        if indexes is None or (expire_at is not None and expire_at < time.time()):
+            indexes = self._load(db_session)
+        by_name, by_url = indexes
+        if name is not None:
+            return by_name.get(name)
+        return by_url.get(self.normalize_url(url))
+
+    def find(self, db_session, name=None, url=None):
+        # type: (Session, Optional[Str], Optional[Str]) -> Optional[Service]
+        """
+        Obtains the service matching either the name or the URL attached to the session.
+
+        Service from the registry is added to the session without any query.
+        """
+        service = self.lookup(db_session, name=name, url=url)
+        if service is None or not self.enabled:
+            return service
+        return db_session.merge(service, load=False)
+
+    def invalidate(self, user_id=None, group_id=None, resource_id=None):  # noqa: W0613
+        # type: (Optional[int], Optional[int], Optional[int]) -> None
+        """
+        Marks the registry for reload if the modification can concern a service, or if all caches are cleared.
+        """
+        if resource_id is None and (user_id is not None or group_id is not None):
+            return
+        self.clear()
+
+    def clear(self):
+        # type: () -> None
+        with self._lock:
+            self._indexes = None
+            self._expire_at = None
+
+
+SERVICE_REGISTRY = ServiceRegistry()
+
+
+class PublicAccessIndex(object):
+    """
+    Thread-safe in-memory index of resources for which unauthenticated requests can resolve permissions without query.
+
+    Every resource with permissions applied for the anonymous user or its groups (i.e.: ``MAGPIE_ANONYMOUS_GROUP``) is
+    loaded at once along with those permissions. Using :class:`magpie.models.ResourceAncestor` references, every
+    resource nested under them is also indexed with the chain of its ancestors that have such permissions, which
+    expands the resources reached by their `recursive` scope. Effective permissions of the anonymous user over any
+    indexed resource are then resolved in memory and kept until a modification concerns them.
+
+    Modifications of anonymous permissions on a specific resource only refresh the branch under that resource on next
+    lookup, while other modifications of the anonymous user or its groups reload the whole index. Resources that are
+    not nested under any resource with anonymous permissions (including resources created after the index was loaded)
+    are not indexed, and their permissions must be resolved normally.
+    """
+    default_max_size = 10000
+
+    def __init__(self, region=PUBLIC_CACHE_REGION):
+        # type: (Str) -> None
+        self.region = region
+        self._lock = threading.RLock()
+        self._version = 0
+        self._expire_at = None  # type: Optional[float]
+        self._user = None       # type: Optional[User]
+        self._group_ids = set()  # type: Set[int]
+        self._levels = None     # type: Optional[Dict[int, Tuple[ServiceOrResourceType, List[PermissionTuple]]]]
+        self._ancestors = None  # type: Optional[Dict[int, Tuple[int, ...]]]
+        self._pending = set()   # type: Set[int]
+        self._resolved = {}     # type: Dict[Tuple[int, FrozenSet[Permission], bool], List[PermissionSet]]
+
+    @property
+    def enabled(self):
+        # type: () -> bool
+        region = cache_regions.get(self.region)
+        return bool(region and region.get("enabled", True))
+
+    @property
+    def expire(self):
+        # type: () -> Optional[int]
+        return cache_regions.get(self.region, {}).get("expire") or None
+
+    @property
+    def max_size(self):
+        # type: () -> int
+        """
+        Maximum amount of resolved effective permissions kept before they are all evicted.
+        """
+        return int(cache_regions.get(self.region, {}).get("max_size") or self.default_max_size)
+
+    def __len__(self):
+        return len(self._ancestors or {}) + len(set(self._levels or {}) - set(self._ancestors or {}))
+
+    @staticmethod
+    def _load_ancestors(db_session, levels, branch_id=None):
+        # type: (Session, Dict[int, Any], Optional[int]) -> Dict[int, Tuple[int, ...]]
+        """
+        Obtains, for resources nested under the indexed levels, the chain of those levels ordered from closest parent.
+
+        Only resources under :paramref:`branch_id` (inclusively) are retrieved if provided.
+        """
+        from magpie import models  # pylint: disable=C0415  # avoid circular import
+
+        if not levels:
+            return {}
+        closure = models.ResourceAncestor.__table__
+        query = db_session.query(closure.c.resource_id, closure.c.ancestor_id).filter(
+            closure.c.ancestor_id.in_(list(levels))
+        )
+        if branch_id is not None:
+            branch = sa.select([closure.c.resource_id]).where(closure.c.ancestor_id == branch_id)
+            query = query.filter(sa.or_(closure.c.resource_id == branch_id, closure.c.resource_id.in_(branch)))
+        ancestors = {}  # type: Dict[int, List[int]]
+        for res_id, ancestor_id in query.order_by(closure.c.resource_id, closure.c.depth):
+            ancestors.setdefault(res_id, []).append(ancestor_id)
+        chains = {}  # type: Dict[Tuple[int, ...], Tuple[int, ...]]  # share identical chains of sibling resources
+        return {res_id: chains.setdefault(tuple(chain), tuple(chain)) for res_id, chain in ancestors.items()}
+
+    def _refresh(self, db_session, user_id, admin_group_id):
+        # type: (Session, int, Optional[int]) -> PublicAccessSnapshot
+        """
+        Reloads the index or its pending branches if required, and returns a consistent snapshot of its current state.
+        """
+        from magpie import models  # pylint: disable=C0415  # avoid circular import
+
+        with self._lock:
+            reload = (self._levels is None or self._user is None or self._user.id != user_id or
+                      (self._expire_at is not None and self._expire_at < time.time()))
+            if not reload and not self._pending:
+                return self._version, self._levels, self._ancestors, self._resolved
+            expire = self.expire
+            index_session = SessionType(bind=db_session.get_bind())
+            try:
+                if reload:
+                    user = index_session.query(models.User).get(user_id)
+                    groups = list(user.groups) if user is not None else []
+                    levels = {}  # type: Dict[int, Tuple[ServiceOrResourceType, List[PermissionTuple]]]
+                    # anonymous access is not resolved like for administrators, let requests resolve them normally
+                    if user is not None and admin_group_id not in [grp.id for grp in groups]:
+                        levels = {res.resource_id: (res, perms)
+                                  for res, perms in models.get_applied_resources_permissions(user, index_session)}
+                    ancestors = self._load_ancestors(index_session, levels)
+                    self._user = user
+                    self._group_ids = {grp.id for grp in groups}
+                    self._expire_at = time.time() + expire if expire else None
+                else:
+                    levels = dict(self._levels)
+                    ancestors = dict(self._ancestors)
+                    for res_id in self._pending:
+                        levels.pop(res_id, None)
+                        for res, perms in models.get_applied_resources_permissions(self._user, index_session,
+                                                                                   resource_ids=[res_id]):
+                            levels[res_id] = (res, perms)
+                        branch = [branch_id for branch_id, chain in ancestors.items() if res_id in chain]
+                        for branch_id in branch + [res_id]:
+                            ancestors.pop(branch_id, None)
+                        ancestors.update(self._load_ancestors(index_session, levels, branch_id=res_id))
+            finally:
+                index_session.close()  # detach loaded resources, user and groups
+            self._levels = levels
+            self._ancestors = ancestors
+            self._pending = set()
+            self._resolved = {}
+            self._version += 1
+            LOGGER.debug("Loaded %s resources with %s anonymous permissions in public access index.",
+                         len(self), len(levels))
+            return self._version, self._levels, self._ancestors, self._resolved
+
+    def lookup(self,
+               db_session,          # type: Session
+               principals,          # type: Dict[Str, Optional[int]]
+               resource,            # type: ServiceOrResourceType
+               permissions,         # type: Collection[Permission]
+               allow_match,         # type: bool
+               resolver,            # type: Callable[..., Tuple[List[PermissionSet], List[int]]]
+               ):                   # type: (...) -> Optional[List[PermissionSet]]
+        """
+        Obtains the effective permissions of the anonymous user over the resource, if it is indexed.
+
+        :param db_session: database connection to load the index if required (a distinct session is employed).
+        :param principals: identifiers of special users and groups (see :class:`magpie.security.SpecialPrincipals`).
+        :param resource: resource for which to resolve permissions.
+        :param permissions: permissions to resolve.
+        :param allow_match: whether `match`-scoped permissions applied on the resource itself should be considered.
+        :param resolver:
+            Function that resolves effective permissions from the hierarchy of resources and their applied permissions
+            (see :meth:`magpie.services.ServiceInterface._resolve_hierarchy_permissions`).
+        :returns: resolved effective permissions, or ``None`` if the resource is not indexed or the index is disabled.
+        """
+        user_id = principals.get("anonymous_user_id")
+        if not self.enabled or user_id is None:
+            return None
+        admin_group_id = principals.get("admin_group_id")
+        version, levels, ancestors, resolved_cache = self._refresh(db_session, user_id, admin_group_id)
+        res_id = resource.resource_id
+        chain = ancestors.get(res_id)
+        level = levels.get(res_id)
+        if chain is None and level is None:
+            return None
+        key = (res_id, frozenset(permissions), allow_match)
+        resolved = resolved_cache.get(key)
+        if resolved is None:
+            hierarchy = [level or (resource, [])] + [levels[ancestor_id] for ancestor_id in chain or []]
+            resolved, _ = resolver(hierarchy, permissions, allow_match)
+            with self._lock:
+                if version == self._version:
+                    if len(self._resolved) >= self.max_size:
+                        self._resolved = {}
+                    self._resolved[key] = resolved
+        return resolved
+
+    def invalidate(self, user_id=None, group_id=None, resource_id=None):
+        # type: (Optional[int], Optional[int], Optional[int]) -> None
+        """
+        Marks the branch of the resource for refresh, or the whole index for reload, if the modification concerns them.
+        """
+        with self._lock:
+            if self._levels is None:
+                return
+            if user_id is None and group_id is None:
+                if resource_id is None:
+                    self.clear()
+                elif resource_id in self._levels or resource_id in self._ancestors:
+                    self._pending.add(resource_id)
+                return
+            anonymous_user_id = self._user.id if self._user is not None else None
+            if (user_id is None or user_id != anonymous_user_id) and group_id not in self._group_ids:
+                return
+            if resource_id is None:
+                self.clear()
+            else:
+                self._pending.add(resource_id)
+
+    def clear(self):
+        # type: () -> None
+        with self._lock:
+            self._levels = None
+            self._ancestors = None
+            self._pending = set()
+            self._resolved = {}
+            self._expire_at = None
+            self._version += 1
+
+
+PUBLIC_ACCESS_INDEX = PublicAccessIndex()
+
+
+def add_cache_invalidation_handler(handler):
+    # type: (CacheInvalidationHandler) -> None
+    """
+    Registers a function that evicts local cache entries impacted by the modification of the specified elements.
+
+    The handler is called with keywords ``user_id``, ``group_id`` and ``resource_id`` (any of which can be ``None``).
+    When all of them are ``None``, the handler must clear all of its entries.
+    """
+    if handler not in CACHE_INVALIDATION_HANDLERS:
+        CACHE_INVALIDATION_HANDLERS.append(handler)
+
+
+def invalidate_local_caches(user_id=None, group_id=None, resource_id=None):
+    # type: (Optional[int], Optional[int], Optional[int]) -> None
+    """
+    Applies invalidation of the specified elements with every registered handler of the current process.
+    """
+    for handler in CACHE_INVALIDATION_HANDLERS:
+        try:
+            handler(user_id=user_id, group_id=group_id, resource_id=resource_id)
+        except Exception as exc:  # noqa: W0703 # nosec: B110
+            LOGGER.error("Cache invalidation handler [%s] failed.", handler, exc_info=exc)
+
+
+add_cache_invalidation_handler(PERMISSION_CACHE.invalidate)
+add_cache_invalidation_handler(SERVICE_REGISTRY.invalidate)
+add_cache_invalidation_handler(PUBLIC_ACCESS_INDEX.invalidate)
+
+
+def get_cache_invalidation_origin():
+    # type: () -> Str
+    """
+    Identifier of the current process to ignore its own notifications since they are already applied locally.
+    """
+    # evaluated on each call since process can be forked after import (e.g.: gunicorn workers with preloaded app)
+    return "{}:{}".format(socket.gethostname(), os.getpid())
+
+
+def notify_cache_invalidation(db_session, user_id=None, group_id=None, resource_id=None):
+    # type: (Session, Optional[int], Optional[int], Optional[int]) -> None
+    """
+    Emits the invalidation for other processes connected to the same database.
+
+    Notification is sent within the active transaction of the session, meaning it is delivered to listeners only once
+    committed, and never if the transaction is aborted. Nothing is done for databases other than `PostgreSQL`.
+    """
+    if db_session.bind is None or db_session.bind.dialect.name != "postgresql":
+        return
+    payload = json.dumps({"origin": get_cache_invalidation_origin(),
+                          "user_id": user_id, "group_id": group_id, "resource_id": resource_id})
+    db_session.execute(sa.text("SELECT pg_notify(:channel, :payload)"),
+                       {"channel": CACHE_INVALIDATION_CHANNEL, "payload": payload})
+
+
+def invalidate_permission_cache(db_session=None, user_id=None, group_id=None, resource_id=None):
+    # type: (Optional[Session], Optional[int], Optional[int], Optional[int]) -> None
+    """
+    Invalidates cached permissions impacted by a modification of the specified elements.
+
+    When the database session is managed by a transaction (see :func:`magpie.db.get_tm_session`), invalidation is
+    deferred until the transaction is successfully committed so that cache cannot be populated again with outdated
+    permissions in the meantime. Otherwise, invalidation is applied immediately.
+
+    Other processes are notified of the invalidation using the same database session.
+
+    .. seealso::
+        - :func:`invalidate_local_caches`
+        - :func:`notify_cache_invalidation`
+    """
+    def invalidate(success=True):
+        if success:
+            invalidate_local_caches(user_id=user_id, group_id=group_id, resource_id=resource_id)
+
+    txn = None
+    transaction_manager = db_session.info.get("transaction_manager") if db_session is not None else None
+    if transaction_manager is not None:
+        try:
+            txn = transaction_manager.get()
+        except Exception as exc:  # noqa: W0703 # nosec: B110
+            LOGGER.debug("No active transaction for deferred permission cache invalidation [%r].", exc)
+    if txn is not None:
+        txn.addAfterCommitHook(invalidate)
+    else:
+        invalidate()
+    if db_session is not None:
+        notify_cache_invalidation(db_session, user_id=user_id, group_id=group_id, resource_id=resource_id)
+
+
+class CacheInvalidationListener(threading.Thread):
+    """
+    Background listener of cache invalidations emitted by other processes.
+
+    Employs a dedicated database connection (outside of the engine pool) on which ``LISTEN`` is executed. Whenever the
+    connection is lost, it is reestablished and all local caches are cleared since notifications could have been
+    missed in the meantime.
+    """
+
+    def __init__(self, engine, channel=CACHE_INVALIDATION_CHANNEL, timeout=5, max_retry_delay=60):
+        # type: (Engine, Str, int, int) -> None
+        super(CacheInvalidationListener, self).__init__(name="magpie-cache-invalidation-listener")
+        self.daemon = True
+        self.engine = engine
+        self.channel = channel
+        self.timeout = timeout
+        self.max_retry_delay = max_retry_delay
+        self.ready = threading.Event()
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        # type: () -> None
+        self._stop_event.set()
+
+    def _connect(self):
+        # type: () -> Any
+        connection = self.engine.raw_connection()
+        connection.detach()  # avoid holding one of the pooled connections indefinitely
+        connection.connection.rollback()  # terminate transaction possibly started by pool 'pre-ping'
+        connection.connection.autocommit = True
+        cursor = connection.cursor()
+        cursor.execute('LISTEN "{}";'.format(self.channel))
+        cursor.close()
+        return connection
+
+    def handle(self, payload):
+        # type: (Str) -> None
+        try:
+            params = json.loads(payload)
+        except ValueError:
+            LOGGER.warning("Invalid cache invalidation notification payload ignored: [%s]", payload)
+            return
+        if params.get("origin") == get_cache_invalidation_origin():
+            return  # already applied locally by the transaction hook
+        invalidate_local_caches(user_id=params.get("user_id"),
+                                group_id=params.get("group_id"),
+                                resource_id=params.get("resource_id"))
+
+    def run(self):
+        connection = None
+        retry = 0
+        while not self._stop_event.is_set():
+            try:
+                if connection is None:
+                    connection = self._connect()
+                    if retry:
+                        LOGGER.info("Cache invalidation listener reconnected, clearing local caches.")
+                        invalidate_local_caches()
+                    retry = 0
+                    self.ready.set()
+                dbapi_connection = connection.connection
+                if select.select([dbapi_connection], [], [], self.timeout) == ([], [], []):
+                    continue
+                dbapi_connection.poll()
+                while dbapi_connection.notifies:
+                    notify = dbapi_connection.notifies.pop(0)
+                    self.handle(notify.payload)
+            except Exception as exc:  # noqa: W0703 # nosec: B110
+                retry += 1
+                delay = min(2 ** retry, self.max_retry_delay)
+                LOGGER.warning("Cache invalidation listener failed [%r]. Retrying in %ss...", exc, delay)
+                self.ready.clear()
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:  # noqa: W0703 # nosec: B110
+                        pass
+                    connection = None
+                self._stop_event.wait(delay)
+        if connection is not None:
+            connection.close()
+
+
+_CACHE_INVALIDATION_LISTENER = None  # type: Optional[CacheInvalidationListener]
+_CACHE_INVALIDATION_LISTENER_PID = None  # type: Optional[int]
+_CACHE_INVALIDATION_LISTENER_LOCK = threading.Lock()
+
+
+def start_cache_invalidation_listener(engine):
+    # type: (Engine) -> CacheInvalidationListener
+    """
+    Starts the cache invalidation listener of the current process if not already running.
+
+    Process identifier is validated to start a new listener in forked processes, since threads are not duplicated.
+    """
+    global _CACHE_INVALIDATION_LISTENER, _CACHE_INVALIDATION_LISTENER_PID  # pylint: disable=W0603
+    pid = os.getpid()
+    if _CACHE_INVALIDATION_LISTENER_PID == pid and _CACHE_INVALIDATION_LISTENER.is_alive():
+        return _CACHE_INVALIDATION_LISTENER
+    with _CACHE_INVALIDATION_LISTENER_LOCK:
+        if _CACHE_INVALIDATION_LISTENER_PID != pid or not _CACHE_INVALIDATION_LISTENER.is_alive():
+            LOGGER.info("Starting cache invalidation listener on channel [%s].", CACHE_INVALIDATION_CHANNEL)
+            _CACHE_INVALIDATION_LISTENER = CacheInvalidationListener(engine)
+            _CACHE_INVALIDATION_LISTENER.start()
+            _CACHE_INVALIDATION_LISTENER_PID = pid
+    return _CACHE_INVALIDATION_LISTENER
+
+
+def register_cache_invalidation_listener(config, engine):
+    # type: (Configurator, Engine) -> None
+    """
+    Starts the cache invalidation listener on first request of each process when local caches must be synchronized.
+
+    The listener is only required when the ``acl``, ``permission``, ``service``, ``token`` or ``public`` cache regions
+    are enabled with `PostgreSQL`. Because processes can be forked after application creation, the listener is started
+    lazily.
+    """
+    region_names = ["acl", PERMISSION_CACHE_REGION, SERVICE_CACHE_REGION, TOKEN_CACHE_REGION, PUBLIC_CACHE_REGION]
+    regions = [cache_regions.get(region) for region in region_names]
+    if engine.dialect.name != "postgresql" or not any(region and region.get("enabled", True) for region in regions):
+        return
+
+    def start_listener(__):
+        start_cache_invalidation_listener(engine)
+
+    config.add_subscriber(start_listener, NewRequest)
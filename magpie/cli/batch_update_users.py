@@ -11,9 +11,8 @@ import os
 import uuid
 from typing import TYPE_CHECKING
 
-import requests
-
 from magpie.constants import get_constant
+from magpie.http_client import make_http_session
 from magpie.register import get_all_configs, pseudo_random_string
 from magpie.utils import get_json, get_logger
 
@@ -37,7 +36,7 @@ def format_response(response):
 
 
 def get_login_session(magpie_url, username, password, return_response=False):
-    session = requests.Session()
+    session = make_http_session()
     data = {"user_name": username, "password": password}
     response = session.post(magpie_url + "/signin", data=data)
     fmt_resp = format_response(response)
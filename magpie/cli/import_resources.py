@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Magpie helper to import a complete tree of resources under an existing service or resource.
+
+The tree file (JSON or YAML) must be of the form validated by :func:`magpie.cli.sync_services.is_valid_resource_schema`
+with the ``resource_type`` of every resource. All resources are validated before being inserted in bulk within a
+single transaction, which is much faster than creating them one by one with requests to the API.
+
+.. seealso::
+    - :func:`magpie.api.management.resource.resource_utils.create_resource_tree`
+"""
+import argparse
+import json
+from typing import TYPE_CHECKING
+
+import transaction
+import yaml
+from pyramid.httpexceptions import HTTPException, HTTPNotFound
+
+from magpie import db, models
+from magpie.api import exception as ax
+from magpie.api.management.resource.resource_utils import create_resource_tree
+from magpie.utils import get_json, get_logger
+
+if TYPE_CHECKING:
+    # pylint: disable=W0611,unused-import
+    from typing import Any, AnyStr, Optional, Sequence
+
+    from magpie.typedefs import JSON, SettingsType, Str
+
+LOGGER = get_logger(__name__,
+                    message_format="%(asctime)s - %(levelname)s - %(message)s",
+                    datetime_format="%d-%b-%y %H:%M:%S", force_stdout=False)
+
+ERROR_PARAMS = 2
+ERROR_EXEC = 1
+
+
+def load_resource_tree(path):
+    # type: (Str) -> JSON
+    """
+    Loads the tree of resources from a JSON or YAML file.
+    """
+    with open(path, "r") as tree_file:
+        if path.endswith(".json"):
+            return json.load(tree_file)
+        return yaml.safe_load(tree_file)
+
+
+def import_resources(resources, service_name=None, parent_id=None, settings=None):
+    # type: (JSON, Optional[Str], Optional[int], Optional[SettingsType]) -> JSON
+    """
+    Creates the tree of resources under the parent resource, or directly under the service if no parent is specified.
+
+    :returns: response body of the created resources tree.
+    :raises HTTPException: if the parent cannot be found or the resources tree is invalid.
+    """
+    with transaction.manager:
+        db_session = db.get_db_session_from_settings(settings=settings, echo=False)
+        if parent_id is None:
+            service = models.Service.by_service_name(service_name, db_session=db_session)
+            ax.verify_param(service, not_none=True, http_error=HTTPNotFound, content={"service_name": service_name},
+                            msg_on_fail="Could not find specified service name.")
+            parent_id = service.resource_id
+        return get_json(create_resource_tree(resources, parent_id, db_session))
+
+
+def make_parser():
+    # type: () -> argparse.ArgumentParser
+    parser = argparse.ArgumentParser(description="Import a tree of resources under a service or resource in bulk.")
+    parser.add_argument("tree_file", help="JSON or YAML file with the tree of resources to import.")
+    parent = parser.add_mutually_exclusive_group(required=True)
+    parent.add_argument("-s", "--service", dest="service_name",
+                        help="Name of the service under which to import the resources.")
+    parent.add_argument("-p", "--parent-id", dest="parent_id", type=int,
+                        help="ID of the service or resource under which to import the resources.")
+    parser.add_argument("--db", metavar="CONNECTION_URL", dest="db",
+                        help="Magpie database URL to connect to. Otherwise employ typical environment variables.")
+    return parser
+
+
+def main(args=None, parser=None, namespace=None):
+    # type: (Optional[Sequence[AnyStr]], Optional[argparse.ArgumentParser], Optional[argparse.Namespace]) -> Any
+    if not parser:
+        parser = make_parser()
+    args = parser.parse_args(args=args, namespace=namespace)
+    settings = {"magpie.db_url": args.db} if args.db else None
+    try:
+        resources = load_resource_tree(args.tree_file)
+    except (IOError, ValueError, yaml.YAMLError) as exc:
+        LOGGER.error("Failed loading resources tree file [%s]: %s", args.tree_file, exc)
+        return ERROR_PARAMS
+    try:
+        result = import_resources(resources, service_name=args.service_name, parent_id=args.parent_id,
+                                  settings=settings)
+    except HTTPException as exc:
+        LOGGER.error("Failed importing resources tree: %s", get_json(exc))
+        return ERROR_EXEC
+    LOGGER.info("Imported %s resources under [%s].", result["created_count"], result["resource"]["resource_name"])
+    return 0
+
+
+if __name__ == "__main__":
+    main()
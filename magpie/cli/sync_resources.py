@@ -13,11 +13,17 @@ import copy
 import datetime
 import logging
 import os
+import random
 import sys
-from collections import OrderedDict
+import threading
+import time
+from collections import OrderedDict, defaultdict, namedtuple
 from typing import TYPE_CHECKING
 
+import sqlalchemy as sa
 import transaction
+from six.moves import queue
+from six.moves.urllib.parse import urlparse
 
 from magpie import constants, db, models
 from magpie.api.management.resource.resource_utils import get_resource_children
@@ -26,16 +32,35 @@ from magpie.utils import get_logger
 
 if TYPE_CHECKING:
     # pylint: disable=W0611,unused-import
-    from typing import Any, AnyStr, Optional, Sequence, Union
+    from typing import Any, AnyStr, Dict, List, Optional, Sequence, Tuple, Union
 
+    from sqlalchemy.orm import sessionmaker
     from sqlalchemy.orm.session import Session
 
+    from magpie.typedefs import JSON, ConfigDict, SettingsType, Str
+
+    # path of resource names from the main remote resource of a service
+    RemoteResourcePath = Tuple[Str, ...]
+    # details of remote resources keyed by their path
+    RemoteResourceRecords = Dict[RemoteResourcePath, Dict[Str, Any]]
+
 LOGGER = get_logger(__name__)
 
 CRON_SERVICE = False
 
 OUT_OF_SYNC = datetime.timedelta(hours=3)
 
+SYNC_WORKERS = 1          # services fetched one after the other within a single transaction by default
+SYNC_TIMEOUT = 600        # seconds allowed to fetch and write remote resources of each service when using workers
+SYNC_INSERT_BATCH = 1000  # remote resources inserted by each statement
+SYNC_INTERVAL = 3600      # seconds between synchronizations of a service by the scheduler, unless configured
+SYNC_BACKOFF_MIN = 60     # seconds before retrying a service after its first failure with the scheduler
+SYNC_BACKOFF_MAX = 86400  # maximum seconds before retrying a service after consecutive failures with the scheduler
+SYNC_POLL_INTERVAL = 60   # maximum seconds between verifications of due services with the scheduler
+
+# details of a service to synchronize, which can be shared across threads (contrary to database objects)
+SyncServiceInfo = namedtuple("SyncServiceInfo", ["resource_id", "resource_name", "url", "sync_type"])
+
 # try to instantiate classes right away
 for sync_service_class in SYNC_SERVICES_TYPES.values():
     name, url = "", ""
@@ -153,17 +178,6 @@ def _get_remote_resources(service):
     return sync_service.get_resources()
 
 
-def _delete_records(service_id, session):
-    """
-    Delete all RemoteResource based on a Service.resource_id.
-
-    :param service_id:
-    :param session:
-    """
-    session.query(models.RemoteResource).filter_by(service_id=service_id).delete()
-    session.flush()
-
-
 def _create_main_resource(service_id, session):
     """
     Creates a main resource for a service, whether one currently exists or not.
@@ -184,32 +198,173 @@ def _create_main_resource(service_id, session):
     session.flush()
 
 
+def _get_stored_resources(sync_info, session):
+    # type: (models.RemoteResourcesSyncInfo, Session) -> Dict[RemoteResourcePath, Dict[Str, Any]]
+    """
+    Obtains details of remote resources of a service stored in database, keyed by their path of resource names.
+
+    The main resource of the service is represented by the empty path. Records that cannot be reached from it through
+    their parents, or that duplicate the path of another one, are returned under a ``None`` path to be removed.
+    """
+    columns = ["resource_id", "parent_id", "resource_name", "resource_display_name", "resource_type", "ordering"]
+    query = session.query(*[getattr(models.RemoteResource, col) for col in columns])
+    query = query.filter(models.RemoteResource.service_id == sync_info.service_id)
+    records = [dict(zip(columns, row)) for row in query]
+    children = defaultdict(list)
+    for record in records:
+        children[record["parent_id"]].append(record)
+    stored = {}
+    main_resource = [record for record in records if record["resource_id"] == sync_info.remote_resource_id]
+    level = [((), record) for record in main_resource]
+    while level:
+        next_level = []
+        for path, record in level:
+            if path in stored:
+                continue
+            stored[path] = record
+            next_level.extend([(path + (child["resource_name"], ), child) for child in children[record["resource_id"]]])
+        level = next_level
+    stored_ids = set(record["resource_id"] for record in stored.values())
+    unreachable = [record for record in records if record["resource_id"] not in stored_ids]
+    if unreachable:
+        stored[None] = unreachable
+    return stored
+
+
+def _get_fetched_resources(remote_resources, service_name):
+    # type: (JSON, Str) -> Dict[RemoteResourcePath, Dict[Str, Any]]
+    """
+    Obtains details of remote resources fetched from a service, keyed by their path of resource names.
+
+    Paths are ordered by depth such that the parent of any resource is always listed before it.
+    The main resource of the service is represented by the empty path.
+    """
+    fetched = OrderedDict()
+    fetched[()] = {"resource_name": str(service_name), "resource_display_name": None,
+                   "resource_type": "directory", "ordering": 0}
+    level = [((), list(remote_resources.values())[0]["children"])]
+    while level:
+        next_level = []
+        for parent_path, resources in level:
+            for position, (resource_name, values) in enumerate(resources.items()):
+                path = parent_path + (str(resource_name), )
+                fetched[path] = {
+                    "resource_name": str(resource_name),
+                    "resource_display_name": str(values.get("resource_display_name", resource_name)),
+                    "resource_type": values["resource_type"],
+                    "ordering": position,
+                }
+                next_level.append((path, values["children"]))
+        level = next_level
+    return fetched
+
+
+def _match_stored_resources(stored, fetched):
+    # type: (RemoteResourceRecords, RemoteResourceRecords) -> RemoteResourceRecords
+    """
+    Obtains the stored remote resources that correspond to fetched ones, keyed by their fetched path.
+
+    Resources are matched from the main resource of the service down to its children, only under parents that were
+    matched themselves. Under the same parent, a stored resource is matched first to the fetched resource of the same
+    name. Remaining ones are then considered renamed on the remote server when they have the same type as a remaining
+    fetched resource, and either the same display name or, failing that, the same position among their siblings.
+    Resources nested under a renamed resource are therefore also matched by their name under the new path.
+    """
+    stored_children = defaultdict(list)  # type: Dict[RemoteResourcePath, List[RemoteResourcePath]]
+    for path in stored:
+        if path:
+            stored_children[path[:-1]].append(path)
+    fetched_children = defaultdict(list)  # type: Dict[RemoteResourcePath, List[RemoteResourcePath]]
+    for path in fetched:
+        if path:
+            fetched_children[path[:-1]].append(path)
+
+    matched = {}
+    level = [((), ())] if () in stored else []
+    while level:
+        next_level = []
+        for stored_path, fetched_path in level:
+            matched[fetched_path] = stored[stored_path]
+            remaining = {path[-1]: path for path in stored_children[stored_path]}
+            unmatched = []
+            for path in fetched_children[fetched_path]:
+                if path[-1] in remaining:
+                    next_level.append((remaining.pop(path[-1]), path))
+                else:
+                    unmatched.append(path)
+            for detail in ["resource_display_name", "ordering"]:
+                if not remaining or not unmatched:
+                    break
+                candidates = defaultdict(list)  # type: Dict[Tuple[Str, Any], List[RemoteResourcePath]]
+                for path in remaining.values():
+                    candidates[(stored[path]["resource_type"], stored[path][detail])].append(path)
+                renamed = []
+                for path in unmatched:
+                    similar = candidates[(fetched[path]["resource_type"], fetched[path][detail])]
+                    if similar:
+                        renamed.append((similar.pop(0), path))
+                for stored_renamed, fetched_renamed in renamed:
+                    remaining.pop(stored_renamed[-1])
+                    unmatched.remove(fetched_renamed)
+                next_level.extend(renamed)
+        level = next_level
+    return matched
+
+
+def _allocate_resource_ids(count, session):
+    # type: (int, Session) -> List[int]
+    """
+    Reserves a block of IDs from the sequence of remote resources with a single statement.
+    """
+    sequence = sa.func.pg_get_serial_sequence(models.RemoteResource.__tablename__, "resource_id")
+    query = sa.select([sa.func.nextval(sequence)]).select_from(sa.func.generate_series(1, count))
+    return [row[0] for row in session.execute(query)]
+
+
 def _update_db(remote_resources, service_id, session):
     """
     Writes remote resources to database.
 
+    Fetched resources are matched to those already stored for the service (see :func:`_match_stored_resources`), and
+    only differences are applied with set-based statements. Stale resources are deleted and those with modified details
+    (including renamed ones) are updated. IDs of new resources are reserved in blocks beforehand, such that references
+    to their parent are known without flushing them one by one, and they are inserted in batches of multiple rows.
+    Resources that remain on the remote server, even if renamed, preserve their ID between synchronizations.
+
     :param remote_resources:
     :param service_id:
     :param session:
     """
     sync_info = models.RemoteResourcesSyncInfo.by_service_id(service_id, session)
-
-    def add_children(resources, parent_id, position=0):
-        for resource_name, values in resources.items():
-            resource_display_name = str(values.get("resource_display_name", resource_name))
-            new_resource = models.RemoteResource(service_id=sync_info.service_id,
-                                                 resource_name=str(resource_name),
-                                                 resource_display_name=resource_display_name,
-                                                 resource_type=values["resource_type"],
-                                                 parent_id=parent_id,
-                                                 ordering=position)  # noqa
-            session.add(new_resource)
-            session.flush()
-            position += 1
-            add_children(values["children"], new_resource.resource_id)
-
-    first_item = list(remote_resources)[0]
-    add_children(remote_resources[first_item]["children"], sync_info.remote_resource_id)
+    table = models.RemoteResource.__table__
+    stored = _get_stored_resources(sync_info, session)
+    fetched = _get_fetched_resources(remote_resources, sync_info.service.resource_name)
+
+    deleted = [record["resource_id"] for record in stored.pop(None, [])]
+    matched = _match_stored_resources(stored, fetched)
+    matched_ids = set(record["resource_id"] for record in matched.values())
+    deleted.extend([record["resource_id"] for record in stored.values() if record["resource_id"] not in matched_ids])
+    if deleted:
+        session.execute(table.delete().where(table.c.resource_id.in_(deleted)))
+
+    details = ["resource_name", "resource_display_name", "resource_type", "ordering"]
+    updated = [dict(fetched[path], _id=record["resource_id"]) for path, record in matched.items()
+               if any(record[col] != fetched[path][col] for col in details)]
+    if updated:
+        session.execute(table.update().where(table.c.resource_id == sa.bindparam("_id"))
+                        .values({col: sa.bindparam(col) for col in details}), updated)
+
+    resource_ids = {path: record["resource_id"] for path, record in matched.items()}
+    inserted = [path for path in fetched if path not in resource_ids]
+    for index in range(0, len(inserted), SYNC_INSERT_BATCH):
+        paths = inserted[index:index + SYNC_INSERT_BATCH]
+        resource_ids.update(zip(paths, _allocate_resource_ids(len(paths), session)))
+        session.execute(table.insert().values([
+            dict(fetched[path], resource_id=resource_ids[path], service_id=service_id,
+                 parent_id=resource_ids[path[:-1]]) for path in paths
+        ]))
+    LOGGER.debug("Remote resources of service [%s]: %s inserted, %s updated, %s deleted.",
+                 service_id, len(inserted), len(updated), len(deleted))
 
     sync_info.last_sync = datetime.datetime.now()
 
@@ -286,17 +441,142 @@ def fetch_single_service(service, session):
     LOGGER.info("Requesting remote resources")
     remote_resources = _get_remote_resources(service)
     service_id = service.resource_id
-    LOGGER.info("Deleting RemoteResource records for service: %s", service.resource_name)
-    _delete_records(service_id, session)
     _ensure_sync_info_exists(service.resource_id, session)
     LOGGER.info("Writing RemoteResource records to database")
     _update_db(remote_resources, service_id, session)
 
 
-def fetch(settings=None):
+def _write_remote_resources(service_id, remote_resources, session_factory):
+    # type: (int, JSON, sessionmaker) -> None
+    """
+    Updates the remote resources of a service in the database within a dedicated transaction.
+    """
+    transaction_manager = transaction.TransactionManager()
+    with transaction_manager:
+        session = db.get_tm_session(session_factory, transaction_manager)
+        _ensure_sync_info_exists(service_id, session)
+        _update_db(remote_resources, service_id, session)
+
+
+def _sync_services_worker(tasks, completed, session_factory, timed_out, lock):
+    # type: (queue.Queue, queue.Queue, sessionmaker, Dict[int, bool], threading.Lock) -> None
+    """
+    Fetches remote resources of services taken from the tasks queue and writes them until none remain.
+
+    Each service is reported to the completed queue with the error that occurred, if any. Remote resources of a service
+    are not written if its timeout was reached while they were requested.
+    """
+    while True:
+        try:
+            service = tasks.get_nowait()  # type: SyncServiceInfo
+        except queue.Empty:
+            return
+        completed.put((service, time.time(), None))  # indicates start of the service to apply its timeout
+        error = None
+        try:
+            LOGGER.info("Requesting remote resources for service: %s", service.resource_name)
+            remote_resources = _get_remote_resources(service)
+            with lock:
+                if timed_out.get(service.resource_id):
+                    continue
+                timed_out[service.resource_id] = False  # writing, cannot time out anymore
+            LOGGER.info("Writing RemoteResource records to database for service: %s", service.resource_name)
+            _write_remote_resources(service.resource_id, remote_resources, session_factory)
+        except Exception as exc:  # noqa: W0703 # nosec: B110
+            error = exc
+        completed.put((service, None, error))
+
+
+def fetch_services(services,                # type: List[SyncServiceInfo]
+                   settings=None,           # type: Optional[SettingsType]
+                   workers=SYNC_WORKERS,    # type: int
+                   timeout=SYNC_TIMEOUT,    # type: Optional[float]
+                   session_factory=None,    # type: Optional[sessionmaker]
+                   ):                       # type: (...) -> Dict[int, Optional[Exception]]
+    """
+    Get remote resources of many services concurrently and write them to database.
+
+    Remote resources are requested by a bounded pool of worker threads such that network operations of different
+    services overlap, and the results of each service are written in their own short transaction as soon as they are
+    retrieved. A failing service does not prevent others from being synchronized. A service that was not completed
+    within the timeout (seconds) is abandoned, and its remote resources will not be written even if they are eventually
+    retrieved, unless they were already being written, in which case the write is awaited until completion. The total
+    duration is therefore bounded by the slowest service (or its timeout) rather than by the sum of durations of all
+    services, as long as there are enough workers.
+
+    :param session_factory: factory of database sessions to reuse, otherwise created from settings for this call.
+    :returns: mapping of service IDs to the error that occurred while synchronizing them, or ``None`` if successful.
+    """
+    if session_factory is None:
+        session_factory = db.get_session_factory(db.get_engine(settings, echo=False))
+    tasks = queue.Queue()
+    completed = queue.Queue()
+    for service in services:
+        tasks.put(service)
+    timed_out = {}  # type: Dict[int, bool]
+    lock = threading.Lock()
+    for _ in range(max(1, min(workers, len(services)))):
+        worker = threading.Thread(target=_sync_services_worker,
+                                  args=(tasks, completed, session_factory, timed_out, lock))
+        worker.daemon = True  # do not wait for abandoned services to exit
+        worker.start()
+
+    results = {}  # type: Dict[int, Optional[Exception]]
+    started = {}  # type: Dict[int, float]
+    while len(results) < len(services):
+        wait = None
+        if timeout is not None and started:
+            wait = max(0, min(started.values()) + timeout - time.time())
+        try:
+            service, start, error = completed.get(timeout=wait)
+            if start is not None:
+                started[service.resource_id] = start
+                continue
+            if service.resource_id in results:
+                continue  # already abandoned
+            results[service.resource_id] = error
+            started.pop(service.resource_id, None)
+            if error is not None:
+                LOGGER.error("There was an error when fetching data from the url: %s", service.url, exc_info=error)
+            else:
+                LOGGER.info("Synchronized remote resources of service: %s", service.resource_name)
+        except queue.Empty:
+            pass
+        for service_id, start in list(started.items()):
+            if timeout is not None and time.time() - start >= timeout:
+                started.pop(service_id)
+                with lock:
+                    if timed_out.get(service_id) is False:
+                        continue  # already writing, let it complete without waking up until it is reported
+                    timed_out[service_id] = True
+                results[service_id] = RuntimeError("Timeout of {}s reached to synchronize service.".format(timeout))
+                LOGGER.error("Timeout reached when fetching data of service with id: %s", service_id)
+    return results
+
+
+def fetch(settings=None, workers=SYNC_WORKERS, timeout=SYNC_TIMEOUT):
+    # type: (Optional[SettingsType], int, Optional[float]) -> None
     """
     Main function to get all remote resources for each service and write to database.
+
+    With more than one worker, services are synchronized concurrently by :func:`fetch_services`.
+    Otherwise, they are all fetched one after the other within a single transaction.
     """
+    if workers > 1:
+        with transaction.manager:
+            session = db.get_db_session_from_settings(settings=settings, echo=False)
+            services = [
+                SyncServiceInfo(svc.resource_id, svc.resource_name, svc.url, svc.sync_type)
+                for service_type in SYNC_SERVICES_TYPES
+                for svc in session.query(models.Service).filter_by(type=service_type)
+            ]
+        LOGGER.info("Fetching data of %s services with %s workers", len(services), workers)
+        results = fetch_services(services, settings=settings, workers=workers, timeout=timeout)
+        errors = [error for error in results.values() if error is not None]
+        if errors and not CRON_SERVICE:
+            raise errors[0]
+        return
+
     with transaction.manager:
         LOGGER.info("Getting database session")
         session = db.get_db_session_from_settings(settings=settings, echo=False)
@@ -308,6 +588,139 @@ def fetch(settings=None):
         transaction.commit()
 
 
+def get_sync_interval(configuration):
+    # type: (Optional[ConfigDict]) -> float
+    """
+    Obtains the delay (seconds) between synchronizations of a service defined by ``sync_interval`` in its configuration.
+
+    Uses :data:`SYNC_INTERVAL` if undefined or invalid.
+    """
+    interval = configuration.get("sync_interval") if isinstance(configuration, dict) else None
+    try:
+        interval = float(interval)
+    except (TypeError, ValueError):
+        return SYNC_INTERVAL
+    return interval if interval > 0 else SYNC_INTERVAL
+
+
+def get_sync_backoff(failures, interval):
+    # type: (int, float) -> float
+    """
+    Obtains the delay (seconds) before retrying a service after consecutive synchronization failures.
+
+    The delay doubles with each failure, starting from :data:`SYNC_BACKOFF_MIN`, up to the lowest of the service
+    interval and :data:`SYNC_BACKOFF_MAX`. It is randomized between half and the whole of that value to avoid retries
+    of many services failing at the same time from being attempted simultaneously.
+    """
+    delay = min(SYNC_BACKOFF_MIN * 2 ** min(max(failures - 1, 0), 32), interval, SYNC_BACKOFF_MAX)
+    return random.uniform(delay / 2.0, delay)  # nosec: B311
+
+
+def _get_host(url):
+    # type: (Str) -> Str
+    return urlparse(url).netloc.lower()
+
+
+def _get_scheduled_services(session, now):
+    # type: (Session, datetime.datetime) -> List[Tuple[SyncServiceInfo, float, datetime.datetime]]
+    """
+    Obtains services to synchronize with their interval and the date when they are due.
+
+    A service that was never scheduled is due immediately. A service of a host for which another service is in backoff
+    after failures is not due before that backoff expires, to avoid repeatedly requesting a host that is unavailable.
+    """
+    query = session.query(models.Service, models.RemoteResourcesSyncInfo).outerjoin(
+        models.RemoteResourcesSyncInfo, models.RemoteResourcesSyncInfo.service_id == models.Service.resource_id
+    ).filter(models.Service.type.in_(list(SYNC_SERVICES_TYPES)))
+    services = []
+    hosts_backoff = {}  # type: Dict[Str, datetime.datetime]
+    for svc, sync_info in query:
+        info = SyncServiceInfo(svc.resource_id, svc.resource_name, svc.url, svc.sync_type)
+        next_sync = sync_info.next_sync if sync_info and sync_info.next_sync else now
+        if sync_info and sync_info.sync_failures and next_sync > now:
+            host = _get_host(svc.url)
+            hosts_backoff[host] = max(hosts_backoff.get(host, next_sync), next_sync)
+        services.append((info, get_sync_interval(svc.configuration), next_sync))
+    return [(info, interval, max(next_sync, hosts_backoff.get(_get_host(info.url), next_sync)))
+            for info, interval, next_sync in services]
+
+
+def schedule_services(settings=None,           # type: Optional[SettingsType]
+                      workers=SYNC_WORKERS,    # type: int
+                      timeout=SYNC_TIMEOUT,    # type: Optional[float]
+                      session_factory=None,    # type: Optional[sessionmaker]
+                      ):                       # type: (...) -> Optional[float]
+    """
+    Synchronizes services that are due according to their schedule and plans their next synchronization.
+
+    Due services are synchronized concurrently by :func:`fetch_services`. A successful service is planned again after
+    its own interval (see :func:`get_sync_interval`), while a failing one is retried after a backoff delay
+    (see :func:`get_sync_backoff`). Scheduling details are persisted in :class:`models.RemoteResourcesSyncInfo` such
+    that they are preserved across restarts.
+
+    :param session_factory: factory of database sessions to reuse, otherwise created from settings for this call.
+    :returns: delay (seconds) until the next service is due, or ``None`` if there is no service to synchronize.
+    """
+    if session_factory is None:
+        session_factory = db.get_session_factory(db.get_engine(settings, echo=False))
+    with transaction.manager:
+        session = db.get_tm_session(session_factory, transaction.manager)
+        now = datetime.datetime.now()
+        scheduled = _get_scheduled_services(session, now)
+    due = {info.resource_id: (info, interval) for info, interval, next_sync in scheduled if next_sync <= now}
+    if due:
+        LOGGER.info("Synchronizing %s due services with %s workers", len(due), workers)
+        results = fetch_services([info for info, _ in due.values()], settings=settings,
+                                 workers=workers, timeout=timeout, session_factory=session_factory)
+        with transaction.manager:
+            session = db.get_tm_session(session_factory, transaction.manager)
+            now = datetime.datetime.now()
+            for service_id, error in results.items():
+                _ensure_sync_info_exists(service_id, session)
+                sync_info = models.RemoteResourcesSyncInfo.by_service_id(service_id, session)
+                interval = due[service_id][1]
+                if error is None:
+                    sync_info.sync_failures = 0
+                    sync_info.next_sync = now + datetime.timedelta(seconds=interval)
+                else:
+                    sync_info.sync_failures = (sync_info.sync_failures or 0) + 1
+                    delay = get_sync_backoff(sync_info.sync_failures, interval)
+                    sync_info.next_sync = now + datetime.timedelta(seconds=delay)
+                    LOGGER.warning("Synchronization of service [%s] failed %s times, retrying in %.0fs.",
+                                   due[service_id][0].resource_name, sync_info.sync_failures, delay)
+            scheduled = _get_scheduled_services(session, now)
+    if not scheduled:
+        return None
+    next_sync = min(next_sync for _, _, next_sync in scheduled)
+    return max((next_sync - now).total_seconds(), 0)
+
+
+def run_scheduler(settings=None, workers=SYNC_WORKERS, timeout=SYNC_TIMEOUT, stop_event=None):
+    # type: (Optional[SettingsType], int, Optional[float], Optional[threading.Event]) -> None
+    """
+    Synchronizes services continuously according to their schedule until the stop event is set.
+
+    Due services are verified again at least every :data:`SYNC_POLL_INTERVAL` seconds to consider services and
+    intervals that were added or modified in the meantime. The database engine and its connection pool are shared by
+    all iterations.
+    """
+    stop_event = stop_event or threading.Event()
+    engine = db.get_engine(settings, echo=False)
+    session_factory = db.get_session_factory(engine)
+    try:
+        while not stop_event.is_set():
+            try:
+                delay = schedule_services(settings=settings, workers=workers, timeout=timeout,
+                                          session_factory=session_factory)
+            except Exception:  # noqa: W0703 # nosec: B110
+                LOGGER.exception("An error occurred while scheduling synchronization of services")
+                delay = None
+            delay = SYNC_POLL_INTERVAL if delay is None else min(delay, SYNC_POLL_INTERVAL)
+            stop_event.wait(max(delay, 1))
+    finally:
+        engine.dispose()
+
+
 def setup_cron_logger(log_level=logging.INFO):
     # type: (Union[AnyStr, int]) -> None
 
@@ -341,6 +754,19 @@ def make_parser():
                         help="Log level to employ (default: %(default)s).")
     parser.add_argument("--db", metavar="CONNECTION_URL", dest="db",
                         help="Magpie database URL to connect to. Otherwise employ typical environment variables.")
+    parser.add_argument("--workers", "-w", type=int, default=SYNC_WORKERS,
+                        help="Amount of services to synchronize concurrently, each within their own transaction. "
+                             "With a single worker, all services are synchronized one after the other within a "
+                             "single transaction (default: %(default)s).")
+    parser.add_argument("--timeout", "-t", type=float, default=SYNC_TIMEOUT,
+                        help="Maximum duration (seconds) to synchronize each service when using more than one worker "
+                             "or the scheduler. Services not completed within this delay are abandoned "
+                             "(default: %(default)s).")
+    parser.add_argument("--scheduler", "-s", action="store_true",
+                        help="Run continuously and synchronize each service whenever it is due according to the "
+                             "'sync_interval' (seconds) of its configuration (default: {}s), instead of synchronizing "
+                             "all services once. Failing services are retried with increasing delays.".format(
+                                 SYNC_INTERVAL))
     return parser
 
 
@@ -365,8 +791,12 @@ def main(args=None, parser=None, namespace=None):
         if not db_ready:
             LOGGER.info("Database isn't ready")
             return
-        LOGGER.info("Starting to fetch data for all service types")
-        fetch(settings=settings)
+        if args.scheduler:
+            LOGGER.info("Starting scheduler of data fetching for all service types")
+            run_scheduler(settings=settings, workers=args.workers, timeout=args.timeout)
+        else:
+            LOGGER.info("Starting to fetch data for all service types")
+            fetch(settings=settings, workers=args.workers, timeout=args.timeout)
     except Exception:
         LOGGER.exception("An error occurred")
         raise
@@ -7,21 +7,30 @@ Sync registered services in Magpie with resources retrieved from actual service.
     - :py:mod:`magpie.cli.sync_resources`
 """
 import abc
+import hashlib
+import json
+import os
+import tempfile
 from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from typing import TYPE_CHECKING
 
-import requests
 import six
 import threddsclient
+from threddsclient.utils import fix_catalog_url
 
-from magpie.utils import CONTENT_TYPE_JSON
+from magpie.constants import get_constant
+from magpie.http_client import get_http_client
+from magpie.utils import CONTENT_TYPE_JSON, get_logger
 
 if TYPE_CHECKING:
     # pylint: disable=W0611,unused-import
-    from typing import Dict, Type
+    from typing import Dict, Optional, Type
 
     from magpie.typedefs import JSON, Str
 
+LOGGER = get_logger(__name__)
+
 
 def is_valid_resource_schema(resources):
     # type: (JSON) -> bool
@@ -86,7 +95,7 @@ class SyncServiceGeoserver(SyncServiceInterface):
         # Only workspaces are fetched for now
         resource_type = "route"
         workspaces_url = "{}/{}".format(self.url, "workspaces")
-        resp = requests.get(workspaces_url, headers={"Accept": CONTENT_TYPE_JSON})
+        resp = get_http_client().get(workspaces_url, headers={"Accept": CONTENT_TYPE_JSON})
         resp.raise_for_status()
         workspaces_list = resp.json().get("workspaces", {}).get("workspace", {})
 
@@ -114,7 +123,7 @@ class SyncServiceProjectAPI(SyncServiceInterface):
         # Only workspaces are fetched for now
         resource_type = "route"
         projects_url = "/".join([self.url, "Projects"])
-        resp = requests.get(projects_url)
+        resp = get_http_client().get(projects_url)
         resp.raise_for_status()
 
         projects = {p["id"]: {"children": {},
@@ -128,8 +137,57 @@ class SyncServiceProjectAPI(SyncServiceInterface):
         return resources
 
 
+class RemoteCatalogCache(object):
+    """
+    On-disk cache of resources obtained from remote catalogs, keyed by URL, with their HTTP validators.
+
+    Each entry is stored in its own file to allow concurrent updates of different catalogs, and is replaced atomically
+    such that an interrupted synchronization never leaves a partially written entry.
+    """
+
+    def __init__(self, path):
+        # type: (Optional[Str]) -> None
+        self.path = os.path.expanduser(os.path.expandvars(path)) if path else None
+        if self.path and not os.path.isdir(self.path):
+            try:
+                os.makedirs(self.path)
+            except OSError:  # created concurrently or not permitted
+                if not os.path.isdir(self.path):
+                    LOGGER.warning("Cannot create remote catalog cache directory [%s], cache disabled.", self.path)
+                    self.path = None
+
+    def _get_file(self, url):
+        # type: (Str) -> Str
+        return os.path.join(self.path, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, url):
+        # type: (Str) -> Optional[JSON]
+        if not self.path:
+            return None
+        try:
+            with open(self._get_file(url), "r") as cache_file:
+                entry = json.load(cache_file)
+        except (IOError, OSError, ValueError):
+            return None
+        return entry if entry.get("url") == url else None
+
+    def set(self, url, entry):
+        # type: (Str, JSON) -> None
+        if not self.path:
+            return
+        entry = dict(entry, url=url)
+        try:
+            cache_fd, cache_tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+            with os.fdopen(cache_fd, "w") as cache_file:
+                json.dump(entry, cache_file)
+            os.rename(cache_tmp, self._get_file(url))
+        except (IOError, OSError):
+            LOGGER.warning("Failed writing remote catalog cache entry of [%s].", url, exc_info=True)
+
+
 class SyncServiceThredds(SyncServiceInterface):
     sync_type = "thredds"
+    max_workers = 8     # amount of catalogs requested concurrently
 
     @property
     def max_depth(self):
@@ -142,25 +200,71 @@ class SyncServiceThredds(SyncServiceInterface):
             id_ = resource.datasets[0].ID.split("/")[-1]
         return id_
 
-    def get_resources(self):
-        def thredds_get_resources(url, depth):
-            cat = threddsclient.read_url(url)
-            name = self._resource_id(cat)
-            if depth == self.max_depth:
-                name = self.service_name
-            resource_type = "directory"
-            if cat.datasets and cat.datasets[0].content_type != "application/directory":
-                resource_type = "file"
+    def _fetch_catalog(self, node, cache):
+        # type: (JSON, RemoteCatalogCache) -> None
+        """
+        Requests the catalog of the node, or revalidates its cached resources when available for the same depth.
 
-            tree_item = {name: {"children": {}, "resource_type": resource_type}}
+        When the catalog was not modified, cached resources of the complete subtree are reused and references of the
+        catalog are not crawled. Otherwise, references of the catalog are added as children nodes to be crawled.
+        """
+        url, depth = node["url"], node["depth"]
+        headers = {}
+        entry = cache.get(url)
+        if entry and entry.get("depth") == depth:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        resp = get_http_client().get(url, headers=headers)
+        if resp.status_code == 304 and headers:
+            node["resources"] = entry["resources"]
+            if depth == self.max_depth:  # service could have been renamed since cached
+                node["resources"] = {self.service_name: list(entry["resources"].values())[0]}
+            node["children"] = []
+            return
+        resp.raise_for_status()
+        cat = threddsclient.read_xml(resp.text, url)
+        node["name"] = self.service_name if depth == self.max_depth else self._resource_id(cat)
+        node["resource_type"] = "directory"
+        if cat.datasets and cat.datasets[0].content_type != "application/directory":
+            node["resource_type"] = "file"
+        node["etag"] = resp.headers.get("ETag")
+        node["last_modified"] = resp.headers.get("Last-Modified")
+        node["children"] = []
+        if depth > 0:
+            node["children"] = [{"url": fix_catalog_url(ref.url), "depth": depth - 1}
+                                for ref in cat.flat_references()]
 
-            if depth > 0:
-                for reference in cat.flat_references():
-                    tree_item[name]["children"].update(thredds_get_resources(reference.url, depth - 1))
+    def get_resources(self):
+        """
+        Crawls catalogs of the service up to :attr:`max_depth`.
 
+        Catalogs of each level of the hierarchy are requested concurrently, using at most :attr:`max_workers` requests
+        at the same time. Resources obtained from each catalog are cached on disk in ``MAGPIE_SYNC_CACHE_DIR`` with
+        their ``ETag`` and ``Last-Modified`` validators. Following synchronizations revalidate cached catalogs, and
+        reuse their complete cached subtree when unmodified (HTTP ``304``) instead of crawling their references again.
+        """
+        cache = RemoteCatalogCache(get_constant("MAGPIE_SYNC_CACHE_DIR", raise_missing=False, raise_not_set=False))
+        root = {"url": fix_catalog_url(self.url), "depth": self.max_depth}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            level = [root]
+            while level:
+                list(executor.map(lambda _node: self._fetch_catalog(_node, cache), level))
+                level = [child for node in level for child in node["children"]]
+
+        def build_resources(node):
+            if "resources" in node:
+                return node["resources"]
+            tree_item = {node["name"]: {"children": {}, "resource_type": node["resource_type"]}}
+            for child in node["children"]:
+                tree_item[node["name"]]["children"].update(build_resources(child))
+            if node["etag"] or node["last_modified"]:
+                cache.set(node["url"], {"depth": node["depth"], "etag": node["etag"],
+                                        "last_modified": node["last_modified"], "resources": tree_item})
             return tree_item
 
-        resources = thredds_get_resources(self.url, self.max_depth)
+        resources = build_resources(root)
         if not is_valid_resource_schema(resources):
             raise ValueError("Error in SyncServiceInterface implementation")
         return resources
@@ -102,6 +102,7 @@ MAGPIE_ANONYMOUS_GROUP = MAGPIE_ANONYMOUS_USER  # left for backward compatibilit
 MAGPIE_EDITOR_GROUP = os.getenv("MAGPIE_EDITOR_GROUP", "editors")
 MAGPIE_USERS_GROUP = os.getenv("MAGPIE_USERS_GROUP", "users")
 MAGPIE_CRON_LOG = os.getenv("MAGPIE_CRON_LOG", "~/magpie-cron.log")
+MAGPIE_SYNC_CACHE_DIR = os.getenv("MAGPIE_SYNC_CACHE_DIR", "~/magpie-sync-cache")  # empty to disable remote cache
 MAGPIE_DB_MIGRATION = asbool(os.getenv("MAGPIE_DB_MIGRATION", True))            # run db migration on startup
 MAGPIE_DB_MIGRATION_ATTEMPTS = int(os.getenv("MAGPIE_DB_MIGRATION_ATTEMPTS", 5))
 MAGPIE_LOG_LEVEL = os.getenv("MAGPIE_LOG_LEVEL", _get_default_log_level())      # log level to apply to the loggers
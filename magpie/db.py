@@ -19,7 +19,9 @@ from sqlalchemy.orm import configure_mappers
 from sqlalchemy.orm.session import Session, sessionmaker
 from zope.sqlalchemy import register
 
+from magpie.cache import register_cache_invalidation_listener
 from magpie.constants import get_constant
+from magpie.metrics import register_sql_metrics
 from magpie.utils import get_logger, get_settings, get_settings_from_config_ini, print_log, raise_log
 
 # import or define all models here to ensure they are attached to the
@@ -116,8 +118,11 @@ def get_tm_session(session_factory, transaction_manager):
           session_factory = get_session_factory(engine)
           with transaction.manager:
               db_session = get_tm_session(session_factory, transaction.manager)
+
+    The transaction manager is also referenced in the session ``info`` to allow hooking operations on commit.
     """
     db_session = session_factory()
+    db_session.info["transaction_manager"] = transaction_manager
     register(db_session, transaction_manager=transaction_manager)
     return db_session
 
@@ -260,8 +265,11 @@ def includeme(config):
 
     # use pyramid_tm to hook the transaction lifecycle to the request
     config.include("pyramid_tm")
-    session_factory = get_session_factory(get_engine(config))
+    engine = get_engine(config)
+    session_factory = get_session_factory(engine)
     config.registry["db_session_factory"] = session_factory
+    register_cache_invalidation_listener(config, engine)
+    register_sql_metrics(engine)
 
     # make `request.db` available for use in Pyramid
     config.add_request_method(
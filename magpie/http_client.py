@@ -0,0 +1,133 @@
+"""
+Shared HTTP client employed by utilities that send requests to `Magpie` (adapter, registration and CLI operations).
+
+Rather than opening a new connection for every call, requests are sent through a process-wide
+:class:`requests.Session` that keeps connections alive in per-host pools, applies a default timeout and retries
+idempotent requests with exponential backoff when the connection fails or the server is temporarily unavailable.
+
+The client is configured with the following settings (or their corresponding environment variables)::
+
+    magpie.http_timeout = 30            # seconds, both to connect and to read each response
+    magpie.http_pool_connections = 10   # number of distinct hosts for which connections are pooled
+    magpie.http_pool_maxsize = 10       # maximum number of kept-alive connections per host
+    magpie.http_retries = 3             # retry attempts of failing connections and idempotent requests
+    magpie.http_backoff_factor = 0.5    # exponential delay factor (seconds) between retry attempts
+
+The shared client never persists cookies across calls, such that credentials of one caller cannot leak to another.
+Cookies provided with each request, or obtained from followed redirects, still apply to that request. Operations
+that need to retain cookies between calls should employ their own session from :func:`make_http_session`, which
+still reuses the pooled connections.
+"""
+import os
+import threading
+from collections import namedtuple
+from typing import TYPE_CHECKING
+
+import requests
+from requests.adapters import HTTPAdapter
+from six.moves.http_cookiejar import DefaultCookiePolicy
+from urllib3.util.retry import Retry
+
+from magpie.constants import get_constant
+from magpie.utils import get_logger
+
+if TYPE_CHECKING:
+    # pylint: disable=W0611,unused-import
+    from typing import Any, Optional
+
+    from magpie.typedefs import AnySettingsContainer, Str
+
+LOGGER = get_logger(__name__)
+
+HTTP_RETRY_STATUS_CODES = (502, 503, 504)
+
+HTTPClientOptions = namedtuple("HTTPClientOptions", ["timeout", "pool_connections", "pool_maxsize",
+                                                     "retries", "backoff_factor"])
+HTTP_CLIENT_DEFAULT_OPTIONS = HTTPClientOptions(timeout=30.0, pool_connections=10, pool_maxsize=10,
+                                                retries=3, backoff_factor=0.5)
+
+
+class HTTPClientSession(requests.Session):
+    """
+    Session that applies a default timeout to requests that do not explicitly provide one.
+    """
+
+    def __init__(self, timeout=None):
+        # type: (Optional[float]) -> None
+        super(HTTPClientSession, self).__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):  # pylint: disable=W0221,arguments-differ
+        # type: (Str, Str, **Any) -> requests.Response
+        kwargs.setdefault("timeout", self.timeout)
+        return super(HTTPClientSession, self).request(method, url, **kwargs)
+
+
+def get_http_client_options(container=None):
+    # type: (Optional[AnySettingsContainer]) -> HTTPClientOptions
+    """
+    Obtains the HTTP client options from the application settings, environment variables or defaults.
+    """
+    options = {}
+    for name, default in HTTP_CLIENT_DEFAULT_OPTIONS._asdict().items():
+        value = get_constant("MAGPIE_HTTP_{}".format(name.upper()), container, default_value=default,
+                             raise_missing=False, raise_not_set=False)
+        options[name] = type(default)(value if value not in (None, "") else default)
+    return HTTPClientOptions(**options)
+
+
+def make_http_adapter(options):
+    # type: (HTTPClientOptions) -> HTTPAdapter
+    """
+    Creates the connection pools and retry strategy employed by HTTP client sessions.
+
+    Only connection errors and idempotent requests are retried, to avoid repeating operations that create or modify
+    contents. Responses with a retried status code are returned as is once retry attempts are exhausted.
+    """
+    retries = Retry(total=options.retries, backoff_factor=options.backoff_factor,
+                    status_forcelist=HTTP_RETRY_STATUS_CODES, raise_on_status=False)
+    return HTTPAdapter(pool_connections=options.pool_connections, pool_maxsize=options.pool_maxsize,
+                       max_retries=retries)
+
+
+_HTTP_CLIENT_LOCK = threading.Lock()
+_HTTP_CLIENT = {"pid": None, "options": None, "adapter": None, "client": None}
+
+
+def _get_shared_client(container=None):
+    # type: (Optional[AnySettingsContainer]) -> dict
+    options = get_http_client_options(container)
+    with _HTTP_CLIENT_LOCK:
+        # connections must not be shared between forked processes (e.g.: preloaded application workers)
+        if _HTTP_CLIENT["pid"] != os.getpid() or _HTTP_CLIENT["options"] != options:
+            LOGGER.debug("Creating shared HTTP client with %s", options)
+            adapter = make_http_adapter(options)
+            client = HTTPClientSession(timeout=options.timeout)
+            client.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+            client.mount("http://", adapter)
+            client.mount("https://", adapter)
+            _HTTP_CLIENT.update({"pid": os.getpid(), "options": options, "adapter": adapter, "client": client})
+        return dict(_HTTP_CLIENT)
+
+
+def get_http_client(container=None):
+    # type: (Optional[AnySettingsContainer]) -> requests.Session
+    """
+    Obtains the process-wide HTTP client with pooled keep-alive connections.
+
+    The client is created on first use and recreated whenever its configured options change or the process is forked.
+    It can be employed concurrently, but does not retain any cookie between requests.
+    """
+    return _get_shared_client(container)["client"]
+
+
+def make_http_session(container=None):
+    # type: (Optional[AnySettingsContainer]) -> requests.Session
+    """
+    Creates a new HTTP session that retains its own cookies while reusing the pooled connections of the shared client.
+    """
+    shared = _get_shared_client(container)
+    session = HTTPClientSession(timeout=shared["options"].timeout)
+    session.mount("http://", shared["adapter"])
+    session.mount("https://", shared["adapter"])
+    return session
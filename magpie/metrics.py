@@ -0,0 +1,381 @@
+"""
+Metrics of the authorization operations applied to every request, exposed in `Prometheus` text format.
+
+When enabled, the stages of :meth:`magpie.adapter.magpieowssecurity.MagpieOWSSecurity.check_request`,
+:meth:`magpie.services.ServiceInterface.__acl__` and :meth:`magpie.services.ServiceInterface.effective_permissions`
+are timed, as well as the amount and duration of SQL statements executed for each request. Measurements are
+accumulated in counters and latency histograms of the process, and returned by the ``/metrics`` route of the `Magpie`
+application or of the `Twitcher` instance employing the ``MagpieAdapter``. Timings of the stages executed by a request
+are also returned in its ``Server-Timing`` response header, such that they can be inspected for a specific request.
+
+Metrics are configured with the following settings (or their corresponding environment variables)::
+
+    magpie.metrics_enabled = false      # measure stages and SQL statements, and add the '/metrics' route
+    magpie.metrics_server_timing = true # return measured stages in 'Server-Timing' header of responses (if enabled)
+
+Measured stages are:
+
+- ``service_lookup``: find the targeted service by name
+- ``request_parsing``: parse the request to obtain the requested permission
+- ``resource_resolution``: resolve the requested resource from the request path or parameters
+- ``permission_query``: fetch the resource hierarchy and the permissions applied on it
+- ``permission_resolution``: resolve effective permissions from the fetched permissions
+- ``authorization``: complete evaluation of the request authorization, including the above stages
+"""
+import threading
+from contextlib import contextmanager
+from timeit import default_timer as timer
+from typing import TYPE_CHECKING
+
+from pyramid.response import Response
+from pyramid.settings import asbool
+from sqlalchemy import event
+
+from magpie.constants import get_constant
+from magpie.utils import get_logger
+
+if TYPE_CHECKING:
+    # pylint: disable=W0611,unused-import
+    from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+    from pyramid.request import Request
+    from sqlalchemy.engine import Engine
+
+    from magpie.typedefs import AnySettingsContainer, Str
+
+LOGGER = get_logger(__name__)
+
+CONTENT_TYPE_PROMETHEUS = "text/plain; version=0.0.4"
+METRICS_REQUEST_KEY = "magpie.metrics"
+METRICS_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+METRICS_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def _format_labels(label_names, label_values, extra=None):
+    # type: (Sequence[Str], Sequence[Str], Optional[Tuple[Str, Str]]) -> Str
+    labels = list(zip(label_names, label_values))
+    if extra:
+        labels.append(extra)
+    if not labels:
+        return ""
+    values = ",".join('{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+                      for name, value in labels)
+    return "{" + values + "}"
+
+
+def _format_value(value):
+    # type: (Union[int, float]) -> Str
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter(object):
+    """
+    Cumulative count of events, for each combination of label values.
+    """
+    kind = "counter"
+
+    def __init__(self, name, description, label_names=()):
+        # type: (Str, Str, Sequence[Str]) -> None
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self._values = {}  # type: Dict[Tuple[Str, ...], float]
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, *label_values):
+        # type: (float, *Str) -> None
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def get(self, *label_values):
+        # type: (*Str) -> float
+        return self._values.get(label_values, 0)
+
+    def reset(self):
+        # type: () -> None
+        with self._lock:
+            self._values = {}
+
+    def samples(self):
+        # type: () -> List[Str]
+        with self._lock:
+            values = sorted(self._values.items())
+        return ["{}_total{} {}".format(self.name, _format_labels(self.label_names, labels), _format_value(value))
+                for labels, value in values]
+
+
+class Histogram(object):
+    """
+    Distribution of observed values within cumulative buckets, for each combination of label values.
+    """
+    kind = "histogram"
+
+    def __init__(self, name, description, label_names=(), buckets=METRICS_LATENCY_BUCKETS):
+        # type: (Str, Str, Sequence[Str], Sequence[float]) -> None
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"), )
+        self._values = {}  # type: Dict[Tuple[Str, ...], List[float]]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        # type: (float, *Str) -> None
+        with self._lock:
+            values = self._values.get(label_values)
+            if values is None:
+                # counts of each bucket, followed by the sum of observed values
+                values = self._values[label_values] = [0] * len(self.buckets) + [0.0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    values[index] += 1
+            values[-1] += value
+
+    def count(self, *label_values):
+        # type: (*Str) -> int
+        values = self._values.get(label_values)
+        return values[-2] if values else 0
+
+    def reset(self):
+        # type: () -> None
+        with self._lock:
+            self._values = {}
+
+    def samples(self):
+        # type: () -> List[Str]
+        with self._lock:
+            values = sorted((labels, list(counts)) for labels, counts in self._values.items())
+        lines = []
+        for labels, counts in values:
+            for bound, count in zip(self.buckets, counts):
+                bucket_labels = _format_labels(self.label_names, labels, ("le", _format_value(float(bound))))
+                lines.append("{}_bucket{} {}".format(self.name, bucket_labels, count))
+            labels = _format_labels(self.label_names, labels)
+            lines.append("{}_sum{} {}".format(self.name, labels, _format_value(counts[-1])))
+            lines.append("{}_count{} {}".format(self.name, labels, counts[-2]))
+        return lines
+
+
+class MetricsRegistry(object):
+    """
+    Metrics of the process, which are only measured once enabled by the application settings.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.server_timing = False
+        self._metrics = []  # type: List[Union[Counter, Histogram]]
+
+    def counter(self, name, description, label_names=()):
+        # type: (Str, Str, Sequence[Str]) -> Counter
+        metric = Counter(name, description, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, description, label_names=(), buckets=METRICS_LATENCY_BUCKETS):
+        # type: (Str, Str, Sequence[Str], Sequence[float]) -> Histogram
+        metric = Histogram(name, description, label_names, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def configure(self, container=None):
+        # type: (Optional[AnySettingsContainer]) -> None
+        """
+        Enables or disables measurements according to the application settings.
+        """
+        self.enabled = asbool(get_constant("MAGPIE_METRICS_ENABLED", container, default_value=False,
+                                           raise_missing=False, raise_not_set=False))
+        self.server_timing = self.enabled and asbool(get_constant("MAGPIE_METRICS_SERVER_TIMING", container,
+                                                                  default_value=True, raise_missing=False,
+                                                                  raise_not_set=False))
+
+    def reset(self):
+        # type: () -> None
+        for metric in self._metrics:
+            metric.reset()
+
+    def render(self):
+        # type: () -> Str
+        """
+        Generates the `Prometheus` text exposition of all metrics.
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.append("# HELP {} {}".format(metric.name, metric.description))
+            lines.append("# TYPE {} {}".format(metric.name, metric.kind))
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+AUTHZ_STAGE_SECONDS = METRICS.histogram(
+    "magpie_authz_stage_seconds", "Duration of authorization stages.", ["stage"])
+AUTHZ_DECISIONS = METRICS.counter(
+    "magpie_authz_decisions", "Authorization decisions of requests received by the proxy.", ["service_type", "result"])
+ACL_CACHE_REQUESTS = METRICS.counter(
+    "magpie_acl_cache_requests", "Lookups of the 'acl' cache region, by result (hit, miss or disabled).", ["result"])
+REQUEST_SECONDS = METRICS.histogram(
+    "magpie_request_seconds", "Duration of requests handled by the application.")
+REQUEST_SQL_STATEMENTS = METRICS.histogram(
+    "magpie_request_sql_statements", "SQL statements executed per request.", buckets=METRICS_COUNT_BUCKETS)
+REQUEST_SQL_SECONDS = METRICS.histogram(
+    "magpie_request_sql_seconds", "Duration of SQL statements executed per request.")
+
+_CURRENT = threading.local()
+
+
+class RequestMetrics(object):
+    """
+    Measurements of a single request, reported in its ``Server-Timing`` header and in the process metrics.
+    """
+
+    def __init__(self):
+        self.start = timer()
+        self.stages = {}  # type: Dict[Str, float]
+        self.descriptions = {}  # type: Dict[Str, Str]
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+
+    def add_stage(self, stage, duration):
+        # type: (Str, float) -> None
+        self.stages[stage] = self.stages.get(stage, 0.0) + duration
+
+    def server_timing(self):
+        # type: () -> Str
+        """
+        Generates the ``Server-Timing`` header value with stage durations in milliseconds.
+        """
+        timings = []
+        for stage, duration in self.stages.items():
+            desc = self.descriptions.get(stage)
+            timings.append("{};dur={:.3f}{}".format(stage, duration * 1000, ';desc="{}"'.format(desc) if desc else ""))
+        for stage, desc in self.descriptions.items():
+            if stage not in self.stages:
+                timings.append('{};desc="{}"'.format(stage, desc))
+        timings.append('sql;dur={:.3f};desc="{} statements"'.format(self.sql_seconds * 1000, self.sql_statements))
+        timings.append("total;dur={:.3f}".format((timer() - self.start) * 1000))
+        return ", ".join(timings)
+
+
+def _complete_request_metrics(request, response=None):
+    # type: (Request, Optional[Response]) -> None
+    metrics = request.environ.get(METRICS_REQUEST_KEY)
+    if metrics is None or getattr(_CURRENT, "metrics", None) is not metrics:
+        return
+    _CURRENT.metrics = None
+    REQUEST_SECONDS.observe(timer() - metrics.start)
+    REQUEST_SQL_STATEMENTS.observe(metrics.sql_statements)
+    REQUEST_SQL_SECONDS.observe(metrics.sql_seconds)
+    if response is not None and METRICS.server_timing:
+        response.headers["Server-Timing"] = metrics.server_timing()
+
+
+def get_request_metrics(request):
+    # type: (Request) -> Optional[RequestMetrics]
+    """
+    Obtains the measurements of the request, starting them if this is the first measurement of this request.
+
+    Measurements are reported once the response is generated, or when the request completes otherwise.
+    """
+    if not METRICS.enabled or request is None:
+        return None
+    metrics = request.environ.get(METRICS_REQUEST_KEY)
+    if metrics is None:
+        metrics = request.environ[METRICS_REQUEST_KEY] = RequestMetrics()
+        _CURRENT.metrics = metrics
+        if hasattr(request, "add_response_callback"):
+            request.add_response_callback(_complete_request_metrics)
+            request.add_finished_callback(_complete_request_metrics)
+    return metrics
+
+
+@contextmanager
+def measure_stage(request, stage):
+    # type: (Request, Str) -> Iterator[None]
+    """
+    Measures the duration of the enclosed operations as an authorization stage of the request.
+    """
+    metrics = get_request_metrics(request)
+    if metrics is None:
+        yield
+        return
+    start = timer()
+    try:
+        yield
+    finally:
+        duration = timer() - start
+        metrics.add_stage(stage, duration)
+        AUTHZ_STAGE_SECONDS.observe(duration, stage)
+
+
+def record_acl_cache(request, result):
+    # type: (Request, Str) -> None
+    """
+    Counts the result of a lookup of the ``acl`` cache region, and reports it for the request.
+    """
+    metrics = get_request_metrics(request)
+    if metrics is None:
+        return
+    ACL_CACHE_REQUESTS.inc(1, result)
+    metrics.descriptions["acl_cache"] = result
+
+
+def record_authz_decision(service_type, allowed):
+    # type: (Str, bool) -> None
+    """
+    Counts the authorization decision of a request received by the proxy.
+    """
+    if METRICS.enabled:
+        AUTHZ_DECISIONS.inc(1, service_type, "allowed" if allowed else "denied")
+
+
+def get_metrics_response(request):  # noqa: W0613
+    # type: (Request) -> Response
+    """
+    Generates the response with all metrics of the process in `Prometheus` text format.
+    """
+    return Response(body=METRICS.render(), content_type=CONTENT_TYPE_PROMETHEUS, charset="UTF-8")
+
+
+def metrics_tween_factory(handler, registry):  # noqa: F811
+    """
+    Starts measurements of every request received by the application.
+    """
+    def metrics_tween(request):
+        get_request_metrics(request)
+        return handler(request)
+    return metrics_tween
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):  # noqa: R0913
+    conn.info.setdefault("magpie_query_start", []).append(timer())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):  # noqa: R0913
+    start = conn.info.get("magpie_query_start")
+    duration = timer() - start.pop() if start else 0.0
+    metrics = getattr(_CURRENT, "metrics", None)
+    if metrics is not None:
+        metrics.sql_statements += 1
+        metrics.sql_seconds += duration
+
+
+def register_sql_metrics(engine):
+    # type: (Engine) -> None
+    """
+    Counts SQL statements executed by the engine for the request being measured by the current thread.
+    """
+    if not METRICS.enabled or event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def includeme(config):
+    METRICS.configure(config)
+    if not METRICS.enabled:
+        return
+    LOGGER.info("Adding metrics measurements...")
+    config.add_tween("magpie.metrics.metrics_tween_factory")
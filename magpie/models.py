@@ -1,12 +1,15 @@
+import itertools
 import math
 from typing import TYPE_CHECKING
 
 import datetime
+import six
 import sqlalchemy as sa
 import uuid
 from pyramid.httpexceptions import HTTPInternalServerError
 from pyramid.security import ALL_PERMISSIONS, Allow, Authenticated, Everyone
 from sqlalchemy.ext.declarative import declarative_base, declared_attr
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from ziggurat_foundations import ziggurat_model_init
@@ -17,7 +20,6 @@ from ziggurat_foundations.models.group_permission import GroupPermissionMixin
 from ziggurat_foundations.models.group_resource_permission import GroupResourcePermissionMixin
 from ziggurat_foundations.models.resource import ResourceMixin
 from ziggurat_foundations.models.services import BaseService
-from ziggurat_foundations.models.services.group import GroupService
 from ziggurat_foundations.models.services.resource_tree import ResourceTreeService
 from ziggurat_foundations.models.services.resource_tree_postgres import ResourceTreeServicePostgreSQL
 from ziggurat_foundations.models.services.user import UserService
@@ -25,7 +27,8 @@ from ziggurat_foundations.models.user import UserMixin
 from ziggurat_foundations.models.user_group import UserGroupMixin
 from ziggurat_foundations.models.user_permission import UserPermissionMixin
 from ziggurat_foundations.models.user_resource_permission import UserResourcePermissionMixin
-from ziggurat_foundations.permissions import permission_to_pyramid_acls
+from ziggurat_foundations.permissions import PermissionTuple, permission_to_pyramid_acls
+from zope.sqlalchemy import mark_changed
 
 from magpie.api import exception as ax
 from magpie.constants import get_constant
@@ -34,11 +37,18 @@ from magpie.utils import get_magpie_url
 
 if TYPE_CHECKING:
     # pylint: disable=W0611,unused-import
-    from typing import Dict, Optional, Type, Union
+    from typing import Dict, Iterable, List, Optional, Tuple, Type, Union
 
+    from sqlalchemy.orm.query import Query
     from sqlalchemy.orm.session import Session
 
-    from magpie.typedefs import AccessControlListType, GroupPriority, Str
+    from magpie.typedefs import (
+        AccessControlListType,
+        GroupPriority,
+        ResourceHierarchyPermissions,
+        ServiceOrResourceType,
+        Str
+    )
 
 Base = declarative_base()   # pylint: disable=C0103,invalid-name
 
@@ -163,18 +173,17 @@ class RootFactory(object):
         """
         Administrators have all permissions, user/group-specific permissions added if user is logged in.
         """
-        user = self.request.user
+        identity = self.request.identity_context
+        user = identity.user
         # allow if role MAGPIE_ADMIN_PERMISSION is somehow directly set instead of inferred via members of admin-group
         acl = [(Allow, get_constant("MAGPIE_ADMIN_PERMISSION"), ALL_PERMISSIONS)]
-        admins = GroupService.by_group_name(get_constant("MAGPIE_ADMIN_GROUP"), db_session=self.request.db)
-        if admins:
+        if identity.admin_group_id is not None:
             # need to add explicit admin-group ALL_PERMISSIONS otherwise views with other permissions than the
             # default MAGPIE_ADMIN_PERMISSION will be refused access (e.g.: views with MAGPIE_LOGGED_PERMISSION)
-            acl += [(Allow, "group:{}".format(admins.id), ALL_PERMISSIONS)]
+            acl += [(Allow, "group:{}".format(identity.admin_group_id), ALL_PERMISSIONS)]
         if user:
             # user-specific permissions (including group memberships)
-            permissions = UserService.permissions(user, self.request.db)
-            user_acl = permission_to_pyramid_acls(permissions)
+            user_acl = permission_to_pyramid_acls(identity.permissions)
             # allow views that require minimally to be logged in (regardless of who is the user)
             auth_acl = [(Allow, user.id, Authenticated)]
             acl += user_acl + auth_acl
@@ -189,7 +198,7 @@ class UserFactory(RootFactory):
     def __getitem__(self, user_name):
         context = UserFactory(self.request)
         if user_name == get_constant("MAGPIE_LOGGED_USER", self.request):
-            self.path_user = self.request.user
+            self.path_user = self.request.identity_context.user
         else:
             self.path_user = UserService.by_user_name(user_name, self.request.db)
         if self.path_user is not None:
@@ -213,7 +222,7 @@ class UserFactory(RootFactory):
 
         All ACL permissions from :class:`RootFactory` are applied on top of user-specific permissions added here.
         """
-        user = self.request.user
+        user = self.request.identity_context.user
         acl = super(UserFactory, self).__acl__   # inherit default permissions for non user-scoped routes
         # when user is authenticated and refers to itself, simultaneously fulfill both logged/context conditions
         if user and self.path_user and user.id == self.path_user.id:
@@ -392,6 +401,8 @@ class RemoteResourcesSyncInfo(BaseModel, Base):
                                    sa.ForeignKey("remote_resources.resource_id", onupdate="CASCADE",
                                                  ondelete="CASCADE"))
     last_sync = sa.Column(sa.DateTime(), nullable=True)
+    next_sync = sa.Column(sa.DateTime(), nullable=True)
+    sync_failures = sa.Column(sa.Integer(), default=0, nullable=False)
 
     @staticmethod
     def by_service_id(service_id, session):
@@ -420,6 +431,80 @@ class RemoteResourceTreeServicePostgresSQL(ResourceTreeServicePostgreSQL):
     """
 
 
+class ResourceAncestor(BaseModel, Base):
+    """
+    Closure of the resource tree referencing every ancestor of each resource with their relative depth.
+
+    Allows to retrieve ancestors or descendants of any resource with a single indexed lookup instead of recursively
+    walking the tree. Entries are maintained by :func:`set_resource_ancestors` and deleted in cascade with resources.
+    """
+    __tablename__ = "resources_ancestors"
+
+    resource_id = sa.Column(sa.Integer(),
+                            sa.ForeignKey("resources.resource_id", onupdate="CASCADE", ondelete="CASCADE"),
+                            primary_key=True, nullable=False)
+    ancestor_id = sa.Column(sa.Integer(),
+                            sa.ForeignKey("resources.resource_id", onupdate="CASCADE", ondelete="CASCADE"),
+                            primary_key=True, nullable=False, index=True)
+    depth = sa.Column(sa.Integer(), nullable=False)
+
+    def __repr__(self):
+        info = self.resource_id, self.ancestor_id, self.depth
+        return "<ResourceAncestor: id: %s, ancestor_id: %s, depth: %s>" % info
+
+
+class ServicePermissionsMatrix(BaseModel, Base):
+    """
+    Details about the last computation of the materialized effective permissions of every user within a service.
+
+    .. seealso::
+        - :class:`EffectivePermission`
+    """
+    __tablename__ = "services_permissions_matrix"
+
+    service_id = sa.Column(sa.Integer(),
+                           sa.ForeignKey("services.resource_id", onupdate="CASCADE", ondelete="CASCADE"),
+                           primary_key=True, nullable=False)
+    service = relationship("Service", foreign_keys=[service_id])
+    computed = sa.Column(sa.DateTime(), nullable=False, default=datetime.datetime.utcnow)
+    entries = sa.Column(sa.Integer(), nullable=False, default=0)
+
+    @staticmethod
+    def by_service_id(service_id, session):
+        return session.query(ServicePermissionsMatrix).get(service_id)
+
+    def __repr__(self):
+        info = self.service_id, self.computed.strftime("%Y-%m-%dT%H:%M:%S"), self.entries
+        return "<ServicePermissionsMatrix service_id: %s, computed: %s, entries: %s>" % info
+
+
+class EffectivePermission(BaseModel, Base):
+    """
+    Materialized effective permission of a user over a resource, as resolved at the time the matrix of the service was
+    computed (see :class:`ServicePermissionsMatrix`).
+
+    Permissions denied by default (no permission applied for the user or its groups) are not stored.
+    """
+    __tablename__ = "effective_permissions"
+
+    service_id = sa.Column(sa.Integer(),
+                           sa.ForeignKey("services.resource_id", onupdate="CASCADE", ondelete="CASCADE"),
+                           nullable=False, index=True)
+    resource_id = sa.Column(sa.Integer(),
+                            sa.ForeignKey("resources.resource_id", onupdate="CASCADE", ondelete="CASCADE"),
+                            primary_key=True, nullable=False)
+    user_id = sa.Column(sa.Integer(),
+                        sa.ForeignKey("users.id", onupdate="CASCADE", ondelete="CASCADE"),
+                        primary_key=True, nullable=False, index=True)
+    perm_name = sa.Column(sa.Unicode(64), primary_key=True, nullable=False)
+    access = sa.Column(sa.Unicode(16), nullable=False)
+    reason = sa.Column(sa.UnicodeText(), nullable=True)
+
+    def __repr__(self):
+        info = self.user_id, self.resource_id, self.perm_name, self.access
+        return "<EffectivePermission user_id: %s, resource_id: %s, perm_name: %s, access: %s>" % info
+
+
 class TemporaryToken(BaseModel, Base):
     """
     Model that defines a token for temporary URL completion of a given pending operation.
@@ -477,7 +562,440 @@ def resource_factory(**kwargs):
 
 
 def find_children_by_name(child_name, parent_id, db_session):
-    tree_struct = RESOURCE_TREE_SERVICE.from_parent_deeper(parent_id=parent_id, limit_depth=1, db_session=db_session)
-    tree_level_filtered = [node.Resource for node in list(tree_struct) if
-                           node.Resource.resource_name.lower() == child_name.lower()]
-    return tree_level_filtered.pop() if len(tree_level_filtered) else None
+    # type: (Str, int, Session) -> Optional[Resource]
+    """
+    Obtains the child resource matched by case-insensitive name directly under the specified parent resource.
+
+    Lookup employs the ``(parent_id, lower(resource_name))`` index to avoid loading all sibling resources.
+    """
+    db = get_db_session(db_session)
+    query = db.query(Resource).filter(
+        Resource.parent_id == parent_id,
+        sa.func.lower(Resource.resource_name) == child_name.lower(),
+    )
+    return query.order_by(Resource.ordering.desc()).first()
+
+
+def find_children_by_path(path_parts, parent_id, db_session):
+    # type: (List[Str], int, Session) -> List[Resource]
+    """
+    Obtains the nested children resources matched by case-insensitive names of successive path parts under the parent.
+
+    All path levels are resolved simultaneously using a single recursive query that descends from the parent resource,
+    matching each tree depth against the corresponding path part.
+
+    For example, using path parts ``["a", "b", "c", "file.nc"]`` under the service ID, resources ``a``, ``a/b``,
+    ``a/b/c`` and ``a/b/c/file.nc`` are returned if they all exist. If only ``a`` and ``a/b`` can be found, only those
+    two are returned. The last returned resource is therefore the *closest* existing one in the requested hierarchy,
+    and the full path was matched only if as many resources as path parts are returned.
+
+    :param path_parts: successive resource names to look for under the parent resource.
+    :param parent_id: resource ID from which to start the search.
+    :param db_session: database connection to retrieve resources.
+    :returns: ordered resources matched from the top-most path part down to the deepest one found.
+    """
+    if not path_parts:
+        return []
+    db = get_db_session(db_session)
+    res_table = Resource.__table__
+    res_child = res_table.alias("child")
+    names = postgresql.array([part.lower() for part in path_parts])
+    children = sa.select([
+        res_table.c.resource_id,
+        sa.literal(1).label("depth"),
+    ]).where(sa.and_(
+        res_table.c.parent_id == parent_id,
+        sa.func.lower(res_table.c.resource_name) == names[1],
+    )).cte("children", recursive=True)
+    children = children.union_all(sa.select([
+        res_child.c.resource_id,
+        (children.c.depth + 1).label("depth"),
+    ]).where(sa.and_(
+        res_child.c.parent_id == children.c.resource_id,
+        sa.func.lower(res_child.c.resource_name) == names[children.c.depth + 1],
+    )))
+    query = (
+        db.query(Resource, children.c.depth)
+        .join(children, children.c.resource_id == Resource.resource_id)
+        .order_by(children.c.depth, Resource.ordering)
+    )
+
+    # in case of case-insensitive name conflicts, multiple branches could match, keep only a single consistent one
+    matches = {}  # type: Dict[Tuple[int, int], Resource]
+    for res, depth in query:
+        matches[(depth, res.parent_id)] = res
+    found = []  # type: List[Resource]
+    for depth in range(1, len(path_parts) + 1):
+        res = matches.get((depth, parent_id))
+        if res is None:
+            break
+        found.append(res)
+        parent_id = res.resource_id
+    return found
+
+
+def find_children_by_paths(paths_parts, parent_id, db_session):
+    # type: (List[List[Str]], int, Session) -> List[List[Resource]]
+    """
+    Obtains the nested children resources matched by case-insensitive names of multiple paths under the same parent.
+
+    Results are equivalent to calling :func:`find_children_by_path` for each path, but each tree depth is resolved for
+    all paths simultaneously with a single query. Common parent parts shared by many paths are therefore looked for
+    only once, and the number of queries is bounded by the deepest path rather than the amount of paths.
+
+    :param paths_parts: successive resource names of each path to look for under the parent resource.
+    :param parent_id: resource ID from which to start the search.
+    :param db_session: database connection to retrieve resources.
+    :returns: for each path, ordered resources matched from the top-most path part down to the deepest one found.
+    """
+    db = get_db_session(db_session)
+    paths_prefixes = [tuple(part.lower() for part in parts) for parts in paths_parts]
+    matched_ids = {(): parent_id}  # type: Dict[Tuple[Str, ...], int]
+    matched = {}  # type: Dict[Tuple[Str, ...], Resource]
+    max_depth = max([len(prefix) for prefix in paths_prefixes] or [0])
+    for depth in range(1, max_depth + 1):
+        lookups = {}  # type: Dict[Tuple[Str, ...], Tuple[int, Str]]
+        for path in paths_prefixes:
+            prefix = path[:depth]
+            if len(prefix) == depth and prefix[:-1] in matched_ids:
+                lookups[prefix] = (matched_ids[prefix[:-1]], prefix[-1])
+        if not lookups:
+            break
+        query = db.query(Resource).filter(
+            sa.tuple_(Resource.parent_id, sa.func.lower(Resource.resource_name)).in_(list(set(lookups.values())))
+        ).order_by(Resource.ordering)
+        # in case of case-insensitive name conflicts, keep the same one as 'find_children_by_name'
+        children = {(res.parent_id, res.resource_name.lower()): res for res in query}
+        for prefix, child_key in lookups.items():
+            res = children.get(child_key)
+            if res is not None:
+                matched[prefix] = res
+                matched_ids[prefix] = res.resource_id
+
+    found = []  # type: List[List[Resource]]
+    for path in paths_prefixes:
+        path_found = []
+        for depth in range(1, len(path) + 1):
+            res = matched.get(path[:depth])
+            if res is None:
+                break
+            path_found.append(res)
+        found.append(path_found)
+    return found
+
+
+def _resource_ancestors_select(resource_id):
+    # type: (int) -> sa.sql.Select
+    """
+    Selects ``(resource_id, depth)`` of the specified resource (depth zero) and each of its ancestors.
+    """
+    closure = ResourceAncestor.__table__
+    return sa.union_all(
+        sa.select([sa.literal(resource_id).label("resource_id"), sa.literal(0).label("depth")]),
+        sa.select([closure.c.ancestor_id.label("resource_id"), closure.c.depth])
+        .where(closure.c.resource_id == resource_id),
+    )
+
+
+def get_resource_ancestors(resource_id, db_session, include_self=True):
+    # type: (int, Session, bool) -> List[Union[Service, Resource]]
+    """
+    Obtains the ancestors of a resource ordered from the closest parent up to the root service.
+
+    :param resource_id: resource for which to retrieve ancestors.
+    :param db_session: database connection to retrieve resources.
+    :param include_self: whether to include the specified resource itself as first item.
+    """
+    db = get_db_session(db_session)
+    ancestors = _resource_ancestors_select(resource_id).alias("ancestors")
+    query = (
+        db.query(Resource)
+        .join(ancestors, ancestors.c.resource_id == Resource.resource_id)
+        .order_by(ancestors.c.depth)
+    )
+    if not include_self:
+        query = query.filter(ancestors.c.depth > 0)
+    return query.all()
+
+
+def set_resource_ancestors(resource_id, parent_id, db_session):
+    # type: (int, Optional[int], Session) -> None
+    """
+    Updates references of :class:`ResourceAncestor` for a resource placed under the specified parent.
+
+    Must be called whenever a resource is created or moved under another parent (after flushing the corresponding
+    change). When moved, the whole branch under the resource is detached from its previous ancestors and attached to
+    the new ones, while preserving references within the branch itself.
+
+    :param resource_id: resource that was created or moved.
+    :param parent_id: new parent of the resource, or ``None`` for a root service.
+    :param db_session: database connection to apply changes.
+    """
+    db = get_db_session(db_session)
+    closure = ResourceAncestor.__table__
+    branch = sa.union_all(
+        sa.select([sa.literal(resource_id).label("resource_id"), sa.literal(0).label("depth")]),
+        sa.select([closure.c.resource_id, closure.c.depth]).where(closure.c.ancestor_id == resource_id),
+    ).alias("branch")
+    branch_ids = sa.select([branch.c.resource_id])
+    db.execute(closure.delete().where(sa.and_(closure.c.resource_id.in_(branch_ids),
+                                              sa.not_(closure.c.ancestor_id.in_(branch_ids)))))
+    if parent_id is None:
+        return
+    parents = sa.union_all(
+        sa.select([sa.literal(parent_id).label("ancestor_id"), sa.literal(1).label("depth")]),
+        sa.select([closure.c.ancestor_id, (closure.c.depth + 1).label("depth")])
+        .where(closure.c.resource_id == parent_id),
+    ).alias("parents")
+    db.execute(closure.insert().from_select(
+        ["resource_id", "ancestor_id", "depth"],
+        sa.select([branch.c.resource_id, parents.c.ancestor_id, (branch.c.depth + parents.c.depth).label("depth")])
+    ))
+
+
+def reserve_resource_ids(count, db_session):
+    # type: (int, Session) -> List[int]
+    """
+    Obtains the specified amount of new resource IDs from the sequence of the resources table with a single query.
+
+    Reserved IDs can be employed to insert resources and their references to each other (parents, ancestors) directly,
+    without the round-trip of a flush for each individual resource to obtain its generated ID.
+    """
+    if count <= 0:
+        return []
+    db = get_db_session(db_session)
+    sequence = sa.func.pg_get_serial_sequence(Resource.__tablename__, "resource_id")
+    query = sa.select([sa.func.nextval(sequence)]).select_from(sa.func.generate_series(1, count))
+    return [row[0] for row in db.execute(query)]
+
+
+def _copy_value(value):
+    if value is None:
+        return "\\N"
+    value = six.text_type(value)
+    for char, escaped in [("\\", "\\\\"), ("\t", "\\t"), ("\n", "\\n"), ("\r", "\\r")]:
+        value = value.replace(char, escaped)
+    return value
+
+
+def bulk_insert(table, columns, rows, db_session, chunk_size=1000):
+    # type: (sa.Table, List[Str], Iterable[Tuple], Session, int) -> None
+    """
+    Inserts all rows in the table as part of the current transaction of the session using set-based operations.
+
+    Rows are streamed using PostgreSQL ``COPY`` when the driver supports it. Otherwise, multi-row ``INSERT`` statements
+    of :paramref:`chunk_size` rows are employed.
+
+    :param table: table where to insert rows.
+    :param columns: names of the columns matching the order of values in each row.
+    :param rows: tuple of values of each row to insert.
+    :param db_session: database connection to apply changes.
+    :param chunk_size: amount of rows inserted per statement when ``COPY`` is not available.
+    """
+    db = get_db_session(db_session)
+    db.flush()
+    connection = db.connection()
+    if connection.dialect.driver == "psycopg2":
+        data = six.StringIO()
+        for row in rows:
+            data.write("\t".join(_copy_value(value) for value in row) + "\n")
+        data.seek(0)
+        preparer = connection.dialect.identifier_preparer
+        copy_sql = "COPY {} ({}) FROM STDIN".format(preparer.format_table(table),
+                                                    ", ".join(preparer.quote(col) for col in columns))
+        connection.connection.cursor().copy_expert(copy_sql, data)
+    else:
+        rows = iter(rows)
+        while True:
+            chunk = [dict(zip(columns, row)) for row in itertools.islice(rows, chunk_size)]
+            if not chunk:
+                break
+            db.execute(table.insert().values(chunk))
+    # statements outside of ORM operations are not detected by the transaction manager, which would otherwise abort
+    transaction_manager = db.info.get("transaction_manager")
+    if transaction_manager is not None:
+        mark_changed(db, transaction_manager=transaction_manager)
+
+
+def _resources_permissions_select(user, groups, resource_ids=None):
+    # type: (User, Iterable[int], Optional[Union[sa.sql.Select, Iterable[int]]]) -> sa.sql.Alias
+    """
+    Selects ``(resource_id, perm_name, type, owner_id)`` of permissions applied for the user or its groups on resources.
+
+    Permissions applied on any resource are selected if :paramref:`resource_ids` are not provided.
+    """
+    user_filter = UserResourcePermission.user_id == user.id
+    group_filter = GroupResourcePermission.group_id.in_(list(groups))
+    if resource_ids is not None:
+        if not isinstance(resource_ids, sa.sql.Select):
+            resource_ids = list(resource_ids)
+        user_filter = sa.and_(user_filter, UserResourcePermission.resource_id.in_(resource_ids))
+        group_filter = sa.and_(group_filter, GroupResourcePermission.resource_id.in_(resource_ids))
+    user_perms = sa.select([
+        UserResourcePermission.resource_id,
+        UserResourcePermission.perm_name,
+        sa.literal("user").label("type"),
+        UserResourcePermission.user_id.label("owner_id"),
+    ]).where(user_filter)
+    group_perms = sa.select([
+        GroupResourcePermission.resource_id,
+        GroupResourcePermission.perm_name,
+        sa.literal("group").label("type"),
+        GroupResourcePermission.group_id.label("owner_id"),
+    ]).where(group_filter)
+    return sa.union_all(user_perms, group_perms).alias("perms")
+
+
+def _regroup_resources_permissions(query, user, groups):
+    # type: (Query, User, Dict[int, Group]) -> ResourceHierarchyPermissions
+    """
+    Regroups rows of resources with applied permissions (as selected by :func:`_resources_permissions_select`).
+
+    Consecutive rows of the same resource are combined. Ownership permissions are added as ``ALL_PERMISSIONS`` to the
+    corresponding resource, as would be returned by
+    :meth:`ziggurat_foundations.models.services.resource.ResourceService.perms_for_user`.
+    """
+    resources_perms = []  # type: ResourceHierarchyPermissions
+    for res, perm_type, perm_name, owner_id in query:
+        if not resources_perms or resources_perms[-1][0] is not res:
+            resources_perms.append((res, []))
+        if perm_type is not None:
+            group = groups.get(owner_id) if perm_type == "group" else None
+            resources_perms[-1][1].append(PermissionTuple(user, perm_name, perm_type, group, res, False, True))
+    for res, res_perms in resources_perms:
+        if res.owner_user_id == user.id:
+            res_perms.append(PermissionTuple(user, ALL_PERMISSIONS, "user", None, res, True, True))
+        if res.owner_group_id in groups:
+            group = groups[res.owner_group_id]
+            res_perms.append(PermissionTuple(user, ALL_PERMISSIONS, "group", group, res, True, True))
+    return resources_perms
+
+
+def get_resource_hierarchy_permissions(resource, user, db_session):
+    # type: (ServiceOrResourceType, User, Session) -> ResourceHierarchyPermissions
+    """
+    Obtains the resource hierarchy from the specified resource up to its root service with applied permissions.
+
+    The complete ancestor chain (see :class:`ResourceAncestor`) and every :term:`Direct Permissions` of the
+    :paramref:`user` or :term:`Inherited Permissions` of its groups applied on any of those resources are retrieved
+    using a single query. This avoids the round-trips of separate permission and parent resource queries for every
+    level of the hierarchy.
+
+    Ownership permissions are added as ``ALL_PERMISSIONS`` to the corresponding level, as would be returned by
+    :meth:`ziggurat_foundations.models.services.resource.ResourceService.perms_for_user`.
+
+    :param resource: service or resource from which to start rewinding the hierarchy.
+    :param user: user for which to retrieve direct and group inherited permissions.
+    :param db_session: database connection to retrieve resources and permissions.
+    :returns: ordered resources from the specified one (first) to the root service (last) with their permissions.
+    """
+    db = get_db_session(db_session)
+    groups = {grp.id: grp for grp in user.groups}
+    ancestors = _resource_ancestors_select(resource.resource_id).alias("ancestors")
+    perms = _resources_permissions_select(user, groups, sa.select([ancestors.c.resource_id]))
+    query = (
+        db.query(Resource, perms.c.type, perms.c.perm_name, perms.c.owner_id)
+        .join(ancestors, ancestors.c.resource_id == Resource.resource_id)
+        .outerjoin(perms, perms.c.resource_id == Resource.resource_id)
+        .order_by(ancestors.c.depth)
+    )
+    return _regroup_resources_permissions(query, user, groups)
+
+
+def get_resources_hierarchy_permissions(resources, user, db_session):
+    # type: (Iterable[ServiceOrResourceType], User, Session) -> Dict[int, ResourceHierarchyPermissions]
+    """
+    Obtains the resource hierarchies of multiple resources up to their root service with applied permissions.
+
+    Results are equivalent to calling :func:`get_resource_hierarchy_permissions` for each resource, but using only two
+    queries regardless of the amount of resources. The ancestors of all resources are first retrieved, and then each
+    distinct resource of the combined hierarchies is fetched only once along with its applied permissions. Resources
+    that share common parents (e.g.: many files under the same directories) therefore reuse the same hierarchy levels.
+
+    .. warning::
+        Hierarchy levels (resource and its list of permissions) are shared across the returned hierarchies.
+        They must not be modified in place.
+
+    :param resources: services or resources from which to start rewinding each hierarchy.
+    :param user: user for which to retrieve direct and group inherited permissions.
+    :param db_session: database connection to retrieve resources and permissions.
+    :returns: mapping of resource IDs to their ordered hierarchy from the resource (first) to the root service (last).
+    """
+    db = get_db_session(db_session)
+    groups = {grp.id: grp for grp in user.groups}
+    ancestors = {res.resource_id: [(0, res.resource_id)] for res in resources}  # type: Dict[int, List[Tuple[int, int]]]
+    if not ancestors:
+        return {}
+    closure = ResourceAncestor.__table__
+    query = db.query(closure.c.resource_id, closure.c.ancestor_id, closure.c.depth).filter(
+        closure.c.resource_id.in_(list(ancestors))
+    )
+    for res_id, ancestor_id, depth in query:
+        ancestors[res_id].append((depth, ancestor_id))
+    hierarchy_ids = {ancestor_id for res_ancestors in ancestors.values() for _, ancestor_id in res_ancestors}
+    perms = _resources_permissions_select(user, groups, hierarchy_ids)
+    query = (
+        db.query(Resource, perms.c.type, perms.c.perm_name, perms.c.owner_id)
+        .filter(Resource.resource_id.in_(list(hierarchy_ids)))
+        .outerjoin(perms, perms.c.resource_id == Resource.resource_id)
+        .order_by(Resource.resource_id)
+    )
+    levels = {}  # type: Dict[int, Tuple[Resource, List[PermissionTuple]]]
+    for res, res_perms in _regroup_resources_permissions(query, user, groups):
+        levels[res.resource_id] = (res, res_perms)
+    return {
+        res_id: [levels[ancestor_id] for _, ancestor_id in sorted(res_ancestors) if ancestor_id in levels]
+        for res_id, res_ancestors in ancestors.items()
+    }
+
+
+def get_applied_resources_permissions(user, db_session, resource_ids=None):
+    # type: (User, Session, Optional[Iterable[int]]) -> ResourceHierarchyPermissions
+    """
+    Obtains every resource on which permissions are applied for the user or its groups, along with those permissions.
+
+    :param user: user for which to retrieve direct and group inherited permissions.
+    :param db_session: database connection to retrieve resources and permissions.
+    :param resource_ids: resources to consider, or any resource if not provided.
+    :returns: resources with at least one applied permission, ordered by ID, with their permissions.
+    """
+    db = get_db_session(db_session)
+    groups = {grp.id: grp for grp in user.groups}
+    perms = _resources_permissions_select(user, groups, resource_ids)
+    query = (
+        db.query(Resource, perms.c.type, perms.c.perm_name, perms.c.owner_id)
+        .join(perms, perms.c.resource_id == Resource.resource_id)
+        .order_by(Resource.resource_id)
+    )
+    return _regroup_resources_permissions(query, user, groups)
+
+
+def get_service_applied_permissions(service_id, db_session):
+    # type: (int, Session) -> Tuple[List[ServiceOrResourceType], List[Tuple[int, Str, Str, int]]]
+    """
+    Obtains the service and all its children resources along with permissions applied on them for any user or group.
+
+    :param service_id: service for which to retrieve resources and permissions.
+    :param db_session: database connection to retrieve resources and permissions.
+    :returns:
+        Service and its children resources, and ``(resource_id, perm_name, type, owner_id)`` of applied permissions
+        where ``type`` is either ``user`` or ``group`` according to the ``owner_id`` the permission is applied for.
+    """
+    db = get_db_session(db_session)
+    in_service = sa.or_(Resource.resource_id == service_id, Resource.root_service_id == service_id)
+    resources = db.query(Resource).filter(in_service).all()
+    resource_ids = sa.select([Resource.resource_id]).where(in_service)
+    user_perms = sa.select([
+        UserResourcePermission.resource_id,
+        UserResourcePermission.perm_name,
+        sa.literal("user").label("type"),
+        UserResourcePermission.user_id.label("owner_id"),
+    ]).where(UserResourcePermission.resource_id.in_(resource_ids))
+    group_perms = sa.select([
+        GroupResourcePermission.resource_id,
+        GroupResourcePermission.perm_name,
+        sa.literal("group").label("type"),
+        GroupResourcePermission.group_id.label("owner_id"),
+    ]).where(GroupResourcePermission.resource_id.in_(resource_ids))
+    perms = [tuple(row) for row in db.execute(sa.union_all(user_perms, group_perms))]
+    return resources, perms
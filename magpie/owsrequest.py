@@ -6,15 +6,21 @@ The OWSRequest is based on pywps code:
 """
 
 import abc
+import io
 from typing import TYPE_CHECKING
 
 import lxml.etree  # nosec: B410 # module safe but bandit flags it : https://github.com/tiran/defusedxml/issues/38
+import six
 
 from magpie.api.requests import get_multiformat_body
 from magpie.utils import CONTENT_TYPE_FORM, CONTENT_TYPE_JSON, CONTENT_TYPE_PLAIN, get_header, get_logger, is_json_body
 
 if TYPE_CHECKING:
+    from typing import Any, Callable, Dict, Optional
+
     from pyramid.request import Request
+
+    from magpie.typedefs import Str
 LOGGER = get_logger(__name__)
 
 
@@ -93,32 +99,76 @@ class OWSGetParser(OWSParser):
         return None
 
 
-def lxml_strip_ns(tree):
-    for node in tree.iter():
-        try:
-            has_namespace = node.tag.startswith("{")
-        except AttributeError:
-            continue  # node.tag is not a string (node is a comment or similar)
-        if has_namespace:
-            node.tag = node.tag.split("}", 1)[1]
+def lxml_local_name(tag):
+    # type: (Any) -> Optional[Str]
+    """
+    Obtains the node tag name without its namespace, or ``None`` if the node is not an element (comment or similar).
+    """
+    if not isinstance(tag, six.string_types):
+        return None
+    if tag.startswith("{"):
+        return tag.split("}", 1)[1]
+    return tag
 
 
 class OWSPostParser(OWSParser):
+    """
+    Incremental parser of the XML request body that only reads the document until requested parameters are found.
+
+    Parameters are retrieved from attributes of the root element, its name (for ``request``), or the text of its direct
+    child elements (sections), regardless of their namespaces. Because the body is parsed with
+    :func:`lxml.etree.iterparse`, reading stops as soon as the parameter is found, and contents nested under sections
+    (e.g.: large inline ``ComplexData`` inputs of a ``WPS Execute`` request) are discarded as they are read instead of
+    building the complete document.
+    """
 
     def __init__(self, request):
         super(OWSPostParser, self).__init__(request)
-        self.document = lxml.etree.fromstring(self.request.body)  # nosec: B410
-        lxml_strip_ns(self.document)
+        body = io.BytesIO(six.ensure_binary(self.request.body))
+        self._events = lxml.etree.iterparse(body, events=("start", "end"))  # nosec: B410
+        self._depth = 0
+        self._done = False
+        self._root_tag = None       # type: Optional[Str]
+        self._root_attrib = {}      # type: Dict[Str, Str]
+        self._sections = {}         # type: Dict[Str, Str]
+        self._read(lambda: self._root_tag is not None)
+
+    def _read(self, found):
+        # type: (Callable[[], bool]) -> None
+        """
+        Reads the document until the condition is met or the end of the document is reached.
+        """
+        while not self._done and not found():
+            try:
+                event, node = next(self._events)
+            except StopIteration:
+                self._done = True
+                break
+            if event == "start":
+                self._depth += 1
+                if self._depth == 1:
+                    self._root_tag = lxml_local_name(node.tag) or ""
+                    self._root_attrib = dict(node.attrib)
+                continue
+            self._depth -= 1
+            if self._depth == 1:
+                name = lxml_local_name(node.tag)
+                if name is not None:
+                    self._sections.setdefault(name.lower(), (node.text or "").strip())
+            if self._depth >= 1:
+                # section values are retrieved, drop their contents and any previous section already processed
+                node.clear()
+                parent = node.getparent()
+                while node.getprevious() is not None:
+                    del parent[0]
 
     def _get_param_value(self, param):
-        if param in self.document.attrib:
-            return self.document.attrib[param].lower()
+        self._read(lambda: param in self._root_attrib or param == "request" or param in self._sections)
+        if param in self._root_attrib:
+            return self._root_attrib[param].lower()
         if param == "request":
-            return self.document.tag.lower()
-        for section in self.document:
-            if param == section.tag.lower():
-                return section.text.strip()
-        return None
+            return self._root_tag.lower()
+        return self._sections.get(param)
 
 
 class MultiFormatParser(OWSParser):
@@ -2,7 +2,6 @@ import logging
 import os
 import random
 import string
-import subprocess  # nosec
 import time
 from tempfile import NamedTemporaryFile
 from typing import TYPE_CHECKING
@@ -12,6 +11,7 @@ import six
 import transaction
 import yaml
 from pyramid.httpexceptions import HTTPException
+from six.moves.http_cookiejar import MozillaCookieJar
 from sqlalchemy.orm.session import Session
 from ziggurat_foundations.models.services.group import GroupService
 from ziggurat_foundations.models.services.resource import ResourceService
@@ -31,9 +31,11 @@ from magpie.api.schemas import (
     UsersAPI
 )
 from magpie.constants import get_constant
+from magpie.http_client import get_http_client, make_http_session
 from magpie.permissions import Permission, PermissionSet
 from magpie.services import SERVICE_TYPE_DICT, ServiceWPS
 from magpie.utils import (
+    CONTENT_TYPE_FORM,
     bool2str,
     get_admin_cookies,
     get_json,
@@ -102,7 +104,7 @@ def _login_loop(login_url, cookies_file, data=None, message="Login response"):
         data_str = data
     attempt = 0
     while True:
-        err, http = _request_curl(login_url, cookie_jar=cookies_file, form_params=data_str, msg=message)
+        err, http = _request_cookies_file(login_url, cookie_jar=cookies_file, form_params=data_str, msg=message)
         if not err and http == 200:
             break
         attempt += 1
@@ -112,34 +114,42 @@ def _login_loop(login_url, cookies_file, data=None, message="Login response"):
             raise RegistrationLoginError("Cannot log in to {0}".format(login_url))
 
 
-def _request_curl(url, cookie_jar=None, cookies=None, form_params=None, msg="Response"):
+def _request_cookies_file(url, cookie_jar=None, cookies=None, form_params=None, msg="Response"):
     # type: (Str, Optional[Str], Optional[Str], Optional[Str], Optional[Str]) -> Tuple[int, int]
     """
-    Executes a request using cURL.
+    Executes a request with the shared HTTP client using cookies stored in a file (`Netscape` cookies format).
 
-    :returns: tuple of the returned system command code and the response http code
-    """
+    Insecure SSL errors are ignored (ie: access 'https' page not configured for it) and redirects are followed.
 
-    # arg -k allows to ignore insecure SSL errors, ie: access 'https' page not configured for it
-    #   curl_cmd = 'curl -k -L -s -o /dev/null -w "{msg_out} : %{{http_code}}\\n" {params} {url}'
-    #   curl_cmd = curl_cmd.format(msg_out=msg, params=params, url=url)
-    msg_sep = msg + ": "
-    params = ["curl", "-k", "-L", "-s", "-o", "/dev/null", "-w", msg_sep + "%{http_code}"]
+    :param url: location where to send the request.
+    :param cookie_jar: file where to save cookies obtained from the request.
+    :param cookies: file from which to load cookies to send with the request.
+    :param form_params: URL-encoded form parameters to submit with a ``POST`` request (``GET`` otherwise).
+    :param msg: message to log with the response status.
+    :returns: tuple of the error code (non-zero if no response could be obtained) and the response http code
+    """
     if cookie_jar is not None and cookies is not None:
         raise RegistrationValueError("CookiesType and Cookie_Jar cannot be both set simultaneously")
-    if cookie_jar is not None:
-        params.extend(["--cookie-jar", cookie_jar])  # save cookies
-    if cookies is not None:
-        params.extend(["--cookie", cookies])         # use cookies
+    jar = MozillaCookieJar(cookie_jar or cookies)
+    if cookies is not None and os.path.getsize(cookies):
+        jar.load(ignore_discard=True, ignore_expires=True)
+    method = "GET"
+    headers = {}
     if form_params is not None:
-        params.extend(["--data", form_params])
-    params.extend([url])
-    curl_out = subprocess.Popen(params, stdout=subprocess.PIPE)  # nosec
-    curl_msg = curl_out.communicate()[0]    # type: Str
-    curl_err = curl_out.returncode          # type: int
-    http_code = int(six.ensure_text(curl_msg).split(msg_sep)[1])
-    print_log("[{url}] {response}".format(response=curl_msg, url=url), logger=LOGGER)
-    return curl_err, http_code
+        method = "POST"
+        headers["Content-Type"] = CONTENT_TYPE_FORM
+    try:
+        resp = get_http_client().request(method, url, data=form_params, headers=headers, cookies=jar, verify=False)
+    except requests.exceptions.RequestException as exc:
+        print_log("[{url}] {msg}: {exc!r}".format(msg=msg, exc=exc, url=url), logger=LOGGER)
+        return 1, 0
+    if cookie_jar is not None:
+        for hop_resp in resp.history + [resp]:
+            for cookie in hop_resp.cookies:
+                jar.set_cookie(cookie)
+        jar.save(ignore_discard=True, ignore_expires=True)
+    print_log("[{url}] {msg}: {code}".format(msg=msg, code=resp.status_code, url=url), logger=LOGGER)
+    return 0, resp.status_code
 
 
 def _phoenix_update_services(services_dict):
@@ -174,9 +184,10 @@ def _phoenix_login_check(cookies):
     """
     no_access_error = "<ExceptionText>Unauthorized: Services failed permission check</ExceptionText>"
     svc_url = get_phoenix_url() + "/services"
-    curl_process = subprocess.Popen(["curl", "-s", "--cookie", cookies, svc_url], stdout=subprocess.PIPE)  # nosec
-    curl_http_resp = curl_process.communicate()  # nosec
-    has_access = no_access_error not in curl_http_resp[0]
+    jar = MozillaCookieJar(cookies)
+    jar.load(ignore_discard=True, ignore_expires=True)
+    resp = get_http_client().get(svc_url, cookies=jar)
+    has_access = no_access_error not in resp.text
     return has_access
 
 
@@ -195,8 +206,8 @@ def _phoenix_remove_services():
                 return False
             phoenix_url = get_phoenix_url()
             remove_services_url = phoenix_url + "/clear_services"
-            error, _ = _request_curl(remove_services_url, cookies=phoenix_cookies_file.name,
-                                     msg="Phoenix remove services")
+            error, _ = _request_cookies_file(remove_services_url, cookies=phoenix_cookies_file.name,
+                                             msg="Phoenix remove services")
     except Exception as exc:
         print_log("Exception during phoenix remove services: [{!r}]".format(exc), logger=LOGGER, level=logging.ERROR)
     return error == 0
@@ -269,7 +280,8 @@ def _register_services(where,                           # type: Optional[Str]
                  "register=register"            \
                  .format(name=service_name, cfg=cfg, svc_url_tag=svc_url_tag, svc_url=svc_url)
         service_msg = "{msg} ({svc}) [{url}]".format(msg=message, svc=service_name, url=svc_url)
-        error, http_code = _request_curl(register_service_url, cookies=cookies, form_params=params, msg=service_msg)
+        error, http_code = _request_cookies_file(register_service_url, cookies=cookies,
+                                                 form_params=params, msg=service_msg)
         statuses[service_name] = http_code
         success = success and not error and ((where == SERVICES_PHOENIX and http_code == 200) or
                                              (where == SERVICES_MAGPIE and http_code == 201))
@@ -314,7 +326,7 @@ def _magpie_add_register_services_perms(services, statuses, curl_cookies, reques
     for service_name in services:
         svc_available_perms_url = "{magpie}/services/{svc}/permissions" \
                                   .format(magpie=magpie_url, svc=service_name)
-        resp_available_perms = requests.get(svc_available_perms_url, cookies=request_cookies)
+        resp_available_perms = get_http_client().get(svc_available_perms_url, cookies=request_cookies)
         if resp_available_perms.status_code == 401:
             raise_log("Invalid credentials, cannot update service permissions",
                       exception=RegistrationLoginError, logger=LOGGER)
@@ -330,23 +342,23 @@ def _magpie_add_register_services_perms(services, statuses, curl_cookies, reques
                 svc_anonym_add_perms_url = "{magpie}/users/{usr}/services/{svc}/permissions" \
                                            .format(magpie=magpie_url, usr=login_usr, svc=service_name)
                 svc_anonym_perm_data = {"permission_name": Permission.GET_CAPABILITIES.value}
-                requests.post(svc_anonym_add_perms_url, data=svc_anonym_perm_data, cookies=request_cookies)
+                get_http_client().post(svc_anonym_add_perms_url, data=svc_anonym_perm_data, cookies=request_cookies)
 
             # check service response so Phoenix doesn't refuse registration
             # try with both the 'direct' URL and the 'GetCapabilities' URL
             attempt = 0
             service_info_url = "{magpie}/services/{svc}".format(magpie=magpie_url, svc=service_name)
-            service_info_resp = requests.get(service_info_url, cookies=request_cookies)
+            service_info_resp = get_http_client().get(service_info_url, cookies=request_cookies)
             service_url = get_json(service_info_resp).get(service_name).get("service_url")
             svc_getcap_url = "{svc_url}/wps?service=WPS&version=1.0.0&request=GetCapabilities" \
                              .format(svc_url=service_url)
             while True:
                 service_msg_direct = "Service response ({svc})".format(svc=service_name)
                 service_msg_getcap = "Service response ({svc}, GetCapabilities)".format(svc=service_name)
-                err, http = _request_curl(service_url, cookies=curl_cookies, msg=service_msg_direct)
+                err, http = _request_cookies_file(service_url, cookies=curl_cookies, msg=service_msg_direct)
                 if not err and http == 200:
                     break
-                err, http = _request_curl(svc_getcap_url, cookies=curl_cookies, msg=service_msg_getcap)
+                err, http = _request_cookies_file(svc_getcap_url, cookies=curl_cookies, msg=service_msg_getcap)
                 if not err and http == 200:
                     break
                 print_log("[{url}] Bad response from service '{svc}' retrying after {sec}s..."
@@ -371,12 +383,12 @@ def _magpie_update_services_conflict(conflict_services, services_dict, request_c
         statuses[svc_name] = 409
         svc_url_new = services_dict[svc_name]["url"]
         svc_url_db = "{magpie}/services/{svc}".format(magpie=magpie_url, svc=svc_name)
-        svc_resp = requests.get(svc_url_db, cookies=request_cookies)
+        svc_resp = get_http_client().get(svc_url_db, cookies=request_cookies)
         svc_info = get_json(svc_resp).get(svc_name)
         svc_url_old = svc_info["service_url"]
         if svc_url_old != svc_url_new:
             svc_info["service_url"] = svc_url_new
-            res_svc_put = requests.patch(svc_url_db, data=svc_info, cookies=request_cookies)
+            res_svc_put = get_http_client().patch(svc_url_db, data=svc_info, cookies=request_cookies)
             statuses[svc_name] = res_svc_put.status_code
             print_log("[{url_old}] => [{url_new}] Service URL update ({svc}): {resp}"
                       .format(svc=svc_name, url_old=svc_url_old, url_new=svc_url_new, resp=res_svc_put.status_code),
@@ -400,7 +412,7 @@ def _magpie_register_services_with_requests(services_dict, push_to_phoenix, user
     :return: successful operation status
     """
     magpie_url = get_magpie_url()
-    session = requests.Session()
+    session = make_http_session()
     success = False
     try:
         with NamedTemporaryFile() as magpie_cookies_file:
@@ -701,7 +713,7 @@ def _parse_resource_path(permission_config_entry,   # type: ConfigItem
             res_path = None
             if _use_request(cookies_or_session):
                 res_path = get_magpie_url() + ServiceResourcesAPI.path.format(service_name=svc_name)
-                res_resp = requests.get(res_path, cookies=cookies_or_session)
+                res_resp = get_http_client().get(res_path, cookies=cookies_or_session)
                 res_dict = get_json(res_resp)[svc_name]["resources"]
             else:
                 from magpie.api.management.service.service_formats import format_service_resources
@@ -743,7 +755,7 @@ def _parse_resource_path(permission_config_entry,   # type: ConfigItem
                 res_type = resource_type or svc_res_types[0]
                 if _use_request(cookies_or_session):
                     body = {"resource_name": res, "resource_type": res_type, "parent_id": parent}
-                    resp = requests.post(res_path, json=body, cookies=cookies_or_session)
+                    resp = get_http_client().post(res_path, json=body, cookies=cookies_or_session)
                 else:
                     from magpie.api.management.resource.resource_utils import create_resource
                     resp = create_resource(res, res, res_type, parent, db_session=cookies_or_session)
@@ -790,7 +802,8 @@ def _apply_permission_entry(permission_config_entry,    # type: ConfigItem
             action_oper = GroupResourcePermissionsAPI.format(group_name=_grp_name, resource_id=resource_id)
         if not action_oper:
             return None
-        action_func = requests.post if create_perm else requests.delete
+        http_client = get_http_client()
+        action_func = http_client.post if create_perm else http_client.delete
         action_body = {"permission": perm.json()}
         action_path = "{url}{path}".format(url=magpie_url, path=action_oper)
         action_resp = action_func(action_path, json=action_body, cookies=cookies_or_session)
@@ -842,10 +855,10 @@ def _apply_permission_entry(permission_config_entry,    # type: ConfigItem
         if _use_request(cookies_or_session):
             if _usr_name:
                 path = "{url}{path}".format(url=magpie_url, path=UsersAPI.path)
-                return requests.post(path, json=usr_data)
+                return get_http_client().post(path, json=usr_data)
             if _grp_name:
                 path = "{url}{path}".format(url=magpie_url, path=GroupsAPI.path)
-                return requests.post(path, json=grp_data)
+                return get_http_client().post(path, json=grp_data)
         else:
             if _usr_name:
                 from magpie.api.management.user.user_utils import create_user
@@ -1005,7 +1018,7 @@ def _process_permissions(permissions, magpie_url, cookies_or_session, users=None
         svc_name = perm_cfg["service"]
         if _use_request(cookies_or_session):
             svc_path = magpie_url + ServiceAPI.path.format(service_name=svc_name)
-            svc_resp = requests.get(svc_path, cookies=cookies_or_session)
+            svc_resp = get_http_client().get(svc_path, cookies=cookies_or_session)
             if svc_resp.status_code != 200:
                 _log_permission("Unknown service [{!s}]".format(svc_name), i)
                 continue
@@ -1,4 +1,5 @@
 import logging
+import threading
 from typing import TYPE_CHECKING
 
 from authomatic import Authomatic, provider_id
@@ -6,23 +7,33 @@ from authomatic.providers import oauth2, openid
 from pyramid.authentication import AuthTktAuthenticationPolicy
 from pyramid.authorization import ACLAuthorizationPolicy
 from pyramid.config import Configurator
+from pyramid.decorator import reify
 from pyramid.settings import asbool
-from ziggurat_foundations.models import groupfinder
+from ziggurat_foundations.models.services.group import GroupService
+from ziggurat_foundations.models.services.user import UserService
 
 from magpie.api.login import esgfopenid, wso2
+from magpie.cache import add_cache_invalidation_handler
 from magpie.constants import get_constant
-from magpie.models import RootFactory
+from magpie.models import RootFactory, User
 from magpie.utils import get_logger, get_settings
 
 if TYPE_CHECKING:
     # pylint: disable=W0611,unused-import
-    from typing import List, Optional
+    from typing import Dict, FrozenSet, List, Optional, Tuple
 
-    from magpie.typedefs import AnySettingsContainer, JSON, Str
+    from pyramid.registry import Registry
+    from pyramid.request import Request
+    from sqlalchemy.orm.session import Session
+    from ziggurat_foundations.permissions import PermissionTuple  # noqa
+
+    from magpie.typedefs import AnySettingsContainer, GroupPriority, JSON, Str
 
 AUTHOMATIC_LOGGER = get_logger("magpie.authomatic", level=logging.DEBUG)
 LOGGER = get_logger(__name__)
 
+SPECIAL_PRINCIPALS_REGISTRY_KEY = "magpie.special_principals"
+
 
 def mask_credentials(container, redact="[REDACTED]", flags=None, parent=None):
     # type: (JSON, Str, Optional[List[Str]], Optional[Str]) -> JSON
@@ -62,6 +73,222 @@ def mask_credentials(container, redact="[REDACTED]", flags=None, parent=None):
     return container
 
 
+class SpecialPrincipals(object):
+    """
+    Identifiers of the special administrators and anonymous users and groups shared by all requests of an application.
+
+    Those entities are resolved by name (from their configuration settings) only once at application startup, and then
+    every request employs their identifiers directly. Because they are referenced by ID, their definition is resolved
+    again only when the cache invalidation of one of them is received (see :func:`magpie.cache.invalidate_local_caches`)
+    following their modification. Entities not found (e.g.: not yet registered) are looked up again when requested.
+    """
+    KEYS = ["admin_user_id", "admin_group_id", "anonymous_user_id", "anonymous_group_id"]
+
+    def __init__(self, settings):
+        # type: (AnySettingsContainer) -> None
+        self.settings = get_settings(settings)
+        self._lock = threading.Lock()
+        self._ids = None  # type: Optional[Dict[Str, Optional[int]]]
+
+    def refresh(self, db_session):
+        # type: (Session) -> Dict[Str, Optional[int]]
+        """
+        Resolves the identifiers of the special users and groups from their configured names.
+        """
+        users = {
+            "admin_user_id": get_constant("MAGPIE_ADMIN_USER", self.settings),
+            "anonymous_user_id": get_constant("MAGPIE_ANONYMOUS_USER", self.settings),
+        }
+        groups = {
+            "admin_group_id": get_constant("MAGPIE_ADMIN_GROUP", self.settings),
+            "anonymous_group_id": get_constant("MAGPIE_ANONYMOUS_GROUP", self.settings),
+        }
+        ids = {}
+        for key, name in users.items():
+            user = UserService.by_user_name(name, db_session=db_session)
+            ids[key] = None if user is None else user.id
+        for key, name in groups.items():
+            group = GroupService.by_group_name(name, db_session=db_session)
+            ids[key] = None if group is None else group.id
+        with self._lock:
+            self._ids = ids
+        LOGGER.debug("Resolved special principals: %s", ids)
+        return ids
+
+    def resolve(self, db_session):
+        # type: (Session) -> Dict[Str, Optional[int]]
+        """
+        Obtains the identifiers of the special users and groups, resolving them again only if required.
+        """
+        ids = self._ids
+        if ids is None or any(ids[key] is None for key in self.KEYS):
+            ids = self.refresh(db_session)
+        return ids
+
+    def invalidate(self, user_id=None, group_id=None, resource_id=None):
+        # type: (Optional[int], Optional[int], Optional[int]) -> None
+        """
+        Discards resolved identifiers if one of the special users or groups is modified, or if all caches are cleared.
+        """
+        ids = self._ids
+        if ids is None:
+            return
+        clear_all = user_id is None and group_id is None and resource_id is None
+        user_ids = [ids["admin_user_id"], ids["anonymous_user_id"]]
+        group_ids = [ids["admin_group_id"], ids["anonymous_group_id"]]
+        special_user = user_id is not None and user_id in user_ids
+        special_group = group_id is not None and group_id in group_ids
+        if clear_all or special_user or special_group:
+            with self._lock:
+                self._ids = None
+
+
+def get_special_principals(registry):
+    # type: (Registry) -> Optional[SpecialPrincipals]
+    """
+    Obtains the special users and groups references registered for the application, if any.
+    """
+    return registry.get(SPECIAL_PRINCIPALS_REGISTRY_KEY) if registry is not None else None
+
+
+def register_special_principals(config, db_session):
+    # type: (Configurator, Session) -> SpecialPrincipals
+    """
+    Resolves the special users and groups at application startup and registers them for reuse by every request.
+    """
+    principals = SpecialPrincipals(config.registry.settings)
+    principals.refresh(db_session)
+    config.registry[SPECIAL_PRINCIPALS_REGISTRY_KEY] = principals
+    add_cache_invalidation_handler(principals.invalidate)
+    return principals
+
+
+class IdentityContext(object):
+    """
+    Identity of the :term:`Request User` resolved once and shared by every access control step of a same request.
+
+    Instead of having :class:`magpie.models.RootFactory`, :class:`magpie.models.UserFactory` and
+    :class:`magpie.services.ServiceInterface` each look up the user, its groups and the *special* administrator and
+    anonymous references, they all employ this context made available with ``request.identity_context``.
+    Every detail is loaded only once when first accessed, and then remains the same for the rest of the request.
+    """
+
+    def __init__(self, request):
+        # type: (Request) -> None
+        self.request = request
+
+    @reify
+    def user(self):
+        # type: () -> Optional[User]
+        """
+        Authenticated user of the request, or ``None`` if not logged in.
+        """
+        return self.request.user
+
+    @reify
+    def user_id(self):
+        # type: () -> Optional[int]
+        return None if self.user is None else self.user.id
+
+    @reify
+    def group_priorities(self):
+        # type: () -> Dict[int, GroupPriority]
+        """
+        Priorities of the groups of the authenticated user by group ID.
+        """
+        if self.user is None:
+            return {}
+        return {group.id: group.priority for group in self.user.groups}
+
+    @reify
+    def group_ids(self):
+        # type: () -> FrozenSet[int]
+        """
+        Groups of the authenticated user by ID.
+        """
+        return frozenset(self.group_priorities)
+
+    @reify
+    def principals(self):
+        # type: () -> FrozenSet[Str]
+        """
+        Group principals of the authenticated user as employed by :term:`ACL` definitions.
+        """
+        return frozenset("group:{}".format(group_id) for group_id in self.group_ids)
+
+    @reify
+    def permissions(self):
+        # type: () -> Tuple[PermissionTuple, ...]
+        """
+        Global permissions (not applied on any resource) of the authenticated user and its groups.
+        """
+        if self.user is None:
+            return tuple()
+        return tuple(UserService.permissions(self.user, self.request.db))
+
+    @reify
+    def special_principals(self):
+        # type: () -> Dict[Str, Optional[int]]
+        """
+        Identifiers of the special users and groups, from the application registry when available.
+        """
+        principals = get_special_principals(self.request.registry)
+        if principals is None:
+            principals = SpecialPrincipals(self.request)
+        return principals.resolve(self.request.db)
+
+    @reify
+    def admin_group_id(self):
+        # type: () -> Optional[int]
+        return self.special_principals["admin_group_id"]
+
+    @reify
+    def anonymous_group_id(self):
+        # type: () -> Optional[int]
+        return self.special_principals["anonymous_group_id"]
+
+    @reify
+    def anonymous_user_id(self):
+        # type: () -> Optional[int]
+        return self.special_principals["anonymous_user_id"]
+
+    @reify
+    def anonymous_user(self):
+        # type: () -> Optional[User]
+        if self.anonymous_user_id is None:
+            return None
+        return self.request.db.query(User).get(self.anonymous_user_id)
+
+    @reify
+    def is_admin(self):
+        # type: () -> bool
+        """
+        Indicates if the authenticated user is a member of the administrators group.
+        """
+        return self.admin_group_id is not None and self.admin_group_id in self.group_ids
+
+    def is_admin_user(self, user):
+        # type: (User) -> bool
+        """
+        Indicates if the specified user, authenticated or not, is a member of the administrators group.
+        """
+        if self.user_id is not None and user.id == self.user_id:
+            return self.is_admin
+        return self.admin_group_id is not None and any(group.id == self.admin_group_id for group in user.groups)
+
+
+def groupfinder(user_id, request):
+    # type: (Optional[int], Request) -> List[Str]
+    """
+    Obtains the group principals of the authenticated user.
+
+    Equivalent to :func:`ziggurat_foundations.models.groupfinder`, but reusing the groups of the request identity.
+    """
+    if user_id and request.identity_context.user:
+        return list(request.identity_context.principals)
+    return []
+
+
 def get_auth_config(container):
     # type: (AnySettingsContainer) -> Configurator
     """
@@ -98,6 +325,7 @@ def get_auth_config(container):
         authentication_policy=authn_policy,
         authorization_policy=authz_policy
     )
+    config.add_request_method(IdentityContext, "identity_context", reify=True)
     return config
 
 
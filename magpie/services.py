@@ -1,19 +1,18 @@
+import copy
 import re
 from typing import TYPE_CHECKING
 
 import abc
 import six
-from beaker.cache import cache_region, cache_regions, region_invalidate
+from beaker.cache import Cache, cache_region, cache_regions, region_invalidate
 from pyramid.httpexceptions import HTTPBadRequest, HTTPInternalServerError, HTTPNotImplemented
 from pyramid.security import ALL_PERMISSIONS, DENY_ALL
-from ziggurat_foundations.permissions import permission_to_pyramid_acls
-from ziggurat_foundations.models.services.group import GroupService
-from ziggurat_foundations.models.services.resource import ResourceService
-from ziggurat_foundations.models.services.user import UserService
+from ziggurat_foundations.permissions import PermissionTuple, permission_to_pyramid_acls
 
 from magpie import models
 from magpie.api import exception as ax
-from magpie.constants import get_constant
+from magpie.cache import PERMISSION_CACHE, PUBLIC_ACCESS_INDEX, add_cache_invalidation_handler
+from magpie.metrics import get_request_metrics, measure_stage, record_acl_cache
 from magpie.owsrequest import ows_parser_factory
 from magpie.permissions import (
     PERMISSION_REASON_ADMIN,
@@ -27,12 +26,18 @@ from magpie.permissions import (
 
 if TYPE_CHECKING:
     # pylint: disable=W0611,unused-import
-    from typing import Collection, Dict, List, Optional, Set, Tuple, Type, Union
+    from typing import Collection, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple, Type, Union
 
     from pyramid.request import Request
-    from ziggurat_foundations.permissions import PermissionTuple  # noqa
 
-    from magpie.typedefs import AccessControlListType, ConfigDict, ServiceOrResourceType, Str
+    from magpie.typedefs import (
+        AccessControlListType,
+        ConfigDict,
+        ResourceHierarchyPermissions,
+        ServiceOrResourceRequested,
+        ServiceOrResourceType,
+        Str
+    )
 
 
 class ServiceMeta(type):
@@ -137,10 +142,10 @@ class ServiceInterface(object):
         raise NotImplementedError
 
     def user_requested(self):
-        user = self.request.user
+        identity = self.request.identity_context
+        user = identity.user
         if not user:
-            anonymous = get_constant("MAGPIE_ANONYMOUS_USER", self.request)
-            user = UserService.by_user_name(anonymous, db_session=self.request.db)
+            user = identity.anonymous_user
             if user is None:
                 raise RuntimeError("No Anonymous user in the database")
         return user
@@ -163,7 +168,15 @@ class ServiceInterface(object):
         cache_keys = (self.request.method, self.request.path_qs, user_id)
         if self.request.headers.get("Cache-Control") == "no-cache":
             region_invalidate(self._get_acl_cached, "acl", *cache_keys)
-        return self._get_acl_cached(*cache_keys)
+        metrics = get_request_metrics(self.request)
+        if metrics is None:
+            return self._get_acl_cached(*cache_keys)
+        # cache miss is recorded only when the cached method is executed
+        metrics.descriptions.pop("acl_cache", None)
+        acl = self._get_acl_cached(*cache_keys)
+        if "acl_cache" not in metrics.descriptions:
+            record_acl_cache(self.request, "hit")
+        return acl
 
     # NOTE:
     #   Function arguments are required to generate caching keys by which cached elements will be retrieved.
@@ -183,10 +196,13 @@ class ServiceInterface(object):
             - :meth:`ServiceInterface.resource_requested`
             - :meth:`ServiceInterface.user_requested`
         """
-        permissions = self.permission_requested()
+        record_acl_cache(self.request, "miss" if cache_regions["acl"].get("enabled", True) else "disabled")
+        with measure_stage(self.request, "request_parsing"):
+            permissions = self.permission_requested()
         if permissions is None:
             return [DENY_ALL]
-        resource = self.resource_requested()
+        with measure_stage(self.request, "resource_resolution"):
+            resource = self.resource_requested()
         if not resource:
             return [DENY_ALL]
         if not isinstance(resource, tuple):
@@ -195,6 +211,10 @@ class ServiceInterface(object):
             resource, is_target = resource
         if not isinstance(permissions, (list, set, tuple)):
             permissions = {permissions}
+        if self.request.identity_context.user is None:
+            public_perms = self._get_public_permissions(resource, permissions, allow_match=is_target)
+            if public_perms is not None:
+                return [perm.ace(None) for perm in public_perms]
         user = self.user_requested()
         return self._get_acl(user, resource, permissions, allow_match=is_target)
 
@@ -253,10 +273,12 @@ class ServiceInterface(object):
         """
         Obtains the effective permissions the user has over the specified resource.
 
-        Recursively rewinds the resource tree from the specified resource up to the top-most parent service the resource
-        resides under (or directly if the resource is the service) and retrieve permissions along the way that should be
-        applied to children when using scoped-resource inheritance. Rewinding of the tree can terminate earlier when
-        permissions can be immediately resolved such as when more restrictive conditions enforce denied access.
+        Rewinds the resource tree from the specified resource up to the top-most parent service the resource resides
+        under (or directly if the resource is the service) and resolves permissions along the way that should be
+        applied to children when using scoped-resource inheritance. The whole hierarchy and its applied permissions are
+        fetched at once (see :func:`magpie.models.get_resource_hierarchy_permissions`) and resolved in memory.
+        Rewinding of the tree can terminate earlier when permissions can be immediately resolved such as when more
+        restrictive conditions enforce denied access.
 
         Both user and group permission inheritance is resolved simultaneously to tree hierarchy with corresponding
         allow and deny conditions. User :term:`Direct Permissions` have priority over all its groups
@@ -271,36 +293,322 @@ class ServiceInterface(object):
         Permissions scoped as `match` can be ignored using :paramref:`allow_match`, such as when the targeted resource
         does not exist.
 
+        Resolved permissions are cached when the ``permission`` cache region is enabled, until any modification of
+        the user, its groups, or the resource hierarchy invalidates them (see :mod:`magpie.cache`). Similarly to the
+        ``acl`` cache region, a request with header ``Cache-Control: no-cache`` forces their resolution. Permissions
+        of the anonymous user are obtained from the public access index instead when the ``public`` cache region is
+        enabled and the resource is part of it.
+
         .. seealso::
             - :meth:`ServiceInterface.resource_requested`
         """
         if not permissions:
             permissions = self.allowed_permissions(resource)
-        requested_perms = set(permissions)  # type: Set[Permission]
-        effective_perms = dict()            # type: Dict[Permission, PermissionSet]
+        if user.id == self.request.identity_context.anonymous_user_id:
+            public_perms = self._get_public_permissions(resource, permissions, allow_match)
+            if public_perms is not None:
+                return public_perms
+        if self.request.headers.get("Cache-Control") != "no-cache":
+            cached_perms = PERMISSION_CACHE.get(user.id, resource.resource_id, permissions, allow_match)
+            if cached_perms is not None:
+                return cached_perms
+        cache_version = PERMISSION_CACHE.version
+        resolved_perms, hierarchy_ids = self._resolve_effective_permissions(user, resource, permissions, allow_match)
+        PERMISSION_CACHE.set(user.id, [grp.id for grp in user.groups], resource.resource_id, hierarchy_ids,
+                             resolved_perms, allow_match, cache_version)
+        return resolved_perms
+
+    def batch_effective_permissions(self,
+                                    user,               # type: models.User
+                                    resources,          # type: Iterable[ServiceOrResourceRequested]
+                                    permissions=None,   # type: Optional[Collection[Permission]]
+                                    ):                  # type: (...) -> List[List[PermissionSet]]
+        """
+        Obtains the effective permissions the user has over each of the specified resources under this service.
 
-        # immediately return all permissions if user is an admin
+        Results are equivalent to calling :meth:`effective_permissions` for each resource, but the hierarchies of all
+        resources that are not already cached are fetched at once (see
+        :func:`magpie.models.get_resources_hierarchy_permissions`). Common parents of the resources are therefore
+        retrieved only once, which greatly reduces the cost of checking access to many resources of a large tree.
+
+        Each item of :paramref:`resources` can be either the resource or the tuple returned by
+        :meth:`resource_requested` (or :meth:`resolve_resource_paths`) to indicate if `match`-scoped permissions should
+        be considered for it. If :paramref:`permissions` are not provided, all permissions applicable for each resource
+        (see :meth:`allowed_permissions`) are resolved.
+
+        :returns: resolved effective permissions of each resource, in the same order as requested.
+        """
+        targets = []  # type: List[Tuple[ServiceOrResourceType, bool, Collection[Permission]]]
+        for resource in resources:
+            allow_match = True
+            if isinstance(resource, tuple):
+                resource, allow_match = resource
+            targets.append((resource, allow_match, permissions or self.allowed_permissions(resource)))
+
+        results = [None] * len(targets)  # type: List[Optional[List[PermissionSet]]]
+        unresolved = []  # type: List[int]
+        use_cache = self.request.headers.get("Cache-Control") != "no-cache"
+        for index, (resource, allow_match, res_perms) in enumerate(targets):
+            if use_cache:
+                results[index] = PERMISSION_CACHE.get(user.id, resource.resource_id, res_perms, allow_match)
+            if results[index] is None:
+                unresolved.append(index)
+        if not unresolved:
+            return results
+
+        cache_version = PERMISSION_CACHE.version
+        is_admin = self._is_admin(user)
+        hierarchies = {}  # type: Dict[int, ResourceHierarchyPermissions]
+        if not is_admin:
+            hierarchies = models.get_resources_hierarchy_permissions([targets[index][0] for index in unresolved],
+                                                                     user, db_session=self.request.db)
+        group_ids = [grp.id for grp in user.groups]
+        for index in unresolved:
+            resource, allow_match, res_perms = targets[index]
+            if is_admin:
+                resolved_perms, hierarchy_ids = self._get_admin_permissions(res_perms), [resource.resource_id]
+            else:
+                hierarchy = hierarchies[resource.resource_id]
+                resolved_perms, hierarchy_ids = self._resolve_hierarchy_permissions(hierarchy, res_perms, allow_match)
+            PERMISSION_CACHE.set(user.id, group_ids, resource.resource_id, hierarchy_ids,
+                                 resolved_perms, allow_match, cache_version)
+            results[index] = resolved_perms
+        return results
+
+    def effective_permissions_matrix(self):
+        # type: () -> Iterator[Tuple[models.User, ServiceOrResourceType, List[PermissionSet]]]
+        """
+        Obtains the effective permissions of every user over every resource of this service.
+
+        Results are equivalent to calling :meth:`effective_permissions` for every combination of user and resource,
+        but the service resources and all permissions applied on them are retrieved at once (see
+        :func:`magpie.models.get_service_applied_permissions`) and resolved in memory. Rather than rewinding the
+        complete hierarchy of each resource, only the parents on which permissions apply for the user are considered,
+        such that resources sharing those parents are resolved only once. Users without any :term:`Direct Permissions`
+        within the service are also resolved only once for each distinct combination of groups.
+
+        Resources for which neither the user nor its groups have any applied permission, on the resource itself or on
+        its parents, are omitted since all their permissions are denied by default.
+
+        .. warning::
+            Resolved permissions are shared across resources and users. They must not be modified in place.
+
+        :returns: user, resource and resolved effective permissions for every combination with applied permissions.
+        """
         db_session = self.request.db
-        admin_group = get_constant("MAGPIE_ADMIN_GROUP", self.request)
-        admin_group = GroupService.by_group_name(admin_group, db_session=db_session)
-        if admin_group in user.groups:  # noqa
-            return [
-                PermissionSet(perm, access=Access.ALLOW, scope=Scope.MATCH,
-                              typ=PermissionType.EFFECTIVE, reason=PERMISSION_REASON_ADMIN)
-                for perm in permissions
-            ]
+        resources, applied_perms = models.get_service_applied_permissions(self.service.resource_id, db_session)
+        resources = {res.resource_id: res for res in resources}
+        users_perms = {}   # type: Dict[int, Dict[int, List[Str]]]
+        groups_perms = {}  # type: Dict[int, Dict[int, List[Str]]]
+        for res_id, perm_name, perm_type, owner_id in applied_perms:
+            owner_perms = users_perms if perm_type == "user" else groups_perms
+            owner_perms.setdefault(owner_id, {}).setdefault(res_id, []).append(perm_name)
+        owner_ids = {res.owner_user_id for res in resources.values() if res.owner_user_id}
+
+        # resources ordered such that parents are always processed before their children
+        children = {}  # type: Dict[int, List[ServiceOrResourceType]]
+        for res in resources.values():
+            children.setdefault(res.parent_id, []).append(res)
+        ordered = [resources[self.service.resource_id]]
+        for res in ordered:  # extended while iterated to walk the tree breadth-first
+            ordered.extend(children.get(res.resource_id, []))
+        allowed_perms = {res.resource_id: self.allowed_permissions(res) for res in ordered}
+
+        groups = {grp.id: grp for grp in db_session.query(models.Group)}
+        users_groups = {}  # type: Dict[int, Set[int]]
+        for user_id, group_id in db_session.query(models.UserGroup.user_id, models.UserGroup.group_id):
+            users_groups.setdefault(user_id, set()).add(group_id)
+        # users of the same profile have the same effective permissions, distinct profiles for users with any direct
+        # permission or ownership within the service, while administrators all share the same one
+        admin_group_id = self.request.identity_context.admin_group_id
+        profiles = {}  # type: Dict[Tuple[Optional[int], Optional[FrozenSet[int]]], List[models.User]]
+        for user in db_session.query(models.User).order_by(models.User.id):
+            group_ids = frozenset(users_groups.get(user.id, []))
+            if admin_group_id in group_ids:
+                profile = (None, None)
+            elif user.id in users_perms or user.id in owner_ids:
+                profile = (user.id, group_ids)
+            else:
+                profile = (None, group_ids)
+            profiles.setdefault(profile, []).append(user)
+
+        for (user_id, group_ids), users in profiles.items():
+            if group_ids is None:
+                for user in users:
+                    for res in ordered:
+                        yield user, res, self._get_admin_permissions(allowed_perms[res.resource_id])
+                continue
+            results = self._resolve_matrix_permissions(users[0], group_ids, ordered, allowed_perms,
+                                                       users_perms.get(user_id, {}), groups_perms, groups)
+            for user in users:
+                for res, res_perms in results:
+                    yield user, res, res_perms
+
+    def _resolve_matrix_permissions(self,
+                                    user,           # type: models.User
+                                    group_ids,      # type: FrozenSet[int]
+                                    ordered,        # type: List[ServiceOrResourceType]
+                                    allowed_perms,  # type: Dict[int, List[Permission]]
+                                    user_perms,     # type: Dict[int, List[Str]]
+                                    groups_perms,   # type: Dict[int, Dict[int, List[Str]]]
+                                    groups,         # type: Dict[int, models.Group]
+                                    ):  # type: (...) -> List[Tuple[ServiceOrResourceType, List[PermissionSet]]]
+        """
+        Resolves the effective permissions over resources of the service for a user with the specified groups.
+
+        .. seealso::
+            - :meth:`ServiceInterface.effective_permissions_matrix`
+        """
+        resources = {res.resource_id: res for res in ordered}
+        levels = {}  # type: Dict[int, List[PermissionTuple]]
+        for res_id, perm_names in user_perms.items():
+            levels.setdefault(res_id, []).extend(
+                PermissionTuple(user, perm_name, "user", None, resources[res_id], False, True)
+                for perm_name in perm_names
+            )
+        for group_id in group_ids:
+            for res_id, perm_names in groups_perms.get(group_id, {}).items():
+                levels.setdefault(res_id, []).extend(
+                    PermissionTuple(user, perm_name, "group", groups[group_id], resources[res_id], False, True)
+                    for perm_name in perm_names
+                )
+        # ownership is applied like in 'models.get_resource_hierarchy_permissions'
+        for res in ordered:
+            if res.owner_user_id == user.id:
+                levels.setdefault(res.resource_id, []).append(
+                    PermissionTuple(user, ALL_PERMISSIONS, "user", None, res, True, True))
+            if res.owner_group_id in group_ids:
+                levels.setdefault(res.resource_id, []).append(
+                    PermissionTuple(user, ALL_PERMISSIONS, "group", groups[res.owner_group_id], res, True, True))
+            if res.__acl__:
+                levels.setdefault(res.resource_id, [])
+
+        # Levels without any permission have no effect on the resolution, except for the resource itself that is always
+        # the first level. Resolution is therefore the same for resources without permissions that share the same
+        # parents with permissions, and can be reused between them.
+        results = []  # type: List[Tuple[ServiceOrResourceType, List[PermissionSet]]]
+        resolved = {}  # type: Dict[Tuple[Optional[int], Tuple[int, ...], Tuple[Permission, ...]], List[PermissionSet]]
+        chains = {None: ()}  # type: Dict[Optional[int], Tuple[int, ...]]
+        for res in ordered:
+            parent_chain = chains[res.parent_id]
+            res_level = levels.get(res.resource_id)
+            chains[res.resource_id] = parent_chain if res_level is None else (res.resource_id, ) + parent_chain
+            if not chains[res.resource_id]:
+                continue
+            perms = allowed_perms[res.resource_id]
+            key = (None if res_level is None else res.resource_id, parent_chain, tuple(perms))
+            res_perms = resolved.get(key)
+            if res_perms is None:
+                hierarchy = [(res, res_level or [])] + [(resources[res_id], levels[res_id]) for res_id in parent_chain]
+                res_perms, _ = self._resolve_hierarchy_permissions(hierarchy, perms, allow_match=True)
+                resolved[key] = res_perms
+            results.append((res, res_perms))
+        return results
+
+    def resolve_resource_paths(self, paths):
+        # type: (Iterable[Str]) -> List[ServiceOrResourceRequested]
+        """
+        Obtains the resources referenced by paths of resource names relative to this service.
+
+        Paths are resolved from the nested children resource names (case-insensitive) of the service, such as
+        ``/dir/sub/file.nc``, rather than from any service-specific request path interpretation. Similarly to
+        :meth:`resource_requested`, the closest existing parent is returned when the full path cannot be found,
+        and the service itself is returned for empty paths.
+
+        All paths are resolved simultaneously (see :func:`magpie.models.find_children_by_paths`), such that common
+        parent parts are looked for only once.
+
+        :returns: for each path, tuple of reference resource (target/parent) and whether the full path was found.
+        """
+        paths_parts = [[part for part in path.split("/") if part] for path in paths]
+        paths_found = models.find_children_by_paths(paths_parts, parent_id=self.service.resource_id,
+                                                    db_session=self.request.db)
+        resources = []  # type: List[ServiceOrResourceRequested]
+        for parts, found in zip(paths_parts, paths_found):
+            resource = found[-1] if found else self.service
+            resources.append((resource, len(found) == len(parts)))
+        return resources
+
+    def _resolve_effective_permissions(self,
+                                       user,            # type: models.User
+                                       resource,        # type: ServiceOrResourceType
+                                       permissions,     # type: Collection[Permission]
+                                       allow_match,     # type: bool
+                                       ):               # type: (...) -> Tuple[List[PermissionSet], List[int]]
+        """
+        Resolves the effective permissions without cache, along with the resource hierarchy employed to do so.
+
+        .. seealso::
+            - :meth:`ServiceInterface.effective_permissions`
+        """
+        # immediately return all permissions if user is an admin
+        if self._is_admin(user):
+            return self._get_admin_permissions(permissions), [resource.resource_id]
+        with measure_stage(self.request, "permission_query"):
+            hierarchy = models.get_resource_hierarchy_permissions(resource, user, db_session=self.request.db)
+        with measure_stage(self.request, "permission_resolution"):
+            return self._resolve_hierarchy_permissions(hierarchy, permissions, allow_match)
+
+    def _get_public_permissions(self, resource, permissions, allow_match):
+        # type: (ServiceOrResourceType, Collection[Permission], bool) -> Optional[List[PermissionSet]]
+        """
+        Obtains the effective permissions of the anonymous user from the public access index, if the resource is part
+        of it.
+
+        .. seealso::
+            - :class:`magpie.cache.PublicAccessIndex`
+        """
+        if not PUBLIC_ACCESS_INDEX.enabled or self.request.headers.get("Cache-Control") == "no-cache":
+            return None
+        return PUBLIC_ACCESS_INDEX.lookup(self.request.db, self.request.identity_context.special_principals,
+                                          resource, permissions, allow_match, self._resolve_hierarchy_permissions)
+
+    def _is_admin(self, user):
+        # type: (models.User) -> bool
+        """
+        Verifies if the user is a member of the administrators group, which is granted all permissions.
+        """
+        return self.request.identity_context.is_admin_user(user)
+
+    @staticmethod
+    def _get_admin_permissions(permissions):
+        # type: (Collection[Permission]) -> List[PermissionSet]
+        return [
+            PermissionSet(perm, access=Access.ALLOW, scope=Scope.MATCH,
+                          typ=PermissionType.EFFECTIVE, reason=PERMISSION_REASON_ADMIN)
+            for perm in permissions
+        ]
+
+    @staticmethod
+    def _resolve_hierarchy_permissions(hierarchy,       # type: ResourceHierarchyPermissions
+                                       permissions,     # type: Collection[Permission]
+                                       allow_match,     # type: bool
+                                       ):               # type: (...) -> Tuple[List[PermissionSet], List[int]]
+        """
+        Resolves the effective permissions from the user and group permissions applied along the resource hierarchy.
+
+        The :paramref:`hierarchy` is not modified, such that its levels can be shared between multiple resolutions.
+
+        .. seealso::
+            - :func:`magpie.models.get_resource_hierarchy_permissions`
+            - :func:`magpie.models.get_resources_hierarchy_permissions`
+        """
+        requested_perms = set(permissions)  # type: Set[Permission]
+        effective_perms = dict()            # type: Dict[Permission, PermissionSet]
 
         # level at which last permission was found, -1 if not found
         # employed to resolve with *closest* scope and for applicable 'reason' combination on same level
         effective_level = dict()  # type: Dict[Permission, Optional[int]]
-        current_level = 1   # one-based to avoid ``if level:`` check failing with zero
         full_break = False
-        # current and parent resource(s) recursive-scope
-        while resource is not None and not full_break:  # bottom-up until service is reached
+        # current and parent resource(s) recursive-scope, all fetched at once, bottom-up until service is reached
+        # level is one-based to avoid ``if level:`` check failing with zero
+        hierarchy_ids = [res.resource_id for res, _ in hierarchy]
+        for current_level, (resource, res_perms) in enumerate(hierarchy, start=1):
+            if full_break:
+                break
 
             # include both permissions set in database as well as defined directly on resource
-            cur_res_perms = ResourceService.perms_for_user(resource, user, db_session=db_session)
-            cur_res_perms.extend(permission_to_pyramid_acls(resource.__acl__))
+            cur_res_perms = res_perms + permission_to_pyramid_acls(resource.__acl__)
 
             for perm_name in requested_perms:
                 if full_break:
@@ -382,11 +690,6 @@ class ServiceInterface(object):
                 break
             # otherwise, move to parent if any available, since we are not done rewinding the resource tree
             allow_match = False  # reset match not applicable anymore for following parent resources
-            current_level += 1
-            if resource.parent_id:
-                resource = ResourceService.by_resource_id(resource.parent_id, db_session=db_session)
-            else:
-                resource = None
 
         # set deny for all still unresolved permissions from requested ones
         resolved_perms = set(effective_perms)
@@ -400,7 +703,144 @@ class ServiceInterface(object):
         for perm in final_perms:
             perm.type = PermissionType.EFFECTIVE
             perm.scope = Scope.MATCH
-        return list(final_perms)
+        return list(final_perms), hierarchy_ids
+
+
+def invalidate_acl_cache(user_id=None, group_id=None, resource_id=None):  # noqa: W0613
+    # type: (Optional[int], Optional[int], Optional[int]) -> None
+    """
+    Clears all :term:`ACL` cached by :meth:`ServiceInterface._get_acl_cached`.
+
+    Cached :term:`ACL` are indexed by request path rather than by resource, and therefore cannot be mapped to the
+    modified elements. They are all evicted regardless of the specified ones.
+    """
+    acl_cached = ServiceInterface._get_acl_cached  # pylint: disable=W0212
+    region = cache_regions.get(acl_cached._arg_region)
+    if region and region.get("enabled", True):
+        Cache._get_cache(acl_cached._arg_namespace, region).clear()  # pylint: disable=W0212
+
+
+add_cache_invalidation_handler(invalidate_acl_cache)
+
+
+class ServiceRouter(object):
+    """
+    Request classification details of a service compiled once from its definition and shared by all of its requests.
+
+    Routers are cached per service ID by :func:`get_service_router` until the service is modified.
+    """
+
+    def __init__(self, service):
+        # type: (models.Service) -> None
+        self.service_id = service.resource_id
+        self.service_name = service.resource_name
+        self.configuration = copy.deepcopy(service.configuration)  # type: Optional[ConfigDict]
+
+    def is_current(self, service):
+        # type: (models.Service) -> bool
+        """
+        Validates that the router still corresponds to the definition of the service.
+        """
+        return service.resource_name == self.service_name and service.configuration == self.configuration
+
+
+class ServiceTHREDDSRouter(ServiceRouter):
+    """
+    Compiled file patterns and path prefixes to permission classification of a ``THREDDS`` service.
+    """
+    max_classified_prefixes = 1024
+
+    def __init__(self, service):
+        # type: (models.Service) -> None
+        super(ServiceTHREDDSRouter, self).__init__(service)
+        config = copy.deepcopy(self.configuration) or {}
+        config.setdefault("skip_prefix", "thredds")
+        config.setdefault("file_patterns", [".*\\.nc"])
+        config.setdefault("data_type", {"prefixes": []})
+        if not config["data_type"]["prefixes"]:
+            config["data_type"]["prefixes"] = ["fileServer", "dodsC", "dap4", "wcs", "wms"]
+        config.setdefault("metadata_type", {"prefixes": []})
+        if not config["metadata_type"]["prefixes"]:
+            config["metadata_type"]["prefixes"] = [None, "catalog\\.\\w+", "catalog", "ncml", "uddc", "iso"]
+        self.config = config  # type: ConfigDict
+        self.skip_prefix = config["skip_prefix"].strip("/") if config["skip_prefix"] else None  # type: Optional[Str]
+        self.file_patterns = [re.compile(pattern) for pattern in config["file_patterns"]]
+        self.prefix_permissions = [
+            (None if prefix is None else re.compile(prefix), permission)
+            for prefixes, permission in [
+                (config["metadata_type"]["prefixes"], Permission.BROWSE),  # first to favor BROWSE over READ conflicts
+                (config["data_type"]["prefixes"], Permission.READ),
+            ]
+            for prefix in prefixes
+        ]
+        self._classified_prefixes = {}  # type: Dict[Optional[Str], Optional[Permission]]
+
+    def match_file(self, name):
+        # type: (Str) -> Str
+        """
+        Obtains the part of the file name matched by the first applicable file pattern, or the literal name otherwise.
+        """
+        for pattern in self.file_patterns:
+            match = pattern.match(name)
+            if match:
+                return match[0]
+        return name
+
+    def classify(self, path_prefix):
+        # type: (Optional[Str]) -> Optional[Permission]
+        """
+        Obtains the permission corresponding to the path prefix, or ``None`` if it does not match any known prefix.
+        """
+        try:
+            return self._classified_prefixes[path_prefix]
+        except KeyError:
+            pass
+        permission = None
+        for pattern, prefix_permission in self.prefix_permissions:
+            if pattern is None and path_prefix is None:
+                permission = prefix_permission
+                break
+            if pattern is not None and path_prefix is not None and pattern.match(path_prefix):
+                permission = prefix_permission
+                break
+        if len(self._classified_prefixes) < self.max_classified_prefixes:
+            self._classified_prefixes[path_prefix] = permission
+        return permission
+
+
+SERVICE_ROUTER_CACHE = {}  # type: Dict[int, ServiceRouter]
+
+# lookup of permissions by name or value equivalent to 'Permission.get' for the 'request' parameter of OWS services
+OWS_REQUEST_PERMISSIONS = dict(
+    [(perm_name, perm) for perm_name, perm in Permission.__members__.items()] +
+    [(perm.value, perm) for perm in Permission]
+)  # type: Dict[Str, Permission]
+
+
+def get_service_router(service, router_class):
+    # type: (models.Service, Type[ServiceRouter]) -> ServiceRouter
+    """
+    Obtains the router of the service, compiling it only if not already cached or if the service was modified.
+    """
+    router = SERVICE_ROUTER_CACHE.get(service.resource_id)
+    if router is None or type(router) is not router_class or not router.is_current(service):
+        router = router_class(service)
+        SERVICE_ROUTER_CACHE[service.resource_id] = router
+    return router
+
+
+def invalidate_service_routers(user_id=None, group_id=None, resource_id=None):  # noqa: W0613
+    # type: (Optional[int], Optional[int], Optional[int]) -> None
+    """
+    Discards the cached router of a modified service, or all of them if all caches are cleared.
+    """
+    if user_id is None and group_id is None and resource_id is None:
+        SERVICE_ROUTER_CACHE.clear()
+    elif resource_id is not None:
+        SERVICE_ROUTER_CACHE.pop(resource_id, None)
+
+
+add_cache_invalidation_handler(invalidate_service_routers)
 
 
 class ServiceOWS(ServiceInterface):
@@ -422,7 +862,7 @@ class ServiceOWS(ServiceInterface):
         # type: () -> Permission
         try:
             req = str(self.parser.params["request"]).lower()
-            perm = Permission.get(req)
+            perm = OWS_REQUEST_PERMISSIONS.get(req)
             if perm is None:
                 raise NotImplementedError("Undefined 'Permission' from 'request' parameter: {!s}".format(req))
             return perm
@@ -561,14 +1001,12 @@ class ServiceNCWMS2(ServiceBaseWMS):
             # FIXME: this is probably too specific to birdhouse... leave as is for bw-compat, adjust as needed
             netcdf_file = netcdf_file.replace("outputs/", "birdhouse/")
 
-            db_session = self.request.db
             file_parts = netcdf_file.split("/")
-            while found_child and file_parts:
-                part = file_parts.pop(0)
-                res_id = found_child.resource_id
-                found_child = models.find_children_by_name(part, parent_id=res_id, db_session=db_session)
-            # target resource reached if no more parts to process, otherwise we have some parent (minimally the service)
-            target = not len(file_parts)
+            found_parts = models.find_children_by_path(file_parts, parent_id=self.service.resource_id,
+                                                       db_session=self.request.db)
+            # target resource reached if all parts were found, otherwise the resource is not resolved
+            target = len(found_parts) == len(file_parts)
+            found_child = found_parts[-1] if target else None
         return found_child, target
 
 
@@ -660,19 +1098,14 @@ class ServiceAPI(ServiceInterface):
         route_parts = self._get_request_path_parts()
         if not route_parts:
             return self.service, True
-        route_found = route_child = self.service
 
-        # find deepest possible resource matching sub-route name
-        while route_child and route_parts:
-            part_name = route_parts.pop(0)
-            route_res_id = route_child.resource_id
-            route_child = models.find_children_by_name(part_name, parent_id=route_res_id, db_session=self.request.db)
-            if route_child:
-                route_found = route_child
+        # find deepest possible resource matching sub-route names
+        route_found = models.find_children_by_path(route_parts, parent_id=self.service.resource_id,
+                                                   db_session=self.request.db)
 
-        # target reached if no more parts to process, otherwise we have some parent (minimally the service)
-        route_target = not len(route_parts) and route_child is not None
-        return route_found, route_target
+        # target reached if all parts were found, otherwise we have some parent (minimally the service)
+        route_target = len(route_found) == len(route_parts)
+        return (route_found[-1] if route_found else self.service), route_target
 
     def permission_requested(self):
         if self.request.method.upper() in ["GET", "HEAD"]:
@@ -730,31 +1163,24 @@ class ServiceTHREDDS(ServiceInterface):
 
     def __init__(self, *_, **__):
         super(ServiceTHREDDS, self).__init__(*_, **__)
-        self._config = None
+        self._router = None
+
+    @property
+    def router(self):
+        # type: () -> ServiceTHREDDSRouter
+        if self._router is None:
+            self._router = get_service_router(self.service, ServiceTHREDDSRouter)
+        return self._router
 
     def get_config(self):
         # type: () -> ConfigDict
-        if self._config is not None:
-            return self._config
-
-        self._config = super(ServiceTHREDDS, self).get_config() or {}
-        self._config.setdefault("skip_prefix", "thredds")
-        self._config.setdefault("file_patterns", [".*\\.nc"])
-        self._config.setdefault("data_type", {"prefixes": []})
-        if not self._config["data_type"]["prefixes"]:
-            self._config["data_type"]["prefixes"] = ["fileServer", "dodsC", "dap4", "wcs", "wms"]
-        self._config.setdefault("metadata_type", {"prefixes": []})
-        if not self._config["metadata_type"]["prefixes"]:
-            self._config["metadata_type"]["prefixes"] = [None, "catalog\\.\\w+", "catalog", "ncml", "uddc", "iso"]
-        return self._config
+        return self.router.config
 
     def get_path_parts(self):
-        cfg = self.get_config()
         path_parts = self._get_request_path_parts()
-        skip_prefix = cfg["skip_prefix"]
+        skip_prefix = self.router.skip_prefix
         if path_parts and skip_prefix:
             full_path = "/".join(path_parts)
-            skip_prefix = skip_prefix.lstrip("/").rstrip("/")
             if full_path.startswith(skip_prefix):
                 path_parts = full_path.split(skip_prefix)[-1].split("/")
                 return path_parts[1:]  # remove extra '' added by split
@@ -767,53 +1193,29 @@ class ServiceTHREDDS(ServiceInterface):
         if len(path_parts) < 2:
             return self.service, True
         path_parts = path_parts[1:]
-        cfg = self.get_config()
+
+        # when reaching the final part, test for possible file pattern, otherwise default to literal value
+        #   allows combining different naming formats into a common file resource (eg: extra extensions)
+        # if final part is a directory, still works because of literal value
+        #   directory name must match exactly, no format naming variants allowed
+        # if final part is 'catalog.html' file, lookup would fail and fall back to previous directory part
+        #   since that would be the last part extracted, the parent directory will be matched as intended
+        path_parts[-1] = self.router.match_file(path_parts[-1])
 
         # find deepest possible resource matching either Directory or File by name
-        found_resource = child_resource = self.service
-        while child_resource and path_parts:
-            part_name = path_parts.pop(0)
-            # when reaching the final part, test for possible file pattern, otherwise default to literal value
-            #   allows combining different naming formats into a common file resource (eg: extra extensions)
-            # if final part is a directory, still works because of literal value
-            #   directory name must match exactly, no format naming variants allowed
-            # if final part is 'catalog.html' file, lookup would fail and fall back to previous directory part
-            #   since that would be the last part extracted, the parent directory will be matched as intended
-            if not path_parts:
-                for pattern in cfg["file_patterns"]:
-                    try:
-                        part_name = re.match(pattern, part_name)[0]
-                        break
-                    except (TypeError, KeyError):  # fail match or fail to extract (depending on configured pattern)
-                        pass
-            child_res_id = child_resource.resource_id
-            child_resource = models.find_children_by_name(part_name, parent_id=child_res_id, db_session=self.request.db)
-            if child_resource:
-                found_resource = child_resource
+        found_resources = models.find_children_by_path(path_parts, parent_id=self.service.resource_id,
+                                                       db_session=self.request.db)
 
-        # target resource reached if no more parts to process, otherwise we have some parent (minimally the service)
-        target = not len(path_parts) and child_resource is not None
-        return found_resource, target
+        # target resource reached if all parts were found, otherwise we have some parent (minimally the service)
+        target = len(found_resources) == len(path_parts)
+        return (found_resources[-1] if found_resources else self.service), target
 
     def permission_requested(self):
-        cfg = self.get_config()
         path_parts = self.get_path_parts()
         path_prefix = None  # in case of no `<prefix>`, simulate as `null`
         if path_parts:
             path_prefix = path_parts[0]
-        for prefixes, permission in [
-            (cfg["metadata_type"]["prefixes"], Permission.BROWSE),  # first to favor BROWSE over READ prefix conflicts
-            (cfg["data_type"]["prefixes"], Permission.READ),
-        ]:
-            for prefix in prefixes:  # type: Str
-                if path_prefix is None and prefix is None:
-                    return permission
-                try:
-                    path_prefix = re.match(prefix, path_prefix)[0]
-                    return permission
-                except (TypeError, KeyError):  # fail match or fail to extract pattern group
-                    pass
-        return None  # automatically deny
+        return self.router.classify(path_prefix)  # automatically deny if None
 
 
 SERVICE_TYPE_DICT = dict()
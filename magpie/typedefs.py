@@ -58,11 +58,19 @@ if TYPE_CHECKING:
     # recursive nodes structure employed by functions for listing children resources hierarchy
     # {<res-id>: {"node": <res>, "children": {<res-id>: ... }}
     ChildrenResourceNodes = Dict[int, Dict[Str, Union[models.Resource, "ChildrenResourceNodes"]]]
+    # flattened node of a new resource tree referencing the list index of its parent node (None if top-level)
+    ResourceTreeNode = Dict[Str, Optional[Union[Str, int]]]
     ResourcePermissionMap = Dict[int, List[PermissionSet]]  # raw mapping of permission-names applied per resource ID
+    # permissions applied on a service, and mapping of permissions applied on its children resources
+    ServiceResourcesPermissions = Tuple[List[PermissionSet], ResourcePermissionMap]
+    # resources from a target resource up to its root service, each with applied user/group permissions
+    ResourceHierarchyPermissions = List[Tuple[Union[models.Service, models.Resource], List[PermissionTuple]]]
 
     GroupPriority = Union[int, Type[math.inf]]
     UserServicesType = Union[Dict[Str, Dict[Str, Any]], List[Dict[Str, Any]]]
     ServiceOrResourceType = Union[models.Service, models.Resource]
+    # reference resource, and whether it is the exact target (True) or its closest existing parent (False)
+    ServiceOrResourceRequested = Union[ServiceOrResourceType, Tuple[ServiceOrResourceType, bool]]
     PermissionObject = Dict[Str, Optional[Str]]
     AnyZigguratPermissionType = Union[
         models.GroupPermission,
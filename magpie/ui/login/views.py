@@ -1,10 +1,10 @@
-import requests
 from pyramid.httpexceptions import HTTPException, HTTPFound, HTTPInternalServerError, HTTPOk, HTTPUnauthorized
 from pyramid.response import Response
 from pyramid.security import NO_PERMISSION_REQUIRED, forget
 from pyramid.view import view_config
 
 from magpie.api import schemas
+from magpie.http_client import get_http_client
 from magpie.ui.utils import BaseViews, check_response, request_api
 from magpie.utils import get_json
 
@@ -42,7 +42,7 @@ class LoginViews(BaseViews):
                 # keep using the external requests for external providers
                 if is_external:
                     signin_url = "{}{}".format(self.magpie_url, schemas.SigninAPI.path)
-                    response = requests.post(signin_url, data=data, allow_redirects=True)
+                    response = get_http_client(self.request).post(signin_url, data=data, allow_redirects=True)
                 # use sub request for internal to avoid retry connection errors
                 else:
                     response = request_api(self.request, schemas.SigninAPI.path, "POST", data=data)
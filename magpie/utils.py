@@ -10,7 +10,6 @@ from enum import Enum
 from inspect import isfunction
 from typing import TYPE_CHECKING
 
-import requests
 import six
 from pyramid.config import ConfigurationError, Configurator
 from pyramid.httpexceptions import HTTPClientError, HTTPException, HTTPOk
@@ -50,6 +49,8 @@ CONTENT_TYPE_HTML = "text/html"
 CONTENT_TYPE_PLAIN = "text/plain"
 CONTENT_TYPE_APP_XML = "application/xml"
 CONTENT_TYPE_TXT_XML = "text/xml"
+CONTENT_TYPE_CSV = "text/csv"
+CONTENT_TYPE_NDJSON = "application/x-ndjson"
 FORMAT_TYPE_MAPPING = {
     CONTENT_TYPE_JSON: CONTENT_TYPE_JSON,
     CONTENT_TYPE_HTML: CONTENT_TYPE_HTML,
@@ -269,12 +270,14 @@ def convert_response(response):
 def get_admin_cookies(container, verify=True, raise_message=None):
     # type: (AnySettingsContainer, bool, Optional[Str]) -> CookiesType
     from magpie.api.schemas import SigninAPI  # pylint: disable=C0415
+    from magpie.http_client import get_http_client  # pylint: disable=C0415  # avoid circular import error
 
     magpie_url = get_magpie_url(container)
     magpie_login_url = "{}{}".format(magpie_url, SigninAPI.path)
     cred = {"user_name": get_constant("MAGPIE_ADMIN_USER", container),
             "password": get_constant("MAGPIE_ADMIN_PASSWORD", container)}
-    resp = requests.post(magpie_login_url, data=cred, headers={"Accept": CONTENT_TYPE_JSON}, verify=verify)
+    resp = get_http_client(container).post(magpie_login_url, data=cred, headers={"Accept": CONTENT_TYPE_JSON},
+                                           verify=verify)
     if resp.status_code != HTTPOk.code:
         if raise_message:
             raise_log(raise_message, logger=LOGGER)
@@ -241,6 +241,7 @@ setup(
             "magpie_cli = magpie.cli:magpie_helper_cli",     # redirect to others below
             "magpie_helper = magpie.cli:magpie_helper_cli",  # alias to helper
             "magpie_batch_update_users = magpie.cli.batch_update_users:main",
+            "magpie_import_resources = magpie.cli.import_resources:main",
             "magpie_register_defaults = magpie.cli.register_defaults:main",
             "magpie_register_providers = magpie.cli.register_providers:main",
             "magpie_run_db_migration = magpie.cli.run_db_migration:main",
@@ -0,0 +1,447 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of the authorization operations applied for every request proxied by `Twitcher` with the ``MagpieAdapter``.
+
+Synthetic resource trees of configurable depth and fan-out are generated under a service of each requested type, along
+with users, groups and permissions applied on a configurable proportion of resources (the permission density). The
+local test application and its `PostgreSQL` database (see ``MAGPIE_POSTGRES_*`` variables) are employed. Requests of
+randomly selected users targeting randomly selected resources are then generated to measure the throughput and latency
+percentiles of the following operations:
+
+- ``acl``: :meth:`magpie.services.ServiceInterface.__acl__`
+- ``effective_permissions``: :meth:`magpie.services.ServiceInterface.effective_permissions`
+- ``find_children_by_name``: :func:`magpie.models.find_children_by_name`
+- ``check_request``: :meth:`magpie.adapter.magpieowssecurity.MagpieOWSSecurity.check_request`
+
+Requests are prepared (including resolution of their authenticated user) before being measured. Results are written
+as JSON along with the parameters and the commit that produced them, such that they can be compared between commits::
+
+    python -m tests.benchmarks --output baseline.json
+    python -m tests.benchmarks --output results.json --compare baseline.json --threshold 20
+"""
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import random
+import subprocess  # nosec: B404
+import sys
+from timeit import default_timer as timer
+from typing import TYPE_CHECKING
+
+import six
+from beaker.cache import cache_regions
+from ziggurat_foundations.models.services.user import UserService
+
+from magpie import __meta__, models
+from magpie.adapter.magpieowssecurity import OWSAccessForbidden
+from magpie.constants import get_constant
+from magpie.permissions import Access, PermissionSet, Scope
+from magpie.services import SERVICE_TYPE_DICT, service_factory
+from magpie.utils import CONTENT_TYPE_JSON, get_logger
+from tests import interfaces as ti, utils
+
+if TYPE_CHECKING:
+    # pylint: disable=W0611,unused-import
+    from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+    from magpie.typedefs import JSON, ServiceOrResourceType, Str
+
+LOGGER = get_logger(__name__)
+
+BENCHMARK_PREFIX = "benchmark"
+BENCHMARK_PASSWORD = "benchmark-password"  # nosec: B105
+BENCHMARK_OPERATIONS = ["acl", "effective_permissions", "find_children_by_name", "check_request"]
+BENCHMARK_HEADERS = {"Accept": CONTENT_TYPE_JSON, "Content-Type": CONTENT_TYPE_JSON}
+
+
+def generate_tree(depth, fan_out, resource_type, name_format, leaf_type=None, leaf_name_format=None):
+    # type: (int, int, Str, Str, Optional[Str], Optional[Str]) -> JSON
+    """
+    Generates a tree of resources of the format expected by ``POST /resources/{resource_id}/children``.
+
+    Every resource has :paramref:`fan_out` children down to the specified :paramref:`depth`, where resources of the last
+    level are optionally of another type and naming format.
+    """
+    if depth < 1:
+        return {}
+    is_leaf = depth == 1
+    res_type = leaf_type if is_leaf and leaf_type else resource_type
+    res_name = leaf_name_format if is_leaf and leaf_name_format else name_format
+    children = generate_tree(depth - 1, fan_out, resource_type, name_format, leaf_type, leaf_name_format)
+    return {res_name.format(index): {"resource_type": res_type, "children": children} for index in range(fan_out)}
+
+
+# Generators of the synthetic tree, and of the request path targeting a resource from its path of resource names,
+# for each service type. Services that only allow resources directly under them ignore the tree depth.
+SERVICE_BENCHMARKS = {
+    "api": {
+        "tree": lambda depth, fan_out: generate_tree(depth, fan_out, "route", "route{}"),
+        "path": lambda svc, parts: "/ows/proxy/{}/{}".format(svc, "/".join(parts)),
+    },
+    "thredds": {
+        "tree": lambda depth, fan_out: generate_tree(depth, fan_out, "directory", "dir{}", "file", "file{}.nc"),
+        "path": lambda svc, parts: "/ows/proxy/{}/fileServer/{}".format(svc, "/".join(parts)),
+    },
+    "wps": {
+        "tree": lambda depth, fan_out: generate_tree(1, fan_out, "process", "process{}"),
+        "path": lambda svc, parts: (
+            "/ows/proxy/{}?service=WPS&request=DescribeProcess&version=1.0.0&identifier={}".format(svc, parts[0])
+            if parts else "/ows/proxy/{}?service=WPS&request=GetCapabilities".format(svc)
+        ),
+    },
+    "geoserverwms": {
+        "tree": lambda depth, fan_out: generate_tree(1, fan_out, "workspace", "workspace{}"),
+        "path": lambda svc, parts: (
+            "/ows/proxy/{}?service=WMS&request=GetMap&version=1.3.0&layers={}:layer".format(svc, parts[0])
+            if parts else "/ows/proxy/{}?service=WMS&request=GetCapabilities".format(svc)
+        ),
+    },
+}
+
+
+class BenchmarkAdapter(ti.SetupMagpieAdapter):
+    """
+    Test application and ``MagpieAdapter`` components against which operations are measured.
+    """
+    app = None
+
+
+def percentile(values, percent):
+    # type: (List[float], float) -> float
+    """
+    Obtains the nearest-rank percentile of sorted values.
+    """
+    rank = int(math.ceil(percent / 100.0 * len(values)))
+    return values[min(max(rank, 1), len(values)) - 1]
+
+
+def measure(operations, warmup=0):
+    # type: (List[Callable[[], Any]], int) -> JSON
+    """
+    Calls each operation in sequence and summarizes their throughput and latency.
+
+    The first :paramref:`warmup` operations are called without being measured.
+    """
+    for operation in operations[:warmup]:
+        operation()
+    latencies = []
+    start = timer()
+    for operation in operations[warmup:]:
+        op_start = timer()
+        operation()
+        latencies.append(timer() - op_start)
+    total = timer() - start
+    latencies = sorted(latencies)
+    if not latencies:
+        return {"count": 0}
+    return {
+        "count": len(latencies),
+        "total_s": round(total, 6),
+        "throughput_ops": round(len(latencies) / total, 3) if total else None,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 4),
+        "min_ms": round(latencies[0] * 1000, 4),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 4),
+        "p90_ms": round(percentile(latencies, 90) * 1000, 4),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 4),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 4),
+        "max_ms": round(latencies[-1] * 1000, 4),
+    }
+
+
+def get_commit():
+    # type: () -> Optional[Str]
+    try:
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=root, stderr=subprocess.STDOUT)  # nosec
+        return commit.decode("utf-8").strip()
+    except Exception:  # noqa: W0703 # nosec: B110
+        return None
+
+
+def request_api(app, method, path, cookies, body=None):
+    # type: (Any, Str, Str, Any, Optional[JSON]) -> JSON
+    resp = utils.test_request(app, method, path, json=body, headers=BENCHMARK_HEADERS, cookies=cookies,
+                              expect_errors=True)
+    if resp.status_code >= 400 and not (method == "DELETE" and resp.status_code == 404):
+        raise RuntimeError("Request [{} {}] failed with [{}]: {}".format(method, path, resp.status_code, resp.text))
+    return utils.get_json_body(resp) if resp.status_code < 400 else {}
+
+
+def setup_principals(app, cookies, options, rand):
+    # type: (Any, Any, argparse.Namespace, random.Random) -> Tuple[List[Str], List[Str]]
+    """
+    Creates the benchmark groups and users, each user being member of randomly selected groups.
+    """
+    group_names = ["{}-group{}".format(BENCHMARK_PREFIX, index) for index in range(options.groups)]
+    user_names = ["{}-user{}".format(BENCHMARK_PREFIX, index) for index in range(options.users)]
+    for grp_name in group_names:
+        request_api(app, "DELETE", "/groups/{}".format(grp_name), cookies)
+        request_api(app, "POST", "/groups", cookies, body={"group_name": grp_name})
+    for usr_name in user_names:
+        request_api(app, "DELETE", "/users/{}".format(usr_name), cookies)
+        request_api(app, "POST", "/users", cookies, body={
+            "user_name": usr_name, "email": "{}@mail.com".format(usr_name), "password": BENCHMARK_PASSWORD
+        })
+        for grp_name in rand.sample(group_names, min(options.groups_per_user, len(group_names))):
+            request_api(app, "POST", "/users/{}/groups".format(usr_name), cookies, body={"group_name": grp_name})
+    return user_names, group_names
+
+
+def setup_service(app, cookies, service_type, options, rand, user_names, group_names):
+    # type: (Any, Any, Str, argparse.Namespace, random.Random, List[Str], List[Str]) -> Str
+    """
+    Creates the benchmark service of the given type with its synthetic resource tree and permissions.
+
+    Each resource (including the service) has a probability equal to the permission density to receive a randomly
+    selected permission, either for a user or a group, such that the amount of permissions scales with the tree.
+    """
+    svc_name = "{}-{}".format(BENCHMARK_PREFIX, service_type)
+    request_api(app, "DELETE", "/services/{}".format(svc_name), cookies)
+    body = request_api(app, "POST", "/services", cookies, body={
+        "service_name": svc_name, "service_type": service_type, "service_url": "http://localhost:9000/" + svc_name
+    })
+    svc_id = body["service"]["resource_id"]
+    tree = SERVICE_BENCHMARKS[service_type]["tree"](options.depth, options.fan_out)
+    request_api(app, "POST", "/resources/{}/children".format(svc_id), cookies, body={"resources": tree})
+
+    db_session = BenchmarkAdapter.session
+    svc_impl = SERVICE_TYPE_DICT[service_type]
+    resources = db_session.query(models.Resource).filter(
+        (models.Resource.resource_id == svc_id) | (models.Resource.root_service_id == svc_id)
+    )
+    for res in resources.order_by(models.Resource.resource_id):
+        if rand.random() >= options.density:
+            continue
+        perms = svc_impl.permissions if res.resource_id == svc_id else svc_impl.get_resource_permissions(
+            res.resource_type)
+        perm = PermissionSet(rand.choice(perms), rand.choice(list(Access)), rand.choice(list(Scope)))
+        if rand.random() < options.user_permissions_ratio:
+            path = "/users/{}/resources/{}/permissions".format(rand.choice(user_names), res.resource_id)
+        else:
+            path = "/groups/{}/resources/{}/permissions".format(rand.choice(group_names), res.resource_id)
+        request_api(app, "POST", path, cookies, body={"permission": perm.json()})
+    return svc_name
+
+
+def get_service_resources(service):
+    # type: (models.Service) -> List[Tuple[ServiceOrResourceType, List[Str]]]
+    """
+    Obtains the service and all its resources with their path of resource names relative to the service.
+    """
+    db_session = BenchmarkAdapter.session
+    resources = db_session.query(models.Resource).filter(models.Resource.root_service_id == service.resource_id)
+    resources = {res.resource_id: res for res in resources}
+    paths = {service.resource_id: []}  # type: Dict[int, List[Str]]
+
+    def get_path(res):
+        if res.resource_id not in paths:
+            paths[res.resource_id] = get_path(resources.get(res.parent_id, service)) + [res.resource_name]
+        return paths[res.resource_id]
+
+    return [(service, [])] + [(res, get_path(res)) for res in resources.values()]
+
+
+def benchmark_service(service_name, options, rand, users_cookies):
+    # type: (Str, argparse.Namespace, random.Random, Dict[Str, Any]) -> Dict[Str, JSON]
+    """
+    Measures every operation against the benchmark service with requests of random users and resources.
+    """
+    db_session = BenchmarkAdapter.session
+    service = models.Service.by_service_name(service_name, db_session=db_session)
+    make_path = SERVICE_BENCHMARKS[service.type]["path"]
+    resources = get_service_resources(service)
+    users = {name: UserService.by_user_name(name, db_session=db_session) for name in users_cookies}
+    headers = {"Cache-Control": "no-cache"} if options.no_cache else {}
+    count = options.warmup + options.iterations
+
+    def make_request(user_name, res_path):
+        return BenchmarkAdapter.mock_request(make_path(service_name, res_path), method="GET",
+                                             headers=dict(headers), cookies=dict(users_cookies[user_name]))
+
+    def check_request(request):
+        try:
+            BenchmarkAdapter.ows.check_request(request)
+        except OWSAccessForbidden:
+            pass
+
+    cases = [(rand.choice(list(users_cookies)), rand.choice(resources)) for _ in range(count)]
+    children = [res for res, _ in resources if res.parent_id is not None] or [service]
+    svc_impl = service_factory(service, BenchmarkAdapter.mock_request("/", headers=dict(headers)))
+    operations = {
+        "acl": [
+            (lambda _req: lambda: service_factory(service, _req).__acl__)(make_request(usr, path))
+            for usr, (_, path) in cases
+        ],
+        "effective_permissions": [
+            (lambda _usr, _res: lambda: svc_impl.effective_permissions(_usr, _res))(users[usr], res)
+            for usr, (res, _) in cases
+        ],
+        "find_children_by_name": [
+            (lambda _res: lambda: models.find_children_by_name(_res.resource_name, _res.parent_id, db_session))(res)
+            for res in (rand.choice(children) for _ in range(count))
+        ],
+        "check_request": [
+            (lambda _req: lambda: check_request(_req))(make_request(usr, path))
+            for usr, (_, path) in cases
+        ],
+    }
+    results = {}
+    for name in options.operations:
+        LOGGER.info("Measuring [%s] operation of service [%s]...", name, service_name)
+        results[name] = measure(operations[name], warmup=options.warmup)
+    return results
+
+
+def run_benchmarks(options):
+    # type: (argparse.Namespace) -> JSON
+    """
+    Generates the synthetic services, resources and principals, and measures every operation for each of them.
+    """
+    rand = random.Random(options.seed)
+    app = utils.get_test_magpie_app()
+    BenchmarkAdapter.app = app
+    BenchmarkAdapter.session = None
+    BenchmarkAdapter.setup_adapter()
+    admin_usr = get_constant("MAGPIE_ADMIN_USER")
+    admin_pwd = get_constant("MAGPIE_ADMIN_PASSWORD")
+    utils.check_or_try_logout_user(app)
+    _, admin_cookies = utils.check_or_try_login_user(app, admin_usr, admin_pwd, use_ui_form_submit=True)
+
+    BenchmarkAdapter.mock_request("/")  # open the database session shared by requests
+    user_names, group_names = setup_principals(app, admin_cookies, options, rand)
+    service_names = [setup_service(app, admin_cookies, svc_type, options, rand, user_names, group_names)
+                     for svc_type in options.services]
+    users_cookies = {}
+    for usr_name in user_names:
+        utils.check_or_try_logout_user(app)
+        _, users_cookies[usr_name] = utils.check_or_try_login_user(app, usr_name, BENCHMARK_PASSWORD,
+                                                                   use_ui_form_submit=True)
+    utils.check_or_try_logout_user(app)
+
+    results = {}
+    for svc_type, svc_name in zip(options.services, service_names):
+        results[svc_type] = benchmark_service(svc_name, options, rand, users_cookies)
+
+    if not options.keep:
+        _, admin_cookies = utils.check_or_try_login_user(app, admin_usr, admin_pwd, use_ui_form_submit=True)
+        for svc_name in service_names:
+            request_api(app, "DELETE", "/services/{}".format(svc_name), admin_cookies)
+        for usr_name in user_names:
+            request_api(app, "DELETE", "/users/{}".format(usr_name), admin_cookies)
+        for grp_name in group_names:
+            request_api(app, "DELETE", "/groups/{}".format(grp_name), admin_cookies)
+        utils.check_or_try_logout_user(app)
+    BenchmarkAdapter.session.close()
+    BenchmarkAdapter.session = None
+
+    parameters = {
+        name: getattr(options, name)
+        for name in ["services", "operations", "depth", "fan_out", "users", "groups", "groups_per_user", "density",
+                     "user_permissions_ratio", "iterations", "warmup", "seed", "no_cache"]
+    }
+    return {
+        "metadata": {
+            "version": __meta__.__version__,
+            "commit": get_commit(),
+            "date": datetime.datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "parameters": parameters,
+            "cache_regions": {name: dict(region) for name, region in cache_regions.items()},
+        },
+        "results": results,
+    }
+
+
+def compare_results(results, baseline, threshold=None):
+    # type: (JSON, JSON, Optional[float]) -> Tuple[List[Str], bool]
+    """
+    Compares the throughput and latency of every operation found in both results.
+
+    :returns: lines of the comparison report, and whether any 95th percentile latency regressed above the threshold.
+    """
+    lines = ["{:<16} {:<24} {:>14} {:>14} {:>9} {:>10} {:>10} {:>9}".format(
+        "service", "operation", "baseline ops/s", "ops/s", "change", "base p95", "p95", "change")]
+    regressed = False
+    for svc_type, operations in sorted(results["results"].items()):
+        for name, stats in sorted(operations.items()):
+            base_stats = baseline.get("results", {}).get(svc_type, {}).get(name)
+            if not base_stats or not base_stats.get("count") or not stats.get("count"):
+                continue
+            ops_change = (stats["throughput_ops"] - base_stats["throughput_ops"]) / base_stats["throughput_ops"] * 100
+            p95_change = (stats["p95_ms"] - base_stats["p95_ms"]) / base_stats["p95_ms"] * 100
+            if threshold is not None and p95_change > threshold:
+                regressed = True
+            lines.append("{:<16} {:<24} {:>14.1f} {:>14.1f} {:>+8.1f}% {:>10.3f} {:>10.3f} {:>+8.1f}%".format(
+                svc_type, name, base_stats["throughput_ops"], stats["throughput_ops"], ops_change,
+                base_stats["p95_ms"], stats["p95_ms"], p95_change))
+    return lines, regressed
+
+
+def make_parser():
+    # type: () -> argparse.ArgumentParser
+    parser = argparse.ArgumentParser(description="Benchmark authorization operations against synthetic resources.")
+    parser.add_argument("-s", "--services", nargs="+",
+                        choices=list(SERVICE_BENCHMARKS), default=list(SERVICE_BENCHMARKS),
+                        help="Service types for which to generate a synthetic resource tree (default: all).")
+    parser.add_argument("-O", "--operations", nargs="+", choices=BENCHMARK_OPERATIONS, default=BENCHMARK_OPERATIONS,
+                        help="Operations to measure (default: all).")
+    parser.add_argument("-d", "--depth", type=int, default=3,
+                        help="Depth of the resource tree, for services that allow nested resources "
+                             "(default: %(default)s).")
+    parser.add_argument("-f", "--fan-out", type=int, default=5, dest="fan_out",
+                        help="Amount of children resources of each service or resource (default: %(default)s).")
+    parser.add_argument("-u", "--users", type=int, default=20, help="Amount of users (default: %(default)s).")
+    parser.add_argument("-g", "--groups", type=int, default=5, help="Amount of groups (default: %(default)s).")
+    parser.add_argument("--groups-per-user", type=int, default=2, dest="groups_per_user",
+                        help="Amount of groups each user is member of (default: %(default)s).")
+    parser.add_argument("-p", "--density", type=float, default=0.1,
+                        help="Proportion of resources with an applied permission (default: %(default)s).")
+    parser.add_argument("--user-permissions-ratio", type=float, default=0.3, dest="user_permissions_ratio",
+                        help="Proportion of applied permissions given to users rather than groups "
+                             "(default: %(default)s).")
+    parser.add_argument("-n", "--iterations", type=int, default=500,
+                        help="Amount of measured calls of each operation (default: %(default)s).")
+    parser.add_argument("-w", "--warmup", type=int, default=50,
+                        help="Amount of calls of each operation before measurements (default: %(default)s).")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random generator (default: %(default)s).")
+    parser.add_argument("--no-cache", action="store_true", dest="no_cache",
+                        help="Send requests with header 'Cache-Control: no-cache' to bypass cache regions.")
+    parser.add_argument("-k", "--keep", action="store_true",
+                        help="Keep the generated services, users and groups after the benchmark.")
+    parser.add_argument("-o", "--output", help="File where to write the JSON results (default: standard output).")
+    parser.add_argument("-c", "--compare", help="JSON results of a previous benchmark to compare against.")
+    parser.add_argument("-t", "--threshold", type=float,
+                        help="Maximum increase (percent) of the 95th percentile latency of any operation compared to "
+                             "the previous results. Exits with an error status when exceeded.")
+    return parser
+
+
+def main(args=None, parser=None, namespace=None):
+    # type: (Optional[Sequence[Str]], Optional[argparse.ArgumentParser], Optional[argparse.Namespace]) -> int
+    if not parser:
+        parser = make_parser()
+    args = parser.parse_args(args=args, namespace=namespace)
+    results = run_benchmarks(args)
+    if args.output:
+        with open(args.output, "w") as out_file:
+            json.dump(results, out_file, indent=2, sort_keys=True)
+    else:
+        six.print_(json.dumps(results, indent=2, sort_keys=True))
+    if args.compare:
+        with open(args.compare) as base_file:
+            baseline = json.load(base_file)
+        lines, regressed = compare_results(results, baseline, args.threshold)
+        six.print_("\n".join(lines), file=sys.stderr)
+        if regressed:
+            six.print_("Latency regression above {}% threshold.".format(args.threshold), file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
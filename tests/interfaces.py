@@ -45,6 +45,39 @@ if TYPE_CHECKING:
 
     from magpie.typedefs import JSON, CookiesType, HeadersType, Str
 
+# maximum amount of SQL statements executed by routes, which must hold regardless of the amount of services, resources
+# and permissions (i.e.: must not grow by loading items one by one), formatted with names of test user and group, and
+# with the name and identifier of the first test service and resource respectively
+API_QUERY_BUDGETS = {
+    "/services": 10,
+    "/resources": 12,
+    "/users": 4,
+    "/users/{usr}": 5,
+    "/users/{usr}/groups": 5,
+    "/users/{usr}/services": 10,
+    "/users/{usr}/services?inherited=true&cascade=true": 10,
+    "/users/{usr}/resources": 10,
+    "/users/{usr}/resources?inherited=true&resolve=true": 10,
+    "/groups": 4,
+    "/groups/{grp}/users": 5,
+    "/groups/{grp}/services": 7,
+    "/groups/{grp}/resources": 8,
+    "/groups/{grp}": 6,
+    "/services/{svc}": 4,
+    "/services/{svc}/resources": 5,
+    "/services/{svc}/permissions": 5,
+    "/resources/{res}": 7,
+    "/resources/{res}/permissions": 6,
+    "/users/{usr}/services/{svc}/resources": 12,
+    "/users/{usr}/services/{svc}/permissions": 7,
+    "/users/{usr}/services/{svc}/permissions?inherited=true&resolve=true": 7,
+    "/users/{usr}/resources/{res}/permissions": 7,
+    "/users/{usr}/resources/{res}/permissions?inherited=true&resolve=true": 7,
+    "/groups/{grp}/services/{svc}/resources": 10,
+    "/groups/{grp}/services/{svc}/permissions": 6,
+    "/groups/{grp}/resources/{res}/permissions": 6,
+}  # type: Dict[Str, int]
+
 
 @six.add_metaclass(ABCMeta)
 class BaseTestCase(unittest.TestCase):
@@ -1414,6 +1447,41 @@ class Interface_MagpieAPI_UsersAuth(UserTestCase, BaseTestCase):
                                   headers=self.test_headers, cookies=self.test_cookies)
         utils.check_response_basic_info(resp, 403)
 
+    @runner.MAGPIE_TEST_USERS
+    @runner.MAGPIE_TEST_RESOURCES
+    @runner.MAGPIE_TEST_PERMISSIONS
+    def test_PostUserPermissionsCheck_AllowedItselfOnly(self):
+        """
+        Validate that non-admin user can check its own effective permissions, but not those of another user.
+
+        .. seealso::
+            - :meth:`Interface_MagpieAPI_AdminAuth.test_PostUserPermissionsCheck`
+        """
+        utils.warn_version(self, "batch check of user effective permissions", "3.6.0", skip=True)
+        body = utils.TestSetup.create_TestServiceResource(self)
+        info = utils.TestSetup.create_TestUserResourcePermission(self, resource_info=body)
+        res_id = info["resource_id"]
+        res_perm = PermissionSet(info["permission_name"])
+        res_perm = PermissionSet(res_perm.name, Access.ALLOW, Scope.MATCH, PermissionType.EFFECTIVE)
+        other_user = self.test_user_name + "-other"
+        self.extra_user_names.add(other_user)
+        utils.TestSetup.delete_TestUser(self, override_user_name=other_user)
+        utils.TestSetup.create_TestUser(self, override_user_name=other_user)
+        self.login_test_user()
+
+        data = {"resources": [{"resource_id": res_id}]}
+        for path_user in [self.test_user_name, get_constant("MAGPIE_LOGGED_USER")]:
+            path = "/users/{}/permissions/check".format(path_user)
+            resp = utils.test_request(self, "POST", path, json=data,
+                                      headers=self.test_headers, cookies=self.test_cookies)
+            body = utils.check_response_basic_info(resp, expected_method="POST")
+            utils.check_val_equal(body["results"][0]["resource_id"], res_id)
+            utils.check_val_is_in(res_perm.explicit_permission, body["results"][0]["permission_names"])
+        path = "/users/{}/permissions/check".format(other_user)
+        resp = utils.test_request(self, "POST", path, json=data, expect_errors=True,
+                                  headers=self.test_headers, cookies=self.test_cookies)
+        utils.check_response_basic_info(resp, 403, expected_method="POST")
+
     @runner.MAGPIE_TEST_USERS
     @runner.MAGPIE_TEST_GROUPS
     @runner.MAGPIE_TEST_REGISTER
@@ -1614,6 +1682,53 @@ class Interface_MagpieAPI_AdminAuth(AdminTestCase, BaseTestCase):
         body = utils.check_response_basic_info(resp, 401, expected_method="GET")
         utils.check_val_equal(body["code"], 401)
 
+    @runner.MAGPIE_TEST_LOCAL
+    @runner.MAGPIE_TEST_STATUS
+    def test_query_budgets(self):
+        """
+        Validate that routes respect their SQL statements budget, and that it remains constant as data grows.
+
+        .. seealso::
+            - :data:`API_QUERY_BUDGETS`
+        """
+        app_or_url = utils.get_app_or_url(self)
+        if isinstance(app_or_url, six.string_types):
+            self.skipTest("cannot count SQL statements of remote server (must test with local application)")
+        utils.TestSetup.create_TestGroup(self)
+        utils.TestSetup.create_TestUser(self)
+
+        service_names = []
+        resource_ids = []
+        route_counts = {}  # type: Dict[Str, List[int]]
+        try:
+            for size in [1, 4]:
+                while len(service_names) < size:
+                    svc_name = "{}-query-budget-{}".format(self.test_service_name, len(service_names))
+                    utils.TestSetup.delete_TestService(self, override_service_name=svc_name)
+                    body = utils.TestSetup.create_TestService(self, override_service_name=svc_name)
+                    service_names.append(svc_name)
+                    svc_id = body["service"]["resource_id"]
+                    body = utils.TestSetup.create_TestResource(self, parent_resource_id=svc_id)
+                    res_id = body["resource"]["resource_id"]
+                    resource_ids.append(res_id)
+                    for resource_id in [svc_id, res_id]:
+                        utils.TestSetup.create_TestUserResourcePermission(self, override_resource_id=resource_id)
+                        utils.TestSetup.create_TestGroupResourcePermission(self, override_resource_id=resource_id)
+                for route, budget in API_QUERY_BUDGETS.items():
+                    # per-service and per-resource routes always employ the first ones to compare the same request
+                    path = route.format(usr=self.test_user_name, grp=self.test_group_name,
+                                        svc=service_names[0], res=resource_ids[0])
+                    count = utils.check_query_budget(self, "GET", path, budget,
+                                                     headers=self.json_headers, cookies=self.cookies)
+                    route_counts.setdefault(route, []).append(count)
+        finally:
+            for svc_name in service_names:
+                utils.TestSetup.delete_TestService(self, override_service_name=svc_name)
+
+        for route, counts in route_counts.items():
+            utils.check_val_equal(counts[-1], counts[0],
+                                  msg="SQL statements of [GET {}] should not grow with data size.".format(route))
+
     @runner.MAGPIE_TEST_LOGIN
     def test_GetSession_Administrator(self):
         resp = utils.test_request(self, "GET", "/session", headers=self.json_headers, cookies=self.cookies)
@@ -2529,6 +2644,108 @@ class Interface_MagpieAPI_AdminAuth(AdminTestCase, BaseTestCase):
             perm.pop("reason", None)  # ignore post magpie-3.5 'reason'
             utils.check_val_equal(perm, perm_effective.json(), msg="Test Case #{}".format(i + 1))
 
+    @runner.MAGPIE_TEST_USERS
+    @runner.MAGPIE_TEST_RESOURCES
+    @runner.MAGPIE_TEST_PERMISSIONS
+    @runner.MAGPIE_TEST_FUNCTIONAL
+    def test_PostUserPermissionsCheck(self):
+        """
+        Validates that :term:`Effective Permissions` of many resources referenced by ID or by service-relative path
+        are resolved at once, using the closest existing parent resource when a path cannot be entirely found.
+
+        Evaluated hierarchy::
+
+            Resources               | group permissions | effective resolution
+            ========================+===================+=======================
+            Service                 | r-A-R             | r-A
+                dir1                |                   | r-A
+                    [unknown]       |                   | r-A   (from dir1)
+                    dir2            | r-D-R             | r-D
+                        dir3        |                   | r-D
+                        [missing]   |                   | r-D   (from dir2)
+        """
+        utils.warn_version(self, "batch check of user effective permissions", "3.6.0", skip=True)
+
+        utils.TestSetup.create_TestGroup(self)
+        utils.TestSetup.create_TestUser(self)  # auto-member of test-group
+        res_names = ["dir1", "dir2", "dir3"]
+        res_types = [self.test_resource_type] * len(res_names)
+        svc_id, res1_id, res2_id, res3_id = utils.TestSetup.create_TestServiceResourceTree(
+            self, override_resource_names=res_names, override_resource_types=res_types
+        )
+        perm_name = self.test_service_resource_perms[0]
+        rAR = PermissionSet(perm_name, Access.ALLOW, Scope.RECURSIVE)                           # noqa
+        rDR = PermissionSet(perm_name, Access.DENY, Scope.RECURSIVE)                            # noqa
+        rAE = PermissionSet(perm_name, Access.ALLOW, Scope.MATCH, PermissionType.EFFECTIVE)     # noqa
+        rDE = PermissionSet(perm_name, Access.DENY, Scope.MATCH, PermissionType.EFFECTIVE)      # noqa
+        utils.TestSetup.create_TestGroupResourcePermission(self, override_resource_id=svc_id, override_permission=rAR)
+        utils.TestSetup.create_TestGroupResourcePermission(self, override_resource_id=res2_id, override_permission=rDR)
+
+        svc_name = self.test_service_name
+        resources = [
+            {"resource_id": svc_id},
+            {"resource_id": res3_id},
+            {"service_name": svc_name, "resource_path": "/dir1"},
+            {"service_name": svc_name, "resource_path": "/DIR1/unknown"},
+            {"service_name": svc_name, "resource_path": "dir1/dir2/missing"},
+            {"service_name": svc_name},
+        ]
+        expected = [
+            (svc_id, True, rAE), (res3_id, True, rDE), (res1_id, True, rAE),
+            (res1_id, False, rAE), (res2_id, False, rDE), (svc_id, True, rAE),
+        ]
+        path = "/users/{}/permissions/check".format(self.test_user_name)
+        data = {"resources": resources, "permissions": [perm_name.value]}
+        resp = utils.test_request(self, "POST", path, json=data, headers=self.json_headers, cookies=self.cookies)
+        body = utils.check_response_basic_info(resp, 200, expected_method="POST")
+        utils.check_val_equal(len(body["results"]), len(resources))
+        for i, (result, (res_id, found, perm_effective)) in enumerate(zip(body["results"], expected)):
+            msg = "Test Case #{}".format(i + 1)
+            utils.check_val_equal(result["resource_id"], res_id, msg=msg)
+            utils.check_val_equal(result["resource_found"], found, msg=msg)
+            utils.check_val_equal(result["service_name"], svc_name, msg=msg)
+            utils.check_val_equal(len(result["permissions"]), 1, msg=msg)
+            perm = result["permissions"][0]
+            perm.pop("reason", None)
+            utils.check_val_equal(perm, perm_effective.json(), msg=msg)
+
+        # all applicable permissions are resolved when none are requested, as for the single resource request
+        data = {"resources": [{"resource_id": res3_id}]}
+        resp = utils.test_request(self, "POST", path, json=data, headers=self.json_headers, cookies=self.cookies)
+        body = utils.check_response_basic_info(resp, 200, expected_method="POST")
+        path = "/users/{}/resources/{}/permissions?effective=true".format(self.test_user_name, res3_id)
+        resp = utils.test_request(self, "GET", path, headers=self.json_headers, cookies=self.cookies)
+        effective = utils.check_response_basic_info(resp, 200)
+        utils.check_val_equal(body["results"][0]["permission_names"], effective["permission_names"])
+
+    @runner.MAGPIE_TEST_USERS
+    @runner.MAGPIE_TEST_RESOURCES
+    @runner.MAGPIE_TEST_PERMISSIONS
+    def test_PostUserPermissionsCheck_Invalid(self):
+        utils.warn_version(self, "batch check of user effective permissions", "3.6.0", skip=True)
+
+        utils.TestSetup.create_TestGroup(self)
+        utils.TestSetup.create_TestUser(self)
+        svc_id = utils.TestSetup.create_TestServiceResourceTree(self, resource_depth=1)[0]
+        path = "/users/{}/permissions/check".format(self.test_user_name)
+        for data in [
+            {"resources": []},
+            {"resources": {"resource_id": svc_id}},
+            {"resources": [svc_id]},
+            {"resources": [{"resource_id": str(svc_id)}]},
+            {"resources": [{"resource_id": svc_id}], "permissions": ["not-a-permission"]},
+        ]:
+            resp = utils.test_request(self, "POST", path, json=data, expect_errors=True,
+                                      headers=self.json_headers, cookies=self.cookies)
+            utils.check_response_basic_info(resp, 400, expected_method="POST")
+        for data in [
+            {"resources": [{"resource_id": svc_id}, {"resource_id": 987654321}]},
+            {"resources": [{"service_name": "unknown-service-unittest", "resource_path": "/dir"}]},
+        ]:
+            resp = utils.test_request(self, "POST", path, json=data, expect_errors=True,
+                                      headers=self.json_headers, cookies=self.cookies)
+            utils.check_response_basic_info(resp, 404, expected_method="POST")
+
     @runner.MAGPIE_TEST_USERS
     @runner.MAGPIE_TEST_RESOURCES
     @runner.MAGPIE_TEST_PERMISSIONS
@@ -4637,6 +4854,57 @@ class Interface_MagpieAPI_AdminAuth(AdminTestCase, BaseTestCase):
         svc_dict = body[self.test_service_name]
         utils.TestSetup.check_ServiceFormat(self, svc_dict)
 
+    @runner.MAGPIE_TEST_SERVICES
+    def test_GetServiceResources_DepthLimitedPages(self):
+        utils.warn_version(self, "depth-limited and paginated service resources", "3.6.0", skip=True)
+        body = utils.TestSetup.create_TestService(self)
+        info = utils.TestSetup.get_ResourceInfo(self, override_body=body)
+        res_type = self.test_resource_type
+        tree = {
+            "res-{}".format(i): {"resource_type": res_type, "children": {
+                "child": {"resource_type": res_type, "children": {
+                    "leaf": {"resource_type": res_type, "children": {}}
+                }}
+            }} for i in range(3)
+        }
+        path = "/resources/{}/children".format(info["resource_id"])
+        resp = utils.test_request(self, "POST", path, json={"resources": tree},
+                                  headers=self.json_headers, cookies=self.cookies)
+        utils.check_response_basic_info(resp, 201, expected_method="POST")
+
+        path = "/services/{svc}/resources".format(svc=self.test_service_name)
+        resp = utils.test_request(self, "GET", path, headers=self.json_headers, cookies=self.cookies)
+        body = utils.check_response_basic_info(resp, 200, expected_method="GET")
+        utils.check_val_not_in("next_cursor", body)
+        resources = body[self.test_service_name]["resources"]
+        utils.check_val_equal(len(resources), 3)
+        for res in resources.values():
+            child = list(res["children"].values())[0]
+            utils.check_val_equal(child["resource_name"], "child")
+            utils.check_val_equal(list(child["children"].values())[0]["resource_name"], "leaf")
+
+        pages = []
+        query = {"depth": 2, "limit": 2}
+        while True:
+            resp = utils.test_request(self, "GET", path, params=query, headers=self.json_headers, cookies=self.cookies)
+            body = utils.check_response_basic_info(resp, 200, expected_method="GET")
+            utils.check_val_is_in("next_cursor", body)
+            svc_dict = body[self.test_service_name]
+            utils.TestSetup.check_ServiceFormat(self, svc_dict)
+            for res in svc_dict["resources"].values():
+                child = list(res["children"].values())[0]
+                utils.check_val_equal(child["resource_name"], "child")
+                utils.check_val_equal(child["children"], {})
+            pages.append(sorted(res["resource_name"] for res in svc_dict["resources"].values()))
+            if body["next_cursor"] is None:
+                break
+            query["cursor"] = body["next_cursor"]
+        utils.check_val_equal(pages, [["res-0", "res-1"], ["res-2"]])
+
+        resp = utils.test_request(self, "GET", path, params={"depth": -1}, expect_errors=True,
+                                  headers=self.json_headers, cookies=self.cookies)
+        utils.check_response_basic_info(resp, 400, expected_method="GET")
+
     @runner.MAGPIE_TEST_SERVICES
     def test_GetServicePermissions(self):
         services_list = utils.TestSetup.get_RegisteredServicesList(self)
@@ -4965,6 +5233,93 @@ class Interface_MagpieAPI_AdminAuth(AdminTestCase, BaseTestCase):
                                   headers=self.json_headers, cookies=self.cookies)
         utils.check_response_basic_info(resp, 409, expected_method="POST")
 
+    @runner.MAGPIE_TEST_RESOURCES
+    def test_PostResourceChildren_Tree(self):
+        """
+        Test creation of a tree of children resources.
+
+        Test structure::
+
+            svc
+              res (existing)
+              tree-1
+                tree-1-1
+                  tree-1-1-1
+                tree-1-2
+              tree-2
+        """
+        utils.warn_version(self, "bulk creation of children resources tree", "3.6.0", skip=True)
+        body = utils.TestSetup.create_TestServiceResource(self)
+        info = utils.TestSetup.get_ResourceInfo(self, override_body=body, full_detail=True)
+        svc_id = info["parent_id"]
+        res_type = self.test_resource_type
+        tree = {
+            "tree-1": {"resource_type": res_type, "children": {
+                "tree-1-1": {"resource_type": res_type, "resource_display_name": "Tree 1-1", "children": {
+                    "tree-1-1-1": {"resource_type": res_type, "children": {}},
+                }},
+                "tree-1-2": {"resource_type": res_type, "children": {}},
+            }},
+            "tree-2": {"resource_type": res_type, "children": {}},
+        }
+        path = "/resources/{}/children".format(svc_id)
+        resp = utils.test_request(self, "POST", path, json={"resources": tree},
+                                  headers=self.json_headers, cookies=self.cookies)
+        body = utils.check_response_basic_info(resp, 201, expected_method="POST")
+        utils.check_val_equal(body["created_count"], 5)
+        utils.check_val_equal(body["resource"]["resource_id"], svc_id)
+
+        resp = utils.test_request(self, "GET", "/resources/{}".format(svc_id),
+                                  headers=self.json_headers, cookies=self.cookies)
+        body = utils.check_response_basic_info(resp)
+        children = body["resource"]["children"]
+        children = {child["resource_name"]: child for child in children.values()}
+        utils.check_all_equal(list(children), [self.test_resource_name, "tree-1", "tree-2"], any_order=True)
+        tree_1 = {child["resource_name"]: child for child in children["tree-1"]["children"].values()}
+        utils.check_all_equal(list(tree_1), ["tree-1-1", "tree-1-2"], any_order=True)
+        utils.check_val_equal(tree_1["tree-1-1"]["resource_display_name"], "Tree 1-1")
+        utils.check_val_equal(tree_1["tree-1-1"]["root_service_id"], svc_id)
+        tree_1_1 = list(tree_1["tree-1-1"]["children"].values())
+        utils.check_val_equal(len(tree_1_1), 1)
+        utils.check_val_equal(tree_1_1[0]["resource_name"], "tree-1-1-1")
+        utils.check_val_equal(tree_1_1[0]["parent_id"], tree_1["tree-1-1"]["resource_id"])
+
+    @runner.MAGPIE_TEST_RESOURCES
+    def test_PostResourceChildren_ConflictName(self):
+        utils.warn_version(self, "bulk creation of children resources tree", "3.6.0", skip=True)
+        body = utils.TestSetup.create_TestServiceResource(self)
+        info = utils.TestSetup.get_ResourceInfo(self, override_body=body, full_detail=True)
+        tree = {
+            "other": {"resource_type": self.test_resource_type, "children": {}},
+            self.test_resource_name: {"resource_type": self.test_resource_type, "children": {}},
+        }
+        path = "/resources/{}/children".format(info["parent_id"])
+        resp = utils.test_request(self, "POST", path, json={"resources": tree}, expect_errors=True,
+                                  headers=self.json_headers, cookies=self.cookies)
+        utils.check_response_basic_info(resp, 409, expected_method="POST")
+
+        # nothing must be created when any resource of the tree is invalid
+        resp = utils.test_request(self, "GET", "/resources/{}".format(info["parent_id"]),
+                                  headers=self.json_headers, cookies=self.cookies)
+        body = utils.check_response_basic_info(resp)
+        utils.check_val_equal(len(body["resource"]["children"]), 1)
+
+    @runner.MAGPIE_TEST_RESOURCES
+    def test_PostResourceChildren_InvalidTree(self):
+        utils.warn_version(self, "bulk creation of children resources tree", "3.6.0", skip=True)
+        body = utils.TestSetup.create_TestServiceResource(self)
+        info = utils.TestSetup.get_ResourceInfo(self, override_body=body)
+        path = "/resources/{}/children".format(info["resource_id"])
+        for tree, code in [
+            ({"child": {"resource_type": self.test_resource_type}}, 422),
+            ({"child": {"children": {}}}, 422),
+            ({"child": {"resource_type": self.test_resource_type, "children": []}}, 422),
+            ({"child": {"resource_type": "<invalid>", "children": {}}}, 403),
+        ]:
+            resp = utils.test_request(self, "POST", path, json={"resources": tree}, expect_errors=True,
+                                      headers=self.json_headers, cookies=self.cookies)
+            utils.check_response_basic_info(resp, code, expected_method="POST")
+
     @runner.MAGPIE_TEST_RESOURCES
     def test_GetResource_ResponseFormat(self):
         """
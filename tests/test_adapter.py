@@ -1,11 +1,111 @@
+import base64
+import json
+import time
+
+import mock
 import pytest
 import unittest
+from beaker.cache import cache_regions
+from requests.cookies import RequestsCookieJar, create_cookie
 
 from magpie import __meta__
+from magpie.adapter.magpieowssecurity import TOKEN_SESSION_CACHE, MagpieOWSSecurity, TokenSessionCache
 from magpie.constants import get_constant
 from tests import interfaces as ti, runner, utils
 
 
+def make_jwt(**claims):
+    payload = base64.urlsafe_b64encode(json.dumps(claims).encode("utf-8")).decode("utf-8").rstrip("=")
+    return "header.{}.signature".format(payload)
+
+
+@runner.MAGPIE_TEST_LOCAL
+@runner.MAGPIE_TEST_ADAPTER
+class TestTokenSessionCache(unittest.TestCase):
+    def setUp(self):
+        self.patch = mock.patch.dict(cache_regions, {"token": {"enabled": True, "expire": 60, "max_size": "2"}})
+        self.patch.start()
+        TOKEN_SESSION_CACHE.clear()
+        self.settings = {"magpie.url": "http://localhost:2001"}
+        self.security = MagpieOWSSecurity(self.settings)
+        self.cookie_name = get_constant("MAGPIE_COOKIE_NAME", self.settings)
+
+    def tearDown(self):
+        TOKEN_SESSION_CACHE.clear()
+        self.patch.stop()
+
+    def mock_session_response(self, cookie, user_id, expires=3600):
+        jar = RequestsCookieJar()
+        expires = int(time.time()) + expires if expires else None
+        jar.set_cookie(create_cookie(self.cookie_name, cookie, domain="localhost", expires=expires))
+        resp = mock.Mock(status_code=200)
+        resp.json.return_value = {"authenticated": True, "user": {"user_id": user_id}}
+        resp.request._cookies = jar  # noqa: W0212
+        return resp
+
+    def test_update_request_cookies_reuses_session(self):
+        token = "Bearer {}".format(make_jwt(exp=time.time() + 600))
+        resp = self.mock_session_response("cookie-1", 1)
+        with mock.patch("magpie.http_client.HTTPClientSession.get", return_value=resp) as mock_get:
+            for _ in range(3):
+                request = utils.mock_request("/ows/proxy/test", headers={"Authorization": token},
+                                             settings=self.settings)
+                self.security.update_request_cookies(request)
+                utils.check_val_equal(request.cookies.get(self.cookie_name), "cookie-1")
+            utils.check_val_equal(mock_get.call_count, 1, msg="Provider login should be requested only once.")
+
+            request = utils.mock_request("/ows/proxy/test?provider=other", headers={"Authorization": token},
+                                         settings=self.settings)
+            self.security.update_request_cookies(request)
+            utils.check_val_equal(mock_get.call_count, 2, msg="Different provider should not reuse the session.")
+
+            TOKEN_SESSION_CACHE.invalidate(user_id=1)
+            request = utils.mock_request("/ows/proxy/test", headers={"Authorization": token}, settings=self.settings)
+            self.security.update_request_cookies(request)
+            utils.check_val_equal(mock_get.call_count, 3, msg="User modification should invalidate its sessions.")
+
+    def test_update_request_cookies_opaque_token_default_expiry(self):
+        self.patch.stop()
+        self.patch = mock.patch.dict(cache_regions, {"token": {"enabled": True}})
+        self.patch.start()
+        token = "Bearer opaque-token"
+        resp = self.mock_session_response("cookie-1", 1, expires=None)
+        with mock.patch("magpie.http_client.HTTPClientSession.get", return_value=resp) as mock_get:
+            for _ in range(2):
+                request = utils.mock_request("/ows/proxy/test", headers={"Authorization": token},
+                                             settings=self.settings)
+                self.security.update_request_cookies(request)
+                utils.check_val_equal(request.cookies.get(self.cookie_name), "cookie-1")
+            utils.check_val_equal(mock_get.call_count, 1, msg="Provider login should be requested only once.")
+
+            later = time.time() + TokenSessionCache.default_expire + 1
+            with mock.patch("magpie.adapter.magpieowssecurity.time.time", return_value=later):
+                request = utils.mock_request("/ows/proxy/test", headers={"Authorization": token},
+                                             settings=self.settings)
+                self.security.update_request_cookies(request)
+            utils.check_val_equal(mock_get.call_count, 2,
+                                  msg="Session without any expiry should not be kept beyond the default delay.")
+
+    def test_cache_expiry_and_size(self):
+        token = "Bearer {}".format(make_jwt(exp=time.time() + 5))
+        utils.check_val_equal(int(TokenSessionCache.get_token_expiry(token)), int(time.time() + 5))
+        utils.check_val_equal(TokenSessionCache.get_token_expiry("Bearer opaque-token"), None)
+
+        TOKEN_SESSION_CACHE.set("key-1", "cookie-1", 1, expire_at=TokenSessionCache.get_token_expiry(token))
+        utils.check_val_equal(TOKEN_SESSION_CACHE.get("key-1"), ("cookie-1", 1))
+        with mock.patch("magpie.adapter.magpieowssecurity.time.time", return_value=time.time() + 10):
+            utils.check_val_equal(TOKEN_SESSION_CACHE.get("key-1"), None, msg="Token expiry should be respected.")
+
+        TOKEN_SESSION_CACHE.set("key-1", "cookie-1", 1)
+        TOKEN_SESSION_CACHE.set("key-2", "cookie-2", 2)
+        TOKEN_SESSION_CACHE.get("key-1")  # most recently used
+        TOKEN_SESSION_CACHE.set("key-3", "cookie-3", 3)
+        utils.check_val_equal(len(TOKEN_SESSION_CACHE), 2)
+        utils.check_val_equal(TOKEN_SESSION_CACHE.get("key-2"), None, msg="Least recently used should be removed.")
+        utils.check_val_equal(TOKEN_SESSION_CACHE.get("key-1"), ("cookie-1", 1))
+        utils.check_val_equal(TOKEN_SESSION_CACHE.get("key-3"), ("cookie-3", 3))
+
+
 @runner.MAGPIE_TEST_LOCAL
 @runner.MAGPIE_TEST_ADAPTER
 @runner.MAGPIE_TEST_FUNCTIONAL
@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_cache
+----------------------------------
+
+Tests for the caching and invalidation of resolved permissions.
+"""
+
+import json
+import time
+import unittest
+
+import mock
+import sqlalchemy as sa
+from beaker.cache import cache_regions
+
+from magpie.cache import (
+    CACHE_INVALIDATION_CHANNEL,
+    CACHE_INVALIDATION_HANDLERS,
+    CacheInvalidationListener,
+    PermissionCache,
+    ServiceRegistry,
+    add_cache_invalidation_handler,
+    notify_cache_invalidation
+)
+from magpie.db import get_engine, get_session_factory
+from magpie.permissions import Access, Permission, PermissionSet, PermissionType, Scope
+from tests import runner, utils
+
+
+@runner.MAGPIE_TEST_LOCAL
+@runner.MAGPIE_TEST_UTILS
+class TestPermissionCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = PermissionCache(region="unittest-permission")
+        self.patch = mock.patch.dict(cache_regions, {"unittest-permission": {"enabled": True, "expire": 60}})
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+
+    def set_perms(self, user_id, group_ids, resource_id, hierarchy_ids, *permissions):
+        perms = [PermissionSet(perm, Access.ALLOW, Scope.MATCH, PermissionType.EFFECTIVE) for perm in permissions]
+        self.cache.set(user_id, group_ids, resource_id, hierarchy_ids, perms, True, self.cache.version)
+
+    def test_cache_get_requires_all_permissions(self):
+        self.set_perms(1, [10], 100, [100, 50], Permission.READ)
+        perms = self.cache.get(1, 100, [Permission.READ], True)
+        utils.check_val_equal(len(perms), 1)
+        utils.check_val_equal(perms[0].name, Permission.READ)
+        utils.check_val_equal(perms[0].access, Access.ALLOW)
+        utils.check_val_equal(self.cache.get(1, 100, [Permission.READ, Permission.WRITE], True), None)
+        utils.check_val_equal(self.cache.get(1, 100, [Permission.READ], False), None)
+        utils.check_val_equal(self.cache.get(2, 100, [Permission.READ], True), None)
+
+    def test_cache_disabled(self):
+        with mock.patch.dict(cache_regions, {"unittest-permission": {"enabled": False}}):
+            self.set_perms(1, [10], 100, [100], Permission.READ)
+            utils.check_val_equal(len(self.cache), 0)
+            utils.check_val_equal(self.cache.get(1, 100, [Permission.READ], True), None)
+
+    def test_cache_expired(self):
+        self.set_perms(1, [10], 100, [100], Permission.READ)
+        with mock.patch("magpie.cache.time.time", return_value=time.time() + 120):
+            utils.check_val_equal(self.cache.get(1, 100, [Permission.READ], True), None)
+
+    def test_cache_expired_removed(self):
+        self.set_perms(1, [10], 100, [100, 50], Permission.READ)
+        with mock.patch("magpie.cache.time.time", return_value=time.time() + 120):
+            utils.check_val_equal(self.cache.get(1, 100, [Permission.READ], True), None)
+        utils.check_val_equal(len(self.cache), 0)
+        utils.check_val_equal(self.cache._by_user, {})      # noqa: W0212
+        utils.check_val_equal(self.cache._by_group, {})     # noqa: W0212
+        utils.check_val_equal(self.cache._by_resource, {})  # noqa: W0212
+
+    def test_cache_max_size_least_recently_used(self):
+        with mock.patch.dict(cache_regions, {"unittest-permission": {"enabled": True, "max_size": 2}}):
+            self.set_perms(1, [10], 100, [100], Permission.READ)
+            self.set_perms(1, [10], 200, [200], Permission.READ)
+            utils.check_val_not_equal(self.cache.get(1, 100, [Permission.READ], True), None)  # most recently used
+            self.set_perms(1, [10], 300, [300], Permission.READ)
+            utils.check_val_equal(len(self.cache), 2)
+            utils.check_val_equal(self.cache.get(1, 200, [Permission.READ], True), None)
+            utils.check_val_not_equal(self.cache.get(1, 100, [Permission.READ], True), None)
+            utils.check_val_not_equal(self.cache.get(1, 300, [Permission.READ], True), None)
+            utils.check_val_not_in(200, self.cache._by_resource)  # noqa: W0212
+
+    def test_cache_invalidate_removes_indexes(self):
+        self.set_perms(1, [10, 11], 100, [100, 50], Permission.READ)
+        self.set_perms(2, [11], 200, [200, 50], Permission.READ)
+        self.cache.invalidate(resource_id=100)
+        utils.check_val_equal(len(self.cache), 1)
+        utils.check_val_equal(list(self.cache._by_user), [2])                # noqa: W0212
+        utils.check_val_equal(list(self.cache._by_group), [11])              # noqa: W0212
+        utils.check_all_equal(list(self.cache._by_resource), [200, 50], any_order=True)  # noqa: W0212
+        self.cache.invalidate(user_id=2)
+        utils.check_val_equal(len(self.cache), 0)
+        utils.check_val_equal(self.cache._by_user, {})      # noqa: W0212
+        utils.check_val_equal(self.cache._by_group, {})     # noqa: W0212
+        utils.check_val_equal(self.cache._by_resource, {})  # noqa: W0212
+
+    def test_cache_invalidate_combined(self):
+        self.set_perms(1, [10], 100, [100, 50], Permission.READ)
+        self.set_perms(1, [10], 200, [200, 50], Permission.READ)
+        self.set_perms(2, [10], 100, [100, 50], Permission.READ)
+
+        self.cache.invalidate(user_id=1, resource_id=200)
+        utils.check_val_equal(self.cache.get(1, 200, [Permission.READ], True), None)
+        utils.check_val_not_equal(self.cache.get(1, 100, [Permission.READ], True), None)
+        utils.check_val_not_equal(self.cache.get(2, 100, [Permission.READ], True), None)
+
+        self.cache.invalidate(group_id=10, resource_id=50)  # parent resource of remaining entries
+        utils.check_val_equal(len(self.cache), 0)
+
+    def test_cache_set_ignored_after_invalidation(self):
+        version = self.cache.version
+        self.cache.invalidate(user_id=1)
+        perms = [PermissionSet(Permission.READ, Access.ALLOW, Scope.MATCH, PermissionType.EFFECTIVE)]
+        self.cache.set(1, [10], 100, [100], perms, True, version)
+        utils.check_val_equal(len(self.cache), 0)
+
+
+@runner.MAGPIE_TEST_LOCAL
+@runner.MAGPIE_TEST_UTILS
+class TestServiceRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = ServiceRegistry(region="unittest-service")
+        self.patch = mock.patch.dict(cache_regions, {"unittest-service": {"enabled": True}})
+        self.patch.start()
+        self.service = mock.Mock(resource_name="svc", url="http://localhost/svc")
+        self.loaded = ({"svc": self.service}, {"http://localhost/svc": self.service})
+
+    def tearDown(self):
+        self.patch.stop()
+
+    def test_normalize_url(self):  # noqa: R0201
+        for url in ["http://localhost/svc", "HTTP://LocalHost/svc/", "http://localhost/svc//"]:
+            utils.check_val_equal(ServiceRegistry.normalize_url(url), "http://localhost/svc")
+        utils.check_val_equal(ServiceRegistry.normalize_url("http://localhost/Svc?Query=1"),
+                              "http://localhost/Svc?Query=1")
+
+    def test_lookup_loads_once(self):
+        def load(__):
+            self.registry._indexes = self.loaded  # noqa: W0212
+            return self.loaded
+
+        with mock.patch.object(self.registry, "_load", side_effect=load) as mock_load:
+            utils.check_val_equal(self.registry.lookup(None, name="svc"), self.service)
+            utils.check_val_equal(self.registry.lookup(None, url="http://LOCALHOST/svc/"), self.service)
+            utils.check_val_equal(self.registry.lookup(None, name="other"), None)
+            utils.check_val_equal(mock_load.call_count, 1)
+
+            self.registry.invalidate(user_id=1)
+            self.registry.invalidate(group_id=1)
+            utils.check_val_equal(self.registry.lookup(None, name="svc"), self.service)
+            utils.check_val_equal(mock_load.call_count, 1, msg="Users and groups modifications should be ignored.")
+
+            self.registry.invalidate(resource_id=1)
+            utils.check_val_equal(self.registry.lookup(None, name="svc"), self.service)
+            utils.check_val_equal(mock_load.call_count, 2, msg="Resource modification should reload registry.")
+
+            self.registry._expire_at = time.time() - 1  # noqa: W0212
+            utils.check_val_equal(self.registry.lookup(None, name="svc"), self.service)
+            utils.check_val_equal(mock_load.call_count, 3, msg="Expired registry should be reloaded.")
+
+    def test_lookup_concurrent_clear(self):
+        """
+        Validate that a lookup never obtains indexes partially cleared by a concurrent invalidation.
+        """
+        clear_count = [0]
+
+        def load(__):
+            self.registry._indexes = self.loaded  # noqa: W0212
+            self.registry._expire_at = time.time() + 60  # noqa: W0212
+            return self.loaded
+
+        def clear_on_read(*_, **__):
+            # simulate an invalidation from the listener thread right after the lookup obtained the indexes
+            clear_count[0] += 1
+            self.registry.clear()
+            return 0
+
+        with mock.patch.object(self.registry, "_load", side_effect=load):
+            self.registry.lookup(None, name="svc")
+            with mock.patch("magpie.cache.time.time", side_effect=clear_on_read):
+                utils.check_val_equal(self.registry.lookup(None, url="http://localhost/svc"), self.service)
+        utils.check_val_equal(clear_count[0] > 0, True)
+
+
+@runner.MAGPIE_TEST_LOCAL
+@runner.MAGPIE_TEST_UTILS
+class TestCacheInvalidationListener(unittest.TestCase):
+    def test_listener_applies_notifications_of_other_processes(self):
+        engine = get_engine({})
+        if engine.dialect.name != "postgresql":
+            self.skipTest("Cache invalidation notifications require PostgreSQL.")
+        handler = mock.MagicMock()
+        add_cache_invalidation_handler(handler)
+        listener = CacheInvalidationListener(engine, timeout=1)
+        try:
+            listener.start()
+            utils.check_val_equal(listener.ready.wait(10), True)
+            db_session = get_session_factory(engine)()
+            # notification from the current process must be ignored since it is already applied locally
+            notify_cache_invalidation(db_session, user_id=1, resource_id=2)
+            payload = json.dumps({"origin": "unittest-host:0", "user_id": 3, "group_id": None, "resource_id": 4})
+            db_session.execute(sa.text("SELECT pg_notify(:channel, :payload)"),
+                               {"channel": CACHE_INVALIDATION_CHANNEL, "payload": payload})
+            db_session.commit()
+            db_session.close()
+            for _ in range(100):
+                if handler.call_count:
+                    break
+                time.sleep(0.1)
+            handler.assert_called_once_with(user_id=3, group_id=None, resource_id=4)
+        finally:
+            listener.stop()
+            listener.join(10)
+            CACHE_INVALIDATION_HANDLERS.remove(handler)
@@ -15,7 +15,8 @@ import mock
 # NOTE: must be imported without 'from', otherwise the interface's test cases are also executed
 import tests.interfaces as ti
 from magpie.constants import get_constant
-from magpie.utils import CONTENT_TYPE_JSON
+from magpie.metrics import METRICS
+from magpie.utils import CONTENT_TYPE_JSON, CONTENT_TYPE_PLAIN
 from tests import runner, utils
 
 
@@ -254,6 +255,36 @@ def test_response_metadata():
             utils.check_response_basic_info(resp, expected_code=code, expected_method=method)
 
 
+@runner.MAGPIE_TEST_API
+@runner.MAGPIE_TEST_LOCAL
+@runner.MAGPIE_TEST_STATUS
+def test_magpie_metrics():
+    """
+    Validate that metrics are returned and that responses report their timings only when enabled.
+    """
+    app = utils.get_test_magpie_app()
+    resp = utils.test_request(app, "GET", "/metrics", expect_errors=True, headers={"Accept": CONTENT_TYPE_JSON})
+    utils.check_val_equal(resp.status_code, 404)
+    utils.check_val_not_in("Server-Timing", resp.headers)
+
+    try:
+        app = utils.get_test_magpie_app({"magpie.metrics_enabled": True})
+        resp = utils.test_request(app, "GET", "/version", headers={"Accept": CONTENT_TYPE_JSON})
+        utils.check_response_basic_info(resp)
+        utils.check_val_is_in("sql;dur=", resp.headers["Server-Timing"])
+        utils.check_val_is_in("total;dur=", resp.headers["Server-Timing"])
+
+        for path, headers in [("/metrics?format=text", {}), ("/metrics", {"Accept": CONTENT_TYPE_PLAIN})]:
+            resp = utils.test_request(app, "GET", path, headers=headers)
+            utils.check_val_equal(resp.status_code, 200)
+            utils.check_val_equal(resp.content_type, CONTENT_TYPE_PLAIN)
+            utils.check_val_is_in("# TYPE magpie_authz_stage_seconds histogram", resp.text)
+            utils.check_val_is_in("magpie_request_sql_statements_count ", resp.text)
+    finally:
+        METRICS.configure()
+        METRICS.reset()
+
+
 if __name__ == "__main__":
     import sys
     sys.exit(unittest.main())
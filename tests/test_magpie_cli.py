@@ -8,16 +8,25 @@ test_magpie_cli
 Tests for :mod:`magpie.cli` module.
 """
 
+import datetime
 import json
 import os
+import shutil
 import subprocess
 import tempfile
+import threading
+import time
+from collections import OrderedDict
 
 import mock
 import six
+import transaction
+from six.moves.BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
 
-from magpie.cli import batch_update_users, magpie_helper_cli
+from magpie import db, models
+from magpie.cli import batch_update_users, import_resources, magpie_helper_cli, sync_resources, sync_services
 from magpie.constants import get_constant
+from magpie.db import get_db_session_from_settings
 from tests import runner, utils
 
 if six.PY2:
@@ -27,6 +36,7 @@ else:
 
 KNOWN_HELPERS = [
     "batch_update_users",
+    "import_resources",
     "register_defaults",
     "register_providers",
     "run_db_migration",
@@ -176,6 +186,72 @@ def test_magpie_batch_update_users_validate_operations_from_file():
         run_batch_update_user_command(test_app, test_users, test_args, test_args)
 
 
+@runner.MAGPIE_TEST_CLI
+@runner.MAGPIE_TEST_LOCAL
+def test_magpie_import_resources_help_via_magpie_helper():
+    out_lines = run_and_get_output("magpie_helper import_resources --help")
+    assert "usage: magpie_helper import_resources" in out_lines[0]
+    assert "Import a tree of resources under a service or resource in bulk." in out_lines[1]
+
+
+@runner.MAGPIE_TEST_CLI
+@runner.MAGPIE_TEST_LOCAL
+def test_magpie_import_resources_help_directly():
+    out_lines = run_and_get_output("magpie_import_resources --help")
+    assert "usage: magpie_import_resources" in out_lines[0]
+    assert "Import a tree of resources under a service or resource in bulk." in out_lines[1]
+
+
+@runner.MAGPIE_TEST_CLI
+@runner.MAGPIE_TEST_LOCAL
+@runner.MAGPIE_TEST_FUNCTIONAL
+def test_magpie_import_resources_from_file():
+    """
+    Validate that a tree of resources loaded from a JSON file is created under the service, and that the same tree
+    cannot be imported again due to conflicting names.
+    """
+    test_app = utils.get_test_magpie_app()
+    _, cookies = utils.check_or_try_login_user(test_app, username=get_constant("MAGPIE_ADMIN_USER"),
+                                               password=get_constant("MAGPIE_ADMIN_PASSWORD"))
+    svc_name = "unittest-import-resources"
+    utils.test_request(test_app, "DELETE", "/services/{}".format(svc_name), cookies=cookies, expect_errors=True)
+    data = {"service_name": svc_name, "service_type": "thredds", "service_url": "http://localhost/" + svc_name}
+    resp = utils.test_request(test_app, "POST", "/services", json=data, cookies=cookies)
+    body = utils.check_response_basic_info(resp, 201, expected_method="POST")
+    svc_id = body["service"]["resource_id"]
+    tree = {
+        "dir1": {"resource_type": "directory", "children": {
+            "file1.nc": {"resource_type": "file", "children": {}},
+            "file2.nc": {"resource_type": "file", "children": {}},
+        }},
+        "dir2": {"resource_type": "directory", "children": {}},
+    }
+    try:
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".json") as tmp_file:
+            tmp_file.write(json.dumps(tree))
+            tmp_file.flush()
+            result = import_resources.main([tmp_file.name, "--service", svc_name])
+            utils.check_val_equal(result, 0)
+            result = import_resources.main([tmp_file.name, "--parent-id", str(svc_id)])
+            utils.check_val_equal(result, import_resources.ERROR_EXEC, msg="conflicting resources names expected")
+            result = import_resources.main([tmp_file.name, "--service", svc_name + "-missing"])
+            utils.check_val_equal(result, import_resources.ERROR_EXEC, msg="missing service expected")
+        result = import_resources.main([tmp_file.name, "--service", svc_name])
+        utils.check_val_equal(result, import_resources.ERROR_PARAMS, msg="missing file expected")
+
+        resp = utils.test_request(test_app, "GET", "/resources/{}".format(svc_id), cookies=cookies)
+        body = utils.check_response_basic_info(resp)
+        children = body["resource"]["children"]
+        children = {child["resource_name"]: child for child in children.values()}
+        utils.check_all_equal(list(children), ["dir1", "dir2"], any_order=True)
+        utils.check_val_equal(children["dir2"]["children"], {})
+        files = {child["resource_name"]: child for child in children["dir1"]["children"].values()}
+        utils.check_all_equal(list(files), ["file1.nc", "file2.nc"], any_order=True)
+        utils.check_val_equal(all(file["resource_type"] == "file" for file in files.values()), True)
+    finally:
+        utils.test_request(test_app, "DELETE", "/services/{}".format(svc_name), cookies=cookies, expect_errors=True)
+
+
 @runner.MAGPIE_TEST_CLI
 @runner.MAGPIE_TEST_LOCAL
 def test_magpie_register_defaults_help_via_magpie_helper():
@@ -238,3 +314,461 @@ def test_magpie_sync_resources_help_directly():
     out_lines = run_and_get_output("magpie_sync_resources --help")
     assert "usage: magpie_sync_resources" in out_lines[0]
     assert "Synchronize local and remote resources based on Magpie Service sync-type" in out_lines[1]
+
+
+@runner.MAGPIE_TEST_CLI
+@runner.MAGPIE_TEST_LOCAL
+@runner.MAGPIE_TEST_FUNCTIONAL
+def test_magpie_sync_resources_concurrent_services():
+    """
+    Validate that services are synchronized concurrently, each within their own transaction, such that a failing or
+    slow service does not prevent nor delay the synchronization of other services.
+    """
+    test_app = utils.get_test_magpie_app()
+    _, cookies = utils.check_or_try_login_user(test_app, username=get_constant("MAGPIE_ADMIN_USER"),
+                                               password=get_constant("MAGPIE_ADMIN_PASSWORD"))
+    svc_names = ["unittest-sync-concurrent-{}".format(name) for name in ["valid", "error", "slow"]]
+    services = {}
+    for svc_name in svc_names:
+        utils.test_request(test_app, "DELETE", "/services/{}".format(svc_name), cookies=cookies, expect_errors=True)
+        data = {"service_name": svc_name, "service_type": "thredds", "service_url": "http://localhost/" + svc_name}
+        resp = utils.test_request(test_app, "POST", "/services", json=data, cookies=cookies)
+        body = utils.check_response_basic_info(resp, 201, expected_method="POST")
+        services[svc_name] = sync_resources.SyncServiceInfo(body["service"]["resource_id"], svc_name,
+                                                            data["service_url"], "thredds")
+
+    def get_remote_resources(service):
+        time.sleep(0.5)
+        if service.resource_name == svc_names[1]:
+            raise ValueError("remote service error")
+        if service.resource_name == svc_names[2]:
+            time.sleep(5)
+        return {service.resource_name: {"children": {"dir": {"children": {}, "resource_type": "directory"}},
+                                        "resource_type": "directory"}}
+
+    try:
+        with mock.patch("magpie.cli.sync_resources._get_remote_resources", side_effect=get_remote_resources):
+            start = time.time()
+            results = sync_resources.fetch_services(list(services.values()), settings=test_app.app.registry.settings,
+                                                    workers=3, timeout=2)
+            duration = time.time() - start
+        utils.check_val_equal(duration < 4, True, msg="services should be fetched concurrently and slow one abandoned")
+        utils.check_val_equal(results[services[svc_names[0]].resource_id], None)
+        utils.check_val_type(results[services[svc_names[1]].resource_id], ValueError)
+        utils.check_val_type(results[services[svc_names[2]].resource_id], RuntimeError)
+
+        session = get_db_session_from_settings(test_app.app.registry)
+        for svc_name, expected in zip(svc_names, [["dir"], [], []]):
+            svc_id = services[svc_name].resource_id
+            sync_info = models.RemoteResourcesSyncInfo.by_service_id(svc_id, session)
+            remote = session.query(models.RemoteResource).filter(models.RemoteResource.service_id == svc_id,
+                                                                 models.RemoteResource.parent_id.isnot(None))
+            utils.check_val_equal(sync_info is not None and sync_info.last_sync is not None, bool(expected))
+            utils.check_all_equal([res.resource_name for res in remote], expected)
+        session.close()
+    finally:
+        for svc_name in svc_names:
+            utils.test_request(test_app, "DELETE", "/services/{}".format(svc_name), cookies=cookies,
+                               expect_errors=True)
+
+
+@runner.MAGPIE_TEST_CLI
+@runner.MAGPIE_TEST_LOCAL
+def test_magpie_sync_resources_write_after_timeout():
+    """
+    Validate that a service that reached its timeout while its remote resources are written is waited for without
+    polling the completed services until its write is reported.
+    """
+    test_app = utils.get_test_magpie_app()
+    service = sync_resources.SyncServiceInfo(1, "unittest-sync-write-timeout", "http://localhost/thredds", "thredds")
+    remote_resources = {service.resource_name: {"children": {}, "resource_type": "directory"}}
+    polls = []
+
+    class CountingQueue(sync_resources.queue.Queue):
+        def get(self, *args, **kwargs):
+            polls.append(kwargs.get("timeout"))
+            return super(CountingQueue, self).get(*args, **kwargs)
+
+    def write_remote_resources(*_, **__):
+        time.sleep(1.5)
+
+    with mock.patch("magpie.cli.sync_resources._get_remote_resources", return_value=remote_resources), \
+            mock.patch("magpie.cli.sync_resources._write_remote_resources", side_effect=write_remote_resources), \
+            mock.patch("magpie.cli.sync_resources.queue.Queue", CountingQueue):
+        results = sync_resources.fetch_services([service], settings=test_app.app.registry.settings,
+                                                workers=1, timeout=1.0)
+    utils.check_val_equal(results, {service.resource_id: None}, msg="written service should not be abandoned")
+    utils.check_val_equal(len(polls) < 10, True,
+                          msg="completed services should not be polled repeatedly while writing ({})".format(len(polls)))
+
+
+@runner.MAGPIE_TEST_CLI
+@runner.MAGPIE_TEST_LOCAL
+def test_magpie_sync_resources_preserve_ids():
+    """
+    Validate that synchronization only applies differences of remote resources such that those that remain on the
+    remote server, including renamed ones, preserve their ID.
+    """
+    test_app = utils.get_test_magpie_app()
+    _, cookies = utils.check_or_try_login_user(test_app, username=get_constant("MAGPIE_ADMIN_USER"),
+                                               password=get_constant("MAGPIE_ADMIN_PASSWORD"))
+    svc_name = "unittest-sync-preserve-ids"
+    utils.test_request(test_app, "DELETE", "/services/{}".format(svc_name), cookies=cookies, expect_errors=True)
+    data = {"service_name": svc_name, "service_type": "thredds", "service_url": "http://localhost/" + svc_name}
+    resp = utils.test_request(test_app, "POST", "/services", json=data, cookies=cookies)
+    body = utils.check_response_basic_info(resp, 201, expected_method="POST")
+    service = sync_resources.SyncServiceInfo(body["service"]["resource_id"], svc_name, data["service_url"], "thredds")
+
+    def resource(children=None, display_name=None, resource_type="directory"):
+        res = {"children": children or {}, "resource_type": resource_type}
+        if display_name:
+            res["resource_display_name"] = display_name
+        return res
+
+    def sync(children):
+        remote_resources = {svc_name: resource(children)}
+        with mock.patch("magpie.cli.sync_resources._get_remote_resources", return_value=remote_resources):
+            results = sync_resources.fetch_services([service], settings=test_app.app.registry.settings, workers=2)
+        utils.check_val_equal(results[service.resource_id], None)
+        session = get_db_session_from_settings(test_app.app.registry)
+        sync_info = models.RemoteResourcesSyncInfo.by_service_id(service.resource_id, session)
+        records = session.query(models.RemoteResource).filter(models.RemoteResource.service_id == service.resource_id)
+        records = {res.resource_id: res for res in records}
+        paths = {}
+        for res in records.values():
+            path, parent = [res.resource_name], res
+            while parent.parent_id is not None:
+                parent = records[parent.parent_id]
+                path.insert(0, parent.resource_name)
+            paths["/".join(path)] = (res.resource_id, res.resource_display_name, res.ordering)
+        main_id = sync_info.remote_resource_id
+        session.close()
+        return main_id, paths
+
+    try:
+        main_id, before = sync({
+            "dir1": resource({"file1.nc": resource(resource_type="file"), "file2.nc": resource(resource_type="file")}),
+            "dir2": resource({"sub": resource()}),
+            "file4.nc": resource(resource_type="file"),
+            "dir5": resource(display_name="Data"),
+        })
+        utils.check_all_equal(list(before), [svc_name, svc_name + "/dir1", svc_name + "/dir1/file1.nc",
+                                             svc_name + "/dir1/file2.nc", svc_name + "/dir2", svc_name + "/dir2/sub",
+                                             svc_name + "/file4.nc", svc_name + "/dir5"],
+                              any_order=True)
+        main_id_after, after = sync({
+            "dir1": resource({"file1.nc": resource(resource_type="file", display_name="File 1"),
+                              "file3.nc": resource(resource_type="file")}),
+            "dir3": resource({"sub": resource()}),
+            "dir6": resource(display_name="Data"),
+            "dir4": resource(),
+        })
+        utils.check_val_equal(main_id_after, main_id)
+        utils.check_all_equal(list(after), [svc_name, svc_name + "/dir1", svc_name + "/dir1/file1.nc",
+                                            svc_name + "/dir1/file3.nc", svc_name + "/dir3", svc_name + "/dir3/sub",
+                                            svc_name + "/dir6", svc_name + "/dir4"],
+                              any_order=True)
+        for path in [svc_name, svc_name + "/dir1", svc_name + "/dir1/file1.nc"]:
+            utils.check_val_equal(after[path][0], before[path][0], msg="ID of unchanged path should be preserved")
+        for path, renamed in [("/dir1/file3.nc", "/dir1/file2.nc"),  # same type and position
+                              ("/dir3", "/dir2"),  # same type and position
+                              ("/dir3/sub", "/dir2/sub"),  # unchanged under renamed parent
+                              ("/dir6", "/dir5")]:  # same type and display name
+            utils.check_val_equal(after[svc_name + path][0], before[svc_name + renamed][0],
+                                  msg="ID of renamed path should be preserved")
+        utils.check_val_not_in(after[svc_name + "/dir4"][0], [res[0] for res in before.values()],
+                               msg="Resource of another type at the same position should not be considered renamed")
+        utils.check_val_equal(after[svc_name + "/dir1/file1.nc"][1], "File 1")
+        utils.check_val_equal(after[svc_name + "/dir1/file3.nc"][2], 1)
+        utils.check_val_equal(after[svc_name + "/dir4"][2], 3)
+    finally:
+        utils.test_request(test_app, "DELETE", "/services/{}".format(svc_name), cookies=cookies, expect_errors=True)
+
+
+@runner.MAGPIE_TEST_CLI
+@runner.MAGPIE_TEST_LOCAL
+def test_magpie_sync_resources_bulk_insert():
+    """
+    Validate that a large tree of remote resources is inserted with a number of statements that does not depend on its
+    amount of nested levels and resources, while preserving references to parents and ordering of siblings.
+    """
+    test_app = utils.get_test_magpie_app()
+    _, cookies = utils.check_or_try_login_user(test_app, username=get_constant("MAGPIE_ADMIN_USER"),
+                                               password=get_constant("MAGPIE_ADMIN_PASSWORD"))
+    svc_name = "unittest-sync-bulk-insert"
+    utils.test_request(test_app, "DELETE", "/services/{}".format(svc_name), cookies=cookies, expect_errors=True)
+    data = {"service_name": svc_name, "service_type": "thredds", "service_url": "http://localhost/" + svc_name}
+    resp = utils.test_request(test_app, "POST", "/services", json=data, cookies=cookies)
+    body = utils.check_response_basic_info(resp, 201, expected_method="POST")
+    svc_id = body["service"]["resource_id"]
+
+    def make_tree(depth):
+        if not depth:
+            return {}
+        return OrderedDict([("res{}".format(i), {"children": make_tree(depth - 1), "resource_type": "directory"})
+                            for i in range(4)])
+
+    remote_resources = {svc_name: {"children": make_tree(6), "resource_type": "directory"}}  # 5460 resources
+    session_factory = test_app.app.registry["db_session_factory"]
+    try:
+        with mock.patch("magpie.cli.sync_resources.SYNC_INSERT_BATCH", 2000):
+            transaction_manager = transaction.TransactionManager()
+            with transaction_manager:
+                session = db.get_tm_session(session_factory, transaction_manager)
+                sync_resources._ensure_sync_info_exists(svc_id, session)  # noqa: W0212
+                with utils.QueryCounter(test_app) as queries:
+                    sync_resources._update_db(remote_resources, svc_id, session)  # noqa: W0212
+        # stored resources, allocation and insert of 3 batches, sync info update
+        utils.check_val_equal(queries.count <= 10, True,
+                              msg="Too many statements ({}) to insert resources:\n{}".format(
+                                  queries.count, "\n".join(queries.statements)))
+
+        session = get_db_session_from_settings(test_app.app.registry)
+        records = session.query(models.RemoteResource).filter(models.RemoteResource.service_id == svc_id).all()
+        children = {res.resource_id: [] for res in records}
+        for res in records:
+            if res.parent_id is not None:
+                children[res.parent_id].append(res)
+                utils.check_val_equal(res.ordering, int(res.resource_name[3:]))
+        root = [res for res in records if res.parent_id is None]
+        utils.check_val_equal(len(records), 1 + sum(4 ** depth for depth in range(1, 7)))
+        utils.check_all_equal([res.resource_name for res in root], [svc_name])
+        level = root
+        for _ in range(6):
+            utils.check_val_equal(all(len(children[res.resource_id]) == 4 for res in level), True)
+            level = [child for res in level for child in children[res.resource_id]]
+        utils.check_val_equal(all(not children[res.resource_id] for res in level), True)
+        session.close()
+    finally:
+        utils.test_request(test_app, "DELETE", "/services/{}".format(svc_name), cookies=cookies, expect_errors=True)
+
+
+@runner.MAGPIE_TEST_CLI
+def test_magpie_sync_resources_scheduler_delays():
+    """
+    Validate the interval of services obtained from their configuration and the randomized backoff after failures.
+    """
+    utils.check_val_equal(sync_resources.get_sync_interval(None), sync_resources.SYNC_INTERVAL)
+    utils.check_val_equal(sync_resources.get_sync_interval({"sync_interval": "invalid"}), sync_resources.SYNC_INTERVAL)
+    utils.check_val_equal(sync_resources.get_sync_interval({"sync_interval": -1}), sync_resources.SYNC_INTERVAL)
+    utils.check_val_equal(sync_resources.get_sync_interval({"sync_interval": 600}), 600)
+    with mock.patch("magpie.cli.sync_resources.SYNC_BACKOFF_MIN", 10), \
+            mock.patch("magpie.cli.sync_resources.SYNC_BACKOFF_MAX", 100):
+        for failures, delay in [(1, 10), (2, 20), (3, 40), (4, 80), (5, 100), (100, 100)]:
+            for _ in range(10):
+                backoff = sync_resources.get_sync_backoff(failures, 1000)
+                utils.check_val_equal(delay / 2.0 <= backoff <= delay, True,
+                                      msg="backoff {} of failure {} out of bounds".format(backoff, failures))
+        utils.check_val_equal(sync_resources.get_sync_backoff(10, 30) <= 30, True,
+                              msg="backoff should not exceed the service interval")
+
+
+@runner.MAGPIE_TEST_CLI
+@runner.MAGPIE_TEST_LOCAL
+def test_magpie_sync_resources_scheduler():
+    """
+    Validate that the scheduler synchronizes only due services, plans them according to their interval, and defers
+    services of a failing host with backoff.
+    """
+    test_app = utils.get_test_magpie_app()
+    settings = test_app.app.registry.settings
+    _, cookies = utils.check_or_try_login_user(test_app, username=get_constant("MAGPIE_ADMIN_USER"),
+                                               password=get_constant("MAGPIE_ADMIN_PASSWORD"))
+    svc_urls = OrderedDict([
+        ("unittest-sync-scheduler-valid", "http://host-valid.localhost/thredds"),
+        ("unittest-sync-scheduler-error", "http://host-error.localhost/thredds"),
+        ("unittest-sync-scheduler-same-host", "http://host-error.localhost/other"),
+        ("unittest-sync-scheduler-new", "http://host-error.localhost/new"),
+    ])
+    svc_names = list(svc_urls)
+    svc_ids = {}
+
+    def create_service(svc_name, configuration=None):
+        utils.test_request(test_app, "DELETE", "/services/{}".format(svc_name), cookies=cookies, expect_errors=True)
+        data = {"service_name": svc_name, "service_type": "thredds", "service_url": svc_urls[svc_name]}
+        if configuration:
+            data["configuration"] = configuration
+        resp = utils.test_request(test_app, "POST", "/services", json=data, cookies=cookies)
+        body = utils.check_response_basic_info(resp, 201, expected_method="POST")
+        svc_ids[svc_name] = body["service"]["resource_id"]
+
+    synced = []
+
+    def get_remote_resources(service):
+        synced.append(service.resource_name)
+        if service.resource_name == svc_names[1]:
+            raise ValueError("remote service error")
+        return {service.resource_name: {"children": {}, "resource_type": "directory"}}
+
+    def get_sync_info(svc_name):
+        session = get_db_session_from_settings(settings)
+        sync_info = models.RemoteResourcesSyncInfo.by_service_id(svc_ids[svc_name], session)
+        info = (sync_info.last_sync, sync_info.next_sync, sync_info.sync_failures) if sync_info else None
+        session.close()
+        return info
+
+    def check_next_sync(svc_name, failures, min_delay, max_delay):
+        info = get_sync_info(svc_name)
+        utils.check_val_not_equal(info, None, msg="service {} should have been scheduled".format(svc_name))
+        utils.check_val_equal(info[2], failures)
+        delay = (info[1] - datetime.datetime.now()).total_seconds()
+        utils.check_val_equal(min_delay - 5 <= delay <= max_delay, True,
+                              msg="invalid delay {}s of service {}".format(delay, svc_name))
+
+    try:
+        create_service(svc_names[0], {"sync_interval": 600})
+        create_service(svc_names[1])
+        create_service(svc_names[2])
+        with mock.patch("magpie.cli.sync_resources._get_remote_resources", side_effect=get_remote_resources):
+            delay = sync_resources.schedule_services(settings=settings, workers=2)
+            utils.check_all_equal([name for name in synced if name in svc_names], svc_names[:3], any_order=True)
+            utils.check_val_equal(delay is not None and delay <= sync_resources.SYNC_BACKOFF_MIN, True)
+            check_next_sync(svc_names[0], 0, 600, 600)
+            check_next_sync(svc_names[1], 1, sync_resources.SYNC_BACKOFF_MIN / 2.0, sync_resources.SYNC_BACKOFF_MIN)
+            check_next_sync(svc_names[2], 0, sync_resources.SYNC_INTERVAL, sync_resources.SYNC_INTERVAL)
+
+            # new service is due, but its host is in backoff
+            create_service(svc_names[3])
+            del synced[:]
+            sync_resources.schedule_services(settings=settings, workers=2)
+            utils.check_val_equal([name for name in synced if name in svc_names], [])
+            utils.check_val_equal(get_sync_info(svc_names[3]), None)
+
+            # once backoff expires, failing service is retried with longer backoff and deferred service is processed
+            session = get_db_session_from_settings(settings)
+            with transaction.manager:
+                sync_info = models.RemoteResourcesSyncInfo.by_service_id(svc_ids[svc_names[1]], session)
+                sync_info.next_sync = datetime.datetime.now() - datetime.timedelta(seconds=1)
+            session.close()
+            del synced[:]
+            sync_resources.schedule_services(settings=settings, workers=2)
+            utils.check_all_equal([name for name in synced if name in svc_names], svc_names[1::2], any_order=True)
+            check_next_sync(svc_names[1], 2, sync_resources.SYNC_BACKOFF_MIN, sync_resources.SYNC_BACKOFF_MIN * 2)
+            check_next_sync(svc_names[3], 0, sync_resources.SYNC_INTERVAL, sync_resources.SYNC_INTERVAL)
+            utils.check_val_not_equal(get_sync_info(svc_names[3])[0], None)
+    finally:
+        for svc_name in svc_names:
+            utils.test_request(test_app, "DELETE", "/services/{}".format(svc_name), cookies=cookies,
+                               expect_errors=True)
+
+
+@runner.MAGPIE_TEST_CLI
+@runner.MAGPIE_TEST_LOCAL
+def test_magpie_sync_resources_scheduler_reuses_engine():
+    """
+    Validate that iterations of the scheduler share the same database engine instead of creating one each time.
+    """
+    test_app = utils.get_test_magpie_app()
+    stop_event = threading.Event()
+    factories = []
+
+    def schedule_services(*_, **kwargs):
+        factories.append(kwargs.get("session_factory"))
+        if len(factories) >= 2:
+            stop_event.set()
+        return 0
+
+    with mock.patch("magpie.cli.sync_resources.schedule_services", side_effect=schedule_services), \
+            mock.patch("magpie.cli.sync_resources.db.get_engine", wraps=db.get_engine) as mock_engine:
+        sync_resources.run_scheduler(settings=test_app.app.registry.settings, stop_event=stop_event)
+    utils.check_val_equal(len(factories), 2)
+    utils.check_val_not_equal(factories[0], None)
+    utils.check_val_equal(factories[0] is factories[1], True, msg="session factory should be shared by iterations")
+    utils.check_val_equal(mock_engine.call_count, 1, msg="engine should be created only once")
+
+
+THREDDS_CATALOG_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<catalog xmlns="http://www.unidata.ucar.edu/namespaces/thredds/InvCatalog/v1.0"
+         xmlns:xlink="http://www.w3.org/1999/xlink" name="{name}">
+  <service name="all" serviceType="Compound" base="">
+    <service name="HTTPServer" serviceType="HTTPServer" base="/thredds/fileServer/"/>
+  </service>
+  <dataset name="{name}" ID="{id}">
+    {items}
+  </dataset>
+</catalog>
+"""
+
+
+@runner.MAGPIE_TEST_CLI
+@runner.MAGPIE_TEST_LOCAL
+def test_magpie_sync_thredds_catalog_cache():
+    """
+    Validate that THREDDS catalogs are crawled concurrently and revalidated with their cached ``ETag`` such that
+    subtrees of unmodified catalogs are reused without requesting their references again.
+    """
+    ref = "<catalogRef xlink:href=\"{0}/catalog.xml\" xlink:title=\"{0}\" ID=\"{0}\" name=\"\"/>"
+    file = "<dataset name=\"{0}\" ID=\"{1}/{0}\" urlPath=\"{1}/{0}\"><serviceName>all</serviceName></dataset>"
+    catalogs = {
+        "/thredds/catalog.xml": THREDDS_CATALOG_XML.format(
+            name="root", id="root", items=ref.format("dir1") + ref.format("dir2")),
+        "/thredds/dir1/catalog.xml": THREDDS_CATALOG_XML.format(
+            name="dir1", id="data/dir1", items=file.format("file1.nc", "dir1") + file.format("file2.nc", "dir1")),
+        "/thredds/dir2/catalog.xml": THREDDS_CATALOG_XML.format(
+            name="dir2", id="data/dir2", items=ref.format("sub")),
+        "/thredds/dir2/sub/catalog.xml": THREDDS_CATALOG_XML.format(
+            name="sub", id="data/dir2/sub", items=file.format("file3.nc", "dir2/sub")),
+    }
+    etags = {path: "\"v1\"" for path in catalogs}
+    requests_status = []
+
+    class CatalogHandler(BaseHTTPRequestHandler):
+        def do_GET(self):  # noqa: N802
+            etag = etags.get(self.path)
+            if etag is None:
+                self.send_response(404)
+                self.end_headers()
+                return
+            if self.headers.get("If-None-Match") == etag:
+                requests_status.append((self.path, 304))
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            requests_status.append((self.path, 200))
+            body = catalogs[self.path].encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/xml")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *_, **__):
+            pass
+
+    server = HTTPServer(("localhost", 0), CatalogHandler)
+    server_thread = threading.Thread(target=server.serve_forever)
+    server_thread.daemon = True
+    server_thread.start()
+    cache_dir = tempfile.mkdtemp()
+    try:
+        url = "http://localhost:{}/thredds/catalog.xml".format(server.server_address[1])
+        with mock.patch("magpie.constants.MAGPIE_SYNC_CACHE_DIR", cache_dir):
+            sync_service = sync_services.SyncServiceThredds("unittest-thredds", url)
+            resources = sync_service.get_resources()
+            expected = {"unittest-thredds": {"resource_type": "directory", "children": {
+                "dir1": {"resource_type": "directory", "children": {}},
+                "dir2": {"resource_type": "directory", "children": {
+                    "sub": {"resource_type": "directory", "children": {}}}}}}}
+            utils.check_val_equal(resources, expected)
+            utils.check_all_equal(requests_status, [(path, 200) for path in catalogs], any_order=True)
+
+            # unchanged root catalog reuses the complete cached tree
+            del requests_status[:]
+            resources = sync_services.SyncServiceThredds("unittest-thredds", url).get_resources()
+            utils.check_val_equal(resources, expected)
+            utils.check_val_equal(requests_status, [("/thredds/catalog.xml", 304)])
+
+            # modified root catalog crawls references again, which are revalidated with their own cached entry
+            del requests_status[:]
+            etags["/thredds/catalog.xml"] = "\"v2\""
+            resources = sync_services.SyncServiceThredds("unittest-thredds", url).get_resources()
+            utils.check_val_equal(resources, expected)
+            utils.check_all_equal(requests_status, [("/thredds/catalog.xml", 200),
+                                                    ("/thredds/dir1/catalog.xml", 304),
+                                                    ("/thredds/dir2/catalog.xml", 304)], any_order=True)
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(cache_dir, ignore_errors=True)
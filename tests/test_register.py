@@ -11,14 +11,18 @@ import copy
 import json
 import shutil
 import tempfile
+import threading
 import unittest
 from typing import TYPE_CHECKING
 
 import mock
+from six.moves.BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from six.moves.socketserver import ThreadingMixIn
 
 from magpie import register
 from magpie.constants import get_constant
 from magpie.db import get_db_session_from_settings
+from magpie.http_client import get_http_client
 from magpie.models import Directory
 from magpie.permissions import Access, Permission, PermissionSet, Scope
 from magpie.services import ServiceAPI, ServiceTHREDDS
@@ -30,6 +34,10 @@ if TYPE_CHECKING:
     from magpie.typedefs import JSON  # noqa: F401
 
 
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    pass
+
+
 @runner.MAGPIE_TEST_LOCAL
 @runner.MAGPIE_TEST_REGISTER
 class TestRegister(interfaces.BaseAdminTestCase, unittest.TestCase):
@@ -473,3 +481,54 @@ def test_register_make_config_registry():
     config = [{"key": "val1", "name": "name1"}, {"key": "val2"}]
     mapped = {"val1": {"key": "val1", "name": "name1"}, "val2": {"key": "val2"}}
     assert register._make_config_registry(config, "key") == mapped
+
+
+@runner.MAGPIE_TEST_LOCAL
+@runner.MAGPIE_TEST_REGISTER
+def test_register_request_cookies_file():
+    """
+    Validate that registration requests share kept-alive connections and retain login cookies only in provided file.
+    """
+    clients = set()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _reply(self, code, headers=None):
+            clients.add(self.client_address)
+            self.send_response(code)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def do_POST(self):  # noqa: N802
+            self.rfile.read(int(self.headers["Content-Length"]))
+            self._reply(302, {"Location": "/home", "Set-Cookie": "auth=secret; Path=/"})
+
+        def do_GET(self):  # noqa: N802
+            authorized = self.path == "/home" or "auth=secret" in (self.headers.get("Cookie") or "")
+            self._reply(200 if authorized else 401)
+
+        def log_message(self, *_, **__):
+            pass
+
+    server = ThreadingHTTPServer(("localhost", 0), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    url = "http://localhost:{}".format(server.server_address[1])
+    try:
+        with tempfile.NamedTemporaryFile() as cookies_file:
+            result = register._request_cookies_file(url + "/login", cookie_jar=cookies_file.name,  # noqa
+                                                    form_params="user=test&password=test")
+            assert result == (0, 200)
+            result = register._request_cookies_file(url + "/check", cookies=cookies_file.name)  # noqa
+            assert result == (0, 200)
+        assert len(clients) == 1, "all requests should have reused the same pooled connection"
+        assert get_http_client().get(url + "/check").status_code == 401, "shared client must not retain cookies"
+    finally:
+        get_http_client().close()
+        server.shutdown()
+        server.server_close()
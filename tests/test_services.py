@@ -9,18 +9,43 @@ Tests for the services implementations magpie.
 """
 import inspect
 import itertools
+import json
 import unittest
 from tempfile import NamedTemporaryFile
 from typing import TYPE_CHECKING
 
+import mock
 import pytest
 import six
+from beaker.cache import cache_regions
+from pyramid.response import Response
+from ziggurat_foundations.models.services.group import GroupService
+from ziggurat_foundations.models.services.resource import ResourceService
+from ziggurat_foundations.models.services.user import UserService
 
-from magpie import __meta__, models, owsrequest
+from magpie import __meta__, models, owsrequest, security
 from magpie.adapter.magpieowssecurity import OWSAccessForbidden
+from magpie.api.management.resource import resource_utils as ru
+from magpie.cache import PERMISSION_CACHE, PUBLIC_ACCESS_INDEX, SERVICE_REGISTRY, invalidate_local_caches
 from magpie.constants import get_constant
+from magpie.db import get_db_session_from_settings
+from magpie.metrics import (
+    AUTHZ_DECISIONS,
+    AUTHZ_STAGE_SECONDS,
+    METRICS,
+    REQUEST_SQL_STATEMENTS,
+    get_request_metrics,
+    register_sql_metrics
+)
 from magpie.permissions import Access, Permission, PermissionSet, Scope
-from magpie.services import ServiceAccess, ServiceAPI, ServiceGeoserverWMS, ServiceTHREDDS, ServiceWPS
+from magpie.services import (
+    SERVICE_ROUTER_CACHE,
+    ServiceAccess,
+    ServiceAPI,
+    ServiceGeoserverWMS,
+    ServiceTHREDDS,
+    ServiceWPS
+)
 from magpie.utils import CONTENT_TYPE_FORM, CONTENT_TYPE_JSON, CONTENT_TYPE_PLAIN
 from tests import interfaces as ti, runner, utils
 
@@ -104,6 +129,37 @@ class TestOWSParser(unittest.TestCase):
         assert isinstance(parser, owsrequest.MultiFormatParser)
         assert parser.params["test"] == "something"
 
+    def test_ows_post_parser_stops_early(self):  # noqa: R0201
+        """
+        Validate that XML body parameters are retrieved without reading the remaining contents of the document.
+
+        The body is purposely truncated within large inputs that should never be reached, which would otherwise raise
+        a parsing error if the complete document was loaded.
+        """
+        body = inspect.cleandoc("""
+            <?xml version="1.0" encoding="UTF-8"?>
+            <wps:Execute service="WPS" version="1.0.0"
+                         xmlns:wps="http://www.opengis.net/wps/1.0.0" xmlns:ows="http://www.opengis.net/ows/1.1">
+                <!-- comment -->
+                <ows:Identifier>
+                    test-process
+                </ows:Identifier>
+                <wps:DataInputs>
+                    <wps:Input>
+                        <ows:Identifier>data</ows:Identifier>
+                        <wps:Data>
+                            <wps:ComplexData>
+        """) + "<item>data</item>" * 100000
+        parser = make_ows_parser(method="POST", content_type=None, params=None, body=six.ensure_binary(body))
+        assert isinstance(parser, owsrequest.OWSPostParser)
+        params = parser.parse(["service", "request", "version", "identifier"])
+        assert params == {"service": "wps", "request": "execute", "version": "1.0.0", "identifier": "test-process"}
+
+        body = six.ensure_binary('<GetCapabilities service="WPS"><Other/></GetCapabilities>')  # pylint: disable=C4001
+        parser = make_ows_parser(method="POST", content_type=None, params=None, body=body)
+        params = parser.parse(["service", "request", "identifier"])
+        assert params == {"service": "wps", "request": "getcapabilities", "identifier": None}
+
 
 @runner.MAGPIE_TEST_LOCAL
 @runner.MAGPIE_TEST_SERVICES
@@ -282,6 +338,604 @@ class TestServices(ti.SetupMagpieAdapter, ti.UserTestCase, ti.BaseTestCase):
                 msg = "Using [{}, {}]".format(method, path)
                 utils.check_no_raise(lambda: self.ows.check_request(req), msg=msg)
 
+    @utils.mock_get_settings
+    def test_effective_permissions_hierarchy_per_level(self):
+        """
+        Validate that the hierarchy and permissions obtained with a single query are resolved identically to the
+        per-level retrieval of permissions and parent resources, on a multi-level tree with user and group permissions.
+        """
+        svc_name = "unittest-service-api-hierarchy"
+        utils.TestSetup.delete_TestService(self, override_service_name=svc_name)
+        body = utils.TestSetup.create_TestService(self, override_service_name=svc_name,
+                                                  override_service_type=ServiceAPI.service_type)
+        info = utils.TestSetup.get_ResourceInfo(self, override_body=body)
+        svc_id = info["resource_id"]
+        route = models.Route.resource_type_name
+        res1_id, _ = self.make_resource(route, svc_id, index=1)
+        res2_id, _ = self.make_resource(route, res1_id, index=2)
+        res3_id, _ = self.make_resource(route, res2_id, index=3)
+        res4_id, _ = self.make_resource(route, res3_id, index=4)
+        res5_id, _ = self.make_resource(route, res2_id, index=5)
+        rAR = PermissionSet(Permission.READ, Access.ALLOW, Scope.RECURSIVE)     # noqa
+        rDR = PermissionSet(Permission.READ, Access.DENY, Scope.RECURSIVE)      # noqa
+        rAM = PermissionSet(Permission.READ, Access.ALLOW, Scope.MATCH)         # noqa
+        wAR = PermissionSet(Permission.WRITE, Access.ALLOW, Scope.RECURSIVE)    # noqa
+        wDR = PermissionSet(Permission.WRITE, Access.DENY, Scope.RECURSIVE)     # noqa
+        wDM = PermissionSet(Permission.WRITE, Access.DENY, Scope.MATCH)         # noqa
+        for res_id, perm, is_user in [
+            (svc_id, wDM, True), (svc_id, wAR, False),
+            (res1_id, rAR, False),
+            (res2_id, rDR, True), (res2_id, wDR, False),
+            (res3_id, wAR, True), (res3_id, rAM, False),
+            (res4_id, wDM, True), (res4_id, rAR, False),
+            (res5_id, rAM, True),
+        ]:
+            create_perm = (utils.TestSetup.create_TestUserResourcePermission if is_user else
+                           utils.TestSetup.create_TestGroupResourcePermission)
+            create_perm(self, override_resource_id=res_id, override_permission=perm)
+
+        request = self.mock_request("/")
+        service = models.Service.by_service_name(svc_name, db_session=request.db)
+        user = UserService.by_user_name(self.test_user_name, db_session=request.db)
+        service_impl = ServiceAPI(service, request)
+
+        def get_per_level_hierarchy(_resource):
+            hierarchy = []
+            while _resource is not None:
+                hierarchy.append((_resource, ResourceService.perms_for_user(_resource, user, db_session=request.db)))
+                _parent_id = _resource.parent_id
+                _resource = ResourceService.by_resource_id(_parent_id, db_session=request.db) if _parent_id else None
+            return hierarchy
+
+        def get_perms_keys(_perms):
+            return sorted((_perm.perm_name, _perm.type, _perm.group.id if _perm.group else None, _perm.owner)
+                          for _perm in _perms)
+
+        for res_id in [svc_id, res1_id, res2_id, res3_id, res4_id, res5_id]:
+            resource = ResourceService.by_resource_id(res_id, db_session=request.db)
+            expect_hierarchy = get_per_level_hierarchy(resource)
+            hierarchy = models.get_resource_hierarchy_permissions(resource, user, request.db)
+            msg = "Resource [{}]".format(res_id)
+            utils.check_val_equal([res.resource_id for res, _ in hierarchy],
+                                  [res.resource_id for res, _ in expect_hierarchy], msg=msg)
+            for (_, perms), (_, expect_perms) in zip(hierarchy, expect_hierarchy):
+                utils.check_val_equal(get_perms_keys(perms), get_perms_keys(expect_perms), msg=msg)
+            permissions = service_impl.allowed_permissions(resource)
+            for allow_match in [True, False]:
+                expect_perms, _ = service_impl._resolve_hierarchy_permissions(  # noqa: W0212
+                    expect_hierarchy, permissions, allow_match
+                )
+                perms = service_impl.effective_permissions(user, resource, allow_match=allow_match)
+                utils.check_all_equal([perm.json() for perm in perms], [perm.json() for perm in expect_perms],
+                                      any_order=True, msg=msg)
+
+        # explicit resolutions to ensure that both user and group permissions were considered at various levels
+        expected = {
+            svc_id: {Permission.READ: Access.DENY, Permission.WRITE: Access.DENY},    # default, user > group
+            res2_id: {Permission.READ: Access.DENY, Permission.WRITE: Access.DENY},   # user deny, closest group deny
+            res3_id: {Permission.READ: Access.DENY, Permission.WRITE: Access.ALLOW},  # parent user > group, user
+            res4_id: {Permission.READ: Access.DENY, Permission.WRITE: Access.DENY},   # parent user > group, user match
+            res5_id: {Permission.READ: Access.ALLOW, Permission.WRITE: Access.DENY},  # user match, parent group deny
+        }
+        for res_id, expect_access in expected.items():
+            resource = ResourceService.by_resource_id(res_id, db_session=request.db)
+            perms = service_impl.effective_permissions(user, resource)
+            utils.check_val_equal({perm.name: perm.access for perm in perms}, expect_access,
+                                  msg="Resource [{}]".format(res_id))
+
+    @utils.mock_get_settings
+    def test_resource_ancestors(self):
+        """
+        Validate that ancestors references are maintained when creating and deleting resources.
+        """
+        svc_name = "unittest-service-api-ancestors"
+        utils.TestSetup.delete_TestService(self, override_service_name=svc_name)
+        body = utils.TestSetup.create_TestService(self, override_service_name=svc_name,
+                                                  override_service_type=ServiceAPI.service_type)
+        info = utils.TestSetup.get_ResourceInfo(self, override_body=body)
+        svc_id = info["resource_id"]
+        res1_id, res1_name = self.make_resource(models.Route.resource_type_name, svc_id, index=1)
+        res2_id, res2_name = self.make_resource(models.Route.resource_type_name, res1_id, index=2)
+
+        db_session = self.mock_request("/").db
+        ancestors = models.get_resource_ancestors(res2_id, db_session=db_session)
+        utils.check_val_equal([res.resource_id for res in ancestors], [res2_id, res1_id, svc_id])
+        ancestors = models.get_resource_ancestors(res2_id, db_session=db_session, include_self=False)
+        utils.check_val_equal([res.resource_id for res in ancestors], [res1_id, svc_id])
+        path = ru.get_resource_path(res2_id, db_session=db_session)
+        utils.check_val_equal(path, "/{}/{}/{}".format(svc_name, res1_name, res2_name))
+
+        utils.TestSetup.delete_TestResource(self, resource_id=res1_id)
+        references = db_session.query(models.ResourceAncestor).filter(
+            models.ResourceAncestor.resource_id.in_([res1_id, res2_id])).count()
+        utils.check_val_equal(references, 0)
+
+    @utils.mock_get_settings
+    def test_resource_tree_ancestors(self):
+        """
+        Validate that ancestors references and ordering are set for resources created in bulk within a tree.
+        """
+        svc_name = "unittest-service-api-tree"
+        utils.TestSetup.delete_TestService(self, override_service_name=svc_name)
+        body = utils.TestSetup.create_TestService(self, override_service_name=svc_name,
+                                                  override_service_type=ServiceAPI.service_type)
+        info = utils.TestSetup.get_ResourceInfo(self, override_body=body)
+        svc_id = info["resource_id"]
+        res1_id, res1_name = self.make_resource(models.Route.resource_type_name, svc_id, index=1)
+        route = models.Route.resource_type_name
+        tree = {"a": {"resource_type": route, "children": {"b": {"resource_type": route, "children": {}}}},
+                "c": {"resource_type": route, "children": {}}}
+        path = "/resources/{}/children".format(res1_id)
+        resp = utils.test_request(self, "POST", path, json={"resources": tree},
+                                  headers=self.json_headers, cookies=self.cookies)
+        utils.check_response_basic_info(resp, 201, expected_method="POST")
+
+        db_session = self.mock_request("/").db
+        children = db_session.query(models.Resource).filter(models.Resource.parent_id == res1_id)
+        children = {child.resource_name: child for child in children}
+        utils.check_all_equal(list(children), ["a", "c"], any_order=True)
+        utils.check_all_equal([children["a"].ordering, children["c"].ordering], [1, 2], any_order=True)
+        res_b = models.find_children_by_name("b", children["a"].resource_id, db_session=db_session)
+        utils.check_val_equal(res_b.ordering, 1)
+        utils.check_val_equal(res_b.root_service_id, svc_id)
+        ancestors = models.get_resource_ancestors(res_b.resource_id, db_session=db_session, include_self=False)
+        utils.check_val_equal([res.resource_id for res in ancestors], [children["a"].resource_id, res1_id, svc_id])
+        path = ru.get_resource_path(res_b.resource_id, db_session=db_session)
+        utils.check_val_equal(path, "/{}/{}/a/b".format(svc_name, res1_name))
+
+    @utils.mock_get_settings
+    def test_find_children_by_path(self):
+        """
+        Validate resolution of nested resources by path parts with a single recursive query.
+
+        Full and partial matches of the path must be returned up to the closest existing resource. When case-insensitive
+        name conflicts occur between siblings, the one with the highest ordering must be selected, consistently with
+        :func:`magpie.models.find_children_by_name`, and the path must be resolved under that branch only.
+        """
+        svc_name = "unittest-service-api-find-path"
+        utils.TestSetup.delete_TestService(self, override_service_name=svc_name)
+        body = utils.TestSetup.create_TestService(self, override_service_name=svc_name,
+                                                  override_service_type=ServiceAPI.service_type)
+        info = utils.TestSetup.get_ResourceInfo(self, override_body=body)
+        svc_id = info["resource_id"]
+        route = models.Route.resource_type_name
+        dir1_id, _ = self.make_resource(route, svc_id, resource_name_prefix="dir1")
+        dir2_id, _ = self.make_resource(route, dir1_id, resource_name_prefix="dir2")
+        file_id, _ = self.make_resource(route, dir2_id, resource_name_prefix="file.nc")
+        lower_id, _ = self.make_resource(route, svc_id, resource_name_prefix="conflict")
+        upper_id, _ = self.make_resource(route, svc_id, resource_name_prefix="CONFLICT")
+        lower_sub_id, _ = self.make_resource(route, lower_id, resource_name_prefix="sub")
+        upper_sub_id, _ = self.make_resource(route, upper_id, resource_name_prefix="sub")
+        lower_only_id, _ = self.make_resource(route, lower_id, resource_name_prefix="lower-only")
+        db_session = self.mock_request("/").db
+
+        def find_ids(_path_parts):
+            return [res.resource_id for res in models.find_children_by_path(_path_parts, svc_id, db_session)]
+
+        utils.check_val_equal(find_ids([]), [])
+        utils.check_val_equal(find_ids(["dir1", "dir2", "file.nc"]), [dir1_id, dir2_id, file_id])
+        utils.check_val_equal(find_ids(["DIR1", "Dir2", "FILE.nc"]), [dir1_id, dir2_id, file_id])
+        utils.check_val_equal(find_ids(["dir1", "dir2"]), [dir1_id, dir2_id])
+        utils.check_val_equal(find_ids(["dir1", "dir2", "missing", "file.nc"]), [dir1_id, dir2_id])
+        utils.check_val_equal(find_ids(["dir1", "missing", "file.nc"]), [dir1_id])
+        utils.check_val_equal(find_ids(["missing", "dir1"]), [])
+        utils.check_val_equal(find_ids(["dir2"]), [], msg="only direct children of the parent must be matched")
+
+        orderings = {res.resource_id: res.ordering for res in db_session.query(models.Resource).filter(
+            models.Resource.resource_id.in_([lower_id, upper_id]))}
+        utils.check_val_equal(orderings[upper_id] > orderings[lower_id], True)
+        conflict = models.find_children_by_name("Conflict", svc_id, db_session=db_session)
+        utils.check_val_equal(conflict.resource_id, upper_id)
+        for name in ["conflict", "CONFLICT", "Conflict"]:
+            utils.check_val_equal(find_ids([name]), [upper_id])
+            utils.check_val_equal(find_ids([name, "sub"]), [upper_id, upper_sub_id])
+            utils.check_val_equal(find_ids([name, "lower-only"]), [upper_id],
+                                  msg="children of other conflicting branches must not be matched")
+        utils.check_val_not_in(lower_sub_id, find_ids(["conflict", "sub"]))
+        utils.check_val_not_in(lower_only_id, find_ids(["conflict", "lower-only"]))
+
+    @utils.mock_get_settings
+    def test_effective_permissions_cache_invalidation(self):
+        """
+        Validate that cached effective permissions are reused until a modification of applied permissions occurs.
+        """
+        svc_name = "unittest-service-api-cache"
+        svc_type = ServiceAPI.service_type
+        res_name = "sub"
+        res_kw = {"override_resource_name": res_name, "override_resource_type": models.Route.resource_type_name}
+        utils.TestSetup.delete_TestService(self, override_service_name=svc_name)
+        body = utils.TestSetup.create_TestService(self, override_service_name=svc_name, override_service_type=svc_type)
+        info = utils.TestSetup.get_ResourceInfo(self, override_body=body)
+        svc_id = info["resource_id"]
+        body = utils.TestSetup.create_TestResource(self, parent_resource_id=svc_id, **res_kw)
+        info = utils.TestSetup.get_ResourceInfo(self, override_body=body)
+        res_id = info["resource_id"]
+        rAR = PermissionSet(Permission.READ, Access.ALLOW, Scope.RECURSIVE)  # noqa
+        rDM = PermissionSet(Permission.READ, Access.DENY, Scope.MATCH)      # noqa
+        utils.TestSetup.create_TestGroupResourcePermission(self, override_resource_id=svc_id, override_permission=rAR)
+
+        path = "/ows/proxy/{}/{}".format(svc_name, res_name)
+        msg = "Using [GET, {}]".format(path)
+        with mock.patch.dict(cache_regions, {"permission": {"enabled": True, "expire": 3600}}):
+            PERMISSION_CACHE.clear()
+            self.login_test_user()
+            req = self.mock_request(path, method="GET")
+            utils.check_no_raise(lambda: self.ows.check_request(req), msg=msg)
+            utils.check_val_not_equal(len(PERMISSION_CACHE), 0)
+
+            # resolved permissions must be reused without any database lookup of the hierarchy
+            with mock.patch("magpie.models.get_resource_hierarchy_permissions", side_effect=AssertionError):
+                req = self.mock_request(path, method="GET")
+                utils.check_no_raise(lambda: self.ows.check_request(req), msg=msg)
+
+            self.login_admin()
+            utils.TestSetup.create_TestUserResourcePermission(self, override_resource_id=res_id,
+                                                              override_permission=rDM)
+            self.login_test_user()
+            req = self.mock_request(path, method="GET")
+            utils.check_raises(lambda: self.ows.check_request(req), OWSAccessForbidden, msg=msg)
+
+            self.login_admin()
+            utils.TestSetup.delete_TestUserResourcePermission(self, override_resource_id=res_id,
+                                                              override_permission=rDM)
+            self.login_test_user()
+            req = self.mock_request(path, method="GET")
+            utils.check_no_raise(lambda: self.ows.check_request(req), msg=msg)
+        PERMISSION_CACHE.clear()
+
+    @utils.mock_get_settings
+    def test_service_registry(self):
+        """
+        Validate that proxied requests resolve their service from the registry until a service gets modified.
+        """
+        utils.warn_version(self, "service registry", "3.6.0", skip=True)
+        svc_name = "unittest-service-api-registry"
+        utils.TestSetup.delete_TestService(self, override_service_name=svc_name)
+        body = utils.TestSetup.create_TestService(self, override_service_name=svc_name,
+                                                  override_service_type=ServiceAPI.service_type)
+        info = utils.TestSetup.get_ResourceInfo(self, override_body=body)
+        rAR = PermissionSet(Permission.READ, Access.ALLOW, Scope.RECURSIVE)  # noqa
+        utils.TestSetup.create_TestGroupResourcePermission(self, override_resource_id=info["resource_id"],
+                                                           override_permission=rAR)
+        path = "/ows/proxy/{}".format(svc_name)
+        with mock.patch.dict(cache_regions, {"service": {"enabled": True}}):
+            SERVICE_REGISTRY.clear()
+            req = self.mock_request(path, method="GET")
+            service = SERVICE_REGISTRY.lookup(req.db, url="HTTP://LocalHost:9000/{}/".format(svc_name))
+            utils.check_val_not_equal(service, None, msg="Service should be found by normalized URL.")
+            utils.check_val_equal(service.resource_name, svc_name)
+            utils.check_val_equal(SERVICE_REGISTRY.lookup(req.db, name="unittest-service-unknown"), None)
+
+            self.login_test_user()
+            with mock.patch("magpie.models.Service.by_service_name", side_effect=AssertionError("no query expected")):
+                with mock.patch.object(SERVICE_REGISTRY, "_load", side_effect=AssertionError("no reload expected")):
+                    for _ in range(2):
+                        req = self.mock_request(path, method="GET")
+                        utils.check_no_raise(lambda: self.ows.check_request(req), msg="Using [GET, {}]".format(path))
+
+            self.login_admin()
+            new_url = "http://localhost:9000/{}/updated".format(svc_name)
+            resp = utils.test_request(self, "PATCH", "/services/{}".format(svc_name), json={"service_url": new_url},
+                                      headers=self.json_headers, cookies=self.cookies)
+            utils.check_response_basic_info(resp, 200, expected_method="PATCH")
+            req = self.mock_request(path, method="GET")
+            service = SERVICE_REGISTRY.lookup(req.db, name=svc_name)
+            utils.check_val_equal(service.url, new_url, msg="Service registry should be reloaded after update.")
+        SERVICE_REGISTRY.clear()
+
+    @utils.mock_get_settings
+    def test_batch_effective_permissions(self):
+        """
+        Validate that effective permissions of many resources resolved at once are equivalent to individual resolution.
+
+        Resources are referenced both by ID and by path relative to the service, including missing ones for which the
+        closest existing parent must be employed.
+        """
+        svc_name = "unittest-service-api-batch"
+        utils.TestSetup.delete_TestService(self, override_service_name=svc_name)
+        body = utils.TestSetup.create_TestService(self, override_service_name=svc_name,
+                                                  override_service_type=ServiceAPI.service_type)
+        info = utils.TestSetup.get_ResourceInfo(self, override_body=body)
+        svc_id = info["resource_id"]
+        route = models.Route.resource_type_name
+        res1_id, res1_name = self.make_resource(route, svc_id, index=1)
+        res2_id, res2_name = self.make_resource(route, res1_id, index=2)
+        res3_id, res3_name = self.make_resource(route, svc_id, index=3)
+        rAR = PermissionSet(Permission.READ, Access.ALLOW, Scope.RECURSIVE)  # noqa
+        rDR = PermissionSet(Permission.READ, Access.DENY, Scope.RECURSIVE)   # noqa
+        wAM = PermissionSet(Permission.WRITE, Access.ALLOW, Scope.MATCH)     # noqa
+        utils.TestSetup.create_TestGroupResourcePermission(self, override_resource_id=svc_id, override_permission=rAR)
+        utils.TestSetup.create_TestUserResourcePermission(self, override_resource_id=res1_id, override_permission=rDR)
+        utils.TestSetup.create_TestUserResourcePermission(self, override_resource_id=res2_id, override_permission=wAM)
+
+        request = self.mock_request("/")
+        service = models.Service.by_service_name(svc_name, db_session=request.db)
+        user = UserService.by_user_name(self.test_user_name, db_session=request.db)
+        service_impl = ServiceAPI(service, request)
+        paths = [
+            "/{}/{}".format(res1_name, res2_name),
+            "/{}/{}/missing".format(res1_name.upper(), res2_name),
+            res3_name,
+            "/missing/{}".format(res3_name),
+            "",
+        ]
+        expect_paths = [(res2_id, True), (res2_id, False), (res3_id, True), (svc_id, False), (svc_id, True)]
+        found_paths = service_impl.resolve_resource_paths(paths)
+        utils.check_val_equal([(res.resource_id, found) for res, found in found_paths], expect_paths)
+
+        resources = [ResourceService.by_resource_id(res_id, db_session=request.db)
+                     for res_id in [svc_id, res1_id, res2_id, res3_id]]
+        targets = resources + found_paths
+        with mock.patch("magpie.models.get_resource_hierarchy_permissions", side_effect=AssertionError):
+            results = service_impl.batch_effective_permissions(user, targets)
+        utils.check_val_equal(len(results), len(targets))
+        for i, (target, result) in enumerate(zip(targets, results)):
+            resource, allow_match = target if isinstance(target, tuple) else (target, True)
+            expected = service_impl.effective_permissions(user, resource, allow_match=allow_match)
+            utils.check_all_equal([perm.json() for perm in result], [perm.json() for perm in expected],
+                                  any_order=True, msg="Test Case #{}".format(i + 1))
+
+    @utils.mock_get_settings
+    def test_identity_context_shared(self):
+        """
+        Validate that the request identity is resolved only once across access control factories and services.
+        """
+        svc_name = "unittest-service-api-identity"
+        utils.TestSetup.delete_TestService(self, override_service_name=svc_name)
+        utils.TestSetup.create_TestService(self, override_service_name=svc_name,
+                                           override_service_type=ServiceAPI.service_type)
+        request = self.mock_request("/")
+        user = UserService.by_user_name(self.test_user_name, db_session=request.db)
+        request.user = user
+        service = models.Service.by_service_name(svc_name, db_session=request.db)
+        service_impl = ServiceAPI(service, request)
+
+        with mock.patch("magpie.security.GroupService.by_group_name",
+                        wraps=security.GroupService.by_group_name) as by_group_name:
+            with mock.patch("magpie.security.UserService.permissions",
+                            wraps=security.UserService.permissions) as user_permissions:
+                for _ in range(3):
+                    utils.check_val_not_equal(len(models.RootFactory(request).__acl__), 0)
+                    utils.check_val_equal(service_impl.user_requested(), user)
+                    service_impl.effective_permissions(user, service)
+        utils.check_val_equal(by_group_name.call_count, 0, msg="Special groups should be resolved from registry.")
+        utils.check_val_equal(user_permissions.call_count, 1, msg="User permissions should be fetched only once.")
+        identity = request.identity_context
+        utils.check_val_equal(identity.user_id, user.id)
+        utils.check_val_equal(identity.group_ids, frozenset(grp.id for grp in user.groups))
+        utils.check_val_equal(identity.is_admin, False)
+
+    @utils.mock_get_settings
+    def test_special_principals_registry(self):
+        """
+        Validate that special users and groups resolved at startup are refreshed only when one of them is invalidated.
+        """
+        request = self.mock_request("/")
+        principals = security.get_special_principals(request.registry)
+        utils.check_val_not_equal(principals, None, msg="Special principals should be registered at startup.")
+        admin_group = GroupService.by_group_name(self.grp, db_session=request.db)
+        anonymous_user = UserService.by_user_name(get_constant("MAGPIE_ANONYMOUS_USER"), db_session=request.db)
+        ids = principals.resolve(request.db)
+        utils.check_val_equal(ids["admin_group_id"], admin_group.id)
+        utils.check_val_equal(ids["anonymous_user_id"], anonymous_user.id)
+        utils.check_val_equal(request.identity_context.anonymous_user, anonymous_user)
+
+        with mock.patch.object(principals, "refresh", wraps=principals.refresh) as refresh:
+            invalidate_local_caches(group_id=-1)
+            invalidate_local_caches(user_id=-1, resource_id=1)
+            principals.resolve(request.db)
+            utils.check_val_equal(refresh.call_count, 0, msg="Unrelated modifications should not refresh principals.")
+            invalidate_local_caches(group_id=admin_group.id)
+            principals.resolve(request.db)
+            principals.resolve(request.db)
+            utils.check_val_equal(refresh.call_count, 1, msg="Special group modification should refresh principals.")
+        utils.check_val_equal(principals.resolve(request.db), ids)
+
+    @utils.mock_get_settings
+    def test_public_access_index(self):
+        """
+        Validate that anonymous permissions are resolved from the public access index and refreshed on modifications.
+        """
+        utils.warn_version(self, "public access index", "3.6.0", skip=True)
+        svc_name = "unittest-service-api-public"
+        anonymous = get_constant("MAGPIE_ANONYMOUS_GROUP")
+        route = models.Route.resource_type_name
+        utils.TestSetup.delete_TestService(self, override_service_name=svc_name)
+        body = utils.TestSetup.create_TestService(self, override_service_name=svc_name,
+                                                  override_service_type=ServiceAPI.service_type)
+        svc_id = utils.TestSetup.get_ResourceInfo(self, override_body=body)["resource_id"]
+        pub_id, _ = self.make_resource(route, svc_id, resource_name_prefix="pub")
+        sub_id, _ = self.make_resource(route, pub_id, resource_name_prefix="sub")
+        priv_id, _ = self.make_resource(route, svc_id, resource_name_prefix="priv")
+        rAR = PermissionSet(Permission.READ, Access.ALLOW, Scope.RECURSIVE)  # noqa
+        rDM = PermissionSet(Permission.READ, Access.DENY, Scope.MATCH)      # noqa
+        for res_id, perm in [(pub_id, rAR), (sub_id, rDM)]:
+            utils.TestSetup.create_TestGroupResourcePermission(self, override_resource_id=res_id,
+                                                               override_permission=perm,
+                                                               override_group_name=anonymous)
+
+        def anonymous_check(_path):
+            _req = super(TestServices, self).mock_request("/ows/proxy/{}/{}".format(svc_name, _path), method="GET")
+            return lambda: self.ows.check_request(_req)
+
+        def anonymous_permissions(_res_id, _allow_match, _no_cache=False):
+            _headers = {"Cache-Control": "no-cache"} if _no_cache else None
+            _req = super(TestServices, self).mock_request("/", headers=_headers)
+            _user = _req.identity_context.anonymous_user
+            _svc = models.Service.by_service_name(svc_name, db_session=_req.db)
+            _res = ResourceService.by_resource_id(_res_id, db_session=_req.db)
+            _perms = ServiceAPI(_svc, _req).effective_permissions(_user, _res, [Permission.READ], _allow_match)
+            return [perm.json() for perm in _perms]
+
+        with mock.patch.dict(cache_regions, {"public": {"enabled": True}}):
+            PUBLIC_ACCESS_INDEX.clear()
+            for res_id, allow_match in [(pub_id, True), (sub_id, True), (sub_id, False)]:
+                expected = anonymous_permissions(res_id, allow_match, _no_cache=True)
+                with mock.patch("magpie.models.get_resource_hierarchy_permissions", side_effect=AssertionError):
+                    utils.check_val_equal(anonymous_permissions(res_id, allow_match), expected)
+
+            with mock.patch("magpie.models.get_resource_hierarchy_permissions", side_effect=AssertionError):
+                utils.check_no_raise(anonymous_check("pub"))
+                utils.check_no_raise(anonymous_check("pub/sub/unknown"))
+                utils.check_raises(anonymous_check("pub/sub"), OWSAccessForbidden)
+            utils.check_raises(anonymous_check("priv"), OWSAccessForbidden)
+
+            # permission added on another branch must be indexed without reloading the complete index
+            with mock.patch("magpie.cache.PublicAccessIndex._load_ancestors",
+                            wraps=PUBLIC_ACCESS_INDEX._load_ancestors) as load_ancestors:  # noqa: W0212
+                utils.TestSetup.create_TestGroupResourcePermission(self, override_resource_id=priv_id,
+                                                                   override_permission=rAR,
+                                                                   override_group_name=anonymous)
+                with mock.patch("magpie.models.get_resource_hierarchy_permissions", side_effect=AssertionError):
+                    utils.check_no_raise(anonymous_check("priv"))
+            utils.check_val_equal(load_ancestors.call_count, 1)
+            utils.check_val_equal(load_ancestors.call_args[1].get("branch_id"), priv_id)
+        PUBLIC_ACCESS_INDEX.clear()
+
+    @utils.mock_get_settings
+    def test_check_request_metrics(self):
+        """
+        Validate that authorization stages and SQL statements of a request are measured and reported when enabled.
+        """
+        svc_name = "unittest-service-metrics"
+        utils.TestSetup.delete_TestService(self, override_service_name=svc_name)
+        body = utils.TestSetup.create_TestService(self, override_service_name=svc_name,
+                                                  override_service_type=ServiceAPI.service_type)
+        svc_id = utils.TestSetup.get_ResourceInfo(self, override_body=body)["resource_id"]
+        body = utils.TestSetup.create_TestResource(self, parent_resource_id=svc_id, override_resource_name="res",
+                                                   override_resource_type=models.Route.resource_type_name)
+        res_id = utils.TestSetup.get_ResourceInfo(self, override_body=body)["resource_id"]
+        rAR = PermissionSet(Permission.READ, Access.ALLOW, Scope.RECURSIVE)  # noqa
+        utils.TestSetup.create_TestUserResourcePermission(self, override_resource_id=res_id, override_permission=rAR)
+        self.login_test_user()
+
+        METRICS.reset()
+        with mock.patch.object(METRICS, "enabled", True), mock.patch.object(METRICS, "server_timing", True):
+            req = self.mock_request("/ows/proxy/{}/res".format(svc_name), method="GET")
+            register_sql_metrics(req.db.get_bind())
+            utils.check_no_raise(lambda: self.ows.check_request(req))
+            req_metrics = get_request_metrics(req)
+            stages = ["service_lookup", "request_parsing", "authorization", "resource_resolution",
+                      "permission_query", "permission_resolution"]
+            utils.check_all_equal(list(req_metrics.stages), stages, any_order=True)
+            utils.check_val_equal(req_metrics.descriptions["acl_cache"], "disabled")
+            utils.check_val_not_equal(req_metrics.sql_statements, 0)
+
+            response = Response()
+            req._process_response_callbacks(response)  # noqa  # pylint: disable=W0212
+            timing = response.headers["Server-Timing"]
+            for stage in stages + ["sql", "total"]:
+                utils.check_val_is_in("{};dur=".format(stage), timing)
+            utils.check_val_is_in('acl_cache;desc="disabled"', timing)
+
+            req = self.mock_request("/ows/proxy/{}".format(svc_name), method="GET")
+            utils.check_raises(lambda: self.ows.check_request(req), OWSAccessForbidden)
+            req._process_finished_callbacks()  # noqa  # pylint: disable=W0212
+
+        utils.check_val_equal(AUTHZ_DECISIONS.get(ServiceAPI.service_type, "allowed"), 1)
+        utils.check_val_equal(AUTHZ_DECISIONS.get(ServiceAPI.service_type, "denied"), 1)
+        utils.check_val_equal(AUTHZ_STAGE_SECONDS.count("service_lookup"), 2)
+        utils.check_val_equal(REQUEST_SQL_STATEMENTS.count(), 2)
+        text = METRICS.render()
+        utils.check_val_is_in('magpie_authz_decisions_total{service_type="api",result="allowed"} 1', text)
+        utils.check_val_is_in('magpie_authz_stage_seconds_count{stage="service_lookup"} 2', text)
+        utils.check_val_is_in('magpie_authz_stage_seconds_bucket{stage="service_lookup",le="+Inf"} 2', text)
+        utils.check_val_is_in("magpie_request_sql_statements_count 2", text)
+
+        # measurements are not applied when disabled
+        req = self.mock_request("/ows/proxy/{}/res".format(svc_name), method="GET")
+        utils.check_no_raise(lambda: self.ows.check_request(req))
+        utils.check_val_equal(get_request_metrics(req), None)
+        utils.check_val_equal(AUTHZ_STAGE_SECONDS.count("service_lookup"), 2)
+        METRICS.reset()
+
+    @utils.mock_get_settings
+    def test_effective_permissions_matrix(self):
+        """
+        Validate that the effective permissions matrix of a service resolves the same permissions as obtained for each
+        user and resource individually, and that it is stored and exported once computed.
+        """
+        utils.warn_version(self, "effective permissions matrix", "3.6.0", skip=True)
+        svc_name = "unittest-service-api-matrix"
+        anonymous = get_constant("MAGPIE_ANONYMOUS_GROUP")
+        route = models.Route.resource_type_name
+        utils.TestSetup.delete_TestService(self, override_service_name=svc_name)
+        body = utils.TestSetup.create_TestService(self, override_service_name=svc_name,
+                                                  override_service_type=ServiceAPI.service_type)
+        svc_id = utils.TestSetup.get_ResourceInfo(self, override_body=body)["resource_id"]
+        res1_id, _ = self.make_resource(route, svc_id, index=1)
+        res2_id, _ = self.make_resource(route, res1_id, index=2)
+        res3_id, _ = self.make_resource(route, res2_id, index=3)
+        res4_id, _ = self.make_resource(route, svc_id, index=4)
+        rAR = PermissionSet(Permission.READ, Access.ALLOW, Scope.RECURSIVE)     # noqa
+        rDR = PermissionSet(Permission.READ, Access.DENY, Scope.RECURSIVE)      # noqa
+        wAR = PermissionSet(Permission.WRITE, Access.ALLOW, Scope.RECURSIVE)    # noqa
+        wDM = PermissionSet(Permission.WRITE, Access.DENY, Scope.MATCH)         # noqa
+        utils.TestSetup.create_TestUserResourcePermission(self, override_resource_id=svc_id, override_permission=wDM)
+        utils.TestSetup.create_TestGroupResourcePermission(self, override_resource_id=svc_id, override_permission=wAR)
+        utils.TestSetup.create_TestGroupResourcePermission(self, override_resource_id=res1_id, override_permission=rAR)
+        utils.TestSetup.create_TestUserResourcePermission(self, override_resource_id=res2_id, override_permission=rDR)
+        utils.TestSetup.create_TestGroupResourcePermission(self, override_resource_id=res4_id, override_permission=rAR,
+                                                           override_group_name=anonymous)
+
+        req = self.mock_request("/", headers={"Cache-Control": "no-cache"})
+        svc = models.Service.by_service_name(svc_name, db_session=req.db)
+        svc_impl = ServiceAPI(svc, req)
+        matrix = {(user.id, res.resource_id): sorted(perm.json()["name"] + ":" + perm.json()["access"]
+                                                     for perm in perms)
+                  for user, res, perms in svc_impl.effective_permissions_matrix()}
+        for user in req.db.query(models.User):
+            for res_id in [svc_id, res1_id, res2_id, res3_id, res4_id]:
+                res = ResourceService.by_resource_id(res_id, db_session=req.db)
+                perms = svc_impl.effective_permissions(user, res)
+                if (user.id, res_id) not in matrix:
+                    utils.check_all_equal([perm.reason for perm in perms], ["no-permission"] * len(perms),
+                                          msg="Omitted resources should only be denied by default.")
+                    continue
+                expected = sorted(perm.json()["name"] + ":" + perm.json()["access"] for perm in perms)
+                utils.check_val_equal(matrix[(user.id, res_id)], expected,
+                                      msg="Mismatch for user [{}] on resource [{}]".format(user.user_name, res_id))
+        test_user = UserService.by_user_name(self.test_user_name, db_session=req.db)
+        utils.check_val_equal(matrix[(test_user.id, res3_id)], ["read:deny", "write:allow"])
+
+        path = "/services/{}/permissions/matrix".format(svc_name)
+        resp = utils.test_request(self, "GET", path, params={"format": "ndjson"},
+                                  headers=self.json_headers, cookies=self.cookies)
+        utils.check_val_equal(resp.status_code, 200)
+        utils.check_val_equal(resp.content_type, "application/x-ndjson")
+        entries = [json.loads(line) for line in resp.text.splitlines()]
+        test_entries = {(entry["resource_id"], entry["permission_name"]): entry["access"]
+                        for entry in entries if entry["user_name"] == self.test_user_name}
+        utils.check_val_equal(test_entries, {
+            (svc_id, "write"): "deny",
+            (res1_id, "read"): "allow", (res1_id, "write"): "allow",
+            (res2_id, "read"): "deny", (res2_id, "write"): "allow",
+            (res3_id, "read"): "deny", (res3_id, "write"): "allow",
+            (res4_id, "read"): "allow", (res4_id, "write"): "allow",
+        })
+
+        # matrix is not recomputed until refreshed
+        utils.TestSetup.create_TestUserResourcePermission(self, override_resource_id=res3_id, override_permission=rAR)
+        with mock.patch("magpie.services.ServiceInterface.effective_permissions_matrix",
+                        side_effect=AssertionError) as compute_matrix:
+            resp = utils.test_request(self, "GET", path, headers=self.json_headers, cookies=self.cookies)
+        utils.check_val_equal(compute_matrix.call_count, 0)
+        utils.check_val_equal(resp.content_type, "text/csv")
+        rows = [line.split(",") for line in resp.text.splitlines()]
+        utils.check_val_equal(rows[0][:3], ["user_id", "user_name", "resource_id"])
+        utils.check_val_equal(len(rows) - 1, len(entries))
+        resp = utils.test_request(self, "POST", path, headers=self.json_headers, cookies=self.cookies)
+        body = utils.check_response_basic_info(resp, 200, expected_method="POST")
+        utils.check_val_equal(body["entries"], len(entries))
+        resp = utils.test_request(self, "GET", path, params={"format": "ndjson"},
+                                  headers=self.json_headers, cookies=self.cookies)
+        entries = [json.loads(line) for line in resp.text.splitlines()]
+        utils.check_val_is_in({"user_id": test_user.id, "user_name": self.test_user_name, "resource_id": res3_id,
+                               "resource_name": "unittest-route3", "resource_type": route, "permission_name": "read",
+                               "access": "allow", "reason": "user:{}:{}".format(test_user.id, self.test_user_name)},
+                              entries)
+        utils.TestSetup.delete_TestService(self, override_service_name=svc_name)
+
     @utils.mock_get_settings
     def test_ServiceTHREDDS_effective_permissions(self):
         """
@@ -579,6 +1233,47 @@ class TestServices(ti.SetupMagpieAdapter, ti.UserTestCase, ti.BaseTestCase):
                 msg += "Using [GET, {}]".format(path)
                 utils.check_raises(lambda: self.ows.check_request(req), OWSAccessForbidden, msg=msg)
 
+    @utils.mock_get_settings
+    def test_ServiceTHREDDS_router_cache(self):
+        """
+        Validate that the compiled router of a service is reused across requests until the service gets updated.
+        """
+        utils.warn_version(self, "compiled service routers", "3.6.0", skip=True)
+        svc_name = "unittest-service-thredds-router"
+        utils.TestSetup.delete_TestService(self, override_service_name=svc_name)
+        utils.TestSetup.create_TestService(self, override_service_name=svc_name,
+                                           override_service_type=ServiceTHREDDS.service_type)
+
+        def get_service_impl(_path):
+            _req = self.mock_request(_path, method="GET")
+            _svc = models.Service.by_service_name(svc_name, db_session=_req.db)
+            return ServiceTHREDDS(_svc, _req)
+
+        path = "/ows/proxy/{}/dodsC/dir/file.nc.html".format(svc_name)
+        service_impl = get_service_impl(path)
+        router = service_impl.router
+        utils.check_val_equal(service_impl.permission_requested(), Permission.READ)
+        for prefix, perm in [("catalog.xml", Permission.BROWSE), ("dodsC", Permission.READ), ("other", None)]:
+            service_impl = get_service_impl("/ows/proxy/{}/{}/dir/file.nc".format(svc_name, prefix))
+            utils.check_val_is_in(service_impl.router, [router], msg="Router should be reused across requests.")
+            utils.check_val_equal(service_impl.permission_requested(), perm)
+        utils.check_val_equal(router.match_file("file.nc.html"), "file.nc")
+        utils.check_val_equal(router.match_file("file.txt"), "file.txt")
+
+        config = {"data_type": {"prefixes": ["other"]}, "file_patterns": [".*\\.txt"]}
+        data = {"service_url": "http://localhost:9000/{}/updated".format(svc_name), "configuration": config}
+        path = "/services/{}".format(svc_name)
+        resp = utils.test_request(self, "PATCH", path, json=data, headers=self.json_headers, cookies=self.cookies)
+        utils.check_response_basic_info(resp, 200, expected_method="PATCH")
+        utils.check_val_not_in(router.service_id, SERVICE_ROUTER_CACHE, msg="Router should be invalidated by update.")
+
+        service_impl = get_service_impl("/ows/proxy/{}/other/dir/file.txt".format(svc_name))
+        utils.check_val_not_equal(service_impl.router, router, msg="Router should be recompiled after update.")
+        utils.check_val_equal(service_impl.permission_requested(), Permission.READ)
+        utils.check_val_equal(service_impl.router.match_file("file.txt.html"), "file.txt")
+        service_impl = get_service_impl("/ows/proxy/{}/dodsC/dir/file.txt".format(svc_name))
+        utils.check_val_equal(service_impl.permission_requested(), None)
+
     @unittest.skip("impl")
     @pytest.mark.skip
     @utils.mock_get_settings
@@ -975,3 +1670,42 @@ class TestServices(ti.SetupMagpieAdapter, ti.UserTestCase, ti.BaseTestCase):
             corresponding resources accessed through different endpoints and formats.
         """
         raise NotImplementedError  # FIXME: see https://github.com/Ouranosinc/Magpie/issues/360
+
+
+@runner.MAGPIE_TEST_LOCAL
+@runner.MAGPIE_TEST_SERVICES
+@runner.MAGPIE_TEST_FUNCTIONAL
+class TestBenchmarks(unittest.TestCase):
+    """
+    Validate that the authorization benchmarks run and report comparable results with minimal synthetic resources.
+    """
+
+    @utils.mock_get_settings
+    def test_benchmarks_results(self):
+        from tests import benchmarks  # pylint: disable=C0415
+
+        with NamedTemporaryFile(mode="r", suffix=".json") as output:
+            args = ["--services", "api", "wps", "--depth", "2", "--fan-out", "2", "--users", "2", "--groups", "2",
+                    "--density", "1", "--iterations", "5", "--warmup", "1", "--output", output.name]
+            utils.check_val_equal(benchmarks.main(args), 0)
+            results = json.load(output)
+            utils.check_val_equal(results["metadata"]["parameters"]["depth"], 2)
+            utils.check_val_equal(sorted(results["results"]), ["api", "wps"])
+            for operations in results["results"].values():
+                utils.check_val_equal(sorted(operations), sorted(benchmarks.BENCHMARK_OPERATIONS))
+                for stats in operations.values():
+                    utils.check_val_equal(stats["count"], 5)
+                    latencies = [stats[name] for name in ["min_ms", "p50_ms", "p95_ms", "max_ms"]]
+                    utils.check_val_equal(latencies, sorted(latencies))
+
+            lines, regressed = benchmarks.compare_results(results, results, threshold=0)
+            utils.check_val_equal(len(lines), 1 + 2 * len(benchmarks.BENCHMARK_OPERATIONS))
+            utils.check_val_equal(regressed, False)
+
+        # generated principals and services are removed after the benchmark
+        app = benchmarks.BenchmarkAdapter.app
+        db_session = get_db_session_from_settings(app.app.registry)
+        try:
+            utils.check_val_equal(models.Service.by_service_name("benchmark-api", db_session=db_session), None)
+        finally:
+            db_session.close()
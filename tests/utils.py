@@ -1,6 +1,7 @@
 import functools
 import itertools
 import json as json_pkg  # avoid conflict name with json argument employed for some function
+import threading
 import unittest
 import uuid
 import warnings
@@ -16,6 +17,7 @@ from pyramid.httpexceptions import HTTPException
 from pyramid.settings import asbool
 from pyramid.testing import DummyRequest, setUp as PyramidSetUp
 from six.moves.urllib.parse import urlparse
+from sqlalchemy import event
 from webtest.app import AppError, TestApp  # noqa
 from webtest.forms import Form
 from webtest.response import TestResponse
@@ -562,6 +564,67 @@ def test_request(test_item,             # type: AnyMagpieTestItemType
             retries -= 1
 
 
+class QueryCounter(object):
+    """
+    Records SQL statements executed by the database engine of a local test application while within the context.
+
+    Only statements executed by the thread that entered the context are recorded, such that background operations
+    (e.g.: cache invalidation listener) do not interfere with statements of requests sent to the test application.
+
+    Example::
+
+        with QueryCounter(app) as queries:
+            test_request(app, "GET", "/users")
+        check_val_equal(queries.count <= 5, True)
+    """
+    def __init__(self, app):
+        # type: (TestApp) -> None
+        self.engine = app.app.registry["db_session_factory"].kw["bind"]
+        self.statements = []  # type: List[Str]
+        self._thread = None  # type: Optional[threading.Thread]
+
+    def _record_statement(self, conn, cursor, statement, parameters, context, executemany):  # noqa: W0613
+        if threading.current_thread() is self._thread:
+            self.statements.append(statement)
+
+    def __enter__(self):
+        self._thread = threading.current_thread()
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute", self._record_statement)
+        return self
+
+    def __exit__(self, *_, **__):
+        event.remove(self.engine, "before_cursor_execute", self._record_statement)
+
+    @property
+    def count(self):
+        # type: () -> int
+        return len(self.statements)
+
+
+def check_query_budget(test_item, method, path, budget, msg=None, **request_kwargs):
+    # type: (AnyMagpieTestItemType, Str, Str, int, Optional[Str], **Any) -> int
+    """
+    Sends the request to the local test application and validates that it completes within the SQL statements budget.
+
+    The request is sent once beforehand to exclude statements of lazy initializations and uncached lookups that are
+    performed only the first time from the count.
+
+    :returns: amount of SQL statements executed by the request.
+    :raises AssertionError: if the request failed or executed more SQL statements than allowed by the budget.
+    """
+    app = get_app_or_url(test_item)
+    test_request(app, method, path, **request_kwargs)
+    with QueryCounter(app) as queries:
+        resp = test_request(app, method, path, **request_kwargs)
+    check_response_basic_info(resp, expected_method=method)
+    details = "{} {} executed {} SQL statements (budget: {}).\n  {}".format(
+        method, path, queries.count, budget, "\n  ".join(stmt.replace("\n", " ") for stmt in queries.statements)
+    )
+    check_val_equal(queries.count <= budget, True, msg="{}\n{}".format(msg, details) if msg else details)
+    return queries.count
+
+
 def get_session_user(app_or_url, headers=None):
     # type: (TestAppOrUrlType, Optional[HeadersType]) -> AnyResponseType
     if not headers:
@@ -1835,7 +1898,7 @@ class TestSetup(object):
             resp = test_request(app_or_url, "GET", path, expect_errors=True,
                                 headers=override_headers if override_headers is not null else test_case.json_headers,
                                 cookies=override_cookies if override_cookies is not null else test_case.cookies)
-            check_val_is_in(resp.status_code, 404)
+            check_val_equal(resp.status_code, 404)
 
     @staticmethod
     def get_RegisteredUsersList(test_case, override_headers=null, override_cookies=null):